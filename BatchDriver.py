@@ -0,0 +1,804 @@
+"""
+Provides a headless, command line and library front end for the
+operations that are available through the menus.
+
+The GUI needs Tk and asks for its input with dialogs, so it cannot be
+used for batch jobs or on servers. The operations here take their input
+as parameters and return plain data, so they can be called from other
+Python code with execute() or run from the command line. For example,
+
+    python -m Chap1.BatchDriver --catalog messier.dat objByName name=M31
+    python -m Chap1.BatchDriver findConst ra=5:35:17 decl=-5d23m28s
+
+When no operation is given on the command line, requests are read from
+stdin, one JSON object per line, such as
+
+    {"op": "load", "file": "messier.dat"}
+    {"op": "objsInConst", "const": "Ori"}
+
+and one JSON result is written to stdout for each request.
+
+The objects an operation finds can be written to a file with the
+export operation instead of being returned, e.g.,
+
+    {"op": "export", "file": "ori.parquet", "of": "objsInConst", "const": "Ori"}
+
+A process that has loaded a catalog can share it with the publish
+operation, and other processes can then use it with --attach NAME (or
+the attach operation) instead of loading it themselves.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+import json
+import math
+import sys
+
+import ASTUtils.ASTAngle as ASTAngle
+import ASTUtils.ASTCatalog as ASTCatalog
+import ASTUtils.ASTConstellation as ASTConstellation
+from ASTUtils.ASTMisc import HIDE_ERRORS, DEFAULT_EPOCH, ASCENDING_ORDER, DESCENDING_ORDER
+import ASTUtils.ASTTime as ASTTime
+
+import Chap1.CatalogExport as CatalogExport
+import Chap1.CatalogFilter as CatalogFilter
+import Chap1.CatalogStore as CatalogStore
+import Chap1.ConstBoundaryIndex as ConstBoundaryIndex
+import Chap1.ConstSearch as ConstSearch
+import Chap1.ConstTables as ConstTables
+import Chap1.LazyImport as LazyImport
+import Chap1.QueryCache as QueryCache
+import Chap1.TextIndex as TextIndex
+
+# Only needed when the module is run from the command line
+argparse = LazyImport.lazyImport("argparse")
+
+# Default number of objects for the objsInRange operation
+DEFAULT_RANGE_COUNT = 100
+
+class BatchError(Exception):
+    """Raised when a request cannot be carried out"""
+    pass
+
+#==================================================
+# Converting results to plain data
+#==================================================
+
+def objToDict(idx):
+    """
+    Converts a catalog object to a dictionary.
+
+    :param int idx: index of the object in the currently loaded catalog
+    """
+    obj = CatalogStore.getCatObject(idx)
+    return {"index": idx, "position": CatalogStore.getObjPosition(idx), "name": obj.name,
+            "altName": obj.altName, "RA": obj.RA, "Decl": obj.Decl, "mV": obj.mV,
+            "const": ASTConstellation.getConstAbbrevName(obj.constIdx) if (obj.constIdx >= 0) else None,
+            "comment": obj.comment, "catalog": CatalogStore.getObjSource(idx)}
+
+
+
+def constToDict(idx):
+    """
+    Converts a constellation to a dictionary.
+
+    :param int idx: index of the constellation
+    """
+    tables = ConstTables.getConstTables()
+    return {"index": idx, "name": tables.getConstName(idx), "abbrev": tables.getConstAbbrevName(idx),
+            "meaning": tables.getConstMeaning(idx)}
+
+
+
+#==================================================
+# Getting parameters
+#==================================================
+
+def _getParam(params,name,default=None):
+    """Gets a parameter, raising BatchError if it is required but missing"""
+    value = params.get(name, default)
+    if ((value == None) or (isinstance(value, str) and (len(value.strip()) <= 0))):
+        if (default != None):
+            return default
+        raise BatchError("Missing parameter '" + name + "'")
+    return value
+
+
+
+def _getStr(params,name,default=None):
+    """Gets a string parameter"""
+    value = _getParam(params,name,default)
+    if not isinstance(value, str):
+        raise BatchError("Parameter '" + name + "' must be a string")
+    return value
+
+
+
+def _getOptionalStr(params,name):
+    """Gets a string parameter that may be left out (None if it is)"""
+    value = params.get(name)
+    if ((value != None) and not isinstance(value, str)):
+        raise BatchError("Parameter '" + name + "' must be a string")
+    return value
+
+
+
+def _getStrList(params,name):
+    """Gets a parameter that is a list of strings or a comma separated string"""
+    value = _getParam(params,name)
+    if isinstance(value, str):
+        value = value.split(",")
+    elif not (isinstance(value, list) and all(isinstance(v, str) for v in value)):
+        raise BatchError("Parameter '" + name + "' must be a list of strings or a comma separated string")
+    return [v.strip() for v in value if (len(v.strip()) > 0)]
+
+
+
+def _getInt(params,name,default=None):
+    """Gets an integer parameter"""
+    value = _getParam(params,name,default)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise BatchError("Parameter '" + name + "' must be an integer")
+
+
+
+def _getFloat(params,name,default=None):
+    """Gets a floating point parameter"""
+    value = _getParam(params,name,default)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise BatchError("Parameter '" + name + "' must be a number")
+
+
+
+def _getLimit(params,default):
+    """Gets the 'limit' parameter, which must be a positive integer"""
+    limit = _getInt(params,"limit",default)
+    if (limit < 1):
+        raise BatchError("Parameter 'limit' must be at least 1")
+    return limit
+
+
+
+def _getBool(params,name):
+    """Gets a parameter that is true or false (false if it is missing)"""
+    return str(params.get(name, False)).strip().lower() in ("true", "1", "yes")
+
+
+
+def _getRA(value):
+    """Converts an RA given in decimal hours or as hh:mm:ss.ss to decimal hours"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    raObj = ASTTime.isValidTime(str(value),HIDE_ERRORS)
+    if not (raObj.isValidTimeObj()):
+        raise BatchError("The RA '" + str(value) + "' is invalid")
+    return raObj.getDecTime()
+
+
+
+def _getDecl(value):
+    """Converts a Decl given in decimal degrees or as xxxd yym zz.zzs to decimal degrees"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    declObj = ASTAngle.isValidAngle(str(value),HIDE_ERRORS)
+    if not (declObj.isValidAngleObj()):
+        raise BatchError("The Decl '" + str(value) + "' is invalid")
+    return declObj.getDecAngle()
+
+
+
+def _getConstIdx(params):
+    """Gets a constellation given its abbreviated name in the 'const' parameter"""
+    abbrev = _getStr(params,"const").strip()
+    idx = ASTConstellation.findConstellationByAbbrvName(abbrev)
+    if (idx < 0):
+        raise BatchError("No Constellation whose abbreviated name is '" + abbrev + "' was found")
+    return idx
+
+
+
+def _getSortOrder(params):
+    """Gets the 'order' parameter, which is 'ascending' (the default) or 'descending'"""
+    order = _getStr(params,"order","ascending").strip().lower()
+    if (order.startswith("asc")):
+        return ASCENDING_ORDER
+    elif (order.startswith("desc")):
+        return DESCENDING_ORDER
+    raise BatchError("Parameter 'order' must be 'ascending' or 'descending'")
+
+
+
+def _requireCatalog():
+    """Raises BatchError if no catalog is loaded"""
+    if not (CatalogStore.isCatalogLoaded()):
+        raise BatchError("No catalog is currently loaded")
+
+
+
+#==================================================
+# Constellation operations
+#==================================================
+
+def opAllConsts(params):
+    """Lists all of the constellations"""
+    return [constToDict(i) for i in range(len(ConstTables.getConstTables()))]
+
+
+
+def opConstByName(params):
+    """Finds a constellation by name (parameter 'name')"""
+    idx = ASTConstellation.findConstellationByName(_getStr(params,"name").strip())
+    return constToDict(idx) if (idx >= 0) else None
+
+
+
+def opConstByAbbrevName(params):
+    """Finds a constellation by abbreviated name (parameter 'abbrev')"""
+    idx = ASTConstellation.findConstellationByAbbrvName(_getStr(params,"abbrev").strip())
+    return constToDict(idx) if (idx >= 0) else None
+
+
+
+def opConstsByMeaning(params):
+    """Finds the constellations whose meaning contains a substring (parameter 'target')"""
+    return [constToDict(i) for i in ConstSearch.findConstellationsByMeaning(_getStr(params,"target").strip())]
+
+
+
+def opFindConst(params):
+    """
+    Finds the constellation a location is in (parameters 'ra', 'decl',
+    and optionally 'epoch'). 'ra' and 'decl' may instead be lists, in
+    which case a list of constellations is returned.
+    """
+    ra = _getParam(params,"ra")
+    decl = _getParam(params,"decl")
+    epoch = _getFloat(params,"epoch",DEFAULT_EPOCH)
+    if isinstance(ra, list):
+        if ((not isinstance(decl, list)) or (len(decl) != len(ra))):
+            raise BatchError("Parameters 'ra' and 'decl' must be lists of the same length")
+        indices = ConstBoundaryIndex.findConstellationsForCoords([_getRA(v) for v in ra],
+                                                                 [_getDecl(v) for v in decl],epoch)
+        return [ASTConstellation.getConstAbbrevName(i) if (i >= 0) else None for i in indices]
+
+    idx = ASTConstellation.findConstellationFromCoord(_getRA(ra),_getDecl(decl),epoch)
+    return constToDict(idx) if (idx >= 0) else None
+
+
+
+#==================================================
+# Star catalog operations
+#==================================================
+
+def opLoad(params):
+    """
+    Loads a catalog (parameter 'file'). 'file' may also be a list of catalogs
+    or a comma separated string, in which case they are loaded in parallel and
+    merged. If the optional parameter 'add' is true, the catalogs are added to
+    those already loaded. If the optional parameter 'lazy' is true, the comments
+    are read from the catalog files only when they are needed.
+    """
+    files = _getStrList(params,"file")
+    keepLoaded = _getBool(params,"add")
+    lazy = _getBool(params,"lazy") if ("lazy" in params) else None
+    if ((len(files) == 1) and not keepLoaded):
+        loaded = CatalogStore.loadFormattedStarCatalog(files[0],lazy)
+    else:
+        loaded = CatalogStore.loadFormattedStarCatalogs(files,keepLoaded,lazy)
+    if not (loaded):
+        raise BatchError("Could not load the catalog data from " + ", ".join(files))
+    return opInfo(params)
+
+
+
+def opPublish(params):
+    """
+    Shares the currently loaded catalog with other processes, which can
+    attach to it by the returned name. The optional parameter 'name' gives
+    the name to use. The catalog stays shared until it is cleared, another
+    catalog is loaded, or this process exits.
+    """
+    _requireCatalog()
+    try:
+        return CatalogStore.publishCatalog(_getOptionalStr(params,"name"))
+    except OSError as e:
+        raise BatchError("Could not share the catalog: " + str(e))
+
+
+
+def opAttach(params):
+    """Attaches to a catalog that another process has shared (parameter 'name')"""
+    name = _getStr(params,"name").strip()
+    if not (CatalogStore.attachSharedCatalog(name)):
+        raise BatchError("Could not attach to the shared catalog '" + name + "'")
+    return opInfo(params)
+
+
+
+def opClear(params):
+    """Clears the currently loaded catalog"""
+    CatalogStore.clearCatalogAndSpaceObjects()
+    return True
+
+
+
+def opInfo(params):
+    """Gets information about the currently loaded catalog"""
+    _requireCatalog()
+    counts = CatalogStore.getCatConstCounts()
+    return {"file": CatalogStore.getCatFilename(), "files": CatalogStore.getCatFilenames(),
+            "type": CatalogStore.getCatType(),
+            "epoch": CatalogStore.getCatEpoch(), "numObjs": CatalogStore.getCatNumObjs(),
+            "numConst": len(counts),
+            "constCounts": dict((ASTConstellation.getConstAbbrevName(i), counts[i]) for i in counts)}
+
+
+
+def opCacheStats(params):
+    """
+    Gets the search result cache's hit and miss statistics. If the 'reset'
+    parameter is true, the counts are set back to 0 after they are returned.
+    """
+    stats = CatalogStore.getQueryCacheStats()
+    if (_getBool(params,"reset")):
+        QueryCache.getQueryCache().resetStats()
+    return stats
+
+
+
+def opSort(params):
+    """Sorts the catalog (parameters 'field' and optionally 'order')"""
+    _requireCatalog()
+    fieldName = _getStr(params,"field").strip().upper()
+    try:
+        sortField = ASTCatalog.CatalogSortField[fieldName]
+    except KeyError:
+        raise BatchError("Unknown sort field '" + fieldName + "'. Valid fields are " +
+                         ", ".join(f.name for f in ASTCatalog.CatalogSortField))
+    CatalogStore.sortStarCatalog(sortField,_getSortOrder(params))
+    return True
+
+
+
+def _constAbbrevOrNone(idx):
+    return ASTConstellation.getConstAbbrevName(idx) if (idx >= 0) else None
+
+
+
+def opCheckConsts(params):
+    """
+    Finds the objects whose constellation does not agree with their
+    coordinates. The optional parameter 'epoch' gives the epoch to take the
+    coordinates to be in instead of the catalog's own epoch.
+    """
+    _requireCatalog()
+    epoch = _getFloat(params,"epoch") if ("epoch" in params) else None
+    try:
+        mismatches = CatalogStore.checkObjConstellations(epoch)
+    except OSError as e:
+        raise BatchError("Could not read the constellation boundaries: " + str(e))
+    return [{"object": objToDict(i), "catalogConst": _constAbbrevOrNone(catConst),
+             "coordConst": _constAbbrevOrNone(coordConst)} for i, catConst, coordConst in mismatches]
+
+
+
+def opRetagConsts(params):
+    """
+    Changes each object's constellation to the one its coordinates are in
+    (optional parameter 'epoch' as for checkConsts). Returns how many
+    objects were changed.
+    """
+    _requireCatalog()
+    epoch = _getFloat(params,"epoch") if ("epoch" in params) else None
+    try:
+        return CatalogStore.retagObjConstellations(epoch)
+    except OSError as e:
+        raise BatchError("Could not read the constellation boundaries: " + str(e))
+
+
+
+#==================================================
+# Space object operations
+#==================================================
+
+def opObjByName(params):
+    """Finds an object by name (parameter 'name')"""
+    _requireCatalog()
+    idx = CatalogStore.findObjByName(_getStr(params,"name").strip())
+    return objToDict(idx) if (idx >= 0) else None
+
+
+
+def opObjByAltName(params):
+    """Finds an object by alternate name (parameter 'name')"""
+    _requireCatalog()
+    idx = CatalogStore.findObjByAltName(_getStr(params,"name").strip())
+    return objToDict(idx) if (idx >= 0) else None
+
+
+
+# Each of the operations that list objects has a function that finds
+# the objects, which the export operation also uses
+
+def findObjsByComments(params):
+    """Finds the objects whose comments contain a substring (parameter 'target')"""
+    _requireCatalog()
+    return CatalogStore.findObjsByComments(_getStr(params,"target").strip())
+
+
+
+def _getNameField(params):
+    """Gets the 'field' parameter, which says which kind of names to complete or suggest"""
+    field = _getStr(params,"field","name").strip()
+    if not (field in ("name", "altName", "const", "constAbbrev")):
+        raise BatchError("Parameter 'field' must be one of name, altName, const, constAbbrev")
+    if (field in ("name", "altName")):
+        _requireCatalog()
+    return field
+
+
+
+def opComplete(params):
+    """
+    Lists the names that start with a prefix (parameter 'prefix'). The
+    optional 'field' parameter says which names to complete: object names
+    ('name', the default), alternate names ('altName'), constellation
+    names ('const'), or abbreviated constellation names ('constAbbrev').
+    The optional 'limit' parameter gives the most names to list.
+    """
+    field = _getNameField(params)
+    prefix = _getStr(params,"prefix","")
+    limit = _getLimit(params,TextIndex.DEFAULT_COMPLETIONS)
+    if (field in ("name", "altName")):
+        return CatalogStore.completeObjNames(prefix,limit,field == "altName")
+    tables = ConstTables.getConstTables()
+    names = tables.abbrevs if (field == "constAbbrev") else tables.names
+    return [names[i] for i in ConstSearch.completeConstNames(prefix,limit,field == "constAbbrev")]
+
+
+
+def opSuggest(params):
+    """
+    Lists the names that are closest to a name that was not found (parameter
+    'name'). The optional 'field' and 'limit' parameters are the same as for
+    the complete operation.
+    """
+    field = _getNameField(params)
+    name = _getStr(params,"name").strip()
+    limit = _getLimit(params,TextIndex.DEFAULT_SUGGESTIONS)
+    if (field in ("name", "altName")):
+        return CatalogStore.suggestObjNames(name,limit,field == "altName")
+    tables = ConstTables.getConstTables()
+    names = tables.abbrevs if (field == "constAbbrev") else tables.names
+    return [names[i] for i in ConstSearch.suggestConstNames(name,limit,field == "constAbbrev")]
+
+
+
+def opObjsByComments(params):
+    """Lists the objects whose comments contain a substring (parameter 'target')"""
+    return [objToDict(i) for i in findObjsByComments(params)]
+
+
+
+def findObjsInRange(params):
+    """
+    Finds the objects in a range of positions in the current sort order
+    (parameters 'start', which is 1-based, and 'count')
+    """
+    _requireCatalog()
+    iStart = max(_getInt(params,"start",1) - 1, 0)
+    iEnd = min(iStart + _getInt(params,"count",DEFAULT_RANGE_COUNT), CatalogStore.getCatNumObjs())
+    return [CatalogStore.getObjIndexAt(pos) for pos in range(iStart,iEnd)]
+
+
+
+def opObjsInRange(params):
+    """
+    Lists the objects in a range of positions in the current sort order
+    (parameters 'start', which is 1-based, and 'count')
+    """
+    return [objToDict(i) for i in findObjsInRange(params)]
+
+
+
+def findObjsInCone(params):
+    """
+    Finds the objects within an angle of a point (parameters 'ra', 'decl',
+    and 'radius', which is in degrees)
+    """
+    _requireCatalog()
+    return CatalogStore.findObjsInCone(_getRA(_getParam(params,"ra")),_getDecl(_getParam(params,"decl")),
+                                       _getFloat(params,"radius"))
+
+
+
+def opObjsInCone(params):
+    """
+    Lists the objects within an angle of a point (parameters 'ra', 'decl',
+    and 'radius', which is in degrees)
+    """
+    return [objToDict(i) for i in findObjsInCone(params)]
+
+
+
+def findObjsInBox(params):
+    """
+    Finds the objects within a range of RA and Decl (parameters 'raStart',
+    'raEnd', 'declLo', and 'declHi'). The RA range wraps through 0h if
+    raStart is greater than raEnd.
+    """
+    _requireCatalog()
+    return CatalogStore.findObjsInBox(_getRA(_getParam(params,"raStart")),_getRA(_getParam(params,"raEnd")),
+                                      _getDecl(_getParam(params,"declLo")),_getDecl(_getParam(params,"declHi")))
+
+
+
+def opObjsInBox(params):
+    """
+    Lists the objects within a range of RA and Decl (parameters 'raStart',
+    'raEnd', 'declLo', and 'declHi'). The RA range wraps through 0h if
+    raStart is greater than raEnd.
+    """
+    return [objToDict(i) for i in findObjsInBox(params)]
+
+
+
+def findObjsByFilter(params):
+    """
+    Finds the objects that satisfy all of the conditions given by the
+    optional parameters 'const', 'mVMin', 'mVMax', 'raStart' and 'raEnd',
+    'declLo', 'declHi', and 'namePrefix'
+    """
+    _requireCatalog()
+    constIdx = _getConstIdx(params) if ("const" in params) else None
+    RAStart = _getRA(params["raStart"]) if ("raStart" in params) else None
+    RAEnd = _getRA(params["raEnd"]) if ("raEnd" in params) else None
+    if ((RAStart == None) != (RAEnd == None)):
+        raise BatchError("Parameters 'raStart' and 'raEnd' must be given together")
+    mVMin = _getFloat(params,"mVMin") if ("mVMin" in params) else None
+    mVMax = _getFloat(params,"mVMax") if ("mVMax" in params) else None
+    catFilter = CatalogFilter.CatalogFilter(constIdx,mVMin,mVMax,RAStart,RAEnd,
+                                            _getDecl(params["declLo"]) if ("declLo" in params) else None,
+                                            _getDecl(params["declHi"]) if ("declHi" in params) else None,
+                                            _getOptionalStr(params,"namePrefix"))
+    return catFilter.apply()
+
+
+
+def opFilter(params):
+    """
+    Lists the objects that satisfy all of the conditions given by the
+    optional parameters 'const', 'mVMin', 'mVMax', 'raStart' and 'raEnd',
+    'declLo', 'declHi', and 'namePrefix'
+    """
+    return [objToDict(i) for i in findObjsByFilter(params)]
+
+
+
+def findObjsInConst(params):
+    """Finds the objects in a constellation (parameters 'const' and optionally 'order')"""
+    _requireCatalog()
+    return CatalogStore.getConstMembers(_getConstIdx(params),_getSortOrder(params))
+
+
+
+def opObjsInConst(params):
+    """Lists the objects in a constellation (parameters 'const' and optionally 'order')"""
+    return [objToDict(i) for i in findObjsInConst(params)]
+
+
+
+#==================================================
+# Exporting objects
+#==================================================
+
+# Maps each operation whose objects can be exported to the function that finds them
+RESULT_SETS = {
+    "objsByComments": findObjsByComments,
+    "objsInRange": findObjsInRange,
+    "objsInCone": findObjsInCone,
+    "objsInBox": findObjsInBox,
+    "filter": findObjsByFilter,
+    "objsInConst": findObjsInConst,
+}
+
+def opExport(params):
+    """
+    Writes objects to a file (parameter 'file') in Arrow, Parquet, NumPy,
+    or CSV format. The format comes from the file's extension unless the
+    'format' parameter is given, and 'columns' can give a comma separated
+    list of the columns to write. If the 'of' parameter names an operation
+    that lists objects, the objects that operation finds (given the rest of
+    the parameters) are written. Otherwise the whole catalog is written.
+    """
+    _requireCatalog()
+    filename = _getStr(params,"file").strip()
+    of = _getOptionalStr(params,"of")
+    indices = None
+    if (of != None):
+        findObjs = RESULT_SETS.get(of)
+        if (findObjs == None):
+            raise BatchError("Cannot export the objects of '" + of + "'. Use one of " +
+                             ", ".join(sorted(RESULT_SETS)))
+        indices = findObjs(params)
+    columns = _getStrList(params,"columns") if (params.get("columns") != None) else None
+    try:
+        n = CatalogExport.exportObjects(filename,indices,_getOptionalStr(params,"format"),columns)
+    except CatalogExport.ExportError as e:
+        raise BatchError(str(e))
+    except OSError as e:
+        raise BatchError("Could not write " + filename + ": " + str(e))
+    return {"file": filename, "numObjs": n}
+
+
+
+#==================================================
+# Dispatching requests
+#==================================================
+
+# Maps the name of each operation to the function that carries it out
+OPERATIONS = {
+    "allConsts": opAllConsts,
+    "constByName": opConstByName,
+    "constByAbbrevName": opConstByAbbrevName,
+    "constsByMeaning": opConstsByMeaning,
+    "findConst": opFindConst,
+    "load": opLoad,
+    "clear": opClear,
+    "publish": opPublish,
+    "attach": opAttach,
+    "info": opInfo,
+    "sort": opSort,
+    "cacheStats": opCacheStats,
+    "checkConsts": opCheckConsts,
+    "retagConsts": opRetagConsts,
+    "objByName": opObjByName,
+    "objByAltName": opObjByAltName,
+    "complete": opComplete,
+    "suggest": opSuggest,
+    "objsByComments": opObjsByComments,
+    "objsInRange": opObjsInRange,
+    "objsInCone": opObjsInCone,
+    "objsInBox": opObjsInBox,
+    "filter": opFilter,
+    "objsInConst": opObjsInConst,
+    "export": opExport,
+}
+
+def execute(request):
+    """
+    Carries out one request.
+
+    :param dict request: the operation name in 'op', plus its parameters
+    :return: dictionary with 'ok' set to True and the operation's 'result',
+             or with 'ok' set to False and an 'error' message. If the request
+             has an 'id', it is copied to the response.
+    """
+    response = {}
+    if ("id" in request):
+        response["id"] = request["id"]
+    opName = request.get("op")
+    op = OPERATIONS.get(opName) if isinstance(opName, str) else None
+    if (op == None):
+        response["ok"] = False
+        response["error"] = "Unknown operation '" + str(opName) + "'"
+        return response
+    try:
+        response["result"] = op(request)
+        response["ok"] = True
+    except BatchError as e:
+        response["ok"] = False
+        response["error"] = str(e)
+    except Exception as e:
+        # A request that trips up an operation in a way it does not check
+        # for must not stop the requests that come after it
+        response["ok"] = False
+        response["error"] = type(e).__name__ + ": " + str(e)
+    return response
+
+
+
+def _jsonSafe(value):
+    """Replaces values that JSON cannot represent (NaN) with None"""
+    if (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, dict):
+        return dict((k, _jsonSafe(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return [_jsonSafe(v) for v in value]
+    return value
+
+
+
+def toJSON(response):
+    """Converts a response to a single line of JSON"""
+    return json.dumps(_jsonSafe(response), separators=(",", ":"))
+
+
+
+def runJSONLines(fin,fout):
+    """
+    Carries out requests read as JSON lines, writing one JSON line per response.
+
+    :param file fin: where to read requests from
+    :param file fout: where to write responses to
+    :return: number of requests that failed
+    """
+    failures = 0
+    for line in fin:
+        line = line.strip()
+        if (len(line) <= 0):
+            continue
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            response = {"ok": False, "error": "Invalid request: " + str(e)}
+        else:
+            response = execute(request)
+        if not (response["ok"]):
+            failures = failures + 1
+        fout.write(toJSON(response) + "\n")
+        fout.flush()
+    return failures
+
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Run catalog and constellation operations without a GUI. " +
+                                     "With no operation, JSON-lines requests are read from stdin.")
+    parser.add_argument("--catalog", help="catalog to load before doing anything else")
+    parser.add_argument("--attach", metavar="NAME",
+                        help="use a catalog that another process has shared instead of loading one")
+    parser.add_argument("--lazy", action="store_true",
+                        help="read the objects' comments from the catalog files only when they are needed")
+    parser.add_argument("--cache-budget", type=int, default=None, dest="cacheBudget",
+                        help="number of object indices to keep in cached search results (0 to not cache them)")
+    parser.add_argument("op", nargs="?", choices=sorted(OPERATIONS), help="operation to perform")
+    parser.add_argument("params", nargs="*", metavar="name=value", help="parameters for the operation")
+    args = parser.parse_args(argv)
+
+    if (args.lazy):
+        CatalogStore.setLazyLoading(True)
+    if (args.cacheBudget != None):
+        CatalogStore.setQueryCacheBudget(args.cacheBudget)
+    if ((args.catalog != None) or (args.attach != None)):
+        if (args.attach != None):
+            response = execute({"op": "attach", "name": args.attach})
+        else:
+            response = execute({"op": "load", "file": args.catalog})
+        if not (response["ok"]):
+            sys.stdout.write(toJSON(response) + "\n")
+            return 1
+
+    if (args.op == None):
+        return 1 if (runJSONLines(sys.stdin, sys.stdout) > 0) else 0
+
+    request = {"op": args.op}
+    for p in args.params:
+        name, sep, value = p.partition("=")
+        if (len(sep) <= 0):
+            parser.error("parameters must be given as name=value")
+        request[name] = value
+    response = execute(request)
+    sys.stdout.write(toJSON(response) + "\n")
+    return 0 if (response["ok"]) else 1
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,737 @@
+"""
+Benchmarks for the catalog and constellation operations behind
+the menu listeners. The benchmarks run without a GUI, e.g.,
+
+    python -m Chap1.Benchmarks comments catalogFile query [query ...]
+    python -m Chap1.Benchmarks suite --sizes 1000,100000 --out baseline.json
+    python -m Chap1.Benchmarks suite --compare baseline.json
+    python -m Chap1.Benchmarks startup --budget 150
+
+The suite generates synthetic catalogs of each requested size in the
+same pseudo-XML format as the book's catalogs, then times loading the
+catalog, each of the sorts, the name, alternate name, and comment
+lookups, the constellation listings, and finding the constellation
+for a coordinate. Each catalog size is run in its own process so that
+one size's caches and leftover objects do not affect the next. Besides
+its times, each operation reports the most memory a single call of it
+allocates, measured with tracemalloc during one extra call so that the
+tracing does not slow down the calls that are timed.
+The results can be saved to a JSON baseline file, and a later run can
+be compared against the baseline to find operations that got slower.
+
+The startup benchmark imports the main modules in fresh interpreters
+with -X importtime, the same way a short batch run starts, and reports
+how long each import took and which modules took the longest. A run
+fails if any import takes longer than the budget.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import ASTUtils.ASTCatalog as ASTCatalog
+import ASTUtils.ASTConstellation as ASTConstellation
+from ASTUtils.ASTMisc import ASCENDING_ORDER, DEFAULT_EPOCH, DESCENDING_ORDER
+
+import Chap1.CatalogCache as CatalogCache
+import Chap1.CatalogExport as CatalogExport
+import Chap1.CatalogStore as CatalogStore
+import Chap1.ConstSearch as ConstSearch
+import Chap1.ConstTables as ConstTables
+
+# Catalog sizes the suite runs if none are given
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+
+# Number of times each operation is timed, and the number of random
+# lookups made for each of the lookup operations
+DEFAULT_REPEAT = 5
+NUM_LOOKUPS = 200
+
+# Version of the layout of a baseline file
+BASELINE_VERSION = 1
+
+# A run is a regression if an operation's median time grows by more
+# than this fraction of the baseline, and by more than MIN_REGRESSION_SECONDS
+# (so that tiny operations do not show up just because of timer noise)
+DEFAULT_THRESHOLD = 0.25
+MIN_REGRESSION_SECONDS = 0.0005
+
+# Sort fields used by the menu items that sort the catalog
+SORT_FIELDS = (("sort.const", ASTCatalog.CatalogSortField.CONSTELLATION),
+               ("sort.constAndName", ASTCatalog.CatalogSortField.CONST_AND_OBJNAME),
+               ("sort.name", ASTCatalog.CatalogSortField.OBJNAME),
+               ("sort.altName", ASTCatalog.CatalogSortField.OBJ_ALTNAME),
+               ("sort.RA", ASTCatalog.CatalogSortField.RA),
+               ("sort.Decl", ASTCatalog.CatalogSortField.DECL),
+               ("sort.mV", ASTCatalog.CatalogSortField.VISUAL_MAGNITUDE))
+
+# Modules whose import time the startup benchmark measures, the number of
+# fresh interpreters each is imported in, and the default budget in milliseconds
+STARTUP_MODULES = ("Chap1.CatalogStore", "Chap1.BatchDriver", "Chap1.MenusListener")
+STARTUP_RUNS = 5
+DEFAULT_STARTUP_BUDGET_MS = 150.0
+
+# Words the comments of the synthetic objects are made from
+_COMMENT_WORDS = ("open", "globular", "cluster", "spiral", "elliptical", "galaxy", "planetary",
+                  "nebula", "double", "variable", "star", "bright", "faint", "compact", "diffuse",
+                  "remnant", "dark", "emission", "reflection", "group")
+
+# Comment searches that are timed
+_COMMENT_QUERIES = ("nebula", "globular cluster", "var", "spiral galaxy", "xyz")
+
+#==================================================
+# Comment searches
+#==================================================
+
+def benchmarkCommentSearch(queries,repeat=5,out=sys.stdout):
+    """
+    Compare comment searches through the comments index with a linear
+    scan of the currently loaded catalog, checking that both agree.
+
+    :param list queries: substrings to search for
+    :param int repeat: number of times to run each query
+    :param file out: where to write the report
+    :return: tuple (scan seconds, index seconds) totalled over all queries
+    """
+    scanTime = 0.0
+    indexTime = 0.0
+    for q in queries:
+        t0 = time.perf_counter()
+        for i in range(repeat):
+            expected = CatalogStore.scanObjsByComments(q)
+        t1 = time.perf_counter()
+        for i in range(repeat):
+            result = CatalogStore.findObjsByComments(q)
+        t2 = time.perf_counter()
+        if (result != expected):
+            raise AssertionError("Index and scan disagree for '" + q + "'")
+        scanTime = scanTime + (t1 - t0)
+        indexTime = indexTime + (t2 - t1)
+        out.write("%-24s %8d hits  scan %9.3f ms  index %9.3f ms\n" %
+                  (q, len(result), 1000.0 * (t1 - t0) / repeat, 1000.0 * (t2 - t1) / repeat))
+    out.write("Total: scan %.3f s, index %.3f s\n" % (scanTime, indexTime))
+    return scanTime, indexTime
+
+
+
+#==================================================
+# Synthetic catalogs
+#==================================================
+
+def generateCatalog(filename,numObjs,seed=1):
+    """
+    Writes a synthetic star catalog in the pseudo-XML catalog format.
+    The objects are spread uniformly over the sky and have random
+    magnitudes (some unknown), alternate names, and comments.
+
+    :param str filename: full pathname of the catalog data file to write
+    :param int numObjs: number of objects in the catalog
+    :param int seed: seed for the random number generator, so that
+                     the same catalog is generated every time
+    """
+    rnd = random.Random(seed)
+    numConsts = ASTConstellation.getNumConstellations()
+    with open(filename, "w", encoding="utf-8", newline="\n") as f:
+        f.write("<Catalog>\n<Header>\n<CatalogType>Synthetic</CatalogType>\n")
+        f.write("<Epoch>" + str(DEFAULT_EPOCH) + "</Epoch>\n")
+        f.write("<Source>Chap1.Benchmarks</Source>\n")
+        f.write("<Description>" + str(numObjs) + " random objects</Description>\n</Header>\n<Data>\n")
+        lines = []
+        for i in range(numObjs):
+            # Uniform over the sphere, so sin(Decl) is uniform
+            decl = math.degrees(math.asin(rnd.uniform(-1.0, 1.0)))
+            mV = "" if (rnd.random() < 0.05) else "%.1f" % rnd.uniform(-1.0, 16.0)
+            comment = " ".join(rnd.choice(_COMMENT_WORDS) for w in range(rnd.randint(1, 3)))
+            lines.append("<Object>\n <Name>SYN %d</Name>\n <AltName>HD %d</AltName>\n"
+                         " <RA>%.5f</RA>\n <Decl>%.4f</Decl>\n <mV>%s</mV>\n"
+                         " <Constellation>%s</Constellation>\n <Comment>%s</Comment>\n</Object>\n" %
+                         (i + 1, rnd.randrange(1, 10 * numObjs + 1), rnd.uniform(0.0, 24.0), decl, mV,
+                          ASTConstellation.getConstAbbrevName(rnd.randrange(numConsts)), comment))
+            if (len(lines) >= 10000):
+                f.write("".join(lines))
+                lines = []
+        f.write("".join(lines))
+        f.write("</Data>\n</Catalog>\n")
+
+
+
+def getSyntheticCatalog(dirname,numObjs,seed=1):
+    """
+    Gets the synthetic catalog of a given size, generating it
+    if it is not already in the directory.
+
+    :param str dirname: directory that holds the synthetic catalogs
+    :param int numObjs: number of objects in the catalog
+    :param int seed: seed for the random number generator
+    :return: full pathname of the catalog data file
+    """
+    filename = os.path.join(dirname, "synthetic_%d_%d.dat" % (numObjs, seed))
+    if not os.path.exists(filename):
+        generateCatalog(filename + ".tmp",numObjs,seed)
+        os.replace(filename + ".tmp", filename)
+    return filename
+
+
+
+#==================================================
+# Measurements
+#==================================================
+
+class _NullPrt():
+    """Stands in for an ASTPrt instance and throws away everything output to it"""
+
+    def __getattr__(self,name):
+        return self._discard
+
+    def _discard(self,*args):
+        pass
+
+
+
+def measurePeakMemory(func,args):
+    """
+    Measures the most memory one call of a function allocates, over what
+    was already allocated when it was called. Only memory allocated
+    through Python is counted, so memory-mapped files are not.
+
+    :param function func: function to call
+    :param tuple args: arguments for the call
+    :return: peak number of bytes allocated during the call
+    """
+    wasTracing = tracemalloc.is_tracing()
+    if not wasTracing:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        func(*args)
+        return max(tracemalloc.get_traced_memory()[1] - before, 0)
+    finally:
+        if not wasTracing:
+            tracemalloc.stop()
+
+
+
+def percentile(samples,pct):
+    """
+    Gets a percentile of a list of measurements.
+
+    :param list samples: the measurements, sorted in ascending order
+    :param float pct: percentile (0 - 100)
+    :return: the smallest measurement that at least pct percent of the measurements do not exceed
+    """
+    if (len(samples) <= 0):
+        return 0.0
+    rank = int(-(-len(samples) * pct // 100))       # ceiling
+    return samples[min(max(rank, 1), len(samples)) - 1]
+
+
+
+def summarize(latencies,numItems=None,peakBytes=None):
+    """
+    Gets the statistics for an operation from the time each call took.
+
+    :param list latencies: seconds taken by each call
+    :param int numItems: number of items (e.g., catalog objects) each
+                         call handled. If None, each call is one item.
+    :param int peakBytes: most memory one call allocated (None if not measured)
+    :return: dictionary of statistics
+    """
+    samples = sorted(latencies)
+    total = sum(samples)
+    items = len(samples) * (1 if (numItems == None) else numItems)
+    return {"count": len(samples),
+            "total": total,
+            "mean": total / len(samples) if (len(samples) > 0) else 0.0,
+            "p50": percentile(samples,50),
+            "p95": percentile(samples,95),
+            "p99": percentile(samples,99),
+            "max": samples[-1] if (len(samples) > 0) else 0.0,
+            "throughput": items / total if (total > 0.0) else 0.0,
+            "peakBytes": peakBytes}
+
+
+
+def timeCalls(func,argsList):
+    """
+    Times a function once for each of a list of arguments.
+
+    :param function func: function to time
+    :param list argsList: tuple of arguments for each call
+    :return: list of the seconds taken by each call
+    """
+    latencies = []
+    for args in argsList:
+        t0 = time.perf_counter()
+        func(*args)
+        latencies.append(time.perf_counter() - t0)
+    return latencies
+
+
+
+def timeOperation(func,argsList,numItems=None):
+    """
+    Times a function once for each of a list of arguments, then measures
+    the memory one more call with the first arguments allocates.
+
+    :param function func: function to time
+    :param list argsList: tuple of arguments for each call
+    :param int numItems: number of items each call handled (None for one)
+    :return: dictionary of statistics, as returned by summarize
+    """
+    return summarize(timeCalls(func,argsList),numItems,measurePeakMemory(func,argsList[0]))
+
+
+
+#==================================================
+# The suite
+#==================================================
+
+def runCatalogBenchmarks(filename,repeat=DEFAULT_REPEAT,numLookups=NUM_LOOKUPS,seed=1):
+    """
+    Times the catalog and constellation operations for one catalog.
+
+    :param str filename: full pathname of the catalog data file
+    :param int repeat: number of times to time each of the whole-catalog operations
+    :param int numLookups: number of random lookups to time for each lookup operation
+    :param int seed: seed for the random number generator that picks the lookups
+    :return: dictionary mapping each operation's name to its statistics
+    """
+    results = {}
+    cacheFile = CatalogCache.getCacheFilename(filename)
+    # Searches are timed without the search result cache unless it is being timed
+    cacheBudget = CatalogStore.getQueryCacheStats()["sizeBudget"]
+    CatalogStore.setQueryCacheBudget(0)
+
+    # Loading from the data file, which also compiles it, and then from the compiled file
+    def coldLoad():
+        if os.path.exists(cacheFile):
+            os.remove(cacheFile)
+        return CatalogStore.prepareFormattedStarCatalog(filename,None,False)
+
+    latencies = timeCalls(coldLoad,[()] * max(repeat // 2, 1))
+    n = len(CatalogStore.prepareFormattedStarCatalog(filename,None,False).catalog)
+    results["load.parse"] = summarize(latencies,n,measurePeakMemory(coldLoad,()))
+    results["load.compiled"] = timeOperation(CatalogStore.prepareFormattedStarCatalog,
+                                             [(filename, None, False)] * repeat,n)
+
+    # Loading lazily, which leaves the comments in the data file
+    lazyCacheFile = CatalogCache.getCacheFilename(filename,True)
+
+    def coldLazyLoad():
+        if os.path.exists(lazyCacheFile):
+            os.remove(lazyCacheFile)
+        return CatalogStore.prepareFormattedStarCatalog(filename,None,True)
+
+    results["load.lazyParse"] = timeOperation(coldLazyLoad,[()] * max(repeat // 2, 1),n)
+    results["load.lazyCompiled"] = timeOperation(CatalogStore.prepareFormattedStarCatalog,
+                                                 [(filename, None, True)] * repeat,n)
+
+    prepared = CatalogStore.prepareFormattedStarCatalog(filename,None,False)
+    results["load.install"] = timeOperation(CatalogStore.installPreparedCatalog,[(prepared,)] * repeat,n)
+
+    # Each sort starts with nothing cached, as it does right after a catalog is loaded
+    for name, sortField in SORT_FIELDS:
+        latencies = []
+        for i in range(repeat):
+            CatalogStore.installPreparedCatalog(prepared)
+            t0 = time.perf_counter()
+            CatalogStore.sortStarCatalog(sortField,ASCENDING_ORDER)
+            latencies.append(time.perf_counter() - t0)
+        CatalogStore.installPreparedCatalog(prepared)
+        results[name] = summarize(latencies,n,measurePeakMemory(CatalogStore.sortStarCatalog,
+                                                                (sortField, ASCENDING_ORDER)))
+    # Sorting again on the same field only has to reverse the order
+    CatalogStore.sortStarCatalog(SORT_FIELDS[0][1],ASCENDING_ORDER)
+    results["sort.reverse"] = timeOperation(CatalogStore.sortStarCatalog,
+                                            [(SORT_FIELDS[0][1], DESCENDING_ORDER)] * repeat,n)
+
+    # Lookups of objects that are in the catalog
+    rnd = random.Random(seed)
+    picks = [rnd.randrange(n) for i in range(numLookups)]
+    names = [(CatalogStore.getCatObject(i).name,) for i in picks]
+    altNames = [(CatalogStore.getCatObject(i).altName,) for i in picks]
+    results["lookup.name"] = timeOperation(CatalogStore.findObjByName,names)
+    results["lookup.altName"] = timeOperation(CatalogStore.findObjByAltName,altNames)
+    results["lookup.complete"] = timeOperation(CatalogStore.completeObjNames,
+                                               [(name[:max(len(name) - 2, 1)],) for (name,) in names])
+    # Misspell each name by doubling one of its characters
+    middles = [max(len(name) // 2, 1) for (name,) in names]
+    misspelled = [(names[k][0][:middles[k]] + names[k][0][middles[k] - 1:],) for k in range(len(names))]
+    results["lookup.suggest"] = timeOperation(CatalogStore.suggestObjNames,misspelled)
+    results["lookup.comment"] = timeOperation(CatalogStore.findObjsByComments,
+                                              [(q,) for q in _COMMENT_QUERIES] * repeat)
+
+    # The same searches repeated with the search result cache
+    CatalogStore.setQueryCacheBudget(cacheBudget)
+    for q in _COMMENT_QUERIES:
+        CatalogStore.findObjsByComments(q)
+    results["lookup.commentCached"] = timeOperation(CatalogStore.findObjsByComments,
+                                                    [(q,) for q in _COMMENT_QUERIES] * repeat)
+    results["lookup.nameCached"] = timeOperation(CatalogStore.findObjByName,names)
+    CatalogStore.setQueryCacheBudget(0)
+
+    # Exporting the whole catalog and a search result in each format that is available
+    formats = [CatalogExport.CSV_FORMAT, CatalogExport.NPY_FORMAT]
+    if (CatalogExport.pa != None):
+        formats = formats + [CatalogExport.ARROW_FORMAT, CatalogExport.PARQUET_FORMAT]
+    someObjs = CatalogStore.findObjsByComments(_COMMENT_QUERIES[0])
+    with tempfile.TemporaryDirectory() as exportDir:
+        for fmt in formats:
+            exportFile = os.path.join(exportDir,"export." + fmt)
+            results["export." + fmt] = timeOperation(CatalogExport.exportObjects,
+                                                     [(exportFile,)] * repeat,n)
+            results["export." + fmt + "Result"] = timeOperation(CatalogExport.exportObjects,
+                                                                [(exportFile, someObjs)] * repeat,
+                                                                len(someObjs))
+
+    # Constellations
+    numConsts = ASTConstellation.getNumConstellations()
+
+    def listAllConstellations():
+        return [(ASTConstellation.getConstName(i), ASTConstellation.getConstAbbrevName(i),
+                 ASTConstellation.getConstMeaning(i)) for i in range(numConsts)]
+
+    results["const.listAll"] = timeOperation(listAllConstellations,[()] * repeat,numConsts)
+    results["const.byMeaning"] = timeOperation(ConstSearch.findConstellationsByMeaning,
+                                               [("the",), ("bear",), ("x",)] * repeat)
+    results["const.listObjs"] = timeOperation(CatalogStore.displayAllObjsByConstellation,
+                                              [(_NullPrt(), rnd.randrange(numConsts), ASCENDING_ORDER)
+                                               for i in range(repeat)])
+    coords = [(rnd.uniform(0.0, 24.0), rnd.uniform(-90.0, 90.0), DEFAULT_EPOCH) for i in range(numLookups)]
+    results["const.fromCoord"] = timeOperation(ASTConstellation.findConstellationFromCoord,coords)
+
+    CatalogStore.clearCatalogAndSpaceObjects()
+    CatalogStore.setQueryCacheBudget(cacheBudget)
+    return results
+
+
+
+def _runSize(dirname,numObjs,repeat,seed):
+    """Generates the catalog for one size and benchmarks it. This runs in a separate process."""
+    filename = getSyntheticCatalog(dirname,numObjs,seed)
+    return runCatalogBenchmarks(filename,repeat,NUM_LOOKUPS,seed)
+
+
+
+def runSuite(sizes=DEFAULT_SIZES,dirname=None,repeat=DEFAULT_REPEAT,seed=1,out=sys.stdout):
+    """
+    Runs the benchmarks for synthetic catalogs of several sizes. Each
+    size is run in its own process.
+
+    :param list sizes: number of objects in each catalog
+    :param str dirname: directory for the synthetic catalogs (None for a temporary directory)
+    :param int repeat: number of times to time each of the whole-catalog operations
+    :param int seed: seed for the random number generator
+    :param file out: where to report progress
+    :return: the results, in the form saved in a baseline file
+    """
+    tmpDir = None
+    if (dirname == None):
+        tmpDir = tempfile.TemporaryDirectory()
+        dirname = tmpDir.name
+    results = {}
+    try:
+        for numObjs in sizes:
+            out.write("Running %d objects ...\n" % numObjs)
+            out.flush()
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                results[str(numObjs)] = executor.submit(_runSize,dirname,numObjs,repeat,seed).result()
+    finally:
+        if (tmpDir != None):
+            tmpDir.cleanup()
+    return {"version": BASELINE_VERSION,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "seed": seed,
+            "results": results}
+
+
+
+#==================================================
+# Startup
+#==================================================
+
+def parseImportTimes(text):
+    """
+    Parses the report that python -X importtime writes to stderr.
+
+    :param str text: the report
+    :return: list of (module, self seconds, cumulative seconds) in the order reported
+    """
+    result = []
+    for line in text.splitlines():
+        if not (line.startswith("import time:")):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if ((len(fields) != 3) or not (fields[0].strip().isdigit())):
+            continue                # the column headings
+        result.append((fields[2].strip(), int(fields[0]) / 1.0e6, int(fields[1]) / 1.0e6))
+    return result
+
+
+
+def measureImportTime(module,runs=STARTUP_RUNS):
+    """
+    Imports a module in fresh interpreters and measures how long it takes.
+
+    :param str module: full name of the module to import
+    :param int runs: number of interpreters to import the module in
+    :return: tuple (cumulative import seconds for each run, list of
+             (module, self seconds) from the last run sorted by self time),
+             or None if the module could not be imported
+    """
+    env = dict(os.environ)
+    # Make sure the module is found the same way it is in this process
+    env["PYTHONPATH"] = os.pathsep.join([p for p in sys.path if (len(p) > 0)])
+    times = []
+    selfTimes = []
+    for i in range(runs):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env=env,
+                              universal_newlines=True)
+        if (proc.returncode != 0):
+            return None
+        imports = parseImportTimes(proc.stderr)
+        times.append(sum(cumulative for name, selfTime, cumulative in imports
+                         if (name.strip() == module)))
+        selfTimes = sorted([(name.strip(), selfTime) for name, selfTime, cumulative in imports],
+                           key=lambda t: t[1], reverse=True)
+    return times, selfTimes
+
+
+
+def runStartup(modules=STARTUP_MODULES,runs=STARTUP_RUNS,out=sys.stdout):
+    """
+    Measures the import time of each module, and how long it takes to get
+    the constellation tables from their snapshot and to build them.
+
+    :param list modules: full names of the modules to import
+    :param int runs: number of times to measure each one
+    :param file out: where to report modules that could not be imported
+                     and the modules that took the longest
+    :return: the results, in the form saved in a baseline file
+    """
+    results = {}
+    for module in modules:
+        measured = measureImportTime(module,runs)
+        if (measured == None):
+            out.write("Could not import " + module + "\n")
+            continue
+        times, selfTimes = measured
+        results["import " + module] = summarize(times)
+        out.write("Slowest imports for " + module + ": " +
+                  ", ".join(["%s %.1f ms" % (name, 1000.0 * t) for name, t in selfTimes[:5]]) + "\n")
+
+    results["const.tablesSnapshot"] = timeOperation(ConstTables.loadConstTables,[()] * runs)
+    results["const.tablesBuild"] = timeOperation(ConstTables.buildConstTables,[()] * runs)
+    return {"version": BASELINE_VERSION,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": runs,
+            "results": {"startup": results}}
+
+
+
+def checkStartupBudget(suite,budgetMs,out=sys.stdout):
+    """
+    Finds the imports whose median time is over budget.
+
+    :param dict suite: value returned by runStartup
+    :param float budgetMs: budget for each import, in milliseconds
+    :param file out: where to report the imports that are over budget
+    :return: list of the operations that are over budget
+    """
+    over = []
+    for op, stats in suite["results"]["startup"].items():
+        if (op.startswith("import ") and (1000.0 * stats["p50"] > budgetMs)):
+            over.append(op)
+            out.write("%s took %.1f ms, over the budget of %.1f ms\n" % (op, 1000.0 * stats["p50"], budgetMs))
+    return over
+
+
+
+#==================================================
+# Reports and baselines
+#==================================================
+
+def _formatBytes(numBytes):
+    return "-" if (numBytes == None) else "%.1f" % (numBytes / (1024.0 * 1024.0))
+
+
+
+def report(suite,out=sys.stdout):
+    """
+    Writes the results of a suite run as a table.
+
+    :param dict suite: value returned by runSuite
+    :param file out: where to write the table
+    """
+    for size, ops in suite["results"].items():
+        out.write("\n%s\n" % ((size + " objects") if size.isdigit() else size))
+        out.write("%-18s %6s %10s %10s %10s %14s %9s\n" %
+                  ("Operation", "Count", "p50 ms", "p95 ms", "p99 ms", "items/s", "Peak MB"))
+        for op, stats in ops.items():
+            out.write("%-18s %6d %10.3f %10.3f %10.3f %14.0f %9s\n" %
+                      (op, stats["count"], 1000.0 * stats["p50"], 1000.0 * stats["p95"],
+                       1000.0 * stats["p99"], stats["throughput"], _formatBytes(stats["peakBytes"])))
+
+
+
+def saveBaseline(suite,filename):
+    """
+    Saves the results of a suite run to a baseline file.
+
+    :param dict suite: value returned by runSuite
+    :param str filename: full pathname of the baseline file
+    """
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(suite, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+
+def loadBaseline(filename):
+    """
+    Reads a baseline file.
+
+    :param str filename: full pathname of the baseline file
+    :return: the results, in the form returned by runSuite
+    :raises ValueError: if the file is not a baseline this version can read
+    """
+    with open(filename, "r", encoding="utf-8") as f:
+        suite = json.load(f)
+    if (suite.get("version") != BASELINE_VERSION):
+        raise ValueError("Unsupported baseline version in " + filename)
+    return suite
+
+
+
+def compareToBaseline(suite,baseline,threshold=DEFAULT_THRESHOLD,out=sys.stdout):
+    """
+    Compares the results of a suite run against a baseline. Only the
+    catalog sizes and operations that are in both are compared.
+
+    :param dict suite: value returned by runSuite
+    :param dict baseline: value returned by loadBaseline
+    :param float threshold: fraction by which an operation's median time may grow
+    :param file out: where to report the comparison
+    :return: list of (size, operation, baseline p50, current p50) for each regression
+    """
+    regressions = []
+    out.write("\n%-10s %-18s %12s %12s %8s\n" % ("Size", "Operation", "Base p50 ms", "Now p50 ms", "Change"))
+    for size, ops in suite["results"].items():
+        baseOps = baseline["results"].get(size, {})
+        for op, stats in ops.items():
+            if not (op in baseOps):
+                continue
+            old = baseOps[op]["p50"]
+            new = stats["p50"]
+            change = (new - old) / old if (old > 0.0) else 0.0
+            flag = ""
+            if ((change > threshold) and (new - old > MIN_REGRESSION_SECONDS)):
+                regressions.append((size, op, old, new))
+                flag = "  REGRESSION"
+            out.write("%-10s %-18s %12.3f %12.3f %+7.0f%%%s\n" %
+                      (size, op, 1000.0 * old, 1000.0 * new, 100.0 * change, flag))
+    return regressions
+
+
+
+#==================================================
+# Command line
+#==================================================
+
+def main(argv=None):
+    """Command line entry point for the benchmarks"""
+    parser = argparse.ArgumentParser(description="Benchmark the catalog and constellation operations")
+    commands = parser.add_subparsers(dest="command")
+
+    cmd = commands.add_parser("comments", help="compare comment searches with a linear scan")
+    cmd.add_argument("catalog", help="catalog data file")
+    cmd.add_argument("queries", nargs="+", help="substrings to search for")
+
+    cmd = commands.add_parser("generate", help="write a synthetic catalog")
+    cmd.add_argument("catalog", help="catalog data file to write")
+    cmd.add_argument("size", type=int, help="number of objects")
+    cmd.add_argument("--seed", type=int, default=1, help="random number seed")
+
+    cmd = commands.add_parser("suite", help="benchmark synthetic catalogs of several sizes")
+    cmd.add_argument("--sizes", default=",".join(str(n) for n in DEFAULT_SIZES),
+                     help="comma separated catalog sizes (default: %(default)s)")
+    cmd.add_argument("--dir", default=None, help="directory to keep the synthetic catalogs in")
+    cmd.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="times to run each operation")
+    cmd.add_argument("--seed", type=int, default=1, help="random number seed")
+    cmd.add_argument("--out", default=None, help="baseline file to write the results to")
+    cmd.add_argument("--compare", default=None, help="baseline file to compare the results against")
+    cmd.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                     help="allowed fractional slowdown before reporting a regression (default: %(default)s)")
+    cmd = commands.add_parser("startup", help="measure how long the main modules take to import")
+    cmd.add_argument("--runs", type=int, default=STARTUP_RUNS, help="times to import each module")
+    cmd.add_argument("--budget", type=float, default=DEFAULT_STARTUP_BUDGET_MS,
+                     help="milliseconds each import may take (default: %(default)s)")
+    cmd.add_argument("--out", default=None, help="baseline file to write the results to")
+    cmd.add_argument("--compare", default=None, help="baseline file to compare the results against")
+    cmd.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                     help="allowed fractional slowdown before reporting a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if (args.command == "comments"):
+        if not CatalogStore.loadFormattedStarCatalog(args.catalog):
+            sys.stderr.write("Could not load the catalog data from " + args.catalog + "\n")
+            return 1
+        benchmarkCommentSearch(args.queries)
+        return 0
+
+    if (args.command == "generate"):
+        generateCatalog(args.catalog,args.size,args.seed)
+        return 0
+
+    if (args.command == "suite"):
+        sizes = [int(s) for s in args.sizes.split(",") if (len(s.strip()) > 0)]
+        baseline = None if (args.compare == None) else loadBaseline(args.compare)
+        suite = runSuite(sizes,args.dir,args.repeat,args.seed)
+        report(suite)
+        if (args.out != None):
+            saveBaseline(suite,args.out)
+        if (baseline != None):
+            if (len(compareToBaseline(suite,baseline,args.threshold)) > 0):
+                return 1
+        return 0
+
+    if (args.command == "startup"):
+        baseline = None if (args.compare == None) else loadBaseline(args.compare)
+        suite = runStartup(STARTUP_MODULES,args.runs)
+        report(suite)
+        if (args.out != None):
+            saveBaseline(suite,args.out)
+        failed = len(checkStartupBudget(suite,args.budget)) > 0
+        if (baseline != None):
+            failed = (len(compareToBaseline(suite,baseline,args.threshold)) > 0) or failed
+        return 1 if failed else 0
+
+    parser.print_usage(sys.stderr)
+    return 2
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Buffers output that is headed for an ASTPrt text area.
+
+Every println, printnoln, or font change sent to an ASTPrt instance
+updates the GUI's text widget. When thousands of lines are output,
+such as when listing a large catalog, updating the widget one line at
+a time takes far longer than formatting the lines. A BufferedPrt
+accepts the same calls as an ASTPrt but only records the text, grouped
+into runs of text that use the same font. When the buffer is flushed,
+each run is sent to the real ASTPrt instance with one font change and
+one printnoln, so a listing of any size takes only a few widget updates.
+
+Anything that writes to the text area directly rather than through the
+BufferedPrt (e.g., ASTConstellation.displayConstellation) must be
+preceded by a flush so that the output stays in the right order.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+from contextlib import contextmanager
+
+# Number of buffered characters that causes an automatic flush. This
+# keeps the buffer from growing without limit for very large listings.
+DEFAULT_FLUSH_THRESHOLD = 4 * 1024 * 1024
+
+#==================================================
+# Buffered output
+#==================================================
+
+class BufferedPrt():
+    """
+    Stands in for an ASTPrt instance and collects output in memory
+    until it is flushed.
+    """
+
+    def __init__(self,prt,flushThreshold=DEFAULT_FLUSH_THRESHOLD):
+        """
+        :param ASTPrt prt: where the output eventually goes
+        :param int flushThreshold: number of buffered characters that causes an automatic flush
+        """
+        self.prt = prt
+        self.flushThreshold = flushThreshold
+        self.fixedWidth = False         # font for text that is output next
+        self.bold = False
+        self.prtFixedWidth = None       # font last set in prt (None means unknown)
+        self.prtBold = False
+        self.runs = []                  # list of [fixedWidth, bold, list of strings]
+        self.numChars = 0
+
+    def __getattr__(self,name):
+        # Anything else an ASTPrt can do is passed along after the buffered output
+        self.flush()
+        return getattr(self.prt, name)
+
+    def _append(self,s):
+        """Adds text to the run for the current font"""
+        if ((len(self.runs) > 0) and (self.runs[-1][0] == self.fixedWidth) and (self.runs[-1][1] == self.bold)):
+            self.runs[-1][2].append(s)
+        else:
+            self.runs.append([self.fixedWidth, self.bold, [s]])
+        self.numChars = self.numChars + len(s)
+        if (self.numChars >= self.flushThreshold):
+            self.flush()
+
+    def println(self,txt=""):
+        """
+        Adds a line of text to the buffer.
+
+        :param str txt: text to output, followed by a newline
+        """
+        self._append(txt + "\n")
+
+    def printnoln(self,txt=""):
+        """
+        Adds text to the buffer without a newline.
+
+        :param str txt: text to output
+        """
+        self._append(txt)
+
+    def setFixedWidthFont(self):
+        """Uses a fixed width font for the text that follows"""
+        self.fixedWidth = True
+
+    def setProportionalFont(self):
+        """Uses a proportional font for the text that follows"""
+        self.fixedWidth = False
+
+    def setBoldFont(self,bold):
+        """
+        Turns bold on or off for the text that follows.
+
+        :param bool bold: True for bold text
+        """
+        self.bold = bold
+
+    def clearTextArea(self):
+        """Discards the buffered output and clears the text area"""
+        self.runs = []
+        self.numChars = 0
+        self.prt.clearTextArea()
+        self.prtFixedWidth = None
+
+    def resetCursor(self):
+        """Flushes the buffered output and resets the text area's cursor"""
+        self.flush()
+        self.prt.resetCursor()
+
+    def _setPrtFont(self,fixedWidth,bold):
+        """Sets prt's font, skipping whatever is already set"""
+        if (fixedWidth != self.prtFixedWidth):
+            if (fixedWidth):
+                self.prt.setFixedWidthFont()
+            else:
+                self.prt.setProportionalFont()
+            self.prtFixedWidth = fixedWidth
+        if (bold != self.prtBold):
+            self.prt.setBoldFont(bold)
+            self.prtBold = bold
+
+    def flush(self):
+        """Sends the buffered output to prt, one run of text at a time"""
+        runs = self.runs
+        self.runs = []
+        self.numChars = 0
+        for fixedWidth, bold, parts in runs:
+            self._setPrtFont(fixedWidth,bold)
+            self.prt.printnoln("".join(parts))
+        # Leave prt with the font that the caller last asked for
+        self._setPrtFont(self.fixedWidth,self.bold)
+
+
+
+@contextmanager
+def bufferedOutput(prt,flushThreshold=DEFAULT_FLUSH_THRESHOLD):
+    """
+    Context manager that gives a BufferedPrt for prt and flushes it
+    when the block is left.
+
+    :param ASTPrt prt: where the output eventually goes
+    :param int flushThreshold: number of buffered characters that causes an automatic flush
+    """
+    bprt = BufferedPrt(prt,flushThreshold)
+    try:
+        yield bprt
+    finally:
+        bprt.flush()
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,619 @@
+"""
+Provides a compiled, binary cache for star catalogs.
+
+Parsing a large pseudo-XML star catalog is slow, and the same
+catalogs are loaded over and over. The first time a catalog is
+loaded, its objects are compiled into a columnar binary file that
+is stored next to the catalog data file. Later loads simply map the
+compiled file into memory, which is nearly instantaneous.
+
+A compiled file remembers the size, modification time, and a hash
+of the contents of the catalog it was compiled from. If the catalog
+data file changes, the compiled file is automatically rebuilt.
+
+A catalog can also be compiled in a 'lazy' form that leaves out the
+comments, which are often most of a catalog, and instead records the
+offset of each object in the catalog data file so that an object's
+comments can be read from the data file only when they are needed.
+
+All of the catalogs in a directory can be compiled ahead of time with
+
+    python -m Chap1.CatalogCache [directory ...]
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+from array import array
+import glob
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+
+import ASTUtils.ASTCatalog as ASTCatalog
+
+import Chap1.CatalogParser as CatalogParser
+import Chap1.LazyImport as LazyImport
+
+# Only needed when a catalog is compiled, several catalogs are compiled
+# at once, or the module is run from the command line
+argparse = LazyImport.lazyImport("argparse")
+concurrentFutures = LazyImport.lazyImport("concurrent.futures")
+hashlib = LazyImport.lazyImport("hashlib")
+multiprocessing = LazyImport.lazyImport("multiprocessing")
+
+# Extension added to a catalog's filename to get its compiled filename,
+# and to get the filename of its lazy compiled file
+CACHE_FILE_EXT = ".astc"
+LAZY_CACHE_FILE_EXT = ".astl"
+
+# Extension of the catalog data files to compile when precompiling a directory
+CATALOG_FILE_EXT = ".dat"
+
+# Identifies a compiled catalog file and its layout version
+_MAGIC = b"ASTCAT02"
+
+# Magic, followed by the length of the JSON header that describes the file
+_PREFIX = struct.Struct("<8sQ")
+
+# Numeric columns, the CatalogObject field each holds, and its array typecode
+_NUMERIC_COLUMNS = (("RA", 'd'), ("Decl", 'd'), ("mV", 'd'), ("constIdx", 'h'))
+
+# String columns. Each distinct string is stored once in a UTF-8 blob, with a
+# table of offsets into the blob and the id of each object's string.
+_STRING_COLUMNS = ("name", "altName", "comment")
+
+# String columns left out of a lazy compiled file, and the column that a
+# lazy compiled file has instead giving the offset of each object's
+# <Object> tag in the catalog data file
+_LAZY_COLUMNS = ("comment",)
+SOURCE_OFFSET_COLUMN = "sourceOffset"
+
+#==================================================
+# Cache keys
+#==================================================
+
+def getCacheFilename(filename,lazy=False):
+    """
+    Gets the name of the compiled file for a catalog data file.
+
+    :param str filename: full pathname of the catalog data file
+    :param bool lazy: if True, get the name of the lazy compiled file
+    """
+    return filename + (LAZY_CACHE_FILE_EXT if lazy else CACHE_FILE_EXT)
+
+
+
+def hashFile(filename):
+    """
+    Computes a hash of a file's contents.
+
+    :param str filename: full pathname of the file
+    :return: hex string with the hash
+    """
+    h = hashlib.sha1()
+    with open(filename, "rb") as f:
+        while True:
+            chunk = f.read(CatalogParser.CHUNK_SIZE)
+            if (len(chunk) <= 0):
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+
+def makeCacheKey(filename,contentHash=None):
+    """
+    Builds the key that identifies the version of a catalog data file.
+
+    :param str filename: full pathname of the catalog data file
+    :param str contentHash: hash of the file if it is already known
+    :return: dictionary with the path, size, mtime, and hash
+    """
+    st = os.stat(filename)
+    if (contentHash == None):
+        contentHash = hashFile(filename)
+    return {"path": os.path.abspath(filename), "size": st.st_size, "mtime": st.st_mtime_ns,
+            "hash": contentHash}
+
+
+
+def isCacheKeyCurrent(key,filename):
+    """
+    Determines whether a compiled file's key still matches a catalog data file.
+    The size and mtime are checked first since they are cheap. The contents
+    are only hashed if the mtime changed, as happens when a file is copied.
+
+    :param dict key: key stored in the compiled file
+    :param str filename: full pathname of the catalog data file
+    """
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return False
+    if ((key.get("path") != os.path.abspath(filename)) or (key.get("size") != st.st_size)):
+        return False
+    if (key.get("mtime") == st.st_mtime_ns):
+        return True
+    return key.get("hash") == hashFile(filename)
+
+
+
+#==================================================
+# Compiling a catalog
+#==================================================
+
+def _pad(n):
+    """Returns the number of bytes needed to align n to an 8 byte boundary"""
+    return (8 - (n % 8)) % 8
+
+
+
+def compileCatalog(filename,objects=None,header=None,progressCallback=None,lazy=False):
+    """
+    Compiles a catalog into the binary columnar format.
+
+    :param str filename: full pathname of the catalog data file
+    :param iterable objects: CatalogObjects that were already parsed from
+                             the file, or None to parse the file here
+    :param dict header: catalog header if objects is given
+    :param function progressCallback: if not None and the file is parsed here,
+                called as progressCallback(bytesRead, totalBytes) after each
+                chunk of the file is read. The callback may raise an
+                exception to stop the compile.
+    :param bool lazy: if True, leave out the comments and record where each
+                      object is in the catalog data file instead. The file is
+                      always parsed here, since the objects' offsets are needed.
+    :return: bytes with the contents of the compiled file
+    """
+    contentHash = hashFile(filename)
+    totalBytes = os.path.getsize(filename)
+    lastReported = 0
+
+    if (lazy):
+        objects = None
+    if (objects == None):
+        f = open(filename, "rb")
+        parser = CatalogParser.CatalogParser(f)
+        objects = parser
+    else:
+        f = None
+        parser = None
+
+    numeric = {}
+    for field, typecode in _NUMERIC_COLUMNS:
+        numeric[field] = array(typecode)
+    stringColumns = [field for field in _STRING_COLUMNS if not (lazy and (field in _LAZY_COLUMNS))]
+    sourceOffsets = array('q')
+    offsets = {}
+    blobs = {}
+    ids = {}
+    lookups = {}
+    for field in stringColumns:
+        offsets[field] = array('q', [0])
+        blobs[field] = bytearray()
+        ids[field] = array('i')
+        lookups[field] = {}
+
+    try:
+        nan = float("nan")
+        for obj in objects:
+            numeric["RA"].append(obj.RA)
+            numeric["Decl"].append(obj.Decl)
+            numeric["mV"].append(nan if (obj.mV == None) else obj.mV)
+            numeric["constIdx"].append(obj.constIdx)
+            if ((progressCallback != None) and (parser != None) and (parser.bytesRead != lastReported)):
+                lastReported = parser.bytesRead
+                progressCallback(lastReported, totalBytes)
+            if (lazy):
+                sourceOffsets.append(parser.objOffset)
+            for field in stringColumns:
+                value = getattr(obj, field)
+                sid = lookups[field].get(value)
+                if (sid == None):
+                    sid = len(offsets[field]) - 1
+                    lookups[field][value] = sid
+                    blob = blobs[field]
+                    blob.extend(value.encode("utf-8"))
+                    offsets[field].append(len(blob))
+                ids[field].append(sid)
+    finally:
+        if (f != None):
+            f.close()
+
+    if (parser != None):
+        header = parser.header
+    if (header == None):
+        header = {}
+
+    # Lay out the columns after the JSON header, each aligned on 8 bytes
+    parts = []
+    columns = {}
+    pos = 0
+
+    def addPart(name,data,typecode):
+        nonlocal pos
+        columns[name] = [pos, len(data), typecode]
+        parts.append(data)
+        pad = _pad(len(data))
+        parts.append(bytes(pad))
+        pos = pos + len(data) + pad
+
+    for field, typecode in _NUMERIC_COLUMNS:
+        addPart(field, numeric[field].tobytes(), typecode)
+    for field in stringColumns:
+        addPart(field + ".offsets", offsets[field].tobytes(), 'q')
+        addPart(field + ".blob", bytes(blobs[field]), 'B')
+        addPart(field + ".ids", ids[field].tobytes(), 'i')
+    if (lazy):
+        addPart(SOURCE_OFFSET_COLUMN, sourceOffsets.tobytes(), 'q')
+
+    desc = {"key": makeCacheKey(filename, contentHash), "header": header,
+            "numObjs": len(numeric["RA"]), "columns": columns}
+    descBytes = json.dumps(desc).encode("utf-8")
+    descBytes = descBytes + b" " * _pad(_PREFIX.size + len(descBytes))
+
+    return _PREFIX.pack(_MAGIC, len(descBytes)) + descBytes + b"".join(parts)
+
+
+
+def writeCompiledCatalog(filename,data,lazy=False):
+    """
+    Writes a compiled catalog next to its catalog data file. The data
+    is written to a temporary file first so that a reader never sees
+    a partially written compiled file.
+
+    :param str filename: full pathname of the catalog data file
+    :param bytes data: contents of the compiled file, or a list of buffers
+                       to write one after the other
+    :param bool lazy: True if data is a lazy compiled catalog
+    :return: full pathname of the compiled file
+    """
+    cacheFile = getCacheFilename(filename,lazy)
+    tmpFile = cacheFile + ".tmp" + str(os.getpid())
+    try:
+        with open(tmpFile, "wb") as f:
+            if isinstance(data, list):
+                f.writelines(data)
+            else:
+                f.write(data)
+        os.replace(tmpFile, cacheFile)
+    except OSError:
+        if os.path.exists(tmpFile):
+            os.remove(tmpFile)
+        raise
+    return cacheFile
+
+
+
+#==================================================
+# Reading a compiled catalog
+#==================================================
+
+class CompiledCatalog():
+    """
+    A compiled catalog mapped into memory. The numeric columns are
+    memoryviews directly over the mapped file so that nothing is
+    copied, and strings are only decoded when they are asked for.
+    A lazy compiled catalog has no comments, and sourceOffset gives
+    the offset of each object in the catalog data file.
+    """
+
+    def __init__(self,buf,mm=None):
+        """
+        :param buffer buf: contents of a compiled catalog file
+        :param mmap mm: memory map that buf is from, if any, so it can be closed
+        """
+        # Check the layout before any views of buf are created, since
+        # a memory map cannot be closed while views of it exist
+        magic, descLen = _PREFIX.unpack_from(buf, 0)
+        if (magic != _MAGIC):
+            raise ValueError("Not a compiled catalog file")
+        desc = json.loads(bytes(buf[_PREFIX.size:_PREFIX.size + descLen]).decode("utf-8"))
+        base = _PREFIX.size + descLen
+        self.key = desc["key"]
+        self.header = desc["header"]
+        self.numObjs = desc["numObjs"]
+
+        self.mm = mm
+        self.buf = memoryview(buf)
+        self.columns = {}
+        for name, (offset, length, typecode) in desc["columns"].items():
+            col = self.buf[base + offset:base + offset + length]
+            self.columns[name] = col if (typecode == 'B') else col.cast(typecode)
+
+        self.RA = self.columns["RA"]
+        self.Decl = self.columns["Decl"]
+        self.mV = self.columns["mV"]
+        self.constIdx = self.columns["constIdx"]
+        self.sourceOffset = self.columns.get(SOURCE_OFFSET_COLUMN)
+
+    def __len__(self):
+        return self.numObjs
+
+    def close(self):
+        """Releases the memory map. No columns may be used afterwards."""
+        for col in self.columns.values():
+            col.release()
+        self.columns = {}
+        self.RA = self.Decl = self.mV = self.constIdx = self.sourceOffset = None
+        self.buf.release()
+        if (self.mm != None):
+            self.mm.close()
+            self.mm = None
+
+    def isLazy(self):
+        """Returns True if this is a lazy compiled catalog"""
+        return self.sourceOffset != None
+
+    def getString(self,field,idx):
+        """
+        Gets one string value.
+
+        :param str field: one of 'name', 'altName', or 'comment'
+        :param int idx: index of the object
+        """
+        if not ((field + ".ids") in self.columns):
+            return ""               # left out of a lazy compiled catalog
+        sid = self.columns[field + ".ids"][idx]
+        offsets = self.columns[field + ".offsets"]
+        return str(self.columns[field + ".blob"][offsets[sid]:offsets[sid + 1]], "utf-8")
+
+    def getStrings(self,field):
+        """
+        Gets all of the values in a string column. Each distinct string
+        is only decoded once.
+
+        :param str field: one of 'name', 'altName', or 'comment'
+        :return: list of strings
+        """
+        if not ((field + ".ids") in self.columns):
+            return [""] * self.numObjs
+        offsets = self.columns[field + ".offsets"]
+        blob = self.columns[field + ".blob"]
+        unique = [str(blob[offsets[k]:offsets[k + 1]], "utf-8") for k in range(len(offsets) - 1)]
+        return [unique[sid] for sid in self.columns[field + ".ids"]]
+
+    def getObject(self,idx):
+        """
+        Gets one object as a CatalogObject.
+
+        :param int idx: index of the object
+        """
+        mV = self.mV[idx]
+        return CatalogParser.CatalogObject(self.getString("name", idx), self.getString("altName", idx),
+                                           self.RA[idx], self.Decl[idx], None if math.isnan(mV) else mV,
+                                           self.constIdx[idx], self.getString("comment", idx))
+
+
+
+def openCompiledCatalog(cacheFile):
+    """
+    Maps a compiled catalog file into memory.
+
+    :param str cacheFile: full pathname of the compiled file
+    :return: a CompiledCatalog
+    """
+    with open(cacheFile, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return CompiledCatalog(mm, mm)
+    except (ValueError, KeyError, struct.error):
+        mm.close()
+        raise
+
+
+
+def _refreshCacheKey(cat,filename):
+    """
+    Updates the key of a compiled catalog whose catalog data file was
+    touched or copied without its contents changing, so that later loads
+    do not have to hash the data file again. The compiled file is rewritten
+    with the new key if it can be, and the key of cat is updated either way.
+
+    :param CompiledCatalog cat: the compiled catalog, whose key matched the
+                                data file's contents
+    :param str filename: full pathname of the catalog data file
+    """
+    key = makeCacheKey(filename, cat.key.get("hash"))
+    magic, descLen = _PREFIX.unpack_from(cat.buf, 0)
+    desc = json.loads(bytes(cat.buf[_PREFIX.size:_PREFIX.size + descLen]).decode("utf-8"))
+    desc["key"] = key
+    descBytes = json.dumps(desc).encode("utf-8")
+    descBytes = descBytes + b" " * _pad(_PREFIX.size + len(descBytes))
+    cat.key = key
+    try:
+        writeCompiledCatalog(filename, [_PREFIX.pack(_MAGIC, len(descBytes)) + descBytes,
+                                        cat.buf[_PREFIX.size + descLen:]], cat.isLazy())
+    except OSError:
+        pass
+
+
+
+def openCurrentCompiledCatalog(filename,lazy=False):
+    """
+    Maps a catalog's compiled file into memory if it is current.
+
+    :param str filename: full pathname of the catalog data file
+    :param bool lazy: if True, open the lazy compiled file
+    :return: a CompiledCatalog, or None if the compiled file is missing,
+             unreadable, or out of date
+    """
+    cacheFile = getCacheFilename(filename,lazy)
+    if not os.path.exists(cacheFile):
+        return None
+    try:
+        cat = openCompiledCatalog(cacheFile)
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+    try:
+        current = isCacheKeyCurrent(cat.key, filename)
+        if (current and (cat.key.get("mtime") != os.stat(filename).st_mtime_ns)):
+            _refreshCacheKey(cat,filename)
+    except OSError:
+        current = False
+    if not (current):
+        cat.close()
+        return None
+    return cat
+
+
+
+def loadCompiledCatalog(filename,progressCallback=None,lazy=False):
+    """
+    Loads a catalog through its compiled file, compiling (or recompiling)
+    it first if the compiled file is missing or out of date.
+
+    If the compiled file cannot be written (e.g., the catalog is in a
+    read-only directory), the catalog is compiled in memory instead.
+
+    :param str filename: full pathname of the catalog data file
+    :param function progressCallback: passed to compileCatalog if the catalog
+                                      has to be compiled
+    :param bool lazy: if True, load the lazy compiled file
+    :return: a CompiledCatalog
+    """
+    cat = openCurrentCompiledCatalog(filename,lazy)
+    if (cat != None):
+        return cat
+
+    data = compileCatalog(filename,progressCallback=progressCallback,lazy=lazy)
+    try:
+        return openCompiledCatalog(writeCompiledCatalog(filename, data, lazy))
+    except OSError:
+        return CompiledCatalog(data)
+
+
+
+def _compileIfNeeded(filename,lazy=False):
+    """
+    Makes sure a catalog's compiled file is current. This runs in a
+    worker process when several catalogs are loaded at once.
+
+    :param str filename: full pathname of the catalog data file
+    :param bool lazy: if True, check the lazy compiled file
+    :return: None if the compiled file is current, otherwise the compiled
+             data (when the compiled file could not be written)
+    """
+    cat = openCurrentCompiledCatalog(filename,lazy)
+    if (cat != None):
+        cat.close()
+        return None
+
+    data = compileCatalog(filename,lazy=lazy)
+    try:
+        writeCompiledCatalog(filename, data, lazy)
+    except OSError:
+        return data
+    return None
+
+
+
+def loadCompiledCatalogs(filenames,maxWorkers=None,progressCallback=None,lazy=False):
+    """
+    Loads several catalogs through their compiled files. Catalogs that
+    have to be compiled are parsed at the same time in a pool of
+    worker processes. The workers are spawned rather than forked, since
+    this is called from a worker thread of the GUI, and forking a process
+    that has several threads running can leave the child deadlocked.
+
+    :param list filenames: full pathnames of the catalog data files
+    :param int maxWorkers: maximum number of worker processes (None means one per CPU)
+    :param function progressCallback: if not None, called as progressCallback(numDone, numFiles)
+                as each catalog is compiled. The callback may raise an exception
+                to stop the load.
+    :param bool lazy: if True, load the lazy compiled files
+    :return: list of CompiledCatalogs, in the same order as filenames
+    """
+    compiled = [None] * len(filenames)
+    data = [None] * len(filenames)
+    toCompile = []
+    try:
+        for i in range(len(filenames)):
+            compiled[i] = openCurrentCompiledCatalog(filenames[i],lazy)
+            if (compiled[i] == None):
+                toCompile.append(i)
+
+        numDone = len(filenames) - len(toCompile)
+        if (len(toCompile) == 1):
+            data[toCompile[0]] = _compileIfNeeded(filenames[toCompile[0]],lazy)
+            if (progressCallback != None):
+                progressCallback(len(filenames), len(filenames))
+        elif (len(toCompile) > 1):
+            pool = concurrentFutures.ProcessPoolExecutor(max_workers=maxWorkers,
+                                                         mp_context=multiprocessing.get_context("spawn"))
+            try:
+                futures = dict((pool.submit(_compileIfNeeded, filenames[i], lazy), i) for i in toCompile)
+                for future in concurrentFutures.as_completed(futures):
+                    data[futures[future]] = future.result()
+                    numDone = numDone + 1
+                    if (progressCallback != None):
+                        progressCallback(numDone, len(filenames))
+            finally:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+        for i in toCompile:
+            if (data[i] != None):
+                compiled[i] = CompiledCatalog(data[i])
+            else:
+                compiled[i] = openCompiledCatalog(getCacheFilename(filenames[i],lazy))
+    except Exception:
+        for cat in compiled:
+            if (cat != None):
+                cat.close()
+        raise
+    return compiled
+
+
+
+#==================================================
+# Precompiling catalogs
+#==================================================
+
+def precompileDirectory(dirname,force=False,out=sys.stdout):
+    """
+    Compiles every catalog data file in a directory.
+
+    :param str dirname: directory containing catalog data files
+    :param bool force: if True, recompile even if a compiled file is current
+    :param file out: where to report what was done
+    :return: number of catalogs that were compiled
+    """
+    count = 0
+    for filename in sorted(glob.glob(os.path.join(dirname, "*" + CATALOG_FILE_EXT))):
+        cat = None if force else openCurrentCompiledCatalog(filename)
+        if (cat != None):
+            cat.close()
+            out.write("Up to date: " + filename + "\n")
+            continue
+        writeCompiledCatalog(filename, compileCatalog(filename))
+        out.write("Compiled: " + filename + "\n")
+        count = count + 1
+    return count
+
+
+
+def main(argv=None):
+    """Command line entry point for precompiling catalogs"""
+    parser = argparse.ArgumentParser(description="Precompile star catalogs so they load quickly")
+    parser.add_argument("dirs", nargs="*", help="directories containing catalogs (default: the catalog data directory)")
+    parser.add_argument("--force", action="store_true", help="recompile even if the compiled files are current")
+    args = parser.parse_args(argv)
+
+    dirs = args.dirs
+    if (len(dirs) <= 0):
+        dirs = [ASTCatalog.ASTCatalog.getCatDataDir()]
+    for d in dirs:
+        precompileDirectory(d, args.force)
+    return 0
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    sys.exit(main())
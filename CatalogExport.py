@@ -0,0 +1,438 @@
+"""
+Exports the currently loaded catalog, or a list of its objects, to files
+that other programs can read: Arrow IPC, Parquet, NumPy .npy, or CSV.
+
+Listing objects through the menus formats every field of every object as
+text, which is slow for large catalogs and has to be parsed again by
+whatever reads it. The exports here work directly from the columns of
+the catalog in batches of objects. When the whole catalog is exported,
+the numeric columns are written straight from the catalog's arrays and,
+for Arrow and Parquet, the name columns are written as dictionaries
+that point at the catalog's own string tables, so nothing is formatted
+or copied. A list of objects (e.g., the result of a search) is gathered
+one batch at a time.
+
+Every export has the same columns (or the subset that is asked for):
+
+    index       position of the object in the catalog as it was loaded
+    name        object's name
+    altName     object's alternate name
+    RA          right ascension, in hours
+    Decl        declination, in degrees
+    mV          visual magnitude (NaN if unknown, empty in a CSV file)
+    constIdx    index of the object's constellation (-1 if unknown)
+    const       abbreviated name of the constellation
+    comment     object's comments
+    catalog     catalog file the object came from
+
+A NumPy export writes one .npy file per column. Exporting 'objs.npy'
+writes 'objs.RA.npy', 'objs.name.npy', and so on. Strings are saved as
+fixed width UTF-8 bytes. Arrow and Parquet need the pyarrow package;
+the other formats only need the standard library.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+from array import array
+import csv
+import os
+import sys
+
+import Chap1.CatalogStore as CatalogStore
+import Chap1.ConstTables as ConstTables
+import Chap1.LazyImport as LazyImport
+
+try:
+    pa = LazyImport.lazyImport("pyarrow")
+except ImportError:
+    pa = None                   # Arrow and Parquet exports are not available
+
+# Export formats
+ARROW_FORMAT = "arrow"
+PARQUET_FORMAT = "parquet"
+NPY_FORMAT = "npy"
+CSV_FORMAT = "csv"
+
+# Format to use for each file extension
+FORMAT_EXTENSIONS = {".arrow": ARROW_FORMAT, ".feather": ARROW_FORMAT, ".parquet": PARQUET_FORMAT,
+                     ".npy": NPY_FORMAT, ".csv": CSV_FORMAT}
+
+# Columns in the order they are exported
+COLUMNS = ("index", "name", "altName", "RA", "Decl", "mV", "constIdx", "const", "comment", "catalog")
+
+# Number of objects written at a time
+DEFAULT_BATCH_SIZE = 65536
+
+# NumPy type of each array typecode used by the catalog's numeric columns
+_NPY_TYPES = {'d': "f8", 'i': "i4", 'h': "i2"}
+
+class ExportError(Exception):
+    """Raised when objects cannot be exported as asked"""
+    pass
+
+
+
+#==================================================
+# Getting the columns in batches
+#==================================================
+
+def getExportFormat(filename,fmt=None):
+    """
+    Determines the format of an export.
+
+    :param str filename: file to export to
+    :param str fmt: format to use, or None to use the one for the file's extension
+    :return: one of the *_FORMAT values
+    :raises ExportError: if the format is unknown
+    """
+    if (fmt == None):
+        fmt = FORMAT_EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+        if (fmt == None):
+            raise ExportError("Cannot tell what format to export '" + filename + "' in. Use one of " +
+                              ", ".join(sorted(FORMAT_EXTENSIONS)) + " as its extension.")
+    fmt = fmt.lower()
+    if not (fmt in FORMAT_EXTENSIONS.values()):
+        raise ExportError("Unknown export format '" + fmt + "'")
+    return fmt
+
+
+
+def _batches(n,indices,batchSize):
+    """
+    Generator for the objects to export, one batch at a time. A batch of
+    the whole catalog is a range of indices, and a batch of a list of
+    objects is a list of indices. There is always at least one batch so
+    that an export of no objects still has its columns.
+    """
+    if (indices == None):
+        for lo in range(0,max(n, 1),batchSize):
+            yield range(lo,min(lo + batchSize, n))
+    else:
+        for lo in range(0,max(len(indices), 1),batchSize):
+            yield list(indices[lo:lo + batchSize])
+
+
+
+def _numbers(col,typecode,sel):
+    """
+    Gets the values of a numeric column for a batch. The values of a range
+    of objects are a view of the column, so nothing is copied.
+    """
+    if isinstance(sel, range):
+        return memoryview(col)[sel.start:sel.stop]
+    return array(typecode, map(col.__getitem__, sel))
+
+
+
+class _ColumnSource():
+    """
+    Where an exported column's values come from. A column is either
+    numbers (a typed array), strings (a StringTable or a lazily read
+    column), or labels (small integer keys into a list of strings,
+    where a negative key means there is no label).
+    """
+
+    def __init__(self,kind,typecode=None,values=None,labels=None):
+        self.kind = kind
+        self.typecode = typecode
+        self.values = values
+        self.labels = labels
+
+    def numbers(self,sel):
+        """Gets the numbers, or the label keys, for a batch"""
+        if (self.values == None):           # the object indices, or a single catalog
+            if (self.kind == "labels"):
+                return array(self.typecode, bytes(array(self.typecode).itemsize * len(sel)))
+            return array(self.typecode, sel)
+        return _numbers(self.values,self.typecode,sel)
+
+    def strings(self,sel):
+        """Gets the strings for a batch"""
+        if (self.kind == "labels"):
+            labels = self.labels
+            return [labels[k] if (k >= 0) else "" for k in self.numbers(sel)]
+        table = self.values
+        if isinstance(table, CatalogStore.StringTable):
+            unique = table.getUniqueStrings()
+            return [unique[table.getId(i)] for i in sel]
+        return [table.get(i) for i in sel]
+
+
+
+def _getColumnSources(cat,columns):
+    """Gets where each of the exported columns comes from"""
+    sources = {}
+    for name in columns:
+        if (name == "index"):
+            sources[name] = _ColumnSource("numbers",'i')
+        elif (name in ("RA", "Decl", "mV")):
+            sources[name] = _ColumnSource("numbers",'d',getattr(cat, name))
+        elif (name == "constIdx"):
+            sources[name] = _ColumnSource("numbers",'h',cat.constIdx)
+        elif (name == "const"):
+            sources[name] = _ColumnSource("labels",'h',cat.constIdx,ConstTables.getConstTables().abbrevs)
+        elif (name == "catalog"):
+            sources[name] = _ColumnSource("labels",'h',cat.sourceIdx,
+                                          [os.path.basename(f) for f in CatalogStore.getCatFilenames()])
+        else:
+            sources[name] = _ColumnSource("strings",None,{"name": cat.names, "altName": cat.altNames,
+                                                          "comment": cat.comments}[name])
+    return sources
+
+
+
+#==================================================
+# Writers for each format
+#==================================================
+
+def _writeCSV(filename,sources,columns,batches,progress):
+    """Writes the columns as a CSV file with a heading line"""
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for sel in batches:
+            cols = []
+            for name in columns:
+                source = sources[name]
+                if (source.kind != "numbers"):
+                    cols.append(source.strings(sel))
+                elif (source.typecode == 'd'):
+                    cols.append([None if (v != v) else v for v in source.numbers(sel)])     # NaN is empty
+                else:
+                    cols.append(source.numbers(sel).tolist())
+            writer.writerows(zip(*cols))
+            progress(len(sel))
+
+
+
+def _npyHeader(descr,n):
+    """Returns the header of a .npy file (format version 1.0) holding n values"""
+    header = "{'descr': '" + descr + "', 'fortran_order': False, 'shape': (" + str(n) + ",), }"
+    # The header, including the 10 byte preamble and a newline, is padded to a multiple of 64 bytes
+    header = header + " " * (63 - (len(header) + 10) % 64) + "\n"
+    return b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header.encode("latin-1")
+
+
+
+class _PaddedStrings():
+    """
+    Gets a column's strings as UTF-8 bytes padded to a fixed width. Each
+    distinct string in a StringTable is only padded once.
+    """
+
+    def __init__(self,source,width):
+        self.source = source
+        self.width = width
+        self.padded = {}
+        self.allPadded = None
+
+    def _pad(self,sid):
+        table = self.source.values
+        return bytes(table.blob[table.offsets[sid]:table.offsets[sid + 1]]).ljust(self.width, b"\0")
+
+    def getBatch(self,sel):
+        """Gets the padded strings for a batch, joined together"""
+        source = self.source
+        table = source.values
+        if ((source.kind != "strings") or not isinstance(table, CatalogStore.StringTable)):
+            return b"".join([s.encode("utf-8").ljust(self.width, b"\0") for s in source.strings(sel)])
+        if isinstance(sel, range):
+            # The whole catalog is being exported, so every distinct string is needed
+            if (self.allPadded == None):
+                self.allPadded = [self._pad(sid) for sid in range(table.getNumUnique())]
+            ids = sel if (table.ids == None) else _numbers(table.ids,'i',sel)
+            return b"".join(map(self.allPadded.__getitem__, ids))
+        result = []
+        for sid in map(table.getId, sel):
+            s = self.padded.get(sid)
+            if (s == None):
+                s = self._pad(sid)
+                self.padded[sid] = s
+            result.append(s)
+        return b"".join(result)
+
+
+
+def _npyStringWidth(source):
+    """Finds how many bytes the longest string in a column takes"""
+    table = source.values
+    if (source.kind == "labels"):
+        return max([len(s.encode("utf-8")) for s in source.labels] + [1])
+    if not isinstance(table, CatalogStore.StringTable):
+        raise ExportError("The comments of a lazily loaded catalog cannot be exported to NumPy files. " +
+                          "Leave out the 'comment' column or load the catalog normally.")
+    offsets = table.offsets
+    return max([offsets[sid + 1] - offsets[sid] for sid in range(table.getNumUnique())] + [1])
+
+
+
+def getNpyFilenames(filename,columns=COLUMNS):
+    """
+    Gets the names of the files that a NumPy export writes.
+
+    :param str filename: file name that the export was given
+    :param list columns: names of the exported columns
+    :return: list of the file names, one per column
+    """
+    base = filename[:-len(".npy")] if filename.lower().endswith(".npy") else filename
+    return [base + "." + name + ".npy" for name in columns]
+
+
+
+def _writeNpy(filenames,sources,columns,batches,progress,n):
+    """Writes each column to its own .npy file, all of them a batch at a time"""
+    byteOrder = "<" if (sys.byteorder == "little") else ">"
+    widths = dict((name, _npyStringWidth(sources[name])) for name in columns
+                  if (sources[name].kind != "numbers"))
+    padded = dict((name, _PaddedStrings(sources[name],widths[name])) for name in widths)
+    files = []
+    try:
+        for k in range(len(columns)):
+            source = sources[columns[k]]
+            files.append(open(filenames[k], "wb"))
+            if (source.kind == "numbers"):
+                files[k].write(_npyHeader(byteOrder + _NPY_TYPES[source.typecode],n))
+            else:
+                files[k].write(_npyHeader("|S" + str(widths[columns[k]]),n))
+        for sel in batches:
+            for k in range(len(columns)):
+                source = sources[columns[k]]
+                if (source.kind == "numbers"):
+                    files[k].write(source.numbers(sel))
+                else:
+                    files[k].write(padded[columns[k]].getBatch(sel))
+            progress(len(sel))
+    finally:
+        for f in files:
+            f.close()
+
+
+
+def _arrowColumn(source,sel,dictionaries):
+    """Gets a column's values for a batch as a pyarrow array"""
+    import pyarrow.compute as pc
+    if (source.kind == "numbers"):
+        values = source.numbers(sel)
+        arrowType = {'d': pa.float64(), 'i': pa.int32(), 'h': pa.int16()}[source.typecode]
+        return pa.Array.from_buffers(arrowType, len(sel), [None, pa.py_buffer(values)])
+    if (source.kind == "labels"):
+        keys = pa.Array.from_buffers(pa.int16(), len(sel), [None, pa.py_buffer(source.numbers(sel))])
+        keys = pc.if_else(pc.less(keys, 0), pa.scalar(None, pa.int16()), keys)
+        return pa.DictionaryArray.from_arrays(keys, pa.array(source.labels, pa.string()))
+    table = source.values
+    if (isinstance(sel, range) and isinstance(table, CatalogStore.StringTable)):
+        # The catalog's string table is the dictionary, and the string ids are the keys
+        dictionary = dictionaries.get(id(table))
+        if (dictionary == None):
+            dictionary = pa.Array.from_buffers(pa.large_string(), table.getNumUnique(),
+                                               [None, pa.py_buffer(table.offsets), pa.py_buffer(table.blob)])
+            dictionaries[id(table)] = dictionary
+        ids = array('i', sel) if (table.ids == None) else _numbers(table.ids,'i',sel)
+        keys = pa.Array.from_buffers(pa.int32(), len(sel), [None, pa.py_buffer(ids)])
+        return pa.DictionaryArray.from_arrays(keys, dictionary)
+    return pa.array(source.strings(sel), pa.large_string())
+
+
+
+def _writeArrow(filename,sources,columns,batches,progress,fmt):
+    """Writes the columns as an Arrow IPC file or a Parquet file"""
+    if (pa == None):
+        raise ExportError("Exporting to " + fmt.capitalize() + " needs the pyarrow package, which is not installed")
+    dictionaries = {}
+    writer = None
+    try:
+        for sel in batches:
+            batch = pa.record_batch([_arrowColumn(sources[name],sel,dictionaries) for name in columns],
+                                    names=list(columns))
+            if (writer == None):
+                if (fmt == PARQUET_FORMAT):
+                    import pyarrow.parquet as pq
+                    writer = pq.ParquetWriter(filename, batch.schema)
+                else:
+                    writer = pa.ipc.new_file(filename, batch.schema)
+            if (fmt == PARQUET_FORMAT):
+                writer.write_table(pa.Table.from_batches([batch]))
+            else:
+                writer.write_batch(batch)
+            progress(len(sel))
+    finally:
+        if (writer != None):
+            writer.close()
+
+
+
+#==================================================
+# Exporting
+#==================================================
+
+def exportObjects(filename,indices=None,fmt=None,columns=None,batchSize=DEFAULT_BATCH_SIZE,
+                  progressCallback=None):
+    """
+    Exports objects from the currently loaded catalog.
+
+    :param str filename: file to export to. For a NumPy export, this is the
+                         name the .npy file for each column is based on.
+    :param list indices: indices of the objects to export, in the order to
+                         export them, or None to export the whole catalog in
+                         the order it was loaded
+    :param str fmt: one of the *_FORMAT values, or None to use the one for
+                    the file's extension
+    :param list columns: names of the columns to export, or None for all of them
+    :param int batchSize: number of objects to write at a time
+    :param function progressCallback: called as progressCallback(n, total)
+                    after each batch with the number of objects written so far
+    :return: number of objects exported
+    :raises ExportError: if the export cannot be done as asked
+    :raises OSError: if the file cannot be written
+    """
+    if not (CatalogStore.isCatalogLoaded()):
+        raise ExportError("No catalog is currently loaded")
+    fmt = getExportFormat(filename,fmt)
+    columns = COLUMNS if (columns == None) else tuple(columns)
+    for name in columns:
+        if not (name in COLUMNS):
+            raise ExportError("Unknown column '" + name + "'. The columns are " + ", ".join(COLUMNS))
+    if (len(columns) <= 0):
+        raise ExportError("No columns to export")
+
+    cat = CatalogStore._getCatalog()
+    total = len(cat) if (indices == None) else len(indices)
+    sources = _getColumnSources(cat,columns)
+    batches = _batches(len(cat),indices,max(batchSize, 1))
+    done = [0]
+
+    def progress(count):
+        done[0] = done[0] + count
+        if (progressCallback != None):
+            progressCallback(int(done[0]),total)
+
+    # Write to temporary files so that a failed or cancelled export does
+    # not leave partial files behind
+    filenames = getNpyFilenames(filename,columns) if (fmt == NPY_FORMAT) else [filename]
+    tmpFiles = [f + ".tmp" + str(os.getpid()) for f in filenames]
+    finished = False
+    try:
+        if (fmt == CSV_FORMAT):
+            _writeCSV(tmpFiles[0],sources,columns,batches,progress)
+        elif (fmt == NPY_FORMAT):
+            _writeNpy(tmpFiles,sources,columns,batches,progress,total)
+        else:
+            _writeArrow(tmpFiles[0],sources,columns,batches,progress,fmt)
+        for k in range(len(filenames)):
+            os.replace(tmpFiles[k], filenames[k])
+        finished = True
+    finally:
+        if not finished:
+            for f in tmpFiles:
+                if os.path.exists(f):
+                    os.remove(f)
+    return total
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    pass
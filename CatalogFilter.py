@@ -0,0 +1,196 @@
+"""
+Finds the catalog objects that satisfy several conditions at once.
+
+A filter can combine a constellation, a range of visual magnitudes,
+a range of RA and Decl, and a prefix for the object's name (e.g., all
+objects brighter than magnitude 6 in Orion). Each kind of condition
+has an index that finds the objects satisfying it without looking at
+the rest of the catalog: the constellation groups, the magnitude sort
+order (searched with bisection), the spatial index, and the sorted
+object names. The filter estimates how many objects each condition
+selects, gets the objects for the most selective condition from its
+index, and keeps those that also satisfy the other conditions.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+import math
+
+import ASTUtils.ASTAngle as ASTAngle
+import ASTUtils.ASTConstellation as ASTConstellation
+from ASTUtils.ASTMisc import DMSFORMAT, HMSFORMAT
+import ASTUtils.ASTStr as ASTStr
+import ASTUtils.ASTTime as ASTTime
+
+import Chap1.CatalogStore as CatalogStore
+
+#==================================================
+# Filters
+#==================================================
+
+class CatalogFilter():
+    """
+    Conditions that objects must satisfy. Any condition that is None is
+    not checked. An object whose magnitude is unknown never satisfies a
+    magnitude condition.
+    """
+
+    def __init__(self,constIdx=None,mVMin=None,mVMax=None,RAStart=None,RAEnd=None,
+                 DeclLo=None,DeclHi=None,namePrefix=None):
+        """
+        :param int constIdx: index of the constellation the objects must be in
+        :param float mVMin: smallest (brightest) visual magnitude
+        :param float mVMax: largest (faintest) visual magnitude
+        :param float RAStart: start of the RA range, in hours. If RAStart is
+                              greater than RAEnd, the range wraps through 0h.
+        :param float RAEnd: end of the RA range, in hours
+        :param float DeclLo: lowest declination, in degrees
+        :param float DeclHi: highest declination, in degrees
+        :param str namePrefix: what the object's name must start with.
+                               Case and spaces are ignored.
+        """
+        self.constIdx = constIdx
+        self.mVMin = mVMin
+        self.mVMax = mVMax
+        self.RAStart = RAStart
+        self.RAEnd = RAEnd
+        self.DeclLo = DeclLo
+        self.DeclHi = DeclHi
+        if ((namePrefix != None) and (len(CatalogStore.normalizeName(namePrefix)) <= 0)):
+            namePrefix = None
+        self.namePrefix = namePrefix
+
+    def _hasMagnitude(self):
+        return (self.mVMin != None) or (self.mVMax != None)
+
+    def _hasRA(self):
+        return (self.RAStart != None) and (self.RAEnd != None)
+
+    def _hasPosition(self):
+        return self._hasRA() or (self.DeclLo != None) or (self.DeclHi != None)
+
+    def _positionBounds(self):
+        """Returns the RA/Decl box, filling in whatever was not given"""
+        if self._hasRA():
+            RAStart = self.RAStart
+            RAEnd = self.RAEnd
+        else:
+            RAStart = 0.0
+            RAEnd = 24.0
+        DeclLo = -90.0 if (self.DeclLo == None) else self.DeclLo
+        DeclHi = 90.0 if (self.DeclHi == None) else self.DeclHi
+        return RAStart, RAEnd, DeclLo, DeclHi
+
+    def isEmpty(self):
+        """Returns True if there are no conditions"""
+        return ((self.constIdx == None) and not self._hasMagnitude() and not self._hasPosition() and
+                (self.namePrefix == None))
+
+    def describe(self):
+        """Returns a description of the conditions"""
+        parts = []
+        if (self.constIdx != None):
+            parts.append("in " + ASTConstellation.getConstName(self.constIdx))
+        if ((self.mVMin != None) and (self.mVMax != None)):
+            parts.append(ASTStr.strFormat("with mV from %.2f",self.mVMin) + ASTStr.strFormat(" to %.2f",self.mVMax))
+        elif (self.mVMax != None):
+            parts.append(ASTStr.strFormat("with mV <= %.2f",self.mVMax))
+        elif (self.mVMin != None):
+            parts.append(ASTStr.strFormat("with mV >= %.2f",self.mVMin))
+        if self._hasRA():
+            parts.append("with RA from " + ASTTime.timeToStr(self.RAStart,HMSFORMAT) + " to " +
+                         ASTTime.timeToStr(self.RAEnd,HMSFORMAT))
+        if ((self.DeclLo != None) or (self.DeclHi != None)):
+            RAStart, RAEnd, DeclLo, DeclHi = self._positionBounds()
+            parts.append("with Decl from " + ASTAngle.angleToStr(DeclLo,DMSFORMAT) + " to " +
+                         ASTAngle.angleToStr(DeclHi,DMSFORMAT))
+        if (self.namePrefix != None):
+            parts.append("with names starting with '" + self.namePrefix + "'")
+        return ", ".join(parts)
+
+    def _conditions(self):
+        """
+        Gets each condition's estimated number of objects, a function that
+        gets those objects from an index, and a function that checks one object.
+        """
+        cat = CatalogStore._getCatalog()
+        conditions = []
+
+        if (self.constIdx != None):
+            constIdx = self.constIdx
+            constCol = cat.constIdx
+            conditions.append((CatalogStore.getCatConstCounts().get(constIdx, 0),
+                               lambda: CatalogStore.getConstMembers(constIdx),
+                               lambda i: constCol[i] == constIdx))
+
+        if self._hasMagnitude():
+            mVMin = -math.inf if (self.mVMin == None) else self.mVMin
+            mVMax = math.inf if (self.mVMax == None) else self.mVMax
+            mVCol = cat.mV
+            conditions.append((CatalogStore.countObjsByMagnitude(self.mVMin,self.mVMax),
+                               lambda: CatalogStore.findObjsByMagnitude(self.mVMin,self.mVMax),
+                               lambda i: (mVCol[i] >= mVMin) and (mVCol[i] <= mVMax)))
+
+        if self._hasPosition():
+            RAStart, RAEnd, DeclLo, DeclHi = self._positionBounds()
+            # Estimate from the fraction of the sky that the box covers
+            allRA = not self._hasRA() or (RAEnd - RAStart >= 24.0)
+            raFraction = 1.0 if allRA else ((RAEnd - RAStart) % 24.0) / 24.0
+            declFraction = max(math.sin(math.radians(min(DeclHi, 90.0))) -
+                               math.sin(math.radians(max(DeclLo, -90.0))), 0.0) / 2.0
+            raCol = cat.RA
+            declCol = cat.Decl
+            raLo = RAStart % 24.0
+            raHi = RAEnd % 24.0
+
+            def inBox(i):
+                d = declCol[i]
+                if ((d < DeclLo) or (d > DeclHi)):
+                    return False
+                if allRA:
+                    return True
+                ra = raCol[i] % 24.0
+                if (raLo <= raHi):
+                    return (ra >= raLo) and (ra <= raHi)
+                return (ra >= raLo) or (ra <= raHi)
+
+            conditions.append((int(len(cat) * raFraction * declFraction),
+                               lambda: CatalogStore.findObjsInBox(RAStart,RAEnd,DeclLo,DeclHi),
+                               inBox))
+
+        if (self.namePrefix != None):
+            sids = CatalogStore.findNameIdsByPrefix(self.namePrefix)
+            sidSet = set(sids)
+            names = cat.names
+            conditions.append((len(sids),
+                               lambda: CatalogStore.findObjsByNamePrefix(self.namePrefix),
+                               lambda i: names.getId(i) in sidSet))
+        return conditions
+
+    def apply(self):
+        """
+        Finds the objects in the currently loaded catalog that satisfy
+        all of the conditions.
+
+        :return: list of indices of the objects, in the current sort order
+        """
+        if not (CatalogStore.isCatalogLoaded()):
+            return []
+        if self.isEmpty():
+            return list(CatalogStore.getActiveOrder())
+
+        conditions = self._conditions()
+        conditions.sort(key=lambda c: c[0])
+        checks = [c[2] for c in conditions[1:]]
+        result = [i for i in conditions[0][1]() if all(check(i) for check in checks)]
+        result.sort(key=CatalogStore.getObjPosition)
+        return result
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    pass
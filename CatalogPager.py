@@ -0,0 +1,306 @@
+"""
+Provides paged and virtual-scrolling output for long object lists.
+
+Printing every object in a large catalog to the text area takes a
+long time, and the text area then holds the entire formatted catalog.
+The classes here only format the rows that are actually being looked
+at. A CatalogPager formats one page of rows at a time, while a
+VirtualCatalogView is a scrollable window that only formats and
+renders the rows that are currently visible. In both cases, the
+time and memory needed do not depend upon the size of the catalog.
+
+A pager remembers the version of the catalog it was made for. When the
+catalog is sorted, cleared, or another one is loaded, a pager over a
+range of positions is brought up to date with the new catalog, while a
+pager over a list of objects (e.g., search results) is only kept if
+the same catalog is still loaded. A view whose pager cannot be brought
+up to date stops showing its rows.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+import tkinter as tk
+
+import Chap1.CatalogStore as CatalogStore
+
+# Number of rows on a page
+PAGE_SIZE = 500
+
+# Listings with more rows than this are shown in a virtual view
+PAGED_LISTING_THRESHOLD = 1000
+
+# How often, in milliseconds, a virtual view checks whether the catalog has changed
+CHECK_INTERVAL = 500
+
+#==================================================
+# Paging
+#==================================================
+
+class CatalogPager():
+    """
+    Splits a range of positions in the current sort order into pages
+    and formats the rows of a page only when they are asked for.
+    """
+
+    def __init__(self,iStart=0,iEnd=None,pageSize=PAGE_SIZE):
+        """
+        :param int iStart: position of the first object (0-based)
+        :param int iEnd: position of the last object, or None for the last one in the catalog
+        :param int pageSize: number of rows on a page
+        """
+        self.firstPos = iStart
+        self.lastPos = iEnd
+        self.pageSize = pageSize
+        self._setRange()
+
+    def _setRange(self):
+        """Works out the rows from the currently loaded catalog"""
+        n = CatalogStore.getCatNumObjs()
+        iEnd = self.lastPos
+        if ((iEnd == None) or (iEnd > n - 1)):
+            iEnd = n - 1
+        self.iStart = max(self.firstPos, 0)
+        self.numRows = max(iEnd - self.iStart + 1, 0)
+        self.catalogVersion = CatalogStore.getCatalogVersion()
+
+    def isCurrent(self):
+        """Returns True if the catalog has not changed since the pager was made or refreshed"""
+        return self.catalogVersion == CatalogStore.getCatalogVersion()
+
+    def refresh(self):
+        """
+        Brings the pager up to date after the catalog has changed. The
+        range of positions is kept, but it is limited to the new catalog's size.
+
+        :return: True if the pager has rows to show from the current catalog
+        """
+        if not (CatalogStore.isCatalogLoaded()):
+            return False
+        self._setRange()
+        return True
+
+    def getNumRows(self):
+        """Returns how many rows there are in all"""
+        return self.numRows
+
+    def getNumPages(self):
+        """Returns how many pages there are"""
+        return (self.numRows + self.pageSize - 1) // self.pageSize
+
+    def formatRow(self,row):
+        """
+        Formats one row.
+
+        :param int row: row number (0-based) within this pager's range
+        """
+        return CatalogStore.formatObjRow(CatalogStore.getObjIndexAt(self.iStart + row))
+
+    def iterRows(self,firstRow,numRows):
+        """
+        Generator that formats a window of rows.
+
+        :param int firstRow: first row to format
+        :param int numRows: number of rows to format
+        """
+        if not (self.isCurrent() or self.refresh()):
+            return
+        last = min(firstRow + numRows, self.numRows)
+        for row in range(max(firstRow, 0), last):
+            yield self.formatRow(row)
+
+    def iterPage(self,page):
+        """
+        Generator that formats the rows on a page.
+
+        :param int page: page number (0-based)
+        """
+        return self.iterRows(page * self.pageSize, self.pageSize)
+
+    def displayPage(self,prt,page):
+        """
+        Displays one page of rows.
+
+        :param ASTPrt prt: where to display the rows
+        :param int page: page number (0-based)
+        """
+        prt.println(CatalogStore.formatObjHeading())
+        for line in self.iterPage(page):
+            prt.println(line)
+
+
+
+class ListPager(CatalogPager):
+    """Pages through a list of objects, such as the results of a search"""
+
+    def __init__(self,indices,pageSize=PAGE_SIZE):
+        """
+        :param sequence indices: indices of the objects, in the order to show them
+        :param int pageSize: number of rows on a page
+        """
+        self.indices = indices
+        self.iStart = 0
+        self.numRows = len(indices)
+        self.pageSize = pageSize
+        self.catalog = CatalogStore._getCatalog()
+        self.catalogVersion = CatalogStore.getCatalogVersion()
+
+    def refresh(self):
+        """
+        Keeps the list after the catalog has changed, which is only possible
+        if the same catalog is still loaded (e.g., it has only been sorted).
+
+        :return: True if the list's objects are still in the current catalog
+        """
+        if ((self.catalog == None) or (CatalogStore._getCatalog() is not self.catalog)):
+            return False
+        self.catalogVersion = CatalogStore.getCatalogVersion()
+        return True
+
+    def formatRow(self,row):
+        """
+        Formats one row.
+
+        :param int row: row number (0-based) within the list
+        """
+        return CatalogStore.formatObjRow(self.indices[row])
+
+
+
+#==================================================
+# Virtual scrolling
+#==================================================
+
+class VirtualCatalogView():
+    """
+    Window that lets the user scroll through a CatalogPager's rows.
+    The scrollbar is sized for all of the rows, but only the rows that
+    are visible are ever formatted and put in the text widget.
+    """
+
+    def __init__(self,parent,title,pager,visibleRows=40):
+        """
+        :param tkwidget parent: window that the view belongs to
+        :param str title: title for the window
+        :param CatalogPager pager: the rows to show
+        :param int visibleRows: initial number of rows to show
+        """
+        self.pager = pager
+        self.top = 0
+        self.visibleRows = visibleRows
+        self.stale = False
+
+        self.win = tk.Toplevel(parent)
+        self.win.title(title)
+        heading = tk.Label(self.win, text=CatalogStore.formatObjHeading(), font="TkFixedFont", anchor="w")
+        heading.pack(side=tk.TOP, fill=tk.X)
+        self.scrollbar = tk.Scrollbar(self.win, orient=tk.VERTICAL, command=self._onScroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text = tk.Text(self.win, height=visibleRows, width=len(CatalogStore.formatObjHeading()) + 2,
+                            wrap=tk.NONE, font="TkFixedFont")
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.text.bind("<Configure>", self._onResize)
+        self.text.bind("<MouseWheel>", self._onWheel)
+        self.text.bind("<Button-4>", lambda e: self.scrollTo(self.top - 3))
+        self.text.bind("<Button-5>", lambda e: self.scrollTo(self.top + 3))
+        self.text.bind("<Up>", lambda e: self.scrollTo(self.top - 1))
+        self.text.bind("<Down>", lambda e: self.scrollTo(self.top + 1))
+        self.text.bind("<Prior>", lambda e: self.scrollTo(self.top - self.visibleRows))
+        self.text.bind("<Next>", lambda e: self.scrollTo(self.top + self.visibleRows))
+        self.text.bind("<Home>", lambda e: self.scrollTo(0))
+        self.text.bind("<End>", lambda e: self.scrollTo(self.pager.getNumRows()))
+        self.text.focus_set()
+        self._render()
+        self.checkId = self.win.after(CHECK_INTERVAL, self._checkCatalog)
+        self.win.bind("<Destroy>", self._onDestroy)
+
+    def scrollTo(self,row):
+        """
+        Makes a row the first visible row.
+
+        :param int row: row number (0-based)
+        """
+        if (self.stale):
+            return "break"
+        lastTop = max(self.pager.getNumRows() - self.visibleRows, 0)
+        row = min(max(int(row), 0), lastTop)
+        if (row != self.top):
+            self.top = row
+            self._render()
+        return "break"
+
+    def _render(self):
+        """Formats the visible rows and replaces the contents of the text widget with them"""
+        if (self.stale):
+            return
+        if not (self.pager.isCurrent() or self.pager.refresh()):
+            self._showStale()
+            return
+        self.top = min(self.top, max(self.pager.getNumRows() - self.visibleRows, 0))
+        lines = list(self.pager.iterRows(self.top, self.visibleRows))
+        self.text.configure(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", "\n".join(lines))
+        self.text.configure(state=tk.DISABLED)
+
+        n = self.pager.getNumRows()
+        if (n <= 0):
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.top / n, min((self.top + self.visibleRows) / n, 1.0))
+
+    def _showStale(self):
+        """Stops showing rows once the catalog they came from is gone"""
+        self.stale = True
+        self.text.configure(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", "The catalog has changed, so these objects can no longer be shown.\n" +
+                         "List the objects again to see them in the current catalog.")
+        self.text.configure(state=tk.DISABLED)
+        self.scrollbar.set(0.0, 1.0)
+
+    def _checkCatalog(self):
+        """Updates the view if the catalog has changed since it was last rendered"""
+        self.checkId = None
+        if not (self.pager.isCurrent()):
+            self._render()
+        if (self.stale):
+            return
+        self.checkId = self.win.after(CHECK_INTERVAL, self._checkCatalog)
+
+    def _onDestroy(self,event):
+        """Stops checking the catalog once the window is gone"""
+        if ((event.widget is self.win) and (self.checkId != None)):
+            self.win.after_cancel(self.checkId)
+            self.checkId = None
+
+    def _onScroll(self,*args):
+        """Handles the scrollbar being moved"""
+        if (args[0] == tk.MOVETO):
+            self.scrollTo(float(args[1]) * self.pager.getNumRows())
+        elif (args[0] == tk.SCROLL):
+            amount = int(args[1])
+            if (args[2] == tk.PAGES):
+                amount = amount * self.visibleRows
+            self.scrollTo(self.top + amount)
+
+    def _onWheel(self,event):
+        """Handles the mouse wheel"""
+        # Windows gives multiples of 120 but macOS gives small deltas, so only the direction is used
+        if (event.delta > 0):
+            return self.scrollTo(self.top - 3)
+        elif (event.delta < 0):
+            return self.scrollTo(self.top + 3)
+        return "break"
+
+    def _onResize(self,event):
+        """Adjusts how many rows are shown when the window is resized"""
+        lineHeight = max(int(self.text.tk.call("font", "metrics", self.text.cget("font"), "-linespace")), 1)
+        rows = max(event.height // lineHeight, 1)
+        if (rows != self.visibleRows):
+            self.visibleRows = rows
+            self.scrollTo(self.top)
+            self._render()
@@ -0,0 +1,251 @@
+"""
+Provides a streaming parser for star catalogs in the pseudo-XML
+format used by the programs in this book.
+
+A star catalog data file looks like
+
+    <Catalog>
+      <Header>
+        <CatalogType>...</CatalogType>
+        <Epoch>2000.0</Epoch>
+        <Source>...</Source>
+        <Description>...</Description>
+      </Header>
+      <Data>
+        <Object>
+          <Name>M1</Name>
+          <AltName>NGC 1952</AltName>
+          <RA>5.575</RA>
+          <Decl>22.0167</Decl>
+          <mV>8.4</mV>
+          <Constellation>Tau</Constellation>
+          <Comment>Crab Nebula</Comment>
+        </Object>
+        ...
+      </Data>
+    </Catalog>
+
+Rather than reading the entire file into memory and then parsing
+it, the file is read a chunk at a time and objects are produced
+by a generator as soon as they have been completely read. Thus,
+memory use is bounded by the chunk size (plus the objects themselves)
+rather than by the size of the file.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+from collections import namedtuple
+import re
+
+import ASTUtils.ASTConstellation as ASTConstellation
+from ASTUtils.ASTMisc import DEFAULT_EPOCH
+
+# Number of bytes to read from the catalog file at one time
+CHUNK_SIZE = 256 * 1024
+
+# Tags that delimit the parts of a catalog data file
+DATA_START_TAG = b"<Data>"
+OBJ_START_TAG = b"<Object>"
+OBJ_END_TAG = b"</Object>"
+
+# Tags within an object and the CatalogObject field each one fills in
+OBJ_NAME_TAG = "Name"
+OBJ_ALTNAME_TAG = "AltName"
+OBJ_RA_TAG = "RA"
+OBJ_DECL_TAG = "Decl"
+OBJ_MV_TAG = "mV"
+OBJ_CONST_TAG = "Constellation"
+OBJ_COMMENT_TAG = "Comment"
+
+# Header tag that gives the catalog's epoch
+EPOCH_TAG = "Epoch"
+
+# Matches a simple <Tag>value</Tag> pair that has no other tags nested within it
+_TAGGED_VALUE = re.compile(rb"<(\w+)>([^<]*)</\1>")
+
+# A single object read from a star catalog. RA is in hours, Decl is
+# in degrees, mV is None if the visual magnitude is not known, and
+# constIdx is an index into the constellations table (-1 if unknown).
+CatalogObject = namedtuple("CatalogObject", ["name", "altName", "RA", "Decl", "mV", "constIdx", "comment"])
+
+#==================================================
+# Low level parsing
+#==================================================
+
+def _decode(value):
+    """Converts raw bytes from the catalog file to a stripped string"""
+    return value.decode("utf-8", "replace").strip()
+
+
+
+def _toFloat(s,default):
+    """Converts a string to a float, returning default if it is empty or invalid"""
+    try:
+        return float(s)
+    except ValueError:
+        return default
+
+
+
+def parseHeader(block):
+    """
+    Parse the header portion of a catalog data file.
+
+    :param bytes block: everything in the file that precedes the <Data> tag
+    :return: dictionary mapping header tag names to their values. The
+             'Epoch' entry is converted to a float.
+    """
+    header = {}
+    for m in _TAGGED_VALUE.finditer(block):
+        header[m.group(1).decode("ascii")] = _decode(m.group(2))
+    header[EPOCH_TAG] = _toFloat(header.get(EPOCH_TAG, ""), DEFAULT_EPOCH)
+    return header
+
+
+
+def _toCoord(fields,tag):
+    """Converts an object's RA or Decl to a float, raising ValueError if it is missing or invalid"""
+    value = fields.get(tag, "")
+    try:
+        return float(value)
+    except ValueError:
+        name = fields.get(OBJ_NAME_TAG, "")
+        raise ValueError(("The object '" + name + "'" if (len(name) > 0) else "An object with no name") +
+                         " has " + ("no " + tag if (len(value) <= 0) else "an invalid " + tag + " '" + value + "'"))
+
+
+
+def parseObject(block,constCache):
+    """
+    Parse the body of one <Object> ... </Object> entry.
+
+    :param bytes block: text between the <Object> and </Object> tags
+    :param dict constCache: maps constellation abbreviations to their
+                            index so that each one is only looked up once
+    :return: a CatalogObject
+    :raises ValueError: if the object's RA or Decl is missing or invalid
+    """
+    fields = {}
+    for m in _TAGGED_VALUE.finditer(block):
+        fields[m.group(1).decode("ascii")] = _decode(m.group(2))
+
+    abbrev = fields.get(OBJ_CONST_TAG, "")
+    constIdx = constCache.get(abbrev)
+    if (constIdx == None):
+        constIdx = ASTConstellation.findConstellationByAbbrvName(abbrev) if (len(abbrev) > 0) else -1
+        constCache[abbrev] = constIdx
+
+    return CatalogObject(fields.get(OBJ_NAME_TAG, ""), fields.get(OBJ_ALTNAME_TAG, ""),
+                         _toCoord(fields,OBJ_RA_TAG), _toCoord(fields,OBJ_DECL_TAG),
+                         _toFloat(fields.get(OBJ_MV_TAG, ""), None), constIdx,
+                         fields.get(OBJ_COMMENT_TAG, ""))
+
+
+
+#==================================================
+# Streaming parser
+#==================================================
+
+class CatalogParser():
+    """
+    Incrementally parses a catalog data file. Iterating over an instance
+    of this class produces CatalogObjects as they are read, and raises
+    ValueError if an object's RA or Decl is missing or invalid. The catalog
+    header is available as soon as the first object has been produced,
+    and objOffset is the byte offset in the file of the <Object> tag
+    of the object that was produced last.
+    """
+
+    def __init__(self,f,chunkSize=CHUNK_SIZE):
+        """
+        :param file f: catalog data file opened in binary mode
+        :param int chunkSize: number of bytes to read at a time
+        """
+        self.f = f
+        self.chunkSize = chunkSize
+        self.header = None
+        self.bytesRead = 0
+        self.objOffset = -1
+        self.constCache = {}
+
+    def __iter__(self):
+        buf = b""
+        bufOffset = 0               # offset in the file of the start of buf
+        inData = False
+        eof = False
+
+        while not eof:
+            chunk = self.f.read(self.chunkSize)
+            if (len(chunk) <= 0):
+                eof = True
+            self.bytesRead = self.bytesRead + len(chunk)
+            buf = buf + chunk
+
+            if not inData:
+                i = buf.find(DATA_START_TAG)
+                if (i < 0):
+                    if eof:
+                        # No data section, so there are no objects
+                        self.header = parseHeader(buf)
+                    continue
+                self.header = parseHeader(buf[:i])
+                buf = buf[i + len(DATA_START_TAG):]
+                bufOffset = bufOffset + i + len(DATA_START_TAG)
+                inData = True
+
+            pos = 0
+            while True:
+                start = buf.find(OBJ_START_TAG, pos)
+                if (start < 0):
+                    break
+                end = buf.find(OBJ_END_TAG, start)
+                if (end < 0):
+                    break
+                self.objOffset = bufOffset + start
+                yield parseObject(buf[start + len(OBJ_START_TAG):end], self.constCache)
+                pos = end + len(OBJ_END_TAG)
+
+            # Keep only the partially read object, if any, for the next chunk
+            buf = buf[pos:]
+            bufOffset = bufOffset + pos
+
+
+
+def parseObjectAt(buf,offset,constCache):
+    """
+    Parse the object whose <Object> tag is at a given offset.
+
+    :param buffer buf: contents of a catalog data file (e.g., a memory map)
+    :param int offset: offset in buf of the object's <Object> tag
+    :param dict constCache: maps constellation abbreviations to their index
+    :return: a CatalogObject
+    :raises ValueError: if there is no complete object at the offset
+    """
+    if (buf[offset:offset + len(OBJ_START_TAG)] != OBJ_START_TAG):
+        raise ValueError("No object starts at offset " + str(offset))
+    end = buf.find(OBJ_END_TAG, offset)
+    if (end < 0):
+        raise ValueError("The object at offset " + str(offset) + " is incomplete")
+    return parseObject(buf[offset + len(OBJ_START_TAG):end], constCache)
+
+
+
+def iterCatalogObjects(filename,chunkSize=CHUNK_SIZE):
+    """
+    Generator that produces the objects in a catalog data file one at a time.
+
+    :param str filename: full pathname of the catalog data file
+    :param int chunkSize: number of bytes to read at a time
+    """
+    with open(filename, "rb") as f:
+        for obj in CatalogParser(f, chunkSize):
+            yield obj
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    pass
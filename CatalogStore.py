@@ -0,0 +1,1862 @@
+"""
+Provides a columnar, array-backed store for the currently loaded
+star catalog.
+
+Rather than keeping a Python object for every object in a catalog,
+each field is kept in its own column. The numeric fields (RA, Decl,
+visual magnitude, and constellation index) are kept in typed arrays,
+while the names, alternate names, and comments are kept in string
+tables that store each distinct string only once. This takes a small
+fraction of the memory that per-object records take, and scanning a
+single column is much more cache friendly. A catalog can also be loaded
+lazily, in which case its comments are not kept in memory at all but
+are read from the catalog data file when they are needed.
+
+The functions at the bottom of this module provide the same operations
+on the currently loaded catalog that the menu listeners need. The results
+of the searches that are repeated most often are kept in a QueryCache,
+keyed by the catalog's version, which changes whenever the catalog is
+loaded, cleared, sorted, or its objects' constellations are changed.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+import math
+import os
+
+import ASTUtils.ASTAngle as ASTAngle
+from ASTUtils.ASTMisc import DMSFORMAT, HMSFORMAT, DEFAULT_EPOCH, ASCENDING_ORDER
+import ASTUtils.ASTStr as ASTStr
+import ASTUtils.ASTTime as ASTTime
+
+import Chap1.LazyImport as LazyImport
+import Chap1.QueryCache as QueryCache
+
+# Only needed once a catalog is loaded or searched, so that modules which
+# import this one (e.g., the menus) do not pay for them at start up
+ASTCatalog = LazyImport.lazyImport("ASTUtils.ASTCatalog")
+ASTConstellation = LazyImport.lazyImport("ASTUtils.ASTConstellation")
+CatalogCache = LazyImport.lazyImport("Chap1.CatalogCache")
+CatalogParser = LazyImport.lazyImport("Chap1.CatalogParser")
+ConstBoundaryIndex = LazyImport.lazyImport("Chap1.ConstBoundaryIndex")
+CoordPrecession = LazyImport.lazyImport("Chap1.CoordPrecession")
+LazyFields = LazyImport.lazyImport("Chap1.LazyFields")
+SpatialIndex = LazyImport.lazyImport("Chap1.SpatialIndex")
+TextIndex = LazyImport.lazyImport("Chap1.TextIndex")
+
+# Only needed when a catalog is shared with other processes
+SharedCatalog = LazyImport.lazyImport("Chap1.SharedCatalog")
+
+# Header tags that give information about the catalog
+CATTYPE_TAG = "CatalogType"
+CATSOURCE_TAG = "Source"
+CATDESCRIPTION_TAG = "Description"
+
+# Used in the mV column for objects whose visual magnitude is unknown
+UNKNOWN_MV = float("nan")
+
+#==================================================
+# Utility routines
+#==================================================
+
+def normalizeName(s):
+    """
+    Normalize a string for searching so that case and spaces do not
+    matter (e.g., 'M 39' and 'm39' both become 'm39').
+
+    :param str s: string to normalize
+    """
+    return "".join(s.split()).lower()
+
+
+
+def groupIndices(keys,numKeys,offset=0,visitOrder=None):
+    """
+    Groups indices by key with a counting sort, which takes a single
+    pass over the keys and keeps the indices within a group in order.
+
+    :param sequence keys: keys[i] is the key for index i
+    :param int numKeys: keys must be less than numKeys - offset
+    :param int offset: added to each key to make it non-negative
+    :param sequence visitOrder: order in which to visit the indices. If None,
+                                the indices are visited in ascending order.
+    :return: tuple (order, starts) where order[starts[k]:starts[k+1]] are
+             the indices, in visiting order, whose key is k - offset
+    """
+    starts = array('q', bytes(8 * (numKeys + 1)))
+    for k in keys:
+        starts[k + offset + 1] = starts[k + offset + 1] + 1
+    for k in range(numKeys):
+        starts[k + 1] = starts[k + 1] + starts[k]
+
+    if (visitOrder == None):
+        visitOrder = range(len(keys))
+    order = array('i', bytes(4 * len(keys)))
+    nextPos = array('q', starts)
+    for i in visitOrder:
+        k = keys[i] + offset
+        order[nextPos[k]] = i
+        nextPos[k] = nextPos[k] + 1
+    return order, starts
+
+
+
+#==================================================
+# String tables
+#==================================================
+
+class StringTable():
+    """
+    Holds one string per catalog object. Each distinct string is stored
+    only once, as UTF-8 in a single blob, and every object holds the
+    id of its string in a typed array.
+    """
+
+    def __init__(self,blob=None,offsets=None,ids=None):
+        """
+        Create an empty string table, or wrap existing storage.
+
+        :param buffer blob: UTF-8 bytes of all distinct strings
+        :param sequence offsets: offsets[k] to offsets[k+1] is string k within blob
+        :param sequence ids: id of each object's string. If None, object i uses string i.
+        """
+        if (blob == None):
+            self.blob = bytearray()
+            self.offsets = array('q', [0])
+            self.ids = array('i')
+            self.lookup = {}
+        else:
+            self.blob = blob
+            self.offsets = offsets
+            self.ids = ids
+            self.lookup = None
+
+    def __len__(self):
+        return len(self.ids) if (self.ids != None) else len(self.offsets) - 1
+
+    def append(self,s):
+        """
+        Add a string for the next object.
+
+        :param str s: the string to add
+        """
+        sid = self.lookup.get(s)
+        if (sid == None):
+            sid = len(self.offsets) - 1
+            self.blob.extend(s.encode("utf-8"))
+            self.offsets.append(len(self.blob))
+            self.lookup[s] = sid
+        self.ids.append(sid)
+
+    def extend(self,table):
+        """
+        Add the strings of all of the objects in another table. Each of
+        the other table's distinct strings is only looked up once.
+
+        :param StringTable table: the table whose strings are added
+        """
+        remap = array('i')
+        for sid in range(table.getNumUnique()):
+            s = table.getUnique(sid)
+            newId = self.lookup.get(s)
+            if (newId == None):
+                newId = len(self.offsets) - 1
+                self.blob.extend(s.encode("utf-8"))
+                self.offsets.append(len(self.blob))
+                self.lookup[s] = newId
+            remap.append(newId)
+        if (table.ids == None):
+            self.ids.extend(remap)
+        else:
+            self.ids.extend(array('i', map(remap.__getitem__, table.ids)))
+
+    def freeze(self):
+        """Discards the data that is only needed while strings are being added"""
+        if (self.lookup != None):
+            self.blob = bytes(self.blob)
+            self.lookup = None
+
+    def getId(self,idx):
+        """Gets the string id for an object"""
+        return self.ids[idx] if (self.ids != None) else idx
+
+    def getNumUnique(self):
+        """Gets how many distinct strings are in the table"""
+        return len(self.offsets) - 1
+
+    def getUnique(self,sid):
+        """
+        Get a distinct string given its id.
+
+        :param int sid: id of the string
+        """
+        return str(self.blob[self.offsets[sid]:self.offsets[sid + 1]], "utf-8")
+
+    def get(self,idx):
+        """
+        Get an object's string.
+
+        :param int idx: index of the object
+        """
+        return self.getUnique(self.getId(idx))
+
+    def getUniqueList(self):
+        """Returns a list of the distinct strings, indexed by string id"""
+        offsets = self.offsets
+        text = str(self.blob, "utf-8")
+        if (len(text) == offsets[-1]):
+            # Plain ASCII, so the byte offsets are also character offsets
+            return [text[offsets[sid]:offsets[sid + 1]] for sid in range(self.getNumUnique())]
+        return [self.getUnique(sid) for sid in range(self.getNumUnique())]
+
+    def getUniqueStrings(self):
+        """Returns a read-only sequence of the distinct strings, indexed by string id"""
+        return _UniqueStrings(self)
+
+    def groupById(self):
+        """
+        Groups the objects by string id.
+
+        :return: None if object i uses string i, otherwise a tuple (order, starts)
+                 where order[starts[sid]:starts[sid+1]] are the (ascending)
+                 indices of the objects that use string sid
+        """
+        if (self.ids == None):
+            return None
+        return groupIndices(self.ids,self.getNumUnique())
+
+
+
+class _UniqueStrings():
+    """Sequence view of the distinct strings in a StringTable"""
+
+    def __init__(self,table):
+        self.table = table
+
+    def __len__(self):
+        return self.table.getNumUnique()
+
+    def __getitem__(self,sid):
+        return self.table.getUnique(sid)
+
+
+
+#==================================================
+# Name indexes
+#==================================================
+
+class NameIndex():
+    """
+    Dictionary index from normalized strings to the first object that
+    has that string. Normalization is done once per distinct string.
+    """
+
+    def __init__(self,table,keys=None):
+        """
+        Build the index.
+
+        :param StringTable table: the strings to index
+        :param list keys: the table's distinct strings already normalized, if they have been
+        """
+        if (keys == None):
+            keys = [normalizeName(s) for s in table.getUniqueList()]
+        self.index = {}
+        index = self.index
+        for i in range(len(table)):
+            key = keys[table.getId(i)]
+            if not (key in index):
+                index[key] = i
+
+    def find(self,s):
+        """
+        Find the first object with a string.
+
+        :param str s: string to search for. Case and spaces are ignored.
+        :return: index of the object, or -1 if not found
+        """
+        return self.index.get(normalizeName(s), -1)
+
+    def findMany(self,strings):
+        """
+        Find the first object with each of several strings.
+
+        :param iterable strings: strings to search for
+        :return: list of object indices (-1 for strings not found)
+        """
+        get = self.index.get
+        return [get(normalizeName(s), -1) for s in strings]
+
+
+
+#==================================================
+# Columnar catalog
+#==================================================
+
+class ColumnarCatalog():
+    """
+    A star catalog stored as columns. RA is in hours, Decl is in
+    degrees, mV is NaN if the magnitude is unknown, and constIdx is
+    an index into the constellations table (-1 if unknown).
+    """
+
+    def __init__(self,header=None):
+        """
+        Create an empty catalog.
+
+        :param dict header: header information from the catalog file
+        """
+        self.header = {} if (header == None) else header
+        self.RA = array('d')
+        self.Decl = array('d')
+        self.mV = array('d')
+        self.constIdx = array('h')
+        self.names = StringTable()
+        self.altNames = StringTable()
+        self.comments = StringTable()
+        self.source = None
+        self.sourceIdx = None           # which merged catalog each object came from
+
+    def __len__(self):
+        return len(self.RA)
+
+    def append(self,obj):
+        """
+        Add an object to the catalog.
+
+        :param CatalogObject obj: the object to add
+        """
+        self.RA.append(obj.RA)
+        self.Decl.append(obj.Decl)
+        self.mV.append(UNKNOWN_MV if (obj.mV == None) else obj.mV)
+        self.constIdx.append(obj.constIdx)
+        self.names.append(obj.name)
+        self.altNames.append(obj.altName)
+        self.comments.append(obj.comment)
+
+    def extend(self,cat):
+        """
+        Add all of the objects in another catalog.
+
+        :param ColumnarCatalog cat: the catalog whose objects are added
+        """
+        self.RA.frombytes(cat.RA.tobytes())
+        self.Decl.frombytes(cat.Decl.tobytes())
+        self.mV.frombytes(cat.mV.tobytes())
+        self.constIdx.frombytes(cat.constIdx.tobytes())
+        self.names.extend(cat.names)
+        self.altNames.extend(cat.altNames)
+        self.comments.extend(cat.comments)
+
+    def freeze(self):
+        """Called when all objects have been added"""
+        self.names.freeze()
+        self.altNames.freeze()
+        self.comments.freeze()
+
+    def getObject(self,idx):
+        """
+        Gets an object as a CatalogObject.
+
+        :param int idx: index of the object
+        """
+        mV = self.mV[idx]
+        return CatalogParser.CatalogObject(self.names.get(idx), self.altNames.get(idx), self.RA[idx],
+                                           self.Decl[idx], None if math.isnan(mV) else mV,
+                                           self.constIdx[idx], self.comments.get(idx))
+
+
+
+def catalogFromObjects(objects,header=None):
+    """
+    Build a columnar catalog from CatalogObjects.
+
+    :param iterable objects: the objects to put in the catalog
+    :param dict header: header information from the catalog file
+    """
+    cat = ColumnarCatalog(header)
+    for obj in objects:
+        cat.append(obj)
+    cat.freeze()
+    return cat
+
+
+
+def catalogFromCompiled(compiled):
+    """
+    Build a columnar catalog directly on top of a compiled catalog.
+    No data is copied; the columns are views into the compiled file.
+
+    :param CompiledCatalog compiled: a compiled catalog
+    """
+    cat = ColumnarCatalog(compiled.header)
+    cat.RA = compiled.RA
+    cat.Decl = compiled.Decl
+    cat.mV = compiled.mV
+    cat.constIdx = compiled.constIdx
+    cols = compiled.columns
+    cat.names = StringTable(cols["name.blob"], cols["name.offsets"], cols["name.ids"])
+    cat.altNames = StringTable(cols["altName.blob"], cols["altName.offsets"], cols["altName.ids"])
+    if compiled.isLazy():
+        key = compiled.key
+        cat.comments = LazyFields.lazyCommentsColumn(key["path"],compiled.sourceOffset,
+                                                     (key["size"], key["mtime"]))
+    else:
+        cat.comments = StringTable(cols["comment.blob"], cols["comment.offsets"], cols["comment.ids"])
+    cat.source = compiled
+    return cat
+
+
+
+def _mergeHeaders(headers):
+    """
+    Combines the headers of several catalogs. The type, source, and
+    description list each different value, and everything else
+    (e.g., the epoch) comes from the first catalog.
+    """
+    header = dict(headers[0])
+    for tag in (CATTYPE_TAG, CATSOURCE_TAG, CATDESCRIPTION_TAG):
+        values = []
+        for hdr in headers:
+            value = hdr.get(tag, "")
+            if ((len(value) > 0) and not (value in values)):
+                values.append(value)
+        header[tag] = ", ".join(values)
+    return header
+
+
+
+def isLazyCatalog(cat):
+    """Returns True if a catalog's comments are read from its data file when needed"""
+    return isinstance(cat.comments, LazyFields.LazyStringColumn)
+
+
+
+def mergeCatalogs(catalogs):
+    """
+    Combines several catalogs into one. The objects of each catalog
+    follow those of the catalogs before it, and the catalog's sourceIdx
+    column gives the position in catalogs that each object came from.
+
+    :param list catalogs: the ColumnarCatalogs to combine
+    :return: a new ColumnarCatalog
+    """
+    merged = ColumnarCatalog(_mergeHeaders([cat.header for cat in catalogs]))
+    if any(isLazyCatalog(cat) for cat in catalogs):
+        merged.comments = LazyFields.LazyStringColumn()
+    merged.sourceIdx = array('h')
+    for k in range(len(catalogs)):
+        merged.extend(catalogs[k])
+        merged.sourceIdx.extend(array('h', [k]) * len(catalogs[k]))
+    merged.freeze()
+    return merged
+
+
+
+#==================================================
+# Currently loaded catalog
+#==================================================
+
+_catalog = None
+_catFilenames = []
+_catParts = []                  # the separate catalogs that _catalog was merged from
+_nameIndex = None
+_altNameIndex = None
+_commentIndex = None
+_commentGroups = None
+_spatialIndex = None
+_namePrefixIndex = None
+_altNamePrefixIndex = None
+
+# Indexes that are only built the first time a search needs them
+_mVSorted = None                # mV in magnitude order (unknown is +inf)
+_nameGroups = None
+
+# Coordinates of the objects precessed to the constellation boundary epoch,
+# and the constellation each object is in according to those coordinates.
+# Both are keyed by the epoch the catalog's coordinates were taken to be
+# in (None means each object's own catalog epoch).
+_boundaryCoords = {}
+_boundaryConsts = {}
+
+# Sorting does not rearrange the catalog. Instead, an ascending sort
+# permutation (perm[p] is the index of the object at position p) is
+# computed for a sort field the first time it is used, along with the
+# objects grouped by constellation in that order. A descending sort
+# just reads the permutation backwards. None is the key for file order.
+_sortPerms = {}
+_sortRanks = {}
+_sortBuckets = {}
+_activeSortField = None
+_activeSortOrder = ASCENDING_ORDER
+
+# Memory budget, in bytes, for the comments index (None for the index's default)
+_commentIndexBudget = None
+
+# Whether catalogs are loaded lazily unless a load says otherwise
+_lazyLoading = False
+
+# Changes every time the catalog or its sort order changes, so that cached
+# search results are only used for the catalog they were computed for.
+# Versions are never reused, even by catalogs that were put aside and
+# later switched back to (see switchCatalogState).
+_catalogVersion = 0
+_lastCatalogVersion = 0
+
+# The SharedCatalog this process has published the current catalog as,
+# and the SharedCatalog the current catalog was attached from
+_publishedCatalog = None
+_attachedCatalog = None
+
+def _getCatalog():
+    """Returns the currently loaded catalog"""
+    return _catalog
+
+
+
+class PreparedCatalog():
+    """
+    A catalog along with all of its indexes, ready to become the
+    currently loaded catalog. Building one does not touch the current
+    catalog, so it can be done in a background thread while the
+    current catalog is still in use.
+    """
+
+    def __init__(self,cat,filenames,parts):
+        """
+        :param ColumnarCatalog cat: the catalog
+        :param list filenames: full pathnames of the catalog data files
+        :param list parts: catalog loaded from each file. If there is more
+                           than one, cat is the parts merged together.
+        """
+        self.catalog = cat
+        self.filenames = filenames
+        self.parts = parts
+        nameKeys = [normalizeName(s) for s in cat.names.getUniqueList()]
+        altNameKeys = [normalizeName(s) for s in cat.altNames.getUniqueList()]
+        self.nameIndex = NameIndex(cat.names,nameKeys)
+        self.altNameIndex = NameIndex(cat.altNames,altNameKeys)
+        # Built now, rather than when first used, so that completing a name is always quick
+        self.namePrefixIndex = TextIndex.PrefixIndex(nameKeys,normalizeName,True)
+        self.altNamePrefixIndex = TextIndex.PrefixIndex(altNameKeys,normalizeName,True)
+        if isLazyCatalog(cat):
+            # The comments are searched by scanning the catalog data files
+            self.commentIndex = None
+            self.commentGroups = None
+        else:
+            budget = TextIndex.DEFAULT_MEMORY_BUDGET if (_commentIndexBudget == None) else _commentIndexBudget
+            self.commentIndex = TextIndex.TrigramIndex(cat.comments.getUniqueStrings(),normalizeName,budget)
+            self.commentGroups = cat.comments.groupById()
+        self.constBuckets = _buildConstBuckets(cat,None)
+        self.spatialIndex = SpatialIndex.SpatialIndex(cat.RA,cat.Decl)
+
+
+
+def _setCatalog(cat,filename):
+    """Makes a catalog the currently loaded catalog and builds its indexes"""
+    installPreparedCatalog(None if (cat == None) else PreparedCatalog(cat,[filename],[cat]))
+
+
+
+def _prepareParts(parts,filenames):
+    """Prepares the catalog made from one or more separately loaded catalogs"""
+    cat = parts[0] if (len(parts) == 1) else mergeCatalogs(parts)
+    return PreparedCatalog(cat,filenames,parts)
+
+
+
+def installPreparedCatalog(prepared):
+    """
+    Makes a prepared catalog the currently loaded catalog. This should
+    only be called from the thread that uses the catalog (e.g., the GUI
+    thread), which then never sees a partially loaded catalog.
+
+    :param PreparedCatalog prepared: the catalog, or None to clear the current one
+    """
+    global _catalog, _catFilenames, _catParts, _nameIndex, _altNameIndex
+    global _commentIndex, _commentGroups, _spatialIndex
+    global _mVSorted, _namePrefixIndex, _altNamePrefixIndex, _nameGroups
+    global _activeSortField, _activeSortOrder
+    _bumpCatalogVersion()
+    _mVSorted = None
+    _nameGroups = None
+    _boundaryCoords.clear()
+    _boundaryConsts.clear()
+    _sortPerms.clear()
+    _sortRanks.clear()
+    _sortBuckets.clear()
+    _activeSortField = None
+    _activeSortOrder = ASCENDING_ORDER
+    if (prepared == None):
+        _catalog = None
+        _catFilenames = []
+        _catParts = []
+        _nameIndex = None
+        _altNameIndex = None
+        _commentIndex = None
+        _commentGroups = None
+        _spatialIndex = None
+        _namePrefixIndex = None
+        _altNamePrefixIndex = None
+    else:
+        _catalog = prepared.catalog
+        _catFilenames = prepared.filenames
+        _catParts = prepared.parts
+        _nameIndex = prepared.nameIndex
+        _altNameIndex = prepared.altNameIndex
+        _commentIndex = prepared.commentIndex
+        _commentGroups = prepared.commentGroups
+        _spatialIndex = prepared.spatialIndex
+        _namePrefixIndex = prepared.namePrefixIndex
+        _altNamePrefixIndex = prepared.altNamePrefixIndex
+        _sortBuckets[None] = prepared.constBuckets
+    _releaseSharedCatalogs(prepared)
+
+
+
+def _releaseSharedCatalogs(prepared):
+    """
+    Stops sharing the catalog that is no longer the current catalog, and
+    lets go of the shared catalog it was attached from
+    """
+    global _publishedCatalog, _attachedCatalog
+    if (_publishedCatalog != None):
+        _publishedCatalog.withdraw()
+        _publishedCatalog = None
+    if ((_attachedCatalog != None) and ((prepared == None) or (prepared.catalog.source != _attachedCatalog))):
+        _attachedCatalog.detach()
+        _attachedCatalog = None
+
+
+
+#==================================================
+# Switching between catalogs
+#==================================================
+
+# The module variables that belong to one catalog, which switchCatalogState
+# puts aside together. Each is a CatalogState attribute of the same name
+# without the leading underscore.
+_STATE_VARIABLES = ("_catalog", "_catFilenames", "_catParts", "_nameIndex", "_altNameIndex",
+                    "_commentIndex", "_commentGroups", "_spatialIndex", "_namePrefixIndex",
+                    "_altNamePrefixIndex", "_mVSorted", "_nameGroups", "_boundaryCoords",
+                    "_boundaryConsts", "_sortPerms", "_sortRanks", "_sortBuckets",
+                    "_activeSortField", "_activeSortOrder", "_catalogVersion",
+                    "_publishedCatalog", "_attachedCatalog")
+
+class CatalogState():
+    """
+    A catalog that has been put aside by switchCatalogState, along with
+    everything that had been worked out for it: its indexes, sort orders,
+    coordinates precessed to the constellation boundary epoch, the active
+    sort, its version, its search result cache, and whether it is shared
+    with other processes.
+    """
+
+    def __init__(self):
+        """Makes the state of a store with no catalog loaded"""
+        self.catalog = None
+        self.catFilenames = []
+        self.catParts = []
+        self.nameIndex = None
+        self.altNameIndex = None
+        self.commentIndex = None
+        self.commentGroups = None
+        self.spatialIndex = None
+        self.namePrefixIndex = None
+        self.altNamePrefixIndex = None
+        self.mVSorted = None
+        self.nameGroups = None
+        self.boundaryCoords = {}
+        self.boundaryConsts = {}
+        self.sortPerms = {}
+        self.sortRanks = {}
+        self.sortBuckets = {}
+        self.activeSortField = None
+        self.activeSortOrder = ASCENDING_ORDER
+        self.catalogVersion = None
+        self.publishedCatalog = None
+        self.attachedCatalog = None
+        self.queryCache = None
+
+
+
+def switchCatalogState(state):
+    """
+    Puts the current catalog aside and makes one that was put aside earlier
+    the current catalog. Unlike installPreparedCatalog, nothing that was
+    worked out for either catalog is thrown away, and each catalog keeps
+    its own search result cache, so a program that switches between
+    several catalogs (e.g., QueryServer) does not redo that work every
+    time. A catalog that was put aside stays shared if it was published.
+    This should only be called from the thread that uses the catalog.
+
+    :param CatalogState state: the catalog to make current, as returned by an
+                               earlier call, or None to start with no catalog
+    :return: CatalogState of the catalog that was current
+    """
+    variables = globals()
+    saved = CatalogState()
+    for name in _STATE_VARIABLES:
+        setattr(saved,name[1:],variables[name])
+    saved.queryCache = QueryCache.getQueryCache()
+    if (state == None):
+        state = CatalogState()
+        state.queryCache = QueryCache.QueryCache(saved.queryCache.sizeBudget)
+    for name in _STATE_VARIABLES:
+        variables[name] = getattr(state,name[1:])
+    QueryCache.setQueryCache(state.queryCache)
+    if (_catalogVersion == None):
+        _bumpCatalogVersion()
+    return saved
+
+
+
+def _buildConstBuckets(cat,perm):
+    """
+    Groups a catalog's objects by constellation. Objects whose
+    constellation is unknown (-1) are in group 0, so constellation
+    idx is group idx+1.
+
+    :param ColumnarCatalog cat: the catalog
+    :param sequence perm: sort permutation giving the order of the objects
+                          within each group, or None for file order
+    """
+    numConst = 0
+    for idx in cat.constIdx:
+        if (idx >= numConst):
+            numConst = idx + 1
+    return groupIndices(cat.constIdx,numConst + 1,1,perm)
+
+
+
+def setCommentIndexBudget(numBytes):
+    """
+    Sets the memory budget for the comments index. The budget takes
+    effect the next time a catalog is loaded.
+
+    :param int numBytes: maximum number of bytes for the index's posting lists
+    """
+    global _commentIndexBudget
+    _commentIndexBudget = numBytes
+
+
+
+def setLazyLoading(lazy):
+    """
+    Sets whether catalogs are loaded lazily. A lazily loaded catalog only
+    keeps the names, coordinates, magnitudes, and constellations in memory.
+    Comments are read from the catalog data file when they are needed, and
+    searching them scans the file. This takes effect the next time a
+    catalog is loaded.
+
+    :param bool lazy: True to load catalogs lazily
+    """
+    global _lazyLoading
+    _lazyLoading = lazy
+
+
+
+def isLazyLoading():
+    """Returns True if catalogs are loaded lazily"""
+    return _lazyLoading
+
+
+
+def setQueryCacheBudget(sizeBudget):
+    """
+    Sets the budget for the search results that are cached. A result's size
+    is the number of objects it holds, so the budget is about how many object
+    indices are kept in all.
+
+    :param int sizeBudget: total size of the results to keep, or 0 to not cache results
+    """
+    QueryCache.getQueryCache().setSizeBudget(sizeBudget)
+
+
+
+def getQueryCacheStats():
+    """Returns the hit, miss, and size statistics of the search result cache"""
+    return QueryCache.getQueryCache().getStats()
+
+
+
+def getCatalogVersion():
+    """Returns the version of the currently loaded catalog and its sort order"""
+    return _catalogVersion
+
+
+
+def _bumpCatalogVersion():
+    """Changes the catalog's version, which makes the cached search results stale"""
+    global _catalogVersion, _lastCatalogVersion
+    _lastCatalogVersion = _lastCatalogVersion + 1
+    _catalogVersion = _lastCatalogVersion
+
+
+
+def cachedQuery(op,args,compute):
+    """
+    Gets the result of a search from the search result cache, doing the
+    search if its result is not cached for the current catalog version.
+
+    :param str op: name of the search
+    :param tuple args: the search's arguments, normalized so that
+                       equivalent searches have the same arguments
+    :param function compute: called with no arguments to do the search
+    """
+    return QueryCache.getQueryCache().lookup(op,args,_catalogVersion,compute)
+
+
+
+def isCatalogLoaded():
+    """
+    Returns True if a catalog is currently loaded. If the current catalog
+    was attached from another process that has since withdrawn it, the
+    catalog is cleared first.
+    """
+    if ((_attachedCatalog != None) and _attachedCatalog.isWithdrawn()):
+        clearCatalogAndSpaceObjects()
+    return _catalog != None
+
+
+
+def clearCatalogAndSpaceObjects():
+    """Clears the currently loaded catalog"""
+    _setCatalog(None,"")
+
+
+
+def prepareFormattedStarCatalog(filename,progressCallback=None,lazy=None):
+    """
+    Loads and indexes a star catalog without making it the current
+    catalog. This can safely be done in a background thread.
+
+    :param str filename: full pathname of the catalog data file
+    :param function progressCallback: called as progressCallback(bytesRead, totalBytes)
+                                      if the catalog has to be compiled
+    :param bool lazy: whether to load the catalog lazily (None means use setLazyLoading's setting)
+    :return: a PreparedCatalog to pass to installPreparedCatalog
+    :raises OSError, ValueError: if the catalog could not be loaded
+    """
+    lazy = _lazyLoading if (lazy == None) else lazy
+    cat = catalogFromCompiled(CatalogCache.loadCompiledCatalog(filename,progressCallback,lazy))
+    return PreparedCatalog(cat,[filename],[cat])
+
+
+
+def prepareFormattedStarCatalogs(filenames,keepLoaded=False,progressCallback=None,maxWorkers=None,lazy=None):
+    """
+    Loads and indexes several star catalogs at once without making
+    them the current catalog. Catalogs that have to be compiled are
+    parsed in parallel, and the catalogs are merged into one whose
+    objects remember which catalog they came from. This can safely
+    be done in a background thread.
+
+    :param list filenames: full pathnames of the catalog data files
+    :param bool keepLoaded: if True, the catalogs that are currently loaded
+                            are kept and the new ones are added to them
+    :param function progressCallback: called as progressCallback(numDone, numFiles)
+                                      as catalogs are compiled
+    :param int maxWorkers: maximum number of processes to parse catalogs with
+    :param bool lazy: whether to load the new catalogs lazily (None means use
+                      setLazyLoading's setting)
+    :return: a PreparedCatalog to pass to installPreparedCatalog
+    :raises OSError, ValueError: if a catalog could not be loaded
+    """
+    lazy = _lazyLoading if (lazy == None) else lazy
+    oldFilenames = list(_catFilenames) if keepLoaded else []
+    oldParts = list(_catParts) if keepLoaded else []
+    filenames = [f for f in filenames if not (f in oldFilenames)]
+    if ((len(filenames) <= 0) and (len(oldParts) <= 0)):
+        raise ValueError("No catalogs to load")
+    compiled = CatalogCache.loadCompiledCatalogs(filenames,maxWorkers,progressCallback,lazy)
+    parts = [catalogFromCompiled(c) for c in compiled]
+    return _prepareParts(oldParts + parts,oldFilenames + filenames)
+
+
+
+def loadFormattedStarCatalog(filename,lazy=None):
+    """
+    Loads a star catalog, going through its compiled file when possible.
+
+    :param str filename: full pathname of the catalog data file
+    :param bool lazy: whether to load the catalog lazily (None means use setLazyLoading's setting)
+    :return: True if the catalog was loaded
+    """
+    try:
+        prepared = prepareFormattedStarCatalog(filename,None,lazy)
+    except (OSError, ValueError):
+        return False
+    installPreparedCatalog(prepared)
+    return True
+
+
+
+def loadFormattedStarCatalogs(filenames,keepLoaded=False,lazy=None):
+    """
+    Loads several star catalogs and merges them into one catalog.
+
+    :param list filenames: full pathnames of the catalog data files
+    :param bool keepLoaded: if True, add the catalogs to those already loaded
+    :param bool lazy: whether to load the new catalogs lazily (None means use
+                      setLazyLoading's setting)
+    :return: True if the catalogs were loaded
+    """
+    try:
+        prepared = prepareFormattedStarCatalogs(filenames,keepLoaded,None,None,lazy)
+    except (OSError, ValueError):
+        return False
+    installPreparedCatalog(prepared)
+    return True
+
+
+
+def publishCatalog(name=None):
+    """
+    Shares the currently loaded catalog with other processes through shared
+    memory (see SharedCatalog). The catalog is withdrawn when it is cleared,
+    another catalog is loaded, it is published again, or this process exits.
+
+    :param str name: name to give the shared memory segment, or None to make one up
+    :return: the segment's name, which other processes pass to attachSharedCatalog
+    :raises ValueError: if no catalog is loaded
+    :raises OSError: if the shared memory segment could not be created
+    """
+    global _publishedCatalog
+    if (_catalog == None):
+        raise ValueError("No catalog is currently loaded")
+    if (_publishedCatalog != None):
+        _publishedCatalog.withdraw()
+        _publishedCatalog = None
+    _publishedCatalog = SharedCatalog.publishCatalog(_catalog,_catFilenames,_catParts,name)
+    return _publishedCatalog.getName()
+
+
+
+def attachSharedCatalog(name):
+    """
+    Makes a catalog that another process published the currently loaded
+    catalog. Its columns stay in shared memory and cannot be changed, and
+    only its indexes are built in this process.
+
+    :param str name: name of the shared memory segment
+    :return: True if the catalog was attached
+    """
+    global _attachedCatalog
+    try:
+        shared = SharedCatalog.attachCatalog(name)
+    except (OSError, ValueError):
+        return False
+    installPreparedCatalog(PreparedCatalog(shared.catalog,shared.filenames,shared.parts))
+    _attachedCatalog = shared
+    return True
+
+
+
+def getCatFilename():
+    """Returns the filename of the currently loaded catalog (a list of names if there are several)"""
+    return ", ".join(_catFilenames)
+
+
+
+def getCatFilenames():
+    """Returns a list of the filenames of the currently loaded catalogs"""
+    return list(_catFilenames)
+
+
+
+def getObjSource(idx):
+    """
+    Gets the catalog file an object came from.
+
+    :param int idx: index of the object
+    """
+    if (_catalog.sourceIdx == None):
+        return _catFilenames[0]
+    return _catFilenames[_catalog.sourceIdx[idx]]
+
+
+
+def getCatType():
+    """Returns the type of the currently loaded catalog"""
+    return _catalog.header.get(CATTYPE_TAG, "") if (_catalog != None) else ""
+
+
+
+def getCatEpoch():
+    """Returns the epoch of the currently loaded catalog"""
+    return _catalog.header.get(CatalogParser.EPOCH_TAG, DEFAULT_EPOCH) if (_catalog != None) else DEFAULT_EPOCH
+
+
+
+def getCatNumObjs():
+    """Returns how many objects are in the currently loaded catalog"""
+    return len(_catalog) if (_catalog != None) else 0
+
+
+
+def getCatConstCounts():
+    """
+    Counts the objects in each constellation of the currently loaded catalog.
+
+    :return: dictionary mapping constellation index to number of objects
+    """
+    counts = {}
+    if (_catalog != None):
+        starts = _sortBuckets[None][1]
+        for idx in range(len(starts) - 2):
+            n = starts[idx + 2] - starts[idx + 1]
+            if (n > 0):
+                counts[idx] = n
+    return counts
+
+
+
+def getCatNumConst():
+    """Returns how many different constellations the catalog's objects are in"""
+    return len(getCatConstCounts())
+
+
+
+def getCatObject(idx):
+    """
+    Gets an object from the currently loaded catalog.
+
+    Object indices identify an object no matter how the catalog is
+    sorted. Use getObjIndexAt to find which object is at a given
+    position in the current sort order.
+
+    :param int idx: index of the object (0-based)
+    :return: a CatalogObject
+    """
+    return _catalog.getObject(idx)
+
+
+
+def getConstMembers(constIdx,sortOrder=None):
+    """
+    Gets the objects in the currently loaded catalog that are in a
+    constellation, ordered by the field the catalog is currently sorted
+    on. This takes time proportional to the number of objects in the
+    constellation, not the catalog size.
+
+    :param int constIdx: index of the constellation
+    :param bool sortOrder: ASCENDING_ORDER or DESCENDING_ORDER of the current sort
+                           field, or None for the order the catalog was sorted in
+    :return: array of object indices
+    """
+    if (_catalog == None):
+        return array('i')
+    if (sortOrder == None):
+        sortOrder = _activeSortOrder
+    return cachedQuery("getConstMembers",(constIdx, sortOrder),lambda: _getConstMembers(constIdx,sortOrder))
+
+
+
+def _getConstMembers(constIdx,sortOrder):
+    """Gets the objects in a constellation without using the search result cache"""
+    # Each bucket is in ascending order of the sort field, whatever order
+    # the catalog was sorted in, so this is the only place it is reversed
+    order, starts = _sortBuckets[_activeSortField]
+    if ((constIdx + 2 < 1) or (constIdx + 2 >= len(starts))):
+        return array('i')
+    members = order[starts[constIdx + 1]:starts[constIdx + 2]]
+    if (sortOrder != ASCENDING_ORDER):
+        members.reverse()
+    return members
+
+
+
+#==================================================
+# Searching the catalog
+#==================================================
+
+def findObjByName(name):
+    """
+    Finds an object by its name. Case and spaces are ignored.
+
+    :param str name: name of the object
+    :return: index of the object, or -1 if not found
+    """
+    if (_nameIndex == None):
+        return -1
+    return cachedQuery("findObjByName",(normalizeName(name),),lambda: _nameIndex.find(name))
+
+
+
+def findObjByAltName(altName):
+    """
+    Finds an object by its alternate name. Case and spaces are ignored.
+
+    :param str altName: alternate name of the object
+    :return: index of the object, or -1 if not found
+    """
+    if (_altNameIndex == None):
+        return -1
+    return cachedQuery("findObjByAltName",(normalizeName(altName),),lambda: _altNameIndex.find(altName))
+
+
+
+def resolveNames(names,byAltName=False):
+    """
+    Finds many objects at once by their names or alternate names.
+
+    :param iterable names: names of the objects to find
+    :param bool byAltName: if True, search the alternate names instead of the names
+    :return: list with the index of each object, or -1 for names not found
+    """
+    index = _altNameIndex if byAltName else _nameIndex
+    if (index == None):
+        return [-1 for name in names]
+    return index.findMany(names)
+
+
+
+def findObjsByComments(target):
+    """
+    Finds all objects whose comments contain a substring. Case
+    and spaces are ignored.
+
+    :param str target: substring to search for
+    :return: list of indices of the objects that were found
+    """
+    if (_catalog == None):
+        return []
+    return cachedQuery("findObjsByComments",(normalizeName(target),),lambda: _findObjsByComments(target))
+
+
+
+def _findObjsByComments(target):
+    """Finds the objects whose comments contain a substring without using the search result cache"""
+    if (_commentIndex == None):
+        result = _catalog.comments.search(normalizeName(target),normalizeName)
+        result.sort(key=getObjPosition)
+        return result
+    sids = _commentIndex.search(target)
+    if (_commentGroups == None):
+        result = sids
+    else:
+        order, starts = _commentGroups
+        result = []
+        for sid in sids:
+            result.extend(order[starts[sid]:starts[sid + 1]])
+    result.sort(key=getObjPosition)
+    return result
+
+
+
+def findObjsInCone(RA,Decl,radius):
+    """
+    Finds all objects within a given angle of a point on the sky.
+
+    :param float RA: right ascension of the center, in hours
+    :param float Decl: declination of the center, in degrees
+    :param float radius: radius of the cone, in degrees
+    :return: list of indices of the objects, in the current sort order
+    """
+    if (_catalog == None):
+        return []
+    result = _spatialIndex.findInCone(RA,Decl,radius)
+    result.sort(key=getObjPosition)
+    return result
+
+
+
+def findObjsInBox(RAStart,RAEnd,DeclLo,DeclHi):
+    """
+    Finds all objects within a range of RA and Decl. If RAStart is
+    greater than RAEnd, the range wraps through 0h.
+
+    :param float RAStart: start of the RA range, in hours
+    :param float RAEnd: end of the RA range, in hours
+    :param float DeclLo: lowest declination, in degrees
+    :param float DeclHi: highest declination, in degrees
+    :return: list of indices of the objects, in the current sort order
+    """
+    if (_catalog == None):
+        return []
+    result = _spatialIndex.findInBox(RAStart,RAEnd,DeclLo,DeclHi)
+    result.sort(key=getObjPosition)
+    return result
+
+
+
+def _getMagnitudeIndex():
+    """
+    Gets the objects in ascending magnitude order along with their
+    magnitudes. This shares the permutation used to sort by magnitude.
+
+    :return: tuple (perm, values) where values[k] is the magnitude of object perm[k]
+    """
+    global _mVSorted
+    sortField = ASTCatalog.CatalogSortField.VISUAL_MAGNITUDE
+    if not (sortField in _sortPerms):
+        installSort(prepareSort(sortField),None)
+    perm = _sortPerms[sortField]
+    if (_mVSorted == None):
+        inf = float("inf")
+        mV = _catalog.mV
+        _mVSorted = array('d', [inf if math.isnan(mV[i]) else mV[i] for i in perm])
+    return perm, _mVSorted
+
+
+
+def _magnitudeRange(mVMin,mVMax):
+    """Returns the range of positions in magnitude order of the objects with mVMin <= mV <= mVMax"""
+    perm, values = _getMagnitudeIndex()
+    lo = 0 if (mVMin == None) else bisect_left(values,mVMin)
+    hi = bisect_left(values,float("inf")) if (mVMax == None) else bisect_right(values,mVMax)
+    return perm, lo, max(hi, lo)
+
+
+
+def countObjsByMagnitude(mVMin=None,mVMax=None):
+    """
+    Counts the objects whose visual magnitude is within a range. Objects
+    whose magnitude is unknown are never counted.
+
+    :param float mVMin: smallest (brightest) magnitude, or None for no limit
+    :param float mVMax: largest (faintest) magnitude, or None for no limit
+    """
+    if (_catalog == None):
+        return 0
+    perm, lo, hi = _magnitudeRange(mVMin,mVMax)
+    return hi - lo
+
+
+
+def findObjsByMagnitude(mVMin=None,mVMax=None):
+    """
+    Finds the objects whose visual magnitude is within a range. Objects
+    whose magnitude is unknown are never found.
+
+    :param float mVMin: smallest (brightest) magnitude, or None for no limit
+    :param float mVMax: largest (faintest) magnitude, or None for no limit
+    :return: array of indices of the objects, brightest first
+    """
+    if (_catalog == None):
+        return array('i')
+    perm, lo, hi = _magnitudeRange(mVMin,mVMax)
+    return perm[lo:hi]
+
+
+
+def _getNamePrefixIndex(byAltName=False):
+    """Gets the index used to find object names, or alternate names, by prefix"""
+    return _altNamePrefixIndex if byAltName else _namePrefixIndex
+
+
+
+def findNameIdsByPrefix(prefix):
+    """
+    Finds the distinct object names that start with a prefix. Case and
+    spaces are ignored.
+
+    :param str prefix: prefix to search for
+    :return: ids of the names (see StringTable), in sorted order of the names
+    """
+    if (_catalog == None):
+        return array('i')
+    return _getNamePrefixIndex().search(prefix)
+
+
+
+def findObjsByNamePrefix(prefix):
+    """
+    Finds the objects whose names start with a prefix. Case and spaces
+    are ignored.
+
+    :param str prefix: prefix to search for
+    :return: list of indices of the objects, in the current sort order
+    """
+    global _nameGroups
+    sids = findNameIdsByPrefix(prefix)
+    if (_catalog == None):
+        return []
+    if (_nameGroups == None):
+        _nameGroups = _catalog.names.groupById()
+    if (_nameGroups == None):
+        result = list(sids)
+    else:
+        order, starts = _nameGroups
+        result = []
+        for sid in sids:
+            result.extend(order[starts[sid]:starts[sid + 1]])
+    result.sort(key=getObjPosition)
+    return result
+
+
+
+def completeObjNames(prefix,limit=None,byAltName=False):
+    """
+    Finds the first few object names that start with a prefix (e.g., to
+    complete a name as it is being typed). Case and spaces are ignored.
+
+    :param str prefix: what has been typed so far
+    :param int limit: most names to return (None for the usual number)
+    :param bool byAltName: if True, complete alternate names instead of names
+    :return: list of the names, in sorted order
+    :raises ValueError: if limit is less than 1
+    """
+    if (limit == None):
+        limit = TextIndex.DEFAULT_COMPLETIONS
+    TextIndex.checkLimit(limit)
+    if (_catalog == None):
+        return []
+    table = _catalog.altNames if byAltName else _catalog.names
+    return [table.getUnique(sid) for sid in _getNamePrefixIndex(byAltName).complete(prefix,limit)]
+
+
+
+def suggestObjNames(name,limit=None,byAltName=False):
+    """
+    Suggests the object names that were most likely meant when a name
+    is not found. Names that start with the name given come first,
+    followed by the names that are most similar to it.
+
+    :param str name: the name that was not found
+    :param int limit: most names to return (None for the usual number)
+    :param bool byAltName: if True, suggest alternate names instead of names
+    :return: list of the names
+    :raises ValueError: if limit is less than 1
+    """
+    if (limit == None):
+        limit = TextIndex.DEFAULT_SUGGESTIONS
+    TextIndex.checkLimit(limit)
+    if (_catalog == None):
+        return []
+    table = _catalog.altNames if byAltName else _catalog.names
+    index = _getNamePrefixIndex(byAltName)
+    result = []
+    for sid in list(index.complete(name,limit)) + list(index.suggest(name,limit)):
+        s = table.getUnique(sid)
+        if not (s in result):
+            result.append(s)
+    return result[:limit]
+
+
+
+def scanObjsByComments(target):
+    """
+    Same as findObjsByComments, but scans every comment rather than
+    using the index. This is only used to check and benchmark the index.
+
+    :param str target: substring to search for
+    """
+    if (_catalog == None):
+        return []
+    target = normalizeName(target)
+    comments = _catalog.comments
+    if isLazyCatalog(_catalog):
+        matches = set(comments.search(target,normalizeName))
+        return [i for i in getActiveOrder() if (i in matches)]
+    matchIds = set()
+    for sid in range(comments.getNumUnique()):
+        if (target in normalizeName(comments.getUnique(sid))):
+            matchIds.add(sid)
+    return [i for i in getActiveOrder() if (comments.getId(i) in matchIds)]
+
+
+
+#==================================================
+# Checking the objects' constellations
+#==================================================
+
+def _getPartEpochs(cat,parts):
+    """
+    Gets the epoch of each catalog that a catalog was merged from,
+    as (first object index, end object index, epoch) tuples.
+    """
+    if (len(parts) <= 1):
+        return [(0, len(cat), cat.header.get(CatalogParser.EPOCH_TAG, DEFAULT_EPOCH))]
+    result = []
+    start = 0
+    for part in parts:
+        result.append((start, start + len(part), part.header.get(CatalogParser.EPOCH_TAG, DEFAULT_EPOCH)))
+        start = start + len(part)
+    return result
+
+
+
+def getBoundaryCoords(epoch=None):
+    """
+    Gets the coordinates of every object in the currently loaded catalog
+    precessed to the epoch of the constellation boundaries. The whole
+    catalog is precessed in one pass the first time the coordinates for
+    an epoch are needed, and the result is reused after that. This can
+    safely be done in a background thread.
+
+    :param float epoch: epoch to take the catalog's coordinates to be in. If None,
+                        each object's coordinates are in its own catalog's epoch.
+    :return: tuple (RA, Decl) of array('d'), RA in hours and Decl in degrees
+    """
+    cat = _catalog
+    parts = _catParts
+    if (cat == None):
+        return array('d'), array('d')
+    key = epoch
+    if (epoch == None):
+        partEpochs = _getPartEpochs(cat,parts)
+        if (len(set(p[2] for p in partEpochs)) == 1):
+            epoch = partEpochs[0][2]
+    coords = _boundaryCoords.get(epoch)
+    if (coords != None):
+        return coords
+
+    if (epoch != None):
+        coords = CoordPrecession.precessCoords(cat.RA,cat.Decl,epoch,ConstBoundaryIndex.BOUNDARY_EPOCH)
+    else:
+        RA = array('d')
+        Decl = array('d')
+        for start, end, partEpoch in partEpochs:
+            partRA, partDecl = CoordPrecession.precessCoords(cat.RA[start:end],cat.Decl[start:end],
+                                                             partEpoch,ConstBoundaryIndex.BOUNDARY_EPOCH)
+            RA.extend(partRA)
+            Decl.extend(partDecl)
+        coords = (RA, Decl)
+
+    # Don't cache the result if a different catalog was loaded in the meantime
+    if (cat is _catalog):
+        _boundaryCoords[key] = coords
+        _boundaryCoords[epoch] = coords
+    return coords
+
+
+
+def findObjConstellations(epoch=None):
+    """
+    Finds the constellation that each object in the currently loaded
+    catalog lies within, according to the object's coordinates rather
+    than the constellation given in the catalog. This can safely be
+    done in a background thread.
+
+    :param float epoch: epoch to take the catalog's coordinates to be in. If None,
+                        each object's coordinates are in its own catalog's epoch.
+    :return: array('h') of constellation indices (-1 if not found)
+    :raises OSError: if the constellation boundaries file could not be read
+    """
+    cat = _catalog
+    if (cat == None):
+        return array('h')
+    consts = _boundaryConsts.get(epoch)
+    if (consts == None):
+        RA, Decl = getBoundaryCoords(epoch)
+        consts = ConstBoundaryIndex.getBoundaryIndex().findConstellations(RA,Decl)
+        if (cat is _catalog):
+            _boundaryConsts[epoch] = consts
+    return consts
+
+
+
+def checkObjConstellations(epoch=None):
+    """
+    Finds the objects in the currently loaded catalog whose constellation
+    does not agree with their coordinates. Objects whose coordinates are
+    not in any constellation are not reported.
+
+    :param float epoch: epoch to take the catalog's coordinates to be in. If None,
+                        each object's coordinates are in its own catalog's epoch.
+    :return: list of (object index, catalog's constellation, constellation
+             from the coordinates) tuples
+    :raises OSError: if the constellation boundaries file could not be read
+    """
+    if (_catalog == None):
+        return []
+    consts = findObjConstellations(epoch)
+    constIdx = _catalog.constIdx
+    return [(i, constIdx[i], consts[i]) for i in range(len(_catalog))
+            if ((consts[i] >= 0) and (consts[i] != constIdx[i]))]
+
+
+
+def retagObjConstellations(epoch=None):
+    """
+    Replaces the constellation of every object in the currently loaded
+    catalog with the constellation its coordinates lie within. Objects
+    whose coordinates are not in any constellation are left alone. The
+    catalog data file is not changed.
+
+    :param float epoch: epoch to take the catalog's coordinates to be in. If None,
+                        each object's coordinates are in its own catalog's epoch.
+    :return: number of objects whose constellation changed
+    :raises OSError: if the constellation boundaries file could not be read
+    """
+    global _activeSortField
+    if (_catalog == None):
+        return 0
+    consts = findObjConstellations(epoch)
+    # The catalog's columns may be read-only views into a compiled file
+    constIdx = array('h', _catalog.constIdx)
+    changed = 0
+    for i in range(len(constIdx)):
+        if ((consts[i] >= 0) and (consts[i] != constIdx[i])):
+            constIdx[i] = consts[i]
+            changed = changed + 1
+    if (changed <= 0):
+        return 0
+
+    _catalog.constIdx = constIdx
+    if (len(_catParts) > 1):
+        # Keep the separate catalogs in step in case more catalogs are added later
+        parts = _getPartEpochs(_catalog,_catParts)
+        for k in range(len(parts)):
+            _catParts[k].constIdx = constIdx[parts[k][0]:parts[k][1]]
+
+    # Everything grouped or sorted by constellation has to be redone
+    sortField = _activeSortField
+    sortOrder = _activeSortOrder
+    _bumpCatalogVersion()
+    _sortPerms.clear()
+    _sortRanks.clear()
+    _sortBuckets.clear()
+    _sortBuckets[None] = _buildConstBuckets(_catalog,None)
+    _activeSortField = None
+    if (sortField != None):
+        installSort(prepareSort(sortField),sortOrder)
+    return changed
+
+
+
+#==================================================
+# Sorting the catalog
+#==================================================
+
+def _stringRanks(table):
+    """
+    Ranks the distinct strings in a string table, ignoring case.
+
+    :return: array giving the rank of each string id
+    """
+    n = table.getNumUnique()
+    ranks = array('i', bytes(4 * n))
+    r = 0
+    for sid in sorted(range(n), key=lambda k: table.getUnique(k).lower()):
+        ranks[sid] = r
+        r = r + 1
+    return ranks
+
+
+
+def _sortKeyColumn(cat,sortField):
+    """
+    Returns a column with the sort key for each object in a catalog.
+
+    :param ColumnarCatalog cat: the catalog, which may no longer be the
+                                current catalog if this is run in the background
+    :param CatalogSortField sortField: which field to sort on
+    """
+    csf = ASTCatalog.CatalogSortField
+
+    if (sortField == csf.RA):
+        return cat.RA
+    elif (sortField == csf.DECL):
+        return cat.Decl
+    elif (sortField == csf.VISUAL_MAGNITUDE):
+        # Objects whose magnitude is unknown go at the end
+        inf = float("inf")
+        return array('d', [inf if math.isnan(mV) else mV for mV in cat.mV])
+    elif (sortField == csf.OBJNAME):
+        ranks = _stringRanks(cat.names)
+        return array('i', [ranks[cat.names.getId(i)] for i in range(len(cat))])
+    elif (sortField == csf.OBJ_ALTNAME):
+        ranks = _stringRanks(cat.altNames)
+        return array('i', [ranks[cat.altNames.getId(i)] for i in range(len(cat))])
+
+    # Rank the constellations by name; unknown constellations go first
+    consts = sorted(set(cat.constIdx))
+    constRank = {}
+    r = 0
+    for idx in sorted(consts, key=lambda c: ASTConstellation.getConstName(c).lower() if (c >= 0) else ""):
+        constRank[idx] = r
+        r = r + 1
+    if (sortField == csf.CONSTELLATION):
+        return array('i', [constRank[idx] for idx in cat.constIdx])
+
+    # Constellation and then object name
+    ranks = _stringRanks(cat.names)
+    numNames = cat.names.getNumUnique()
+    return array('q', [constRank[cat.constIdx[i]] * numNames + ranks[cat.names.getId(i)]
+                       for i in range(len(cat))])
+
+
+
+def prepareSort(sortField):
+    """
+    Computes what is needed to sort the current catalog on a field without
+    changing the current sort order. This can safely be done in a
+    background thread.
+
+    :param CatalogSortField sortField: which field to sort on
+    :return: (catalog, sortField, perm, buckets) to pass to installSort
+    """
+    cat = _catalog
+    perm = _sortPerms.get(sortField)
+    buckets = _sortBuckets.get(sortField)
+    if ((cat != None) and (perm == None)):
+        keys = _sortKeyColumn(cat,sortField)
+        perm = array('i', sorted(range(len(cat)), key=keys.__getitem__))
+        buckets = _buildConstBuckets(cat,perm)
+    return (cat, sortField, perm, buckets)
+
+
+
+def installSort(prepared,sortOrder):
+    """
+    Makes a sort computed by prepareSort the current sort order.
+
+    :param tuple prepared: value returned by prepareSort
+    :param bool sortOrder: ASCENDING_ORDER, DESCENDING_ORDER, or None to
+                           only remember the sort without making it current
+    :return: False if a different catalog was loaded since prepareSort was called
+    """
+    global _activeSortField, _activeSortOrder
+    cat, sortField, perm, buckets = prepared
+    if ((cat == None) or (cat is not _catalog)):
+        return False
+    _sortPerms[sortField] = perm
+    _sortBuckets[sortField] = buckets
+    if (sortOrder != None):
+        _bumpCatalogVersion()
+        _activeSortField = sortField
+        _activeSortOrder = sortOrder
+    return True
+
+
+
+def getActiveOrder():
+    """
+    Gets the indices of all objects in the current sort order.
+
+    :return: sequence of object indices
+    """
+    if (_catalog == None):
+        return range(0)
+    if (_activeSortField == None):
+        return range(len(_catalog))
+    perm = _sortPerms[_activeSortField]
+    return perm if (_activeSortOrder == ASCENDING_ORDER) else perm[::-1]
+
+
+
+def getObjIndexAt(pos):
+    """
+    Gets the index of the object at a position in the current sort order.
+
+    :param int pos: position (0-based)
+    """
+    if (_activeSortField == None):
+        return pos
+    perm = _sortPerms[_activeSortField]
+    return perm[pos] if (_activeSortOrder == ASCENDING_ORDER) else perm[len(perm) - 1 - pos]
+
+
+
+def getObjPosition(idx):
+    """
+    Gets the position of an object in the current sort order.
+
+    :param int idx: index of the object
+    """
+    if (_activeSortField == None):
+        return idx
+    ranks = _sortRanks.get(_activeSortField)
+    if (ranks == None):
+        perm = _sortPerms[_activeSortField]
+        ranks = array('i', bytes(4 * len(perm)))
+        for p in range(len(perm)):
+            ranks[perm[p]] = p
+        _sortRanks[_activeSortField] = ranks
+    return ranks[idx] if (_activeSortOrder == ASCENDING_ORDER) else len(ranks) - 1 - ranks[idx]
+
+
+
+def sortStarCatalog(sortField,sortOrder):
+    """
+    Sorts the currently loaded catalog. The objects are not moved; the
+    sort order is used by everything that lists objects. Once a field has
+    been sorted on, sorting on it again in either order is nearly instant.
+
+    :param CatalogSortField sortField: which field to sort on
+    :param bool sortOrder: ASCENDING_ORDER or DESCENDING_ORDER
+    """
+    if (_catalog == None):
+        return
+    installSort(prepareSort(sortField),sortOrder)
+
+
+
+#==================================================
+# Displaying the catalog
+#==================================================
+
+def _constAbbrev(idx):
+    """Returns a constellation's abbreviated name, or '' if idx is unknown"""
+    return ASTConstellation.getConstAbbrevName(idx) if (idx >= 0) else ""
+
+
+
+def _mVToStr(mV):
+    """Returns a visual magnitude as a string, or '' if it is unknown"""
+    return "" if math.isnan(mV) else ASTStr.strFormat("%5.2f",mV)
+
+
+
+def formatObjHeading():
+    """Returns the heading line for a list of objects"""
+    return ASTStr.strFormat("%-8s %-14s %-14s %-14s %-16s %6s %-5s",
+                            "Obj #","Name","Alt Name","RA","Decl","mV","Const")
+
+
+
+def formatObjRow(idx):
+    """
+    Formats one line of an object list. The object number shown is
+    the object's position in the current sort order.
+
+    :param int idx: index of the object
+    """
+    cat = _catalog
+    return ASTStr.strFormat("%-8d %-14s %-14s %-14s %-16s %6s %-5s", getObjPosition(idx) + 1,
+                            cat.names.get(idx),cat.altNames.get(idx),
+                            ASTTime.timeToStr(cat.RA[idx],HMSFORMAT),
+                            ASTAngle.angleToStr(cat.Decl[idx],DMSFORMAT),
+                            _mVToStr(cat.mV[idx]),_constAbbrev(cat.constIdx[idx]))
+
+
+
+def displayObjRows(prt,indices):
+    """
+    Displays a list of objects, one per line.
+
+    :param ASTPrt prt: where to display the list
+    :param iterable indices: indices of the objects to display
+    """
+    prt.println(formatObjHeading())
+    for i in indices:
+        prt.println(formatObjRow(i))
+
+
+
+def displayCatalogInfo(prt):
+    """
+    Displays information about the currently loaded catalog.
+
+    :param ASTPrt prt: where to display the information
+    """
+    if (_catalog == None):
+        return
+    hdr = _catalog.header
+    counts = getCatConstCounts()
+
+    if (len(_catFilenames) > 1):
+        prt.println("Catalog Files:")
+        for k in range(len(_catFilenames)):
+            part = _catParts[k]
+            prt.println(ASTStr.strFormat("   %s (",os.path.basename(_catFilenames[k])) +
+                        part.header.get(CATTYPE_TAG, "") + ASTStr.strFormat(", %d Objects, ",len(part)) +
+                        ASTStr.strFormat("Epoch %.1f)",part.header.get(CatalogParser.EPOCH_TAG, DEFAULT_EPOCH)))
+    else:
+        prt.println("Catalog File: " + os.path.basename(_catFilenames[0]))
+    prt.println("Catalog Type: " + hdr.get(CATTYPE_TAG, ""))
+    prt.println("Source: " + hdr.get(CATSOURCE_TAG, ""))
+    prt.println("Description: " + hdr.get(CATDESCRIPTION_TAG, ""))
+    prt.println("Epoch: " + ASTStr.strFormat("%.1f",getCatEpoch()))
+    prt.println(ASTStr.strFormat("The catalog contains %d Objects in ",len(_catalog)) +
+                ASTStr.strFormat("%d different Constellations",len(counts)))
+    prt.println()
+    prt.setFixedWidthFont()
+    for idx in sorted(counts, key=ASTConstellation.getConstName):
+        prt.println(ASTStr.strFormat("%-5s %-22s %8d objects",ASTConstellation.getConstAbbrevName(idx),
+                                     ASTConstellation.getConstName(idx),counts[idx]))
+    prt.setProportionalFont()
+
+
+
+def displayAllCatalogObjects(prt):
+    """
+    Displays all of the objects in the currently loaded catalog.
+
+    :param ASTPrt prt: where to display the objects
+    """
+    if (_catalog != None):
+        displayObjRows(prt,getActiveOrder())
+
+
+
+def displayAllObjsByRange(prt,iStart,iEnd):
+    """
+    Displays the objects in a range of positions in the current sort order.
+
+    :param ASTPrt prt: where to display the objects
+    :param int iStart: position of the first object to display (0-based)
+    :param int iEnd: position of the last object to display
+    """
+    if (_catalog == None):
+        return
+    n = len(_catalog)
+    iStart = max(iStart, 0)
+    iEnd = min(iEnd, n - 1)
+    if (iStart > iEnd):
+        prt.println(ASTStr.strFormat("There are no objects in that range. The catalog has %d objects.",n))
+        return
+    displayObjRows(prt,[getObjIndexAt(pos) for pos in range(iStart,iEnd + 1)])
+
+
+
+def displayAllObjsByConstellation(prt,constIdx,sortOrder):
+    """
+    Displays all of the objects in the currently loaded catalog
+    that are in a given constellation.
+
+    :param ASTPrt prt: where to display the objects
+    :param int constIdx: index of the constellation
+    :param bool sortOrder: ASCENDING_ORDER or DESCENDING_ORDER of the field
+                           the catalog is currently sorted on
+    """
+    if (_catalog == None):
+        return
+    members = getConstMembers(constIdx,sortOrder)
+
+    if (len(members) <= 0):
+        prt.println("No objects in the catalog are in the " + ASTConstellation.getConstName(constIdx) +
+                    " constellation")
+        return
+    prt.println(ASTStr.strFormat("%d objects are in the ",len(members)) +
+                ASTConstellation.getConstName(constIdx) + " constellation")
+    prt.println()
+    displayObjRows(prt,members)
+
+
+
+def displayFullObjInfo(prt,idx):
+    """
+    Displays everything known about an object.
+
+    :param ASTPrt prt: where to display the information
+    :param int idx: index of the object
+    """
+    cat = _catalog
+    cIdx = cat.constIdx[idx]
+    prt.println("Name: " + cat.names.get(idx))
+    prt.println("Alt Name: " + cat.altNames.get(idx))
+    prt.println("RA: " + ASTTime.timeToStr(cat.RA[idx],HMSFORMAT))
+    prt.println("Decl: " + ASTAngle.angleToStr(cat.Decl[idx],DMSFORMAT))
+    if math.isnan(cat.mV[idx]):
+        prt.println("mV: unknown")
+    else:
+        prt.println("mV: " + _mVToStr(cat.mV[idx]))
+    if (cIdx >= 0):
+        prt.println("Constellation: " + ASTConstellation.getConstName(cIdx) + " (" + _constAbbrev(cIdx) + ")")
+    else:
+        prt.println("Constellation: unknown")
+    try:
+        prt.println("Comments: " + cat.comments.get(idx))
+    except (OSError, ValueError):
+        # A lazily loaded catalog's data file has been moved or changed
+        prt.println("Comments: (could not be read from the catalog data file)")
+    if (len(_catFilenames) > 1):
+        prt.println("Catalog: " + os.path.basename(getObjSource(idx)))
@@ -0,0 +1,254 @@
+"""
+Runs long catalog operations in the background.
+
+Loading a large catalog or sorting it can take long enough that the
+GUI stops responding if the work is done in a menu handler. Instead,
+the work is given to a CatalogWorker as a job. The job runs in its own
+thread and never touches the GUI. Everything the job wants to tell the
+GUI (progress, its result, or an error) is put on a queue that the GUI
+thread polls with after(), so all GUI updates and all changes to the
+currently loaded catalog happen in the GUI thread.
+
+Only one job runs at a time. While a job is running, other jobs are
+refused, except that a job submitted with preempt=True (e.g., loading
+another catalog) cancels the running job and takes its place. A job
+that has been cancelled or preempted may still be finishing in its
+thread, but whatever it reports is ignored.
+
+A job submitted by a menu handler carries on that handler's MenuStats
+operation, which is finished after the job's onDone or onError has run
+in the GUI thread. A job that is cancelled is not recorded.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+import queue
+import threading
+import tkinter as tk
+import tkinter.ttk as ttk
+
+import Chap1.MenuStats as MenuStats
+
+# How often, in milliseconds, the GUI thread checks for messages from a job
+POLL_INTERVAL = 50
+
+# Kinds of messages a job sends to the GUI thread
+_MSG_PROGRESS = 0
+_MSG_DONE = 1
+_MSG_ERROR = 2
+
+class JobCancelled(Exception):
+    """Raised inside a job when it has been cancelled"""
+    pass
+
+
+
+#==================================================
+# Jobs
+#==================================================
+
+class Job():
+    """
+    One operation being run by a CatalogWorker. The function that does
+    the work is called as func(job) in the job's thread. It should call
+    job.reportProgress() (which also checks for cancellation) every so
+    often, and return its result.
+    """
+
+    def __init__(self,worker,name,func,onDone,onError,onProgress):
+        self.worker = worker
+        self.name = name
+        self.func = func
+        self.onDone = onDone
+        self.onError = onError
+        self.onProgress = onProgress
+        self.cancelled = False
+        self.thread = None
+        self.timer = None
+
+    def cancel(self):
+        """Asks the job to stop as soon as possible"""
+        self.cancelled = True
+
+    def checkCancelled(self):
+        """Raises JobCancelled if the job has been cancelled"""
+        if self.cancelled:
+            raise JobCancelled()
+
+    def reportProgress(self,fraction,text=""):
+        """
+        Tells the GUI thread how far along the job is. This also checks
+        whether the job has been cancelled.
+
+        :param float fraction: fraction (0 - 1) of the job that is done
+        :param str text: description of what is being done
+        """
+        self.checkCancelled()
+        self.worker.queue.put((self, _MSG_PROGRESS, (fraction, text)))
+
+    def _run(self):
+        """Runs the job in its thread"""
+        try:
+            result = self.func(self)
+            self.checkCancelled()
+            self.worker.queue.put((self, _MSG_DONE, result))
+        except JobCancelled:
+            pass
+        except Exception as e:
+            self.worker.queue.put((self, _MSG_ERROR, e))
+
+
+
+#==================================================
+# Worker
+#==================================================
+
+class CatalogWorker():
+    """Runs jobs in the background and passes their results to the GUI thread"""
+
+    def __init__(self,gui,pollInterval=POLL_INTERVAL):
+        """
+        :param tkwidget gui: GUI object whose after() method is used to poll for messages
+        :param int pollInterval: milliseconds between polls
+        """
+        self.gui = gui
+        self.pollInterval = pollInterval
+        self.queue = queue.Queue()
+        self.current = None
+        self.polling = False
+
+    def isBusy(self):
+        """Returns True if a job is running"""
+        return self.current != None
+
+    def getCurrentJob(self):
+        """Returns the job that is running, or None"""
+        return self.current
+
+    def submit(self,name,func,onDone,onError=None,onProgress=None,preempt=False):
+        """
+        Starts a job.
+
+        :param str name: name of the job (used for messages and timing statistics)
+        :param function func: does the work, called as func(job) in the job's thread
+        :param function onDone: called as onDone(result) in the GUI thread when the job finishes
+        :param function onError: called as onError(exception) in the GUI thread if the job fails
+        :param function onProgress: called as onProgress(fraction, text) in the GUI thread
+        :param bool preempt: if True, cancel any running job rather than refusing to start
+        :return: the Job, or None if another job is running and preempt is False
+        """
+        if (self.current != None):
+            if not preempt:
+                return None
+            self.cancel()
+
+        job = Job(self,name,func,onDone,onError,onProgress)
+        # The operation that submitted the job (or the job itself, if it was
+        # not submitted by a timed operation) is finished when the job is
+        job.timer = MenuStats.deferOperation(name)
+        self.current = job
+        job.thread = threading.Thread(target=job._run, name=name, daemon=True)
+        job.thread.start()
+        if not self.polling:
+            self.polling = True
+            self.gui.after(self.pollInterval, self._poll)
+        return job
+
+    def cancel(self):
+        """Cancels the running job, if there is one"""
+        job = self.current
+        self.current = None
+        if (job != None):
+            job.cancel()
+
+    def _poll(self):
+        """Handles the messages from jobs. This runs in the GUI thread."""
+        while True:
+            try:
+                job, kind, value = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if (job is not self.current):
+                continue            # the job was cancelled or preempted
+            if (kind == _MSG_PROGRESS):
+                if (job.onProgress != None):
+                    job.onProgress(value[0], value[1])
+            else:
+                self.current = None
+                MenuStats.resumeOperation(job.timer)
+                try:
+                    if (kind == _MSG_DONE):
+                        job.onDone(value)
+                    elif (job.onError != None):
+                        job.onError(value)
+                finally:
+                    MenuStats.finishOperation(job.timer)
+
+        if (self.current != None):
+            self.gui.after(self.pollInterval, self._poll)
+        else:
+            self.polling = False
+
+
+
+_worker = None
+
+def getCatalogWorker(gui):
+    """
+    Gets the CatalogWorker for the GUI, creating it the first time.
+
+    :param tkwidget gui: GUI object that owns the worker
+    """
+    global _worker
+    if (_worker == None):
+        _worker = CatalogWorker(gui)
+    return _worker
+
+
+
+#==================================================
+# Progress window
+#==================================================
+
+class ProgressWindow():
+    """Small window showing a job's progress with a button to cancel it"""
+
+    def __init__(self,parent,title,onCancel):
+        """
+        :param tkwidget parent: window that the progress window belongs to
+        :param str title: title for the window
+        :param function onCancel: called when the Cancel button is clicked
+        """
+        self.win = tk.Toplevel(parent)
+        self.win.title(title)
+        self.win.resizable(False, False)
+        self.win.protocol("WM_DELETE_WINDOW", onCancel)
+        self.label = tk.Label(self.win, text=title, anchor="w", width=50)
+        self.label.pack(side=tk.TOP, fill=tk.X, padx=10, pady=(10, 5))
+        self.bar = ttk.Progressbar(self.win, orient=tk.HORIZONTAL, length=300, mode="determinate", maximum=1.0)
+        self.bar.pack(side=tk.TOP, fill=tk.X, padx=10, pady=5)
+        tk.Button(self.win, text="Cancel", command=onCancel).pack(side=tk.TOP, pady=(5, 10))
+
+    def update(self,fraction,text=""):
+        """
+        Shows how far along the job is.
+
+        :param float fraction: fraction (0 - 1) of the job that is done
+        :param str text: description of what is being done
+        """
+        self.bar["value"] = min(max(fraction, 0.0), 1.0)
+        if (len(text) > 0):
+            self.label.configure(text=text)
+
+    def close(self):
+        """Removes the window"""
+        self.win.destroy()
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    pass
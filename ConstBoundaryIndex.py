@@ -0,0 +1,268 @@
+"""
+Provides a precomputed index of the constellation boundaries
+so that large numbers of RA/Decl coordinates can be tagged with
+the constellation they lie within.
+
+ASTConstellation.findConstellationFromCoord scans the boundary
+table linearly for every coordinate. That is fine for a single
+coordinate entered through the GUI, but not for tagging millions
+of objects. The index built here splits the sky into declination
+bands, one per distinct lower declination limit in the boundary
+table. Within a band, the constellation depends only upon the RA,
+so each band is stored as a sorted list of RA breakpoints. A lookup
+is then two binary searches instead of a scan of the whole table.
+
+The boundary table is the standard one published by Roman (1987)
+in which each line gives the lower RA limit (hours), upper RA
+limit (hours), lower Decl limit (degrees), and the abbreviated
+constellation name, all for epoch 1875.0. Lines are ordered by
+decreasing lower Decl limit.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+from array import array
+from bisect import bisect_right
+import math
+import os
+import random
+
+import ASTUtils.ASTCatalog as ASTCatalog
+import ASTUtils.ASTConstellation as ASTConstellation
+from ASTUtils.ASTMisc import DEFAULT_EPOCH
+
+import Chap1.CoordPrecession as CoordPrecession
+import Chap1.LazyImport as LazyImport
+
+# ConstTables imports this module, so it is only loaded when it is used
+ConstTables = LazyImport.lazyImport("Chap1.ConstTables")
+
+# Epoch for which the constellation boundaries are defined
+BOUNDARY_EPOCH = 1875.0
+
+# Name of the file containing the constellation boundaries
+BOUNDARY_DATA_FILE = "ConstellationBoundaries.dat"
+
+# The index is built only once and then reused
+_boundaryIndex = None
+
+#==================================================
+# Boundary table
+#==================================================
+
+def getDefaultBoundaryFile():
+    """Returns the full pathname of the default constellation boundaries file"""
+    return os.path.join(ASTCatalog.ASTCatalog.getCatDataDir(),BOUNDARY_DATA_FILE)
+
+
+
+def loadBoundaryTable(filename):
+    """
+    Reads the constellation boundaries file.
+
+    :param str filename: full pathname of the boundaries file
+    :return: list of (raLow, raHigh, declLow, constIdx) tuples in
+             the order they appear in the file
+    """
+    rows = []
+    constIdx = {}
+
+    with open(filename, "r") as f:
+        for line in f:
+            fields = line.split()
+            if ((len(fields) < 4) or fields[0].startswith("#")):
+                continue
+            abbrev = fields[3]
+            if not (abbrev in constIdx):
+                constIdx[abbrev] = ASTConstellation.findConstellationByAbbrvName(abbrev)
+            rows.append((float(fields[0]), float(fields[1]), float(fields[2]), constIdx[abbrev]))
+
+    return rows
+
+
+
+#==================================================
+# Declination-banded interval table
+#==================================================
+
+class ConstBoundaryIndex():
+    """
+    Declination-banded interval table built from the constellation
+    boundary table. All coordinates given to the search methods
+    of this class must be for the boundary epoch (1875.0).
+    """
+
+    def __init__(self,rows):
+        """
+        Build the index from the boundary table.
+
+        :param list rows: (raLow, raHigh, declLow, constIdx) tuples in the same
+                          order as the boundaries file
+        """
+        # Band i covers declinations from bandDecl[i] up to, but not including, bandDecl[i+1]
+        self.bandDecl = array('d', sorted(set(row[2] for row in rows)))
+        self.bandRA = []
+        self.bandConst = []
+
+        # Split 0h - 24h into the elementary intervals formed by every RA limit in the table
+        edges = sorted(set([0.0, 24.0] + [row[0] for row in rows] + [row[1] for row in rows]))
+        owner = [-1] * (len(edges) - 1)
+        edgeIdx = {}
+        for k in range(len(edges)):
+            edgeIdx[edges[k]] = k
+
+        # The per-point search takes the first line in the file that covers a coordinate.
+        # Since the file is ordered by decreasing lower Decl limit, the lines that become
+        # eligible as we move up to the next band take priority over all of the lines
+        # already painted in, so each band is the previous band with the new lines painted
+        # on top. Lines with the same Decl limit are painted in reverse so the first wins.
+        for dLow in self.bandDecl:
+            newRows = [row for row in rows if row[2] == dLow]
+            for row in reversed(newRows):
+                for k in range(edgeIdx[row[0]], edgeIdx[row[1]]):
+                    owner[k] = row[3]
+
+            breaks = array('d')
+            consts = array('h')
+            for k in range(len(owner)):
+                # Merge adjacent intervals that are in the same constellation
+                if ((len(consts) > 0) and (consts[-1] == owner[k])):
+                    continue
+                breaks.append(edges[k])
+                consts.append(owner[k])
+            self.bandRA.append(breaks)
+            self.bandConst.append(consts)
+
+    def findConstellation(self,RA,Decl):
+        """
+        Find the constellation a coordinate lies within.
+
+        :param float RA: right ascension in hours for the boundary epoch
+        :param float Decl: declination in degrees for the boundary epoch
+        :return: index into the constellations table, or -1 if not found
+        """
+        band = bisect_right(self.bandDecl, Decl) - 1
+        if (band < 0):
+            return -1
+        k = bisect_right(self.bandRA[band], RA) - 1
+        if (k < 0):
+            return -1
+        return self.bandConst[band][k]
+
+    def findConstellations(self,raValues,declValues):
+        """
+        Find the constellations for arrays of coordinates.
+
+        :param sequence raValues: RA values in hours for the boundary epoch
+        :param sequence declValues: Decl values in degrees for the boundary epoch
+        :return: array('h') of constellation indices (-1 if not found)
+        """
+        n = len(raValues)
+        result = array('h', bytes(2 * n))
+        bandDecl = self.bandDecl
+        bandRA = self.bandRA
+        bandConst = self.bandConst
+        for i in range(n):
+            band = bisect_right(bandDecl, declValues[i]) - 1
+            if (band < 0):
+                result[i] = -1
+                continue
+            k = bisect_right(bandRA[band], raValues[i]) - 1
+            result[i] = bandConst[band][k] if (k >= 0) else -1
+        return result
+
+
+
+def boundaryIndexFromArrays(bandDecl,bandRA,bandConst):
+    """
+    Creates a constellation boundary index from the tables of an index
+    that was built earlier (e.g., one saved in a snapshot).
+
+    :param array bandDecl: lower Decl limit of each band
+    :param list bandRA: array of RA breakpoints for each band
+    :param list bandConst: array of constellation indices for each band
+    :return: a ConstBoundaryIndex object
+    """
+    index = ConstBoundaryIndex([])
+    index.bandDecl = bandDecl
+    index.bandRA = bandRA
+    index.bandConst = bandConst
+    return index
+
+
+
+def getBoundaryIndex(filename=None):
+    """
+    Gets the constellation boundary index. The default index comes from
+    the constellation tables snapshot the first time it is needed.
+
+    :param str filename: boundaries file to use instead of the default
+    :return: the ConstBoundaryIndex object
+    """
+    global _boundaryIndex
+
+    if (filename != None):
+        return ConstBoundaryIndex(loadBoundaryTable(filename))
+    if (_boundaryIndex == None):
+        _boundaryIndex = ConstTables.getConstTables().boundaryIndex
+        if (_boundaryIndex == None):
+            # There is no boundaries file, so this reports why it could not be read
+            _boundaryIndex = ConstBoundaryIndex(loadBoundaryTable(getDefaultBoundaryFile()))
+    return _boundaryIndex
+
+
+
+#==================================================
+# Batch entry points
+#==================================================
+
+def findConstellationsForCoords(raValues,declValues,epoch=DEFAULT_EPOCH):
+    """
+    Find the constellation for each of a batch of coordinates.
+    This is the batch equivalent of ASTConstellation.findConstellationFromCoord.
+
+    :param sequence raValues: RA values in hours (list, array, NumPy array, etc.)
+    :param sequence declValues: Decl values in degrees
+    :param float epoch: epoch the coordinates are in
+    :return: array('h') of constellation indices (-1 if not found)
+    """
+    ra, decl = CoordPrecession.precessCoords(raValues,declValues,epoch,BOUNDARY_EPOCH)
+    return getBoundaryIndex().findConstellations(ra,decl)
+
+
+
+def verifyAgainstPerPoint(numPoints=10000,epoch=DEFAULT_EPOCH,seed=1):
+    """
+    Compare the batch lookup against ASTConstellation.findConstellationFromCoord
+    for a randomized set of coordinates spread uniformly over the sky.
+
+    Points that lie within a hair of a boundary line may legitimately
+    disagree because of rounding in the precession, so mismatches are
+    returned for inspection rather than treated as an error.
+
+    :param int numPoints: number of random coordinates to check
+    :param float epoch: epoch to use for the coordinates
+    :param int seed: seed for the random number generator
+    :return: list of (RA, Decl, batchIdx, perPointIdx) tuples that differ
+    """
+    rnd = random.Random(seed)
+    raValues = array('d', [rnd.uniform(0.0, 24.0) for i in range(numPoints)])
+    declValues = array('d', [_randomDecl(rnd) for i in range(numPoints)])
+
+    batch = findConstellationsForCoords(raValues,declValues,epoch)
+
+    mismatches = []
+    for i in range(numPoints):
+        idx = ASTConstellation.findConstellationFromCoord(raValues[i],declValues[i],epoch)
+        if (idx != batch[i]):
+            mismatches.append((raValues[i], declValues[i], batch[i], idx))
+    return mismatches
+
+
+
+def _randomDecl(rnd):
+    """Returns a random declination (degrees) such that points are uniform over the sphere"""
+    return math.degrees(math.asin(2.0 * rnd.random() - 1.0))
@@ -0,0 +1,97 @@
+"""
+Provides indexed searches of the constellations table.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+import Chap1.CatalogStore as CatalogStore
+import Chap1.ConstTables as ConstTables
+import Chap1.TextIndex as TextIndex
+
+# The constellation meanings index is only built once
+_meaningIndex = None
+
+# Indexes of the constellation names and abbreviated names, built the first time they are used
+_nameIndexes = {}
+
+#==================================================
+# Constellation meanings
+#==================================================
+
+def getMeaningIndex():
+    """Gets the index of the constellation meanings, building it the first time it is needed"""
+    global _meaningIndex
+    if (_meaningIndex == None):
+        _meaningIndex = TextIndex.TrigramIndex(ConstTables.getConstTables().meanings,CatalogStore.normalizeName)
+    return _meaningIndex
+
+
+
+def findConstellationsByMeaning(target):
+    """
+    Find the constellations whose 'meaning' field contains a substring.
+    Case and spaces are ignored.
+
+    :param str target: substring to search for
+    :return: list of indices of the constellations that were found
+    """
+    return CatalogStore.cachedQuery("findConstellationsByMeaning",(CatalogStore.normalizeName(target),),
+                                    lambda: getMeaningIndex().search(target))
+
+
+
+#==================================================
+# Constellation names
+#==================================================
+
+def getNameIndex(byAbbrev=False):
+    """
+    Gets the prefix index of the constellation names or abbreviated names.
+
+    :param bool byAbbrev: if True, get the index of the abbreviated names
+    """
+    index = _nameIndexes.get(byAbbrev)
+    if (index == None):
+        tables = ConstTables.getConstTables()
+        index = TextIndex.PrefixIndex(tables.abbrevs if byAbbrev else tables.names,CatalogStore.normalizeName)
+        _nameIndexes[byAbbrev] = index
+    return index
+
+
+
+def completeConstNames(prefix,limit=TextIndex.DEFAULT_COMPLETIONS,byAbbrev=False):
+    """
+    Finds the constellations whose names start with a prefix. Case and
+    spaces are ignored.
+
+    :param str prefix: what has been typed so far
+    :param int limit: most constellations to return
+    :param bool byAbbrev: if True, complete abbreviated names instead of names
+    :return: list of indices of the constellations, in sorted order of their names
+    :raises ValueError: if limit is less than 1
+    """
+    return list(getNameIndex(byAbbrev).complete(prefix,limit))
+
+
+
+def suggestConstNames(name,limit=TextIndex.DEFAULT_SUGGESTIONS,byAbbrev=False):
+    """
+    Suggests the constellations that were most likely meant when a name
+    is not found. Constellations whose names start with the name given
+    come first, followed by those whose names are most similar to it.
+
+    :param str name: the name that was not found
+    :param int limit: most constellations to return
+    :param bool byAbbrev: if True, suggest from the abbreviated names instead of the names
+    :return: list of indices of the constellations
+    :raises ValueError: if limit is less than 1
+    """
+    index = getNameIndex(byAbbrev)
+    result = []
+    for idx in list(index.complete(name,limit)) + list(index.suggest(name,limit)):
+        if not (idx in result):
+            result.append(idx)
+    return result[:limit]
@@ -0,0 +1,271 @@
+"""
+Provides the constellation tables (names, abbreviated names, meanings,
+and the constellation boundary index) from a prebuilt snapshot.
+
+Building these tables means going through every constellation in
+ASTConstellation and reading and indexing the constellation boundaries
+file, which is a noticeable part of the time it takes to start the
+program or a short batch run. The first time the tables are built they
+are saved in a snapshot file in the catalog data directory, and after
+that they are simply read back from the snapshot, which takes only a
+few milliseconds. The snapshot remembers the size and modification time
+of the files it was built from and is rebuilt if any of them change.
+Like a compiled catalog, the snapshot is a JSON description followed by
+the raw bytes of the boundary index's arrays, so reading it never runs
+any code from the file.
+
+The snapshot can be rebuilt ahead of time with
+
+    python -m Chap1.ConstTables [--force]
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+from array import array
+import importlib.util
+import json
+import os
+import struct
+import sys
+
+import Chap1.LazyImport as LazyImport
+
+# These are only needed when the tables have to be built rather than read
+ASTCatalog = LazyImport.lazyImport("ASTUtils.ASTCatalog")
+ASTConstellation = LazyImport.lazyImport("ASTUtils.ASTConstellation")
+ConstBoundaryIndex = LazyImport.lazyImport("Chap1.ConstBoundaryIndex")
+
+# Name of the snapshot file in the catalog data directory
+SNAPSHOT_FILE = "ConstellationTables.snapshot"
+
+# Identifies a snapshot file and its layout version
+_MAGIC = b"ASTCTB02"
+
+# Magic, followed by the length of the JSON description that comes before the arrays
+_PREFIX = struct.Struct("<8sQ")
+
+# The tables are only loaded once
+_constTables = None
+
+#==================================================
+# Constellation tables
+#==================================================
+
+class ConstTables():
+    """The constellation tables, indexed by constellation index"""
+
+    def __init__(self,names,abbrevs,meanings,boundaryIndex):
+        """
+        :param list names: name of each constellation
+        :param list abbrevs: abbreviated name of each constellation
+        :param list meanings: meaning of each constellation's name
+        :param ConstBoundaryIndex boundaryIndex: index of the constellation
+                        boundaries, or None if the boundaries file is missing
+        """
+        self.names = names
+        self.abbrevs = abbrevs
+        self.meanings = meanings
+        self.boundaryIndex = boundaryIndex
+
+    def __len__(self):
+        return len(self.names)
+
+    def getConstName(self,idx):
+        """Returns the name of a constellation"""
+        return self.names[idx]
+
+    def getConstAbbrevName(self,idx):
+        """Returns the abbreviated name of a constellation"""
+        return self.abbrevs[idx]
+
+    def getConstMeaning(self,idx):
+        """Returns the meaning of a constellation's name"""
+        return self.meanings[idx]
+
+
+
+def buildConstTables(boundaryFile=None):
+    """
+    Builds the constellation tables from ASTConstellation and the
+    constellation boundaries file.
+
+    :param str boundaryFile: boundaries file to use instead of the default
+    :return: a ConstTables object
+    """
+    n = ASTConstellation.getNumConstellations()
+    names = [ASTConstellation.getConstName(i) for i in range(n)]
+    abbrevs = [ASTConstellation.getConstAbbrevName(i) for i in range(n)]
+    meanings = [ASTConstellation.getConstMeaning(i) for i in range(n)]
+    if (boundaryFile == None):
+        boundaryFile = ConstBoundaryIndex.getDefaultBoundaryFile()
+    try:
+        boundaryIndex = ConstBoundaryIndex.ConstBoundaryIndex(ConstBoundaryIndex.loadBoundaryTable(boundaryFile))
+    except OSError:
+        boundaryIndex = None
+    return ConstTables(names,abbrevs,meanings,boundaryIndex)
+
+
+
+#==================================================
+# Snapshots
+#==================================================
+
+def getSnapshotFilename():
+    """Returns the full pathname of the snapshot file"""
+    return os.path.join(ASTCatalog.ASTCatalog.getCatDataDir(),SNAPSHOT_FILE)
+
+
+
+def _fileKey(filename):
+    """Returns the size and modification time of a file, or None if it does not exist"""
+    try:
+        st = os.stat(filename)
+    except (OSError, TypeError):
+        return None
+    return [os.path.abspath(filename), st.st_size, st.st_mtime_ns]
+
+
+
+def _sourceKeys(boundaryFile):
+    """Identifies the versions of the files that the tables are built from"""
+    spec = importlib.util.find_spec("ASTUtils.ASTConstellation")
+    return [_fileKey(None if (spec == None) else spec.origin), _fileKey(boundaryFile)]
+
+
+
+def writeSnapshot(tables,filename,boundaryFile):
+    """
+    Saves the constellation tables in a snapshot file. The snapshot is
+    written to a temporary file first so that a reader never sees a
+    partially written snapshot.
+
+    :param ConstTables tables: the tables to save
+    :param str filename: full pathname of the snapshot file
+    :param str boundaryFile: boundaries file the tables were built from
+    """
+    parts = []
+    pos = 0
+
+    def addArray(a):
+        nonlocal pos
+        data = a.tobytes()
+        parts.append(data)
+        pos = pos + len(data)
+        return [pos - len(data), len(data)]
+
+    bIdx = tables.boundaryIndex
+    boundary = None
+    if (bIdx != None):
+        boundary = {"bandDecl": addArray(bIdx.bandDecl), "bandRA": [addArray(a) for a in bIdx.bandRA],
+                    "bandConst": [addArray(a) for a in bIdx.bandConst]}
+    desc = {"sources": _sourceKeys(boundaryFile), "names": tables.names, "abbrevs": tables.abbrevs,
+            "meanings": tables.meanings, "boundary": boundary}
+    descBytes = json.dumps(desc).encode("utf-8")
+    tmpFile = filename + ".tmp" + str(os.getpid())
+    try:
+        with open(tmpFile, "wb") as f:
+            f.write(_PREFIX.pack(_MAGIC, len(descBytes)))
+            f.write(descBytes)
+            f.writelines(parts)
+        os.replace(tmpFile, filename)
+    except OSError:
+        if os.path.exists(tmpFile):
+            os.remove(tmpFile)
+        raise
+
+
+
+def readSnapshot(filename,boundaryFile):
+    """
+    Reads the constellation tables from a snapshot file.
+
+    :param str filename: full pathname of the snapshot file
+    :param str boundaryFile: boundaries file the tables should have been built from
+    :return: a ConstTables object, or None if the snapshot is missing,
+             unreadable, or out of date
+    """
+    try:
+        with open(filename, "rb") as f:
+            data = f.read()
+        magic, descLen = _PREFIX.unpack_from(data, 0)
+        if (magic != _MAGIC):
+            return None
+        base = _PREFIX.size + descLen
+        desc = json.loads(data[_PREFIX.size:base].decode("utf-8"))
+        if (desc["sources"] != _sourceKeys(boundaryFile)):
+            return None
+
+        def getArray(typecode,where):
+            offset, length = where
+            if ((offset < 0) or (base + offset + length > len(data))):
+                raise ValueError("array outside of the snapshot")
+            return array(typecode, data[base + offset:base + offset + length])
+
+        boundaryIndex = None
+        if (desc["boundary"] != None):
+            boundary = desc["boundary"]
+            bandDecl = getArray('d', boundary["bandDecl"])
+            bandRA = [getArray('d', w) for w in boundary["bandRA"]]
+            bandConst = [getArray('h', w) for w in boundary["bandConst"]]
+            boundaryIndex = ConstBoundaryIndex.boundaryIndexFromArrays(bandDecl,bandRA,bandConst)
+        return ConstTables(list(desc["names"]),list(desc["abbrevs"]),list(desc["meanings"]),boundaryIndex)
+    except (OSError, ValueError, KeyError, TypeError, struct.error):
+        return None
+
+
+
+def getConstTables():
+    """
+    Gets the constellation tables, reading them from the snapshot if it
+    is current and otherwise building them and saving a new snapshot.
+
+    :return: a ConstTables object
+    """
+    global _constTables
+    if (_constTables == None):
+        _constTables = loadConstTables()
+    return _constTables
+
+
+
+def loadConstTables(force=False):
+    """
+    Reads the constellation tables from the snapshot, or builds them and
+    saves a new snapshot if the snapshot is missing or out of date. If the
+    snapshot cannot be written (e.g., the data directory is read-only),
+    the tables are still returned.
+
+    :param bool force: if True, always build the tables and save a new snapshot
+    :return: a ConstTables object
+    """
+    boundaryFile = ConstBoundaryIndex.getDefaultBoundaryFile()
+    snapshotFile = getSnapshotFilename()
+    tables = None if force else readSnapshot(snapshotFile,boundaryFile)
+    if (tables == None):
+        tables = buildConstTables(boundaryFile)
+        try:
+            writeSnapshot(tables,snapshotFile,boundaryFile)
+        except OSError:
+            pass
+    return tables
+
+
+
+def main(argv=None):
+    """Command line entry point for building the snapshot"""
+    argv = sys.argv[1:] if (argv == None) else argv
+    force = ("--force" in argv)
+    tables = loadConstTables(force)
+    sys.stdout.write("%d constellations, boundaries %s, snapshot %s\n" %
+                     (len(tables), "indexed" if (tables.boundaryIndex != None) else "not found",
+                      getSnapshotFilename()))
+    return 0
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    sys.exit(main())
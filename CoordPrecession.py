@@ -0,0 +1,133 @@
+"""
+Provides bulk precession of equatorial coordinates.
+
+The routines in this module precess whole arrays of RA/Decl
+values from one epoch to another. The precession matrix is
+computed only once for a given pair of epochs and is then
+applied to every coordinate in a single tight loop, which is
+much faster than precessing objects one at a time.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+from array import array
+import math
+
+# Number of arc seconds in a radian
+_ARCSEC_PER_RADIAN = 206264.80624709636
+
+#==================================================
+# Precession matrix
+#==================================================
+
+def precessionMatrix(fromEpoch,toEpoch):
+    """
+    Compute the rotation matrix that precesses equatorial
+    coordinates from one epoch to another. The IAU 1976
+    precession angles (zeta, z, theta) are used.
+
+    :param float fromEpoch: epoch (e.g., 2000.0) the coordinates are in
+    :param float toEpoch: epoch (e.g., 1875.0) to precess the coordinates to
+    :return: 3x3 matrix as a tuple of 3 row tuples
+    """
+    T = (fromEpoch - 2000.0) / 100.0
+    t = (toEpoch - fromEpoch) / 100.0
+
+    c1 = 2306.2181 + 1.39656 * T - 0.000139 * T * T
+    zeta = c1 * t + (0.30188 - 0.000344 * T) * t * t + 0.017998 * t * t * t
+    z = c1 * t + (1.09468 + 0.000066 * T) * t * t + 0.018203 * t * t * t
+    theta = (2004.3109 - 0.85330 * T - 0.000217 * T * T) * t -\
+            (0.42665 + 0.000217 * T) * t * t - 0.041833 * t * t * t
+
+    zeta = zeta / _ARCSEC_PER_RADIAN
+    z = z / _ARCSEC_PER_RADIAN
+    theta = theta / _ARCSEC_PER_RADIAN
+
+    cZeta = math.cos(zeta)
+    sZeta = math.sin(zeta)
+    cz = math.cos(z)
+    sz = math.sin(z)
+    cTheta = math.cos(theta)
+    sTheta = math.sin(theta)
+
+    return ((cZeta * cTheta * cz - sZeta * sz, -sZeta * cTheta * cz - cZeta * sz, -sTheta * cz),
+            (cZeta * cTheta * sz + sZeta * cz, -sZeta * cTheta * sz + cZeta * cz, -sTheta * sz),
+            (cZeta * sTheta, -sZeta * sTheta, cTheta))
+
+
+
+#==================================================
+# Bulk precession
+#==================================================
+
+def precessCoords(raValues,declValues,fromEpoch,toEpoch):
+    """
+    Precess arrays of RA/Decl values from one epoch to another.
+
+    Any sequence or buffer that can be indexed (lists, array.array,
+    memoryview, NumPy arrays, etc.) may be passed in.
+
+    :param sequence raValues: RA values in hours
+    :param sequence declValues: Decl values in degrees
+    :param float fromEpoch: epoch the coordinates are in
+    :param float toEpoch: epoch to precess the coordinates to
+    :return: tuple (RA, Decl) of array('d') with the precessed
+             RA in hours and Decl in degrees
+    """
+    n = len(raValues)
+    if (len(declValues) != n):
+        raise ValueError("RA and Decl arrays must be the same length")
+
+    raOut = array('d', bytes(8 * n))
+    declOut = array('d', bytes(8 * n))
+
+    if (fromEpoch == toEpoch):
+        for i in range(n):
+            raOut[i] = raValues[i]
+            declOut[i] = declValues[i]
+        return raOut, declOut
+
+    ((p11, p12, p13), (p21, p22, p23), (p31, p32, p33)) = precessionMatrix(fromEpoch,toEpoch)
+
+    # Bind the math functions locally since they are used on every iteration
+    sin = math.sin
+    cos = math.cos
+    asin = math.asin
+    atan2 = math.atan2
+    hrToRad = math.pi / 12.0
+    degToRad = math.pi / 180.0
+    radToHr = 12.0 / math.pi
+    radToDeg = 180.0 / math.pi
+
+    for i in range(n):
+        a = raValues[i] * hrToRad
+        d = declValues[i] * degToRad
+        cd = cos(d)
+        x = cd * cos(a)
+        y = cd * sin(a)
+        zz = sin(d)
+        x1 = p11 * x + p12 * y + p13 * zz
+        y1 = p21 * x + p22 * y + p23 * zz
+        z1 = p31 * x + p32 * y + p33 * zz
+        if (z1 > 1.0):
+            z1 = 1.0
+        elif (z1 < -1.0):
+            z1 = -1.0
+        a = atan2(y1, x1) * radToHr
+        if (a < 0.0):
+            a = a + 24.0
+        elif (a >= 24.0):
+            a = a - 24.0
+        raOut[i] = a
+        declOut[i] = asin(z1) * radToDeg
+
+    return raOut, declOut
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,256 @@
+"""
+Reads the heavy fields of catalog objects from the catalog data file
+only when they are needed.
+
+The comments in a catalog are often much larger than everything else
+in it put together, yet they are only looked at when an object's full
+details are displayed or when the comments are searched. When a catalog
+is loaded lazily, its comments are not kept in memory. Instead, the
+offset of each object in the catalog data file is recorded, and an
+object's comments are read by parsing just that object from a memory
+map of the data file. The objects read most recently are kept in a
+small LRU cache since the same few objects tend to be looked at again.
+
+A LazyStringColumn stands in for the StringTable that would otherwise
+hold a catalog's comments. It can also hold the columns of several
+merged catalogs, some of which may not have been loaded lazily.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+from bisect import bisect_right
+from collections import OrderedDict
+import mmap
+import os
+import re
+import threading
+
+import Chap1.CatalogParser as CatalogParser
+
+# Number of parsed objects that each data file keeps in its LRU cache
+DEFAULT_CACHE_SIZE = 256
+
+#==================================================
+# Reading objects from the catalog data file
+#==================================================
+
+class SourceFieldReader():
+    """
+    Reads one field of the objects in a catalog data file, given where
+    each object is in the file. The file is only mapped into memory the
+    first time a field is read.
+    """
+
+    def __init__(self,filename,offsets,field,tag,fileKey=None,cacheSize=DEFAULT_CACHE_SIZE):
+        """
+        :param str filename: full pathname of the catalog data file
+        :param sequence offsets: offset in the file of each object's <Object>
+                                 tag, in ascending order
+        :param str field: name of the CatalogObject field to read (e.g., 'comment')
+        :param str tag: tag that holds the field in the file (e.g., 'Comment')
+        :param tuple fileKey: size and modification time (in ns) that the file had
+                              when the offsets were found, used to tell whether
+                              the file has changed since then
+        :param int cacheSize: number of parsed objects to keep
+        """
+        self.filename = filename
+        self.offsets = offsets
+        self.field = field
+        self.fieldPattern = re.compile(b"<" + tag.encode("ascii") + b">([^<]*)</" + tag.encode("ascii") + b">")
+        self.fileKey = None if (fileKey == None) else tuple(fileKey)
+        self.cacheSize = cacheSize
+        self.cache = OrderedDict()
+        self.constCache = {}
+        self.mm = None
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def _getMap(self):
+        """Maps the catalog data file into memory the first time it is needed"""
+        if (self.mm == None):
+            with open(self.filename, "rb") as f:
+                st = os.fstat(f.fileno())
+                if ((self.fileKey != None) and ((st.st_size, st.st_mtime_ns) != self.fileKey)):
+                    raise ValueError(self.filename + " has changed since the catalog was loaded")
+                self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.mm
+
+    def getObject(self,idx):
+        """
+        Reads an object from the catalog data file.
+
+        :param int idx: index of the object
+        :return: a CatalogObject
+        :raises OSError, ValueError: if the catalog data file cannot be read
+                                     or has changed
+        """
+        with self.lock:
+            obj = self.cache.get(idx)
+            if (obj != None):
+                self.cache.move_to_end(idx)
+                return obj
+            obj = CatalogParser.parseObjectAt(self._getMap(),self.offsets[idx],self.constCache)
+            self.cache[idx] = obj
+            if (len(self.cache) > self.cacheSize):
+                self.cache.popitem(last=False)
+            return obj
+
+    def get(self,idx):
+        """
+        Reads the field for an object.
+
+        :param int idx: index of the object
+        """
+        return getattr(self.getObject(idx), self.field)
+
+    def search(self,target,normalize):
+        """
+        Finds the objects whose field contains a substring by scanning the
+        catalog data file once.
+
+        :param str target: substring to search for, already normalized
+        :param function normalize: applied to each field before it is checked
+        :return: ascending list of the indices of the objects that were found
+        """
+        with self.lock:
+            mm = self._getMap()
+        offsets = self.offsets
+        result = []
+        last = -1
+        for m in self.fieldPattern.finditer(mm, offsets[0] if (len(offsets) > 0) else len(mm)):
+            idx = bisect_right(offsets, m.start()) - 1
+            if ((idx > last) and (target in normalize(CatalogParser._decode(m.group(1))))):
+                result.append(idx)
+                last = idx
+        return result
+
+    def close(self):
+        """Releases the memory map and the cached objects"""
+        with self.lock:
+            self.cache.clear()
+            if (self.mm != None):
+                self.mm.close()
+                self.mm = None
+
+
+
+class _TableSource():
+    """Gives a StringTable the same search method that a SourceFieldReader has"""
+
+    def __init__(self,table):
+        self.table = table
+
+    def __len__(self):
+        return len(self.table)
+
+    def get(self,idx):
+        return self.table.get(idx)
+
+    def search(self,target,normalize):
+        table = self.table
+        matchIds = set(sid for sid in range(table.getNumUnique()) if (target in normalize(table.getUnique(sid))))
+        return [i for i in range(len(table)) if (table.getId(i) in matchIds)]
+
+    def close(self):
+        pass
+
+
+
+#==================================================
+# Lazily read columns
+#==================================================
+
+class LazyStringColumn():
+    """
+    Stands in for a catalog's StringTable for a field that is read from
+    the catalog data file when it is needed. The column is made of one
+    or more sources, one for each catalog that was merged together.
+    """
+
+    def __init__(self,source=None):
+        """
+        :param SourceFieldReader source: where the column's values are read from
+        """
+        self.sources = []
+        self.starts = [0]
+        if (source != None):
+            self._addSource(source)
+
+    def __len__(self):
+        return self.starts[-1]
+
+    def _addSource(self,source):
+        self.sources.append(source)
+        self.starts.append(self.starts[-1] + len(source))
+
+    def extend(self,column):
+        """
+        Adds the values of all of the objects in another column.
+
+        :param object column: a LazyStringColumn or a StringTable
+        """
+        if isinstance(column, LazyStringColumn):
+            for source in column.sources:
+                self._addSource(source)
+        else:
+            self._addSource(_TableSource(column))
+
+    def freeze(self):
+        """Called when all objects have been added"""
+        pass
+
+    def get(self,idx):
+        """
+        Gets an object's value.
+
+        :param int idx: index of the object
+        :raises OSError, ValueError: if a catalog data file cannot be read
+        """
+        k = bisect_right(self.starts, idx) - 1
+        return self.sources[k].get(idx - self.starts[k])
+
+    def search(self,target,normalize):
+        """
+        Finds the objects whose value contains a substring.
+
+        :param str target: substring to search for, already normalized
+        :param function normalize: applied to each value before it is checked
+        :return: ascending list of the indices of the objects that were found
+        """
+        result = []
+        for k in range(len(self.sources)):
+            start = self.starts[k]
+            result.extend([start + i for i in self.sources[k].search(target,normalize)])
+        return result
+
+    def close(self):
+        """Releases the memory maps of the catalog data files"""
+        for source in self.sources:
+            source.close()
+
+
+
+def lazyCommentsColumn(filename,offsets,fileKey=None,cacheSize=DEFAULT_CACHE_SIZE):
+    """
+    Creates the column for the comments of a lazily loaded catalog.
+
+    :param str filename: full pathname of the catalog data file
+    :param sequence offsets: offset in the file of each object's <Object> tag
+    :param tuple fileKey: size and modification time (in ns) that the file had
+                          when the offsets were found
+    :param int cacheSize: number of parsed objects to keep
+    :return: a LazyStringColumn
+    """
+    return LazyStringColumn(SourceFieldReader(filename,offsets,"comment",CatalogParser.OBJ_COMMENT_TAG,
+                                              fileKey,cacheSize))
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    pass
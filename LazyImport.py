@@ -0,0 +1,74 @@
+"""
+Imports modules only when they are first used.
+
+Many modules are only needed by a few of the menu handlers or command
+line operations, yet importing them all up front makes every start of
+the program pay for them, which adds up for short batch runs. A module
+imported with lazyImport() is found right away, so a misspelled name
+still fails immediately, but the module's code does not run until one
+of its attributes is used.
+
+Only attribute access on the returned module is deferred, so use
+
+    ASTQuery = LazyImport.lazyImport("ASTUtils.ASTQuery")
+    ASTQuery.showQueryForm(...)
+
+rather than 'from ... import ...', which would load the module at once.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+import importlib.util
+import sys
+
+#==================================================
+# Lazy imports
+#==================================================
+
+def lazyImport(name):
+    """
+    Imports a module, deferring the work of loading it until one of its
+    attributes is first used. If the module has already been imported,
+    it is simply returned.
+
+    :param str name: full name of the module (e.g., 'ASTUtils.ASTQuery')
+    :return: the module
+    :raises ImportError: if the module cannot be found
+    """
+    module = sys.modules.get(name)
+    if (module != None):
+        return module
+    spec = importlib.util.find_spec(name)
+    if (spec == None):
+        raise ImportError("No module named '" + name + "'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+
+def isLoaded(name):
+    """
+    Determines whether a module's code has actually been run, which
+    is not the case for a lazily imported module that was never used.
+
+    :param str name: full name of the module
+    """
+    module = sys.modules.get(name)
+    if (module == None):
+        return False
+    # Until it is loaded, a lazy module has the LazyLoader's own module class.
+    # Using type() avoids touching an attribute, which would load the module.
+    return type(module).__name__ != "_LazyModule"
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,267 @@
+"""
+Collects timing statistics for the menu operations.
+
+Every operation dispatched by the menu listener is timed. An operation's
+time is broken down into phases: the time spent getting input from the
+user (query), the time spent doing the work (compute), and the time spent
+displaying the results (render). The menu handlers call markPhase() when
+they move from one phase to the next.
+
+An operation that hands its work to a background job is not finished
+when its menu handler returns. The job defers the operation, and it is
+resumed and finished in the GUI thread once the job is done, so the
+job's time and the time taken to show its results are recorded too.
+
+The statistics kept for each operation are a count, the total time in
+each phase, and a histogram of the total times. Listeners can also be
+added to be told about every operation as soon as it finishes.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+from bisect import bisect_left
+import sys
+import threading
+import time
+
+# Phases of an operation
+PHASE_QUERY = "query"
+PHASE_COMPUTE = "compute"
+PHASE_RENDER = "render"
+PHASES = (PHASE_QUERY, PHASE_COMPUTE, PHASE_RENDER)
+
+# Upper bounds, in seconds, of the latency histogram buckets. The
+# last bucket holds everything longer than the last bound.
+HISTOGRAM_BOUNDS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+#==================================================
+# Statistics
+#==================================================
+
+class OperationStats():
+    """Statistics for one kind of operation"""
+
+    def __init__(self):
+        self.count = 0
+        self.totalTime = 0.0
+        self.maxTime = 0.0
+        self.phaseTimes = dict((phase, 0.0) for phase in PHASES)
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+
+    def record(self,elapsed,phaseTimes):
+        """
+        Adds one operation to the statistics.
+
+        :param float elapsed: total seconds the operation took
+        :param dict phaseTimes: seconds spent in each phase
+        """
+        self.count = self.count + 1
+        self.totalTime = self.totalTime + elapsed
+        self.maxTime = max(self.maxTime, elapsed)
+        for phase in phaseTimes:
+            self.phaseTimes[phase] = self.phaseTimes.get(phase, 0.0) + phaseTimes[phase]
+        self.histogram[bisect_left(HISTOGRAM_BOUNDS, elapsed)] += 1
+
+    def getPercentile(self,pct):
+        """
+        Estimates a latency percentile from the histogram.
+
+        :param float pct: percentile (0 - 100)
+        :return: upper bound, in seconds, of the bucket the percentile falls in
+        """
+        if (self.count <= 0):
+            return 0.0
+        target = self.count * pct / 100.0
+        total = 0
+        for i in range(len(self.histogram)):
+            total = total + self.histogram[i]
+            if (total >= target):
+                return HISTOGRAM_BOUNDS[i] if (i < len(HISTOGRAM_BOUNDS)) else self.maxTime
+        return self.maxTime
+
+
+
+class OperationTimer():
+    """Times one operation, phase by phase"""
+
+    def __init__(self,operation):
+        """
+        :param object operation: identifies the operation (e.g., a CalculationType)
+        """
+        self.operation = operation
+        self.start = time.perf_counter()
+        self.phase = PHASE_QUERY
+        self.phaseStart = self.start
+        self.phaseTimes = {}
+        self.previous = None
+        self.deferred = False
+
+    def mark(self,phase):
+        """
+        Ends the current phase and starts another one.
+
+        :param str phase: the phase that is starting
+        """
+        now = time.perf_counter()
+        self.phaseTimes[self.phase] = self.phaseTimes.get(self.phase, 0.0) + (now - self.phaseStart)
+        self.phase = phase
+        self.phaseStart = now
+
+    def stop(self):
+        """
+        Ends the operation.
+
+        :return: total number of seconds the operation took
+        """
+        self.mark(None)
+        return self.phaseStart - self.start
+
+
+
+#==================================================
+# Recording operations
+#==================================================
+
+_lock = threading.Lock()
+_stats = {}
+_listeners = []
+_current = threading.local()
+
+def startOperation(operation):
+    """
+    Starts timing an operation. The operation becomes the current one
+    for the calling thread, which is what markPhase applies to.
+
+    :param object operation: identifies the operation
+    :return: an OperationTimer to pass to finishOperation
+    """
+    timer = OperationTimer(operation)
+    timer.previous = getattr(_current, "timer", None)
+    _current.timer = timer
+    return timer
+
+
+
+def finishOperation(timer):
+    """
+    Finishes timing an operation and records it. If the operation has
+    been deferred, it only stops being the calling thread's current
+    operation, and is recorded when it is resumed and finished again.
+
+    :param OperationTimer timer: value returned by startOperation
+    """
+    _current.timer = timer.previous
+    if (timer.deferred):
+        return
+    elapsed = timer.stop()
+    with _lock:
+        stats = _stats.get(timer.operation)
+        if (stats == None):
+            stats = OperationStats()
+            _stats[timer.operation] = stats
+        stats.record(elapsed,timer.phaseTimes)
+        listeners = list(_listeners)
+    for listener in listeners:
+        listener(timer.operation,elapsed,timer.phaseTimes)
+
+
+
+def deferOperation(operation=None):
+    """
+    Keeps the current operation going after it would otherwise be finished
+    (e.g., while a background job does its work). If no operation is being
+    timed, one is started in the compute phase.
+
+    :param object operation: identifies the operation to start if none is being timed
+    :return: the OperationTimer to pass to resumeOperation
+    """
+    timer = getattr(_current, "timer", None)
+    if (timer == None):
+        timer = OperationTimer(operation)
+        timer.mark(PHASE_COMPUTE)
+    timer.deferred = True
+    return timer
+
+
+
+def resumeOperation(timer):
+    """
+    Makes a deferred operation the calling thread's current operation again.
+    It is then finished and recorded by finishOperation.
+
+    :param OperationTimer timer: value returned by deferOperation
+    """
+    timer.deferred = False
+    timer.previous = getattr(_current, "timer", None)
+    _current.timer = timer
+
+
+
+def markPhase(phase):
+    """
+    Marks the start of a new phase of the current operation. Does nothing
+    if no operation is being timed.
+
+    :param str phase: PHASE_QUERY, PHASE_COMPUTE, or PHASE_RENDER
+    """
+    timer = getattr(_current, "timer", None)
+    if (timer != None):
+        timer.mark(phase)
+
+
+
+def addListener(listener):
+    """
+    Adds a function to be called whenever an operation finishes.
+
+    :param function listener: called as listener(operation, elapsedSeconds, phaseTimes)
+    """
+    with _lock:
+        _listeners.append(listener)
+
+
+
+def removeListener(listener):
+    """Removes a function added with addListener"""
+    with _lock:
+        if (listener in _listeners):
+            _listeners.remove(listener)
+
+
+
+def getStats():
+    """
+    Gets a snapshot of the statistics.
+
+    :return: dictionary mapping each operation to its OperationStats
+    """
+    with _lock:
+        return dict(_stats)
+
+
+
+def resetStats():
+    """Discards all of the statistics collected so far"""
+    with _lock:
+        _stats.clear()
+
+
+
+def report(out=sys.stdout):
+    """
+    Writes a summary of the statistics, with the operations that
+    took the most time in total listed first.
+
+    :param file out: where to write the summary
+    """
+    stats = getStats()
+    out.write("%-28s %6s %10s %10s %10s %10s %10s %10s\n" %
+              ("Operation", "Count", "Total s", "Query s", "Compute s", "Render s", "p50 ms", "p95 ms"))
+    for op in sorted(stats, key=lambda k: stats[k].totalTime, reverse=True):
+        s = stats[op]
+        out.write("%-28s %6d %10.3f %10.3f %10.3f %10.3f %10.1f %10.1f\n" %
+                  (str(op)[:28], s.count, s.totalTime, s.phaseTimes[PHASE_QUERY], s.phaseTimes[PHASE_COMPUTE],
+                   s.phaseTimes[PHASE_RENDER], 1000.0 * s.getPercentile(50), 1000.0 * s.getPercentile(95)))
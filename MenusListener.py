@@ -7,22 +7,36 @@ Copyright (c) 2018
 :version 3.0, 2018
 """
 
+import os
 import sys
 
 import ASTUtils.ASTAngle as ASTAngle
-import ASTUtils.ASTCatalog as ASTCatalog
-import ASTUtils.ASTConstellation as ASTConstellation
-import ASTUtils.ASTFileIO as ASTFileIO
-import ASTUtils.ASTInt as ASTInt
 from ASTUtils.ASTMisc import HIDE_ERRORS, HMSFORMAT, DMSFORMAT, DEFAULT_EPOCH, ASCENDING_ORDER
 import ASTUtils.ASTMsg as ASTMsg
 from ASTUtils.ASTPrt import CENTERTXT
-import ASTUtils.ASTQuery as ASTQuery
 import ASTUtils.ASTStr as ASTStr
 import ASTUtils.ASTTime as ASTTime
 
+import Chap1.BufferedPrt as BufferedPrt
+import Chap1.CatalogStore as CatalogStore
+import Chap1.LazyImport as LazyImport
+import Chap1.MenuStats as MenuStats
 import Chap1.ChapEnums
 
+# Modules that only some of the menu handlers need are not loaded until
+# a handler first uses them, which keeps startup fast
+filedialog = LazyImport.lazyImport("tkinter.filedialog")
+ASTCatalog = LazyImport.lazyImport("ASTUtils.ASTCatalog")
+ASTConstellation = LazyImport.lazyImport("ASTUtils.ASTConstellation")
+ASTInt = LazyImport.lazyImport("ASTUtils.ASTInt")
+ASTQuery = LazyImport.lazyImport("ASTUtils.ASTQuery")
+CatalogCache = LazyImport.lazyImport("Chap1.CatalogCache")
+CatalogExport = LazyImport.lazyImport("Chap1.CatalogExport")
+CatalogFilter = LazyImport.lazyImport("Chap1.CatalogFilter")
+CatalogPager = LazyImport.lazyImport("Chap1.CatalogPager")
+CatalogWorker = LazyImport.lazyImport("Chap1.CatalogWorker")
+ConstSearch = LazyImport.lazyImport("Chap1.ConstSearch")
+
 #==================================================
 # Define listeners for about, exit, instructions
 #==================================================
@@ -70,7 +84,8 @@ def instructionsMenuListener(prt):
     
     prt.printnoln("The 'Star Catalogs' menu item allows you to load a star catalog and see basic information about the " +
             "catalog, such as where it came from, how many objects are in the catalog, and what constellations " +
-            "those objects are in. The catalogs ")
+            "those objects are in. The 'Check Constellations' menu item checks that the constellation given for " +
+            "each object agrees with the object's coordinates for the catalog's epoch. The catalogs ")
     prt.setBoldFont(True)
     prt.printnoln("*MUST*")
     prt.setBoldFont(False)
@@ -91,17 +106,22 @@ def instructionsMenuListener(prt):
             "for the same object. The 'List all Space Objects ...' menu entry allows you to " +
             "look at all, or a subset of, the objects in the catalog. For example, if you wish to explore " +
             "the objects within a particular constellation, choose the 'In a Constellation' sub-menu to see " +
-            "all objects within the currently loaded catalog that are in a given constellation. Be aware that " +
-            "some of the catalogs are quite large and may take considerable time to display all of their objects. " +
+            "all objects within the currently loaded catalog that are in a given constellation, or choose the " +
+            "'Near a Location' or 'In an RA/Decl Box' sub-menus to see the objects within a given angle of a " +
+            "Right Ascension and Declination, or within a range of Right Ascensions and Declinations. Be aware that " +
+            "some of the catalogs are quite large, so when there are a lot of objects to display they are shown in a " +
+            "separate scrollable window that only displays the objects you scroll to. " +
             "The 'Sort Catalog by ...' menu item allows you to sort the catalog objects in various ways before " +
-            "displaying them.")
+            "displaying them. The 'Export Objects' menu item writes the objects that were last listed, or the " +
+            "whole catalog, to a CSV, Parquet, Arrow, or NumPy file for use by other programs.")
     prt.println()
     
     prt.printnoln("Several menu options, such as those under 'List a Catalog Object by ...', allow you to enter a string, " +
             "such as an object name, to search for in the currently loaded catalog. When searches are performed for " +
             "a string that you enter, the search is not case sensitive. Thus, a search for 'm39' and 'M39' will yield " +
             "the same results. Also, spaces are generally not important so that a search for 'M 39' will yield the " +
-            "same result as a search for 'M39'.")
+            "same result as a search for 'M39'. If a name is not found, the names that are closest to it are " +
+            "suggested.")
     prt.resetCursor()
    
 
@@ -110,65 +130,99 @@ def instructionsMenuListener(prt):
 # Define listener for the menu items
 #==================================================
 
+# Maps each CalculationType to the function that handles it. The
+# table is built the first time a menu item is clicked.
+_menuHandlers = None
+
+def _buildMenuHandlers():
+    """Builds the table that maps each CalculationType to its handler"""
+    cen = Chap1.ChapEnums.CalculationType           # shorten to make typing easier!!!
+    csf = ASTCatalog.CatalogSortField
+    
+    handlers = {
+        #****************Constellations Menu
+        cen.LISTCONSTBYNAME: listConstByName,
+        cen.LISTCONSTBYABBREVNAME: listConstByAbbrevName,
+        cen.LISTCONSTBYMEANING: listConstsByMeaning,
+        cen.LISTALLCONST: listAllConstellations,
+        cen.FINDCONST: findConstellationForRA_Decl,
+        
+        #****************Star Catalogs Menu
+        cen.CLEARCAT: clearCatalog,
+        cen.LOADCAT: loadCatalog,
+        cen.SHOWCATINFO: showCatalogInfo,
+        
+        #*****************Space Objects Menu
+        cen.LISTOBJBYNAME: listObjByName,
+        cen.LISTOBJBYALTNAME: listObjByAltName,
+        cen.LISTOBJBYCOMMENTS: listObjByComments,
+        cen.LISTALLOBJSINCAT: listAllObjsInCatalog,
+        cen.LISTALLOBJSINRANGE: listAllObjsByRange,
+        cen.LISTALLOBJSINCONST: listAllObjsByConst,
+        cen.SORTCATBYCONST: lambda gui: sortCatalog(gui,csf.CONSTELLATION),
+        cen.SORTCATBYCONSTANDOBJNAME: lambda gui: sortCatalog(gui,csf.CONST_AND_OBJNAME),
+        cen.SORTCATBYOBJNAME: lambda gui: sortCatalog(gui,csf.OBJNAME),
+        cen.SORTCATBYOBJALTNAME: lambda gui: sortCatalog(gui,csf.OBJ_ALTNAME),
+        cen.SORTCATBYOBJRA: lambda gui: sortCatalog(gui,csf.RA),
+        cen.SORTCATBYOBJDECL: lambda gui: sortCatalog(gui,csf.DECL),
+        cen.SORTCATBYOBJMV: lambda gui: sortCatalog(gui,csf.VISUAL_MAGNITUDE),
+    }
+    
+    # Menu items whose CalculationType values are not defined by every
+    # version of ChapEnums. ChapEnums and the menus that use it are not part
+    # of this package, so each handler is only registered once ChapEnums has
+    # its value. Until then, the feature is only available through BatchDriver
+    # (the operation named in each comment).
+    for name, handler in (("LISTALLOBJSINCONE", listAllObjsInCone),        # objsInCone
+                          ("LISTALLOBJSINBOX", listAllObjsInBox),          # objsInBox
+                          ("LISTOBJSBYFILTER", listObjsByFilter),          # filter
+                          ("CHECKCATCONSTS", checkCatalogConstellations),  # checkConsts, retagConsts
+                          ("EXPORTOBJS", exportObjects)):                 # export
+        if hasattr(cen, name):
+            handlers[getattr(cen, name)] = handler
+    return handlers
+
+
+
+def _getMenuHandlers():
+    """Gets the table that maps each CalculationType to its handler"""
+    global _menuHandlers
+    if (_menuHandlers == None):
+        _menuHandlers = _buildMenuHandlers()
+    return _menuHandlers
+
+
+
+def registerMenuHandler(calcToDo,handler):
+    """
+    Adds a handler for a menu item, or replaces an existing one.
+    
+    :param CalculationType calcToDo: the menu item's calculation
+    :param function handler: called as handler(gui) when the menu item is clicked
+    """
+    _getMenuHandlers()[calcToDo] = handler
+
+
+
 def menuListener(calcToDo,gui):
     """
-    Handle a click on the menu items
+    Handle a click on the menu items. Each operation is timed and
+    recorded in the MenuStats statistics. An operation that runs a
+    background job is recorded when the job has finished.
     
     :param CalculationType calcToDo: the calculation to perform
     :param tkwidget gui: GUI object to which menu items are associated)
     """
-    cen = Chap1.ChapEnums.CalculationType           # shorten to make typing easier!!!
-    
-    #****************Constellations Menu
-    if (calcToDo == cen.LISTCONSTBYNAME):
-        listConstByName(gui)        
-    elif (calcToDo == cen.LISTCONSTBYABBREVNAME):
-        listConstByAbbrevName(gui)
-    elif (calcToDo == cen.LISTCONSTBYMEANING): 
-        listConstsByMeaning(gui)
-    elif (calcToDo == cen.LISTALLCONST):
-        listAllConstellations(gui)
-    elif (calcToDo == cen.FINDCONST):
-        findConstellationForRA_Decl(gui)
-
-    #****************Star Catalogs Menu
-    elif (calcToDo == cen.CLEARCAT):
-        clearCatalog(gui)
-    elif (calcToDo == cen.LOADCAT):       
-        loadCatalog(gui)
-    elif (calcToDo == cen.SHOWCATINFO):
-        showCatalogInfo(gui)
-
-    #*****************Space Objects Menu
-    elif (calcToDo == cen.LISTOBJBYNAME):        
-        listObjByName(gui)
-    elif (calcToDo == cen.LISTOBJBYALTNAME):    
-        listObjByAltName(gui)
-    elif (calcToDo == cen.LISTOBJBYCOMMENTS):    
-        listObjByComments(gui)
-    elif (calcToDo == cen.LISTALLOBJSINCAT):
-        listAllObjsInCatalog(gui)
-    elif (calcToDo == cen.LISTALLOBJSINRANGE): 
-        listAllObjsByRange(gui)
-    elif (calcToDo == cen.LISTALLOBJSINCONST): 
-        listAllObjsByConst(gui)
-    elif (calcToDo == cen.SORTCATBYCONST):
-        sortCatalog(gui,ASTCatalog.CatalogSortField.CONSTELLATION)
-    elif (calcToDo == cen.SORTCATBYCONSTANDOBJNAME):
-        sortCatalog(gui,ASTCatalog.CatalogSortField.CONST_AND_OBJNAME)
-    elif (calcToDo == cen.SORTCATBYOBJNAME):
-        sortCatalog(gui,ASTCatalog.CatalogSortField.OBJNAME)
-    elif (calcToDo == cen.SORTCATBYOBJALTNAME):
-        sortCatalog(gui,ASTCatalog.CatalogSortField.OBJ_ALTNAME)
-    elif (calcToDo == cen.SORTCATBYOBJRA):
-        sortCatalog(gui,ASTCatalog.CatalogSortField.RA)
-    elif (calcToDo == cen.SORTCATBYOBJDECL):
-        sortCatalog(gui,ASTCatalog.CatalogSortField.DECL)
-    elif (calcToDo == cen.SORTCATBYOBJMV):
-        sortCatalog(gui,ASTCatalog.CatalogSortField.VISUAL_MAGNITUDE)
-
-    else:           # This should never happen
+    handler = _getMenuHandlers().get(calcToDo)
+    if (handler == None):           # This should never happen
         ASTMsg.criticalErrMsg("Unimplemented menu item " + str(calcToDo))
+        return
+    
+    timer = MenuStats.startOperation(calcToDo)
+    try:
+        handler(gui)
+    finally:
+        MenuStats.finishOperation(timer)
         
 
 
@@ -176,6 +230,28 @@ def menuListener(calcToDo,gui):
 # Handle Constellations menu items
 #=========================================
 
+def _offerSuggestions(prt,notFoundMsg,suggestions):
+    """
+    Tells the user that what they entered was not found, along with
+    what they may have meant. If there is only one suggestion, the
+    user is asked whether it is what they meant.
+    
+    :param ASTPrt prt: where to display the suggestions
+    :param str notFoundMsg: message saying what was not found
+    :param list suggestions: names that may have been meant
+    :return: position in suggestions of the one the user accepted, or -1
+    """
+    if ((len(suggestions) == 1) and
+            ASTMsg.pleaseConfirm(notFoundMsg + ".\nDid you mean '" + suggestions[0] + "'?","Did You Mean")):
+        return 0
+    prt.println(notFoundMsg)
+    if (len(suggestions) > 0):
+        prt.println("Did you mean " + ", ".join(["'" + name + "'" for name in suggestions]) + "?")
+    return -1
+
+
+
+
 def findConstellationForRA_Decl(gui):
     """
     Finds the constellation that a given RA/Decl falls within.
@@ -205,10 +281,12 @@ def findConstellationForRA_Decl(gui):
         ASTMsg.errMsg("The Declination entered is invalid - try again.", "Invalid Decl")
         return
 
+    MenuStats.markPhase(MenuStats.PHASE_COMPUTE)
     prt.clearTextArea()
     
     idx = ASTConstellation.findConstellationFromCoord(raObj.getDecTime(),declObj.getDecAngle(),DEFAULT_EPOCH)
     
+    MenuStats.markPhase(MenuStats.PHASE_RENDER)
     if (idx < 0):
         ASTMsg.criticalErrMsg("Could not determine a constellation for the data entered.")
     else:
@@ -229,6 +307,7 @@ def listAllConstellations(gui):
     """
     prt = gui.getPrtInstance()
     
+    MenuStats.markPhase(MenuStats.PHASE_RENDER)
     prt.clearTextArea()
     prt.setFixedWidthFont()
     ASTConstellation.displayAllConstellations()
@@ -253,10 +332,16 @@ def listConstByAbbrevName(gui):
     if ((sAbbrevName == None) or (len(sAbbrevName) <= 0)):
         return
 
+    MenuStats.markPhase(MenuStats.PHASE_COMPUTE)
     prt.clearTextArea()
     idx = ASTConstellation.findConstellationByAbbrvName(sAbbrevName.strip())
+    MenuStats.markPhase(MenuStats.PHASE_RENDER)
     if (idx < 0):
-        prt.println("No Constellation whose abbreviated name is '" + sAbbrevName + "' was found")
+        iSuggest = ConstSearch.suggestConstNames(sAbbrevName.strip(),byAbbrev=True)
+        k = _offerSuggestions(prt,"No Constellation whose abbreviated name is '" + sAbbrevName + "' was found",
+                              [ASTConstellation.getConstAbbrevName(i) for i in iSuggest])
+        if (k >= 0):
+            ASTConstellation.displayConstellation(iSuggest[k])
     else:
         ASTConstellation.displayConstellation(idx)
     
@@ -271,7 +356,7 @@ def listConstsByMeaning(gui):
 
     :param tkwidget gui: GUI object from which the request came
     """
-    prt = gui.getPrtInstance()
+    prt = BufferedPrt.BufferedPrt(gui.getPrtInstance())
       
     if (ASTQuery.showQueryForm(["Enter Substring to Search for in the\n"+
                                 "Constellation's 'Meaning' field"]) != ASTQuery.QUERY_OK):
@@ -281,10 +366,12 @@ def listConstsByMeaning(gui):
     if ((targ == None) or (len(targ) <= 0)):
         return
     
+    MenuStats.markPhase(MenuStats.PHASE_COMPUTE)
     prt.clearTextArea()
     
-    iResult = ASTConstellation.findConstellationsByMeaning(targ.strip())
+    iResult = ConstSearch.findConstellationsByMeaning(targ.strip())
     
+    MenuStats.markPhase(MenuStats.PHASE_RENDER)
     n=len(iResult)
     
     if (n <= 0):
@@ -302,6 +389,7 @@ def listConstsByMeaning(gui):
             prt.println("*"*80)
             prt.setProportionalFont()
             prt.println("Constellation # " + str(i+1))
+            prt.flush()         # displayConstellation writes to the text area directly
             ASTConstellation.displayConstellation(iResult[i])
     
     prt.resetCursor()
@@ -323,11 +411,17 @@ def listConstByName(gui):
     if ((sConstName == None) or (len(sConstName) <= 0)):
         return
      
+    MenuStats.markPhase(MenuStats.PHASE_COMPUTE)
     prt.clearTextArea()
     
     idx = ASTConstellation.findConstellationByName(sConstName.strip())
+    MenuStats.markPhase(MenuStats.PHASE_RENDER)
     if (idx < 0):
-        prt.println("There is no Constellation with the name '"+sConstName+"'")
+        iSuggest = ConstSearch.suggestConstNames(sConstName.strip())
+        k = _offerSuggestions(prt,"There is no Constellation with the name '"+sConstName+"'",
+                              [ASTConstellation.getConstName(i) for i in iSuggest])
+        if (k >= 0):
+            ASTConstellation.displayConstellation(iSuggest[k])
     else:
         ASTConstellation.displayConstellation(idx)
 
@@ -339,6 +433,52 @@ def listConstByName(gui):
 # Handle Star Catalogs menu items
 #=========================================
 
+# Progress window for the catalog being loaded in the background
+_progressWindow = None
+
+def _setProgressWindow(win):
+    """Remembers the progress window for the catalog being loaded"""
+    global _progressWindow
+    _progressWindow = win
+
+
+
+def _closeProgressWindow():
+    """Closes the progress window for the catalog being loaded, if there is one"""
+    global _progressWindow
+    if (_progressWindow != None):
+        _progressWindow.close()
+        _progressWindow = None
+
+
+
+# The objects that were last listed, as (description, list of indices),
+# which is what gets exported. None means the whole catalog.
+_lastListed = None
+
+def _setLastListed(title,iResult):
+    """Remembers the objects that were last listed so that they can be exported"""
+    global _lastListed
+    _lastListed = None if (iResult == None) else (title, iResult)
+
+
+
+def _checkNotBusy(gui):
+    """
+    Checks that no background catalog operation is running.
+    
+    :param tkwidget gui: GUI object from which the request came
+    :return: True if nothing is running, otherwise tells the user and returns False
+    """
+    job = CatalogWorker.getCatalogWorker(gui).getCurrentJob()
+    if (job == None):
+        return True
+    ASTMsg.errMsg("Please wait until the current operation ('" + job.name + "') is finished.", "Catalog Busy")
+    return False
+
+
+
+
 def clearCatalog(gui):
     """
     Clears all catalog data currently loaded.
@@ -347,14 +487,19 @@ def clearCatalog(gui):
     """
     prt = gui.getPrtInstance()
 
-    if (not ASTCatalog.isCatalogLoaded()):
+    if (not CatalogStore.isCatalogLoaded()):
         ASTMsg.errMsg("No catalog is currently loaded, so there is nothing to clear.", "No Catalog Loaded")
         return
+    if not (_checkNotBusy(gui)):
+        return
     
     prt.clearTextArea()
     
     if (ASTMsg.pleaseConfirm("Are you sure you want to clear all\ncurrently loaded catalog data?","Clear Catalog Data")):
-        ASTCatalog.clearCatalogAndSpaceObjects()
+        MenuStats.markPhase(MenuStats.PHASE_COMPUTE)
+        CatalogStore.clearCatalogAndSpaceObjects()
+        _setLastListed(None,None)
+        MenuStats.markPhase(MenuStats.PHASE_RENDER)
         gui.setFilename("")
         gui.setCatalogType("")
         gui.setEpoch(DEFAULT_EPOCH)
@@ -368,40 +513,79 @@ def clearCatalog(gui):
 
 def loadCatalog(gui):
     """
-    Loads a star catalog from disk.
+    Loads one or more star catalogs from disk. Several catalogs can be
+    selected at once, and they can be added to the catalogs that are
+    already loaded. The objects from all of the catalogs are merged
+    into one catalog. The catalogs are loaded in the background while
+    a progress window is shown. Loading another catalog before this
+    load is done cancels this one.
     
     :param tkwidget gui: GUI object from which the request came
     """
     prt = gui.getPrtInstance()
 
-    fileToRead = ASTFileIO.getFileToRead("Select Catalog to Load ...",ASTCatalog.ASTCatalog.getFileExtFilter(),
-                                         ASTCatalog.ASTCatalog.getCatDataDir(),"")
-    
-    if ((fileToRead == None) or (len(fileToRead) <= 0)):
+    filesToRead = filedialog.askopenfilenames(title="Select Catalog(s) to Load ...",
+                                              initialdir=ASTCatalog.ASTCatalog.getCatDataDir(),
+                                              filetypes=[("Star Catalogs","*" + CatalogCache.CATALOG_FILE_EXT),
+                                                         ("All Files","*.*")])
+    filesToRead = [f for f in filesToRead if (len(f) > 0)]
+    if (len(filesToRead) <= 0):
         return
     
-    gui.setFilename(fileToRead)
+    keepLoaded = False
+    if (CatalogStore.isCatalogLoaded() and (CatalogWorker.getCatalogWorker(gui).getCurrentJob() == None)):
+        keepLoaded = ASTMsg.pleaseConfirm("Do you want to add to the catalog data that is already loaded?\n" +
+                                          "(Answer 'No' to replace it)","Add Catalog Data")
     
+    names = ", ".join([os.path.basename(f) for f in filesToRead])
     prt.clearTextArea()
+    prt.println("Loading " + names + " ...")
+    prt.resetCursor()
+    
+    MenuStats.markPhase(MenuStats.PHASE_COMPUTE)
+    worker = CatalogWorker.getCatalogWorker(gui)
     
-    if ((ASTFileIO.getFileSize(fileToRead)/1024.0) > ASTCatalog.MAX_CATALOG_FILESIZE_KB):
-        ASTMsg.infoMsg("Warning: Due to its size, it may take several seconds to load\n" +
-                       "this Star Catalog. Click 'OK' and then please be patient.\n" +
-                       "A message will be displayed when loading is completed.","")
+    def load(job):
+        if ((len(filesToRead) == 1) and not keepLoaded):
+            return CatalogStore.prepareFormattedStarCatalog(filesToRead[0],
+                        lambda n, total: job.reportProgress(n / max(total, 1),"Reading " + names + " ..."))
+        return CatalogStore.prepareFormattedStarCatalogs(filesToRead,keepLoaded,
+                        lambda n, total: job.reportProgress(n / max(total, 1),
+                                                            ASTStr.strFormat("Read %d of ",n) +
+                                                            ASTStr.strFormat("%d catalogs ...",total)))
     
-    if (ASTCatalog.loadFormattedStarCatalog(fileToRead)):
-        s = ASTStr.strFormat("Read in %d different Constellations with a total of ",ASTCatalog.getCatNumConst()) +\
-            ASTStr.strFormat("%d Objects",ASTCatalog.getCatNumObjs())
+    def onDone(prepared):
+        _closeProgressWindow()
+        CatalogStore.installPreparedCatalog(prepared)
+        _setLastListed(None,None)
+        MenuStats.markPhase(MenuStats.PHASE_RENDER)
+        s = ASTStr.strFormat("Read in %d different Constellations with a total of ",CatalogStore.getCatNumConst()) +\
+            ASTStr.strFormat("%d Objects",CatalogStore.getCatNumObjs())
+        prt.clearTextArea()
+        if (len(CatalogStore.getCatFilenames()) > 1):
+            prt.println("Loaded the catalogs " +
+                        ", ".join([os.path.basename(f) for f in CatalogStore.getCatFilenames()]))
         prt.println(s)
-        gui.setCatalogType(ASTCatalog.getCatType())
-        gui.setEpoch(ASTCatalog.getCatEpoch())
-    else:          
-        ASTMsg.errMsg("Could not load the catalog data from "+fileToRead, "Catalog Load Failed")
-        gui.setFilename("")
-        gui.setCatalogType("")
-        gui.setEpoch(DEFAULT_EPOCH)
+        prt.resetCursor()
+        gui.setFilename(CatalogStore.getCatFilename())
+        gui.setCatalogType(CatalogStore.getCatType())
+        gui.setEpoch(CatalogStore.getCatEpoch())
     
-    prt.resetCursor()
+    def onError(e):
+        _closeProgressWindow()
+        ASTMsg.errMsg("Could not load the catalog data from "+names, "Catalog Load Failed")
+        
+    def onCancel():
+        worker.cancel()
+        _closeProgressWindow()
+        prt.println("Loading the catalog was cancelled ...")
+        prt.resetCursor()
+    
+    # A load that is still running is cancelled, and so is its progress window
+    _closeProgressWindow()
+    _setProgressWindow(CatalogWorker.ProgressWindow(gui,"Loading " + names,onCancel))
+    worker.submit("Load catalog",load,onDone,onError,lambda fraction, text: _progressWindow.update(fraction,text),
+                  preempt=True)
 
 
 
@@ -411,14 +595,144 @@ def showCatalogInfo(gui):
     
     :param tkwidget gui: GUI object from which the request came
     """
-    prt = gui.getPrtInstance()
+    prt = BufferedPrt.BufferedPrt(gui.getPrtInstance())
     
-    if not (ASTCatalog.isCatalogLoaded()):
+    if not (CatalogStore.isCatalogLoaded()):
         ASTMsg.errMsg("No catalog is currently loaded.", "No Catalog Loaded")
     else:
+        MenuStats.markPhase(MenuStats.PHASE_RENDER)
+        prt.clearTextArea()
+        CatalogStore.displayCatalogInfo(prt)
+        prt.resetCursor()
+
+
+
+# Most objects whose constellation disagrees with their coordinates to list
+MAX_CONST_MISMATCHES_SHOWN = 500
+
+def checkCatalogConstellations(gui):
+    """
+    Checks that the constellation given for each object in the currently
+    loaded catalog agrees with the object's coordinates (taken to be in the
+    catalog's epoch), and offers to correct the objects that disagree.
+    The check is done in the background.
+
+    :param tkwidget gui: GUI object from which the request came
+    """
+    prt = BufferedPrt.BufferedPrt(gui.getPrtInstance())
+
+    if not (CatalogStore.isCatalogLoaded()):
+        ASTMsg.errMsg("No catalog is currently loaded.", "No Catalog Loaded")
+        return
+    if not (_checkNotBusy(gui)):
+        return
+
+    prt.clearTextArea()
+    prt.println(ASTStr.strFormat("Checking the constellations of %d objects against their coordinates ...",
+                                 CatalogStore.getCatNumObjs()))
+    prt.resetCursor()
+
+    def onDone(mismatches):
+        MenuStats.markPhase(MenuStats.PHASE_RENDER)
         prt.clearTextArea()
-        ASTCatalog.displayCatalogInfo()
+        if (len(mismatches) <= 0):
+            prt.println("The constellation of every object agrees with its coordinates.")
+            prt.resetCursor()
+            return
+        prt.println(ASTStr.strFormat("%d objects are in a different constellation than the catalog says",
+                                     len(mismatches)))
+        prt.println()
+        prt.setFixedWidthFont()
+        for idx, catConst, coordConst in mismatches[:MAX_CONST_MISMATCHES_SHOWN]:
+            obj = CatalogStore.getCatObject(idx)
+            prt.println(ASTStr.strFormat("%-20s ",obj.name) +
+                        ASTStr.strFormat("%-4s -> ",ASTConstellation.getConstAbbrevName(catConst) if (catConst >= 0) else "?") +
+                        ASTConstellation.getConstAbbrevName(coordConst))
+        if (len(mismatches) > MAX_CONST_MISMATCHES_SHOWN):
+            prt.println(ASTStr.strFormat("... and %d more",len(mismatches) - MAX_CONST_MISMATCHES_SHOWN))
+        prt.setProportionalFont()
         prt.resetCursor()
+        MenuStats.markPhase(MenuStats.PHASE_QUERY)
+        if (ASTMsg.pleaseConfirm(ASTStr.strFormat("Change the constellation of these %d objects to ",len(mismatches)) +
+                                 "match their coordinates?", "Correct Constellations")):
+            MenuStats.markPhase(MenuStats.PHASE_COMPUTE)
+            n = CatalogStore.retagObjConstellations()
+            MenuStats.markPhase(MenuStats.PHASE_RENDER)
+            prt.println()
+            prt.println(ASTStr.strFormat("Changed the constellation of %d objects.",n))
+            prt.resetCursor()
+
+    def onError(e):
+        ASTMsg.errMsg("The constellation boundaries could not be read.", "Check Failed")
+
+    MenuStats.markPhase(MenuStats.PHASE_COMPUTE)
+    CatalogWorker.getCatalogWorker(gui).submit("Check constellations",
+                                               lambda job: CatalogStore.checkObjConstellations(),onDone,onError)
+
+
+
+def exportObjects(gui):
+    """
+    Exports the objects that were last listed, or the whole catalog, to an
+    Arrow, Parquet, NumPy, or CSV file for use by other programs. The
+    export is done in the background.
+
+    :param tkwidget gui: GUI object from which the request came
+    """
+    prt = gui.getPrtInstance()
+
+    if not (CatalogStore.isCatalogLoaded()):
+        ASTMsg.errMsg("No catalog is currently loaded.", "No Catalog Loaded")
+        return
+    if not (_checkNotBusy(gui)):
+        return
+
+    filename = filedialog.asksaveasfilename(title="Export Objects to ...",
+                                            filetypes=[("CSV Files","*.csv"),("Parquet Files","*.parquet"),
+                                                       ("Arrow Files","*.arrow"),("NumPy Files","*.npy")])
+    if ((filename == None) or (len(filename) <= 0)):
+        return
+    try:
+        CatalogExport.getExportFormat(filename)
+    except CatalogExport.ExportError as e:
+        ASTMsg.errMsg(str(e), "Unknown Format")
+        return
+
+    title = "in the catalog"
+    indices = None
+    if ((_lastListed != None) and
+            ASTMsg.pleaseConfirm(ASTStr.strFormat("Export only the %d objects ",len(_lastListed[1])) +
+                                 _lastListed[0] + "?\n(Answer 'No' to export the whole catalog)","Export Objects")):
+        title, indices = _lastListed
+
+    prt.clearTextArea()
+    prt.println("Exporting the objects " + title + " to " + filename + " ...")
+    prt.resetCursor()
+
+    def onDone(n):
+        _closeProgressWindow()
+        MenuStats.markPhase(MenuStats.PHASE_RENDER)
+        prt.clearTextArea()
+        prt.println(ASTStr.strFormat("Exported %d objects to ",n) + filename)
+        prt.resetCursor()
+
+    def onError(e):
+        _closeProgressWindow()
+        ASTMsg.errMsg("Could not export the objects to " + filename + "\n" + str(e), "Export Failed")
+
+    def onCancel():
+        worker.cancel()
+        _closeProgressWindow()
+        prt.println("Exporting the objects was cancelled ...")
+        prt.resetCursor()
+
+    MenuStats.markPhase(MenuStats.PHASE_COMPUTE)
+    worker = CatalogWorker.getCatalogWorker(gui)
+    _setProgressWindow(CatalogWorker.ProgressWindow(gui,"Exporting to " + os.path.basename(filename),onCancel))
+    worker.submit("Export objects",
+                  lambda job: CatalogExport.exportObjects(filename,indices,progressCallback=lambda n, total:
+                                job.reportProgress(n / max(total, 1),ASTStr.strFormat("Wrote %d objects ...",n))),
+                  onDone,onError,lambda fraction, text: _progressWindow.update(fraction,text))
 
 
 
@@ -432,9 +746,9 @@ def listAllObjsByConst(gui):
     
     :param tkwidget gui: GUI object from which the request came
     """
-    prt = gui.getPrtInstance() 
+    prt = BufferedPrt.BufferedPrt(gui.getPrtInstance())
 
-    if (not ASTCatalog.isCatalogLoaded()):
+    if (not CatalogStore.isCatalogLoaded()):
         ASTMsg.errMsg("No catalog is currently loaded.", "No Catalog Loaded")
         return
      
@@ -445,14 +759,18 @@ def listAllObjsByConst(gui):
     if ((constAbbrevName == None) or (len(constAbbrevName) <= 0)):
         return
      
+    MenuStats.markPhase(MenuStats.PHASE_COMPUTE)
     prt.clearTextArea()
     
     idx = ASTConstellation.findConstellationByAbbrvName(constAbbrevName.strip())
+    MenuStats.markPhase(MenuStats.PHASE_RENDER)
     if (idx < 0):
         prt.println("No Constellation whose abbreviated name is '" + constAbbrevName + "' was found")
     else:
+        _setLastListed("in " + ASTConstellation.getConstName(idx),
+                       CatalogStore.getConstMembers(idx,gui.getSortOrderChkbox()))
         prt.setFixedWidthFont()    
-        ASTCatalog.displayAllObjsByConstellation(idx,gui.getSortOrderChkbox())        
+        CatalogStore.displayAllObjsByConstellation(prt,idx,gui.getSortOrderChkbox())        
         prt.setProportionalFont()
         
     prt.resetCursor()
@@ -467,9 +785,9 @@ def listAllObjsByRange(gui):
     """
     iMaxNum = 100                # default to 1st 100 entries
     
-    prt = gui.getPrtInstance()    
+    prt = BufferedPrt.BufferedPrt(gui.getPrtInstance())
      
-    if (not ASTCatalog.isCatalogLoaded()):
+    if (not CatalogStore.isCatalogLoaded()):
         ASTMsg.errMsg("No catalog is currently loaded.", "No Catalog Loaded")
         return
     
@@ -478,6 +796,7 @@ def listAllObjsByRange(gui):
                                 "Enter number of objects to list\n(ex: 10 for total of 10 objects)"]) != ASTQuery.QUERY_OK):
         return
      
+    MenuStats.markPhase(MenuStats.PHASE_COMPUTE)
     prt.clearTextArea()
      
     n = ASTInt.isValidInt(ASTQuery.getData(1),HIDE_ERRORS)
@@ -492,13 +811,264 @@ def listAllObjsByRange(gui):
     else:
         iEnd = iStart + iMaxNum - 1
     
+    # Long listings go in a window that only formats the rows being looked at
+    pager = CatalogPager.CatalogPager(iStart,iEnd)
+    _setLastListed(ASTStr.strFormat("at positions %d",iStart + 1) + ASTStr.strFormat(" to %d",iStart + pager.getNumRows()),
+                   [CatalogStore.getObjIndexAt(pos) for pos in range(iStart,iStart + pager.getNumRows())])
+    MenuStats.markPhase(MenuStats.PHASE_RENDER)
+    if (pager.getNumRows() > CatalogPager.PAGED_LISTING_THRESHOLD):
+        CatalogPager.VirtualCatalogView(gui,"Objects " + str(iStart + 1) + " to " +
+                                        str(iStart + pager.getNumRows()),pager)
+        prt.println(str(pager.getNumRows()) + " objects are shown in a separate scrollable window")
+        prt.resetCursor()
+        return
+
     prt.setFixedWidthFont()    
-    ASTCatalog.displayAllObjsByRange(iStart,iEnd)        
+    CatalogStore.displayAllObjsByRange(prt,iStart,iEnd)        
     prt.setProportionalFont()
     prt.resetCursor()
 
 
 
+def _getRADecl(raStr,declStr):
+    """
+    Validates an RA and Decl entered by the user.
+    
+    :param str raStr: RA as hh:mm:ss.ss
+    :param str declStr: Decl as xxxd yym zz.zzs
+    :return: (RA in hours, Decl in degrees), or None if either is invalid
+    """
+    if ((raStr == None) or (len(raStr) <= 0) or (declStr == None) or (len(declStr) <= 0)):
+        return None
+    raObj = ASTTime.isValidTime(raStr,HIDE_ERRORS)
+    if not (raObj.isValidTimeObj()):
+        ASTMsg.errMsg("The RA entered is invalid - try again.", "Invalid RA")
+        return None
+    declObj = ASTAngle.isValidAngle(declStr,HIDE_ERRORS)
+    if not (declObj.isValidAngleObj()):
+        ASTMsg.errMsg("The Declination entered is invalid - try again.", "Invalid Decl")
+        return None
+    return (raObj.getDecTime(), declObj.getDecAngle())
+
+
+
+def _displayObjList(gui,prt,title,iResult):
+    """
+    Displays a list of objects, using a separate scrollable window if the list is long.
+    
+    :param tkwidget gui: GUI object from which the request came
+    :param ASTPrt prt: where to display the list
+    :param str title: describes the objects in the list
+    :param list iResult: indices of the objects to display
+    """
+    n = len(iResult)
+    _setLastListed(title,iResult)
+    if (n <= 0):
+        prt.println("No objects in the catalog are " + title)
+        return
+    prt.println(ASTStr.strFormat("%d objects are ",n) + title)
+    prt.println()
+    if (n > CatalogPager.PAGED_LISTING_THRESHOLD):
+        CatalogPager.VirtualCatalogView(gui,"Objects " + title,CatalogPager.ListPager(iResult))
+        prt.println("The objects are shown in a separate scrollable window")
+    else:
+        prt.setFixedWidthFont()
+        CatalogStore.displayObjRows(prt,iResult)
+        prt.setProportionalFont()
+
+
+
+def listAllObjsInBox(gui):
+    """
+    Shows all space objects within a range of RA and Decl.
+    
+    :param tkwidget gui: GUI object from which the request came
+    """
+    prt = BufferedPrt.BufferedPrt(gui.getPrtInstance())
+     
+    if (not CatalogStore.isCatalogLoaded()):
+        ASTMsg.errMsg("No catalog is currently loaded.", "No Catalog Loaded")
+        return
+    
+    if (ASTQuery.showQueryForm(["Enter starting Right Ascension (hh:mm:ss.ss)",
+                                "Enter ending Right Ascension (hh:mm:ss.ss)",
+                                "Enter lowest Declination (xxxd yym zz.zzs)",
+                                "Enter highest Declination (xxxd yym zz.zzs)"]) != ASTQuery.QUERY_OK):
+        return
+    
+    corner1 = _getRADecl(ASTQuery.getData(1),ASTQuery.getData(3))
+    if (corner1 == None):
+        return
+    corner2 = _getRADecl(ASTQuery.getData(2),ASTQuery.getData(4))
+    if (corner2 == None):
+        return
+    
+    MenuStats.markPhase(MenuStats.PHASE_COMPUTE)
+    prt.clearTextArea()
+    
+    iResult = CatalogStore.findObjsInBox(corner1[0],corner2[0],corner1[1],corner2[1])
+    
+    MenuStats.markPhase(MenuStats.PHASE_RENDER)
+    _displayObjList(gui,prt,"between " + ASTTime.timeToStr(corner1[0],HMSFORMAT) + " and " +
+                    ASTTime.timeToStr(corner2[0],HMSFORMAT) + " RA, " + ASTAngle.angleToStr(corner1[1],DMSFORMAT) +
+                    " and " + ASTAngle.angleToStr(corner2[1],DMSFORMAT) + " Decl",iResult)
+    prt.resetCursor()
+
+
+
+def listAllObjsInCone(gui):
+    """
+    Shows all space objects within a given angle of an RA/Decl.
+    
+    :param tkwidget gui: GUI object from which the request came
+    """
+    prt = BufferedPrt.BufferedPrt(gui.getPrtInstance())
+     
+    if (not CatalogStore.isCatalogLoaded()):
+        ASTMsg.errMsg("No catalog is currently loaded.", "No Catalog Loaded")
+        return
+    
+    if (ASTQuery.showQueryForm(["Enter Right Ascension (hh:mm:ss.ss)",
+                                "Enter Declination (xxxd yym zz.zzs)",
+                                "Enter search radius (xxxd yym zz.zzs)"]) != ASTQuery.QUERY_OK):
+        return
+    
+    center = _getRADecl(ASTQuery.getData(1),ASTQuery.getData(2))
+    if (center == None):
+        return
+    strTmp = ASTQuery.getData(3)
+    if ((strTmp == None) or (len(strTmp) <= 0)):
+        return
+    radiusObj = ASTAngle.isValidAngle(strTmp,HIDE_ERRORS)
+    if (not (radiusObj.isValidAngleObj()) or (radiusObj.getDecAngle() < 0.0)):
+        ASTMsg.errMsg("The search radius entered is invalid - try again.", "Invalid Radius")
+        return
+    radius = radiusObj.getDecAngle()
+    
+    MenuStats.markPhase(MenuStats.PHASE_COMPUTE)
+    prt.clearTextArea()
+    
+    iResult = CatalogStore.findObjsInCone(center[0],center[1],radius)
+    
+    MenuStats.markPhase(MenuStats.PHASE_RENDER)
+    _displayObjList(gui,prt,"within " + ASTAngle.angleToStr(radius,DMSFORMAT) + " of " +
+                    ASTTime.timeToStr(center[0],HMSFORMAT) + " RA, " + ASTAngle.angleToStr(center[1],DMSFORMAT) +
+                    " Decl",iResult)
+    prt.resetCursor()
+
+
+
+def _parseRange(strTmp,parse):
+    """
+    Parses a range entered as two values separated by a comma. Either
+    value may be left out (e.g., ', 6' has no lower limit).
+    
+    :param str strTmp: the range entered by the user
+    :param function parse: converts one value, returning None if it is invalid
+    :return: (low, high), where a missing value is None, or None if the range is invalid
+    """
+    if ((strTmp == None) or (len(strTmp.strip()) <= 0)):
+        return (None, None)
+    values = strTmp.split(",")
+    if (len(values) == 1):
+        values.append("")
+    if (len(values) != 2):
+        return None
+    result = []
+    for v in values:
+        v = v.strip()
+        if (len(v) <= 0):
+            result.append(None)
+        else:
+            x = parse(v)
+            if (x == None):
+                return None
+            result.append(x)
+    return tuple(result)
+
+
+
+def _parseMagnitude(strTmp):
+    """Converts a visual magnitude entered by the user, returning None if it is invalid"""
+    try:
+        return float(strTmp)
+    except ValueError:
+        return None
+
+
+
+def _parseRA(strTmp):
+    """Converts an RA (hh:mm:ss.ss) entered by the user, returning None if it is invalid"""
+    raObj = ASTTime.isValidTime(strTmp,HIDE_ERRORS)
+    return raObj.getDecTime() if (raObj.isValidTimeObj()) else None
+
+
+
+def _parseDecl(strTmp):
+    """Converts a Decl (xxxd yym zz.zzs) entered by the user, returning None if it is invalid"""
+    declObj = ASTAngle.isValidAngle(strTmp,HIDE_ERRORS)
+    return declObj.getDecAngle() if (declObj.isValidAngleObj()) else None
+
+
+
+def listObjsByFilter(gui):
+    """
+    Shows all space objects that satisfy a combination of conditions:
+    a constellation, a range of visual magnitudes, a range of RA, a range
+    of Decl, and a prefix for the object's name. Conditions left blank
+    are not checked.
+    
+    :param tkwidget gui: GUI object from which the request came
+    """
+    prt = BufferedPrt.BufferedPrt(gui.getPrtInstance())
+     
+    if (not CatalogStore.isCatalogLoaded()):
+        ASTMsg.errMsg("No catalog is currently loaded.", "No Catalog Loaded")
+        return
+    
+    if (ASTQuery.showQueryForm(["Enter Constellation's 3 Character Abbreviated Name\n(leave blank for any)",
+                                "Enter range of visual magnitudes as 'brightest, faintest'\n(ex: ', 6' for mV <= 6)",
+                                "Enter range of Right Ascensions as 'start, end'\n(ex: '5:00:00, 6:00:00')",
+                                "Enter range of Declinations as 'lowest, highest'\n(ex: '-10d, 10d')",
+                                "Enter the start of the Object's Name\n(leave blank for any)"]) != ASTQuery.QUERY_OK):
+        return
+    
+    constIdx = None
+    strTmp = ASTQuery.getData(1)
+    if ((strTmp != None) and (len(strTmp.strip()) > 0)):
+        constIdx = ASTConstellation.findConstellationByAbbrvName(strTmp.strip())
+        if (constIdx < 0):
+            ASTMsg.errMsg("No Constellation whose abbreviated name is '" + strTmp + "' was found", "Invalid Constellation")
+            return
+    
+    mVRange = _parseRange(ASTQuery.getData(2),_parseMagnitude)
+    if (mVRange == None):
+        ASTMsg.errMsg("The magnitude range entered is invalid - try again.", "Invalid Magnitude")
+        return
+    raRange = _parseRange(ASTQuery.getData(3),_parseRA)
+    if ((raRange == None) or ((raRange[0] == None) != (raRange[1] == None))):
+        ASTMsg.errMsg("The RA range entered is invalid - try again.", "Invalid RA")
+        return
+    declRange = _parseRange(ASTQuery.getData(4),_parseDecl)
+    if (declRange == None):
+        ASTMsg.errMsg("The Declination range entered is invalid - try again.", "Invalid Decl")
+        return
+    
+    catFilter = CatalogFilter.CatalogFilter(constIdx,mVRange[0],mVRange[1],raRange[0],raRange[1],
+                                            declRange[0],declRange[1],ASTQuery.getData(5))
+    
+    MenuStats.markPhase(MenuStats.PHASE_COMPUTE)
+    prt.clearTextArea()
+    
+    iResult = catFilter.apply()
+    
+    MenuStats.markPhase(MenuStats.PHASE_RENDER)
+    desc = catFilter.describe()
+    _displayObjList(gui,prt,desc if (len(desc) > 0) else "in the catalog",iResult)
+    prt.resetCursor()
+
+
+
 def listAllObjsInCatalog(gui):
     """
     Shows all catalog information, including space objects,
@@ -506,18 +1076,26 @@ def listAllObjsInCatalog(gui):
 
     :param tkwidget gui: GUI object from which the request came
     """
-    prt = gui.getPrtInstance()    
+    prt = BufferedPrt.BufferedPrt(gui.getPrtInstance())
      
-    if (not ASTCatalog.isCatalogLoaded()):
+    if (not CatalogStore.isCatalogLoaded()):
         ASTMsg.errMsg("No catalog is currently loaded.", "No Catalog Loaded")
         return
     
+    MenuStats.markPhase(MenuStats.PHASE_RENDER)
+    _setLastListed(None,None)
     prt.clearTextArea()
-    ASTCatalog.displayCatalogInfo()
+    CatalogStore.displayCatalogInfo(prt)
     prt.setFixedWidthFont()
     prt.println("*"*80)    
-    ASTCatalog.displayAllCatalogObjects()        
-    prt.setProportionalFont()
+    if (CatalogStore.getCatNumObjs() > CatalogPager.PAGED_LISTING_THRESHOLD):
+        # Large catalogs go in a window that only formats the rows being looked at
+        CatalogPager.VirtualCatalogView(gui,"All Objects in the Catalog",CatalogPager.CatalogPager())
+        prt.setProportionalFont()
+        prt.println("The catalog's objects are shown in a separate scrollable window")
+    else:
+        CatalogStore.displayAllCatalogObjects(prt)        
+        prt.setProportionalFont()
     prt.resetCursor()
 
 
@@ -530,7 +1108,7 @@ def listObjByAltName(gui):
     """
     prt = gui.getPrtInstance()    
      
-    if (not ASTCatalog.isCatalogLoaded()):
+    if (not CatalogStore.isCatalogLoaded()):
         ASTMsg.errMsg("No catalog is currently loaded.", "No Catalog Loaded")
         return
     
@@ -541,12 +1119,18 @@ def listObjByAltName(gui):
     if ((searchStr == None) or (len(searchStr) <= 0)):
         return
     
+    MenuStats.markPhase(MenuStats.PHASE_COMPUTE)
     prt.clearTextArea()
-    idx = ASTCatalog.findObjByAltName(searchStr.strip())
+    idx = CatalogStore.findObjByAltName(searchStr.strip())
+    MenuStats.markPhase(MenuStats.PHASE_RENDER)
     if (idx < 0):
-        prt.println("No object whose alternate name is '" + searchStr + "' was found in the catalog")
+        suggestions = CatalogStore.suggestObjNames(searchStr.strip(),byAltName=True)
+        k = _offerSuggestions(prt,"No object whose alternate name is '" + searchStr + "' was found in the catalog",
+                              suggestions)
+        if (k >= 0):
+            CatalogStore.displayFullObjInfo(prt,CatalogStore.findObjByAltName(suggestions[k]))
     else:
-        ASTCatalog.displayFullObjInfo(idx)
+        CatalogStore.displayFullObjInfo(prt,idx)
         
     prt.resetCursor()
 
@@ -559,9 +1143,9 @@ def listObjByComments(gui):
 
     :param tkwidget gui: GUI object from which the request came
     """
-    prt = gui.getPrtInstance()    
+    prt = BufferedPrt.BufferedPrt(gui.getPrtInstance())
      
-    if (not ASTCatalog.isCatalogLoaded()):
+    if (not CatalogStore.isCatalogLoaded()):
         ASTMsg.errMsg("No catalog is currently loaded.", "No Catalog Loaded")
         return
     
@@ -572,10 +1156,13 @@ def listObjByComments(gui):
     if ((searchStr == None) or (len(searchStr) <= 0)):
         return
     
+    MenuStats.markPhase(MenuStats.PHASE_COMPUTE)
     prt.clearTextArea()
 
-    iResult = ASTCatalog.findObjsByComments(searchStr.strip())
+    iResult = CatalogStore.findObjsByComments(searchStr.strip())
+    _setLastListed("with the substring '" + searchStr + "' in their 'Comments' field",iResult)
     
+    MenuStats.markPhase(MenuStats.PHASE_RENDER)
     n = len(iResult)
     
     if (n <= 0):
@@ -592,7 +1179,7 @@ def listObjByComments(gui):
             prt.println("*"*80)
             prt.setProportionalFont()
             prt.println("Object # " + str(i+1))
-            ASTCatalog.displayFullObjInfo(iResult[i])
+            CatalogStore.displayFullObjInfo(prt,iResult[i])
 
     prt.resetCursor()
 
@@ -606,7 +1193,7 @@ def listObjByName(gui):
     """
     prt = gui.getPrtInstance()    
      
-    if (not ASTCatalog.isCatalogLoaded()):
+    if (not CatalogStore.isCatalogLoaded()):
         ASTMsg.errMsg("No catalog is currently loaded.", "No Catalog Loaded")
         return
     
@@ -617,12 +1204,17 @@ def listObjByName(gui):
     if ((searchStr == None) or (len(searchStr) <= 0)):
         return    
  
+    MenuStats.markPhase(MenuStats.PHASE_COMPUTE)
     prt.clearTextArea()
-    idx = ASTCatalog.findObjByName(searchStr.strip())
+    idx = CatalogStore.findObjByName(searchStr.strip())
+    MenuStats.markPhase(MenuStats.PHASE_RENDER)
     if (idx < 0):
-        prt.println("No object named '" + searchStr + "' was found in the catalog")
+        suggestions = CatalogStore.suggestObjNames(searchStr.strip())
+        k = _offerSuggestions(prt,"No object named '" + searchStr + "' was found in the catalog",suggestions)
+        if (k >= 0):
+            CatalogStore.displayFullObjInfo(prt,CatalogStore.findObjByName(suggestions[k]))
     else:
-        ASTCatalog.displayFullObjInfo(idx)
+        CatalogStore.displayFullObjInfo(prt,idx)
     
     prt.resetCursor()    
 
@@ -631,7 +1223,8 @@ def listObjByName(gui):
 def sortCatalog(gui,sortField):
     """
     Sorts the currently loaded catalog in ascending or descending
-    order depending upon the sort checkbox in the GUI.
+    order depending upon the sort checkbox in the GUI. The sort is
+    done in the background.
 
     :param tkwidget gui: GUI object from which the request came
     :param CatalogSortFiedl sortField      which field to sort on.
@@ -639,9 +1232,11 @@ def sortCatalog(gui,sortField):
     prt = gui.getPrtInstance()
     sortOrder = gui.getSortOrderChkbox()
             
-    if (not ASTCatalog.isCatalogLoaded()):
+    if (not CatalogStore.isCatalogLoaded()):
         ASTMsg.errMsg("No catalog is currently loaded.", "No Catalog Loaded")
         return
+    if not (_checkNotBusy(gui)):
+        return
      
     prt.clearTextArea()
     prt.printnoln("You have elected to sort the catalog in ")
@@ -651,10 +1246,23 @@ def sortCatalog(gui,sortField):
         prt.printnoln("descending")
     prt.println(" order by " + sortField.toStr()+" ... ")  
     prt.println()
-     
-    ASTCatalog.sortStarCatalog(sortField,sortOrder)
-    prt.println("The catalog has now been sorted ...")
     prt.resetCursor()
+    
+    def onDone(prepared):
+        installed = CatalogStore.installSort(prepared,sortOrder)
+        MenuStats.markPhase(MenuStats.PHASE_RENDER)
+        if (installed):
+            prt.println("The catalog has now been sorted ...")
+        else:
+            prt.println("A different catalog was loaded, so the sort was discarded ...")
+        prt.resetCursor()
+        
+    def onError(e):
+        ASTMsg.errMsg("The catalog could not be sorted.", "Sort Failed")
+     
+    MenuStats.markPhase(MenuStats.PHASE_COMPUTE)
+    CatalogWorker.getCatalogWorker(gui).submit("Sort catalog",lambda job: CatalogStore.prepareSort(sortField),
+                                               onDone,onError)
 
 
 
@@ -0,0 +1,203 @@
+"""
+Remembers the results of catalog and constellation searches.
+
+The same searches (e.g., for an object's name or for a word in the
+comments) tend to be repeated many times while the catalog stays the
+same. Each search result is kept in a cache keyed by the search, its
+normalized arguments, and the version of the catalog it was computed
+for. The catalog's version changes whenever a catalog is loaded or
+cleared, it is sorted, or its objects' constellations are changed, so
+a result is never used for a catalog other than the one it came from.
+When the version changes, the results for the old version are dropped.
+A program that switches between several catalogs gives each catalog
+a cache of its own (see setQueryCache).
+
+The cache has a budget for the total size of the results it holds,
+where a result's size is the number of items in it (e.g., the number
+of object indices in a list). When the budget is exceeded, the results
+that were used least recently are dropped. The cache also counts its
+hits and misses so that its effectiveness can be checked.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+from array import array
+from collections import OrderedDict
+import threading
+
+# Default budget for the total size of the cached results
+DEFAULT_SIZE_BUDGET = 1000000
+
+#==================================================
+# Query cache
+#==================================================
+
+def _resultSize(stored):
+    """Returns how much of the budget a stored result takes"""
+    value = stored[1]
+    return max(len(value), 1) if hasattr(value, "__len__") else 1
+
+
+
+def _store(result):
+    """
+    Gets what is kept in the cache for a result. Lists and arrays are
+    copied (lists as tuples) so that a caller changing the result it
+    was given cannot change the cache.
+    """
+    if isinstance(result, list):
+        return (list, tuple(result))
+    if isinstance(result, array):
+        return (array, result[:])
+    return (None, result)
+
+
+
+def _retrieve(stored):
+    """Gets a copy of a cached result of the type that was originally returned"""
+    kind, value = stored
+    if (kind == list):
+        return list(value)
+    if (kind == array):
+        return value[:]
+    return value
+
+
+
+class QueryCache():
+    """LRU cache of search results for one version of the catalog"""
+
+    def __init__(self,sizeBudget=DEFAULT_SIZE_BUDGET):
+        """
+        :param int sizeBudget: total size of the results to keep
+        """
+        self.sizeBudget = sizeBudget
+        self.entries = OrderedDict()
+        self.size = 0
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _setVersion(self,version):
+        """
+        Drops every result if the catalog's version has changed. Versions
+        only increase, so a search of an older version (e.g., one that was
+        started in another thread before the catalog changed) changes nothing.
+        """
+        if ((self.version == None) or (version > self.version)):
+            self.entries.clear()
+            self.size = 0
+            self.version = version
+
+    def _evict(self):
+        """Drops the least recently used results until the cache is within its budget"""
+        while ((self.size > self.sizeBudget) and (len(self.entries) > 0)):
+            key, (stored, size) = self.entries.popitem(last=False)
+            self.size = self.size - size
+            self.evictions = self.evictions + 1
+
+    def lookup(self,op,args,version,compute):
+        """
+        Gets the result of a search, computing it if it is not cached.
+
+        :param str op: name of the search
+        :param tuple args: the search's arguments, normalized so that
+                           equivalent searches have the same arguments
+        :param int version: version of the catalog being searched
+        :param function compute: called with no arguments to do the search
+        :return: the search's result. Lists and arrays are copies that the
+                 caller is free to change.
+        """
+        key = (op, args)
+        with self.lock:
+            self._setVersion(version)
+            entry = self.entries.get(key) if (version == self.version) else None
+            if (entry != None):
+                self.entries.move_to_end(key)
+                self.hits = self.hits + 1
+                return _retrieve(entry[0])
+            self.misses = self.misses + 1
+
+        # The search is done without holding the lock, and its result is
+        # only kept if the catalog did not change while it was being done
+        result = compute()
+        stored = _store(result)
+        size = _resultSize(stored)
+        with self.lock:
+            if ((version == self.version) and (size <= self.sizeBudget) and not (key in self.entries)):
+                self.entries[key] = (stored, size)
+                self.size = self.size + size
+                self._evict()
+        return result
+
+    def clear(self):
+        """Drops every cached result"""
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def setSizeBudget(self,sizeBudget):
+        """
+        Sets the budget for the total size of the cached results,
+        dropping results if the cache is now over budget.
+
+        :param int sizeBudget: total size of the results to keep
+        """
+        with self.lock:
+            self.sizeBudget = sizeBudget
+            self._evict()
+
+    def getStats(self):
+        """
+        Gets the cache's statistics.
+
+        :return: dictionary with the number of hits, misses, and evictions,
+                 the hit rate, and the number and total size of the cached results
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "hitRate": (self.hits / lookups) if (lookups > 0) else 0.0,
+                    "entries": len(self.entries), "size": self.size, "sizeBudget": self.sizeBudget}
+
+    def resetStats(self):
+        """Sets the hit, miss, and eviction counts back to 0"""
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+
+
+# The cache that the catalog and constellation searches share
+_queryCache = QueryCache()
+
+def getQueryCache():
+    """Returns the cache that the catalog and constellation searches share"""
+    return _queryCache
+
+
+
+def setQueryCache(cache):
+    """
+    Makes a cache the one that the catalog and constellation searches
+    share, such as the cache of a catalog being switched back to.
+
+    :param QueryCache cache: the cache
+    """
+    global _queryCache
+    _queryCache = cache
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    pass
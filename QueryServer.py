@@ -0,0 +1,472 @@
+"""
+Serves catalog and constellation queries from catalogs that are kept
+loaded in memory.
+
+Every program that runs the operations in BatchDriver has to load its
+catalog first, which takes far longer than answering a query. The
+server loads one or more catalogs once and then answers queries from
+any number of clients over a UNIX socket or a localhost TCP port, e.g.,
+
+    python -m Chap1.QueryServer --socket /tmp/catalog.sock --catalog messier.dat
+    python -m Chap1.QueryServer --port 7070 --catalog stars=hd.dat,sao.dat --catalog messier.dat
+
+The protocol is the same JSON lines that BatchDriver reads from stdin:
+a client sends one request per line, such as
+
+    {"id": 1, "op": "objByName", "name": "M31"}
+
+and gets back one line with the response. A line may instead hold a
+JSON array of requests, which are carried out together and answered
+with one line holding an array of responses. Clients may send many
+requests without waiting for the responses (pipelining), and the
+responses come back in the order the requests were sent. When a client
+has too many requests waiting to be answered, the server stops reading
+from it until it has caught up, so a client that sends faster than it
+reads cannot make the server run out of memory.
+
+Only the operations that look at a catalog are served. Those that change
+or share the catalog (load, clear, attach, publish, sort, retagConsts) or
+write files (export) would affect every other client, so they are
+refused. If more than one catalog is loaded, a request picks one with
+its 'catalog' parameter; otherwise the first catalog is used. Each
+catalog keeps its own sort orders, precessed coordinates, and search
+result cache while the others are in use. The server also answers the
+'catalogs' operation, which lists the loaded catalogs, and 'serverStats'.
+
+The catalog is only ever touched by one thread, just as the GUI only
+touches it from the GUI thread, so the requests from all of the clients
+are carried out one at a time. Each takes a millisecond or so, and
+reading and writing the clients' sockets overlaps with them.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+import asyncio
+from collections import OrderedDict
+import concurrent.futures
+import json
+import os
+import socket
+import sys
+
+import Chap1.BatchDriver as BatchDriver
+import Chap1.CatalogStore as CatalogStore
+import Chap1.LazyImport as LazyImport
+
+# Only needed when the module is run from the command line
+argparse = LazyImport.lazyImport("argparse")
+
+# Default host for a TCP server. Only local clients can reach it.
+DEFAULT_HOST = "127.0.0.1"
+
+# Default number of requests from one client that can be waiting to be
+# answered before the server stops reading from the client
+DEFAULT_MAX_PENDING = 64
+
+# Most requests that one line may hold
+DEFAULT_MAX_BATCH = 1000
+
+# Longest line, in bytes, that a client may send
+MAX_LINE_LENGTH = 1024 * 1024
+
+# BatchDriver operations that are not served because they change the
+# catalog, share it, or write files
+REFUSED_OPERATIONS = ("load", "clear", "attach", "publish", "sort", "retagConsts", "export")
+
+#==================================================
+# Resident catalogs
+#==================================================
+
+class QueryServer():
+    """Answers requests from clients using catalogs kept in memory"""
+
+    def __init__(self,maxPending=DEFAULT_MAX_PENDING,maxBatch=DEFAULT_MAX_BATCH):
+        """
+        :param int maxPending: number of requests from one client that can be
+                               waiting to be answered
+        :param int maxBatch: most requests that one line may hold
+        """
+        self.maxPending = maxPending
+        self.maxBatch = maxBatch
+        self.catalogs = OrderedDict()           # name -> PreparedCatalog
+        self.states = {}                        # name -> CatalogState of the catalogs put aside
+        self.current = None                     # name of the catalog installed in CatalogStore
+        self.operations = dict((name, op) for name, op in BatchDriver.OPERATIONS.items()
+                               if not (name in REFUSED_OPERATIONS))
+        self.operations["catalogs"] = self.opCatalogs
+        self.operations["serverStats"] = self.opServerStats
+        # Every request is carried out in this one thread
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1,thread_name_prefix="QueryServer")
+        self.server = None
+        self.numConnections = 0
+        self.numRequests = 0
+        self.numFailures = 0
+
+    def loadCatalog(self,name,filenames,lazy=None):
+        """
+        Loads a catalog and keeps it in memory. This should be done
+        before the server is started.
+
+        :param str name: name that requests use to pick the catalog
+        :param list filenames: full pathnames of the catalog data files, which
+                               are merged into one catalog if there are several
+        :param bool lazy: whether to load the catalog lazily (None means use
+                          CatalogStore's setting)
+        :raises OSError, ValueError: if the catalog could not be loaded
+        """
+        prepared = CatalogStore.prepareFormattedStarCatalogs(filenames,False,None,None,lazy)
+        self.catalogs[name] = prepared
+        if (self.current == None):
+            self._install(name)
+
+    def _install(self,name):
+        """
+        Makes one of the loaded catalogs CatalogStore's current catalog. The
+        catalog that was current is put aside with everything CatalogStore
+        worked out for it, ready to be switched back to.
+        """
+        if (name == self.current):
+            return
+        state = self.states.pop(name, None)
+        saved = CatalogStore.switchCatalogState(state)
+        if (self.current != None):
+            self.states[self.current] = saved
+        if (state == None):
+            CatalogStore.installPreparedCatalog(self.catalogs[name])
+        self.current = name
+
+    #==================================================
+    # Server operations
+    #==================================================
+
+    def opCatalogs(self,params):
+        """Lists the loaded catalogs"""
+        default = next(iter(self.catalogs), None)
+        return [{"name": name, "files": prepared.filenames, "numObjs": len(prepared.catalog),
+                 "default": name == default} for name, prepared in self.catalogs.items()]
+
+    def opServerStats(self,params):
+        """Gets the number of clients and requests the server has had, and each catalog's search cache statistics"""
+        cache = dict((name, state.queryCache.getStats()) for name, state in self.states.items())
+        if (self.current != None):
+            cache[self.current] = CatalogStore.getQueryCacheStats()
+        return {"connections": self.numConnections, "requests": self.numRequests,
+                "failures": self.numFailures, "catalogs": list(self.catalogs),
+                "cache": dict((name, cache[name]) for name in self.catalogs if (name in cache))}
+
+    #==================================================
+    # Carrying out requests (in the executor's thread)
+    #==================================================
+
+    def execute(self,request):
+        """
+        Carries out one request.
+
+        :param dict request: the operation name in 'op', the catalog to use
+                             in the optional 'catalog', plus the operation's
+                             parameters
+        :return: the response, as for BatchDriver.execute
+        """
+        response = {}
+        if ("id" in request):
+            response["id"] = request["id"]
+        opName = request.get("op")
+        # A name that is not a string (e.g., a list) cannot be looked up
+        op = self.operations.get(opName) if isinstance(opName, str) else None
+        name = request.get("catalog")
+        if (op == None):
+            response["ok"] = False
+            if (opName in REFUSED_OPERATIONS):
+                response["error"] = "The operation '" + str(opName) + "' is not served"
+            else:
+                response["error"] = "Unknown operation '" + str(opName) + "'"
+        elif ((name != None) and not (isinstance(name, str) and (name in self.catalogs))):
+            response["ok"] = False
+            response["error"] = "No catalog named '" + str(name) + "' is loaded"
+        else:
+            if (len(self.catalogs) > 0):
+                self._install(next(iter(self.catalogs)) if (name == None) else name)
+            try:
+                response["result"] = op(request)
+                response["ok"] = True
+            except BatchDriver.BatchError as e:
+                response["ok"] = False
+                response["error"] = str(e)
+            except Exception as e:
+                # One bad request (e.g., a lazily loaded catalog's data file
+                # having gone away) must not take the server down
+                response["ok"] = False
+                response["error"] = type(e).__name__ + ": " + str(e)
+        self.numRequests = self.numRequests + 1
+        if not (response["ok"]):
+            self.numFailures = self.numFailures + 1
+        return response
+
+    def handleLine(self,line):
+        """
+        Carries out the request or batch of requests on one line from a client.
+
+        :param bytes line: the line, without its line ending
+        :return: the encoded response line, including its line ending
+        """
+        try:
+            requests = json.loads(line)
+            if isinstance(requests, list):
+                if (len(requests) > self.maxBatch):
+                    raise ValueError("a batch may hold at most " + str(self.maxBatch) + " requests")
+                if not all(isinstance(r, dict) for r in requests):
+                    raise ValueError("each request in a batch must be a JSON object")
+            elif not isinstance(requests, dict):
+                raise ValueError("request must be a JSON object or an array of them")
+        except ValueError as e:
+            self.numRequests = self.numRequests + 1
+            self.numFailures = self.numFailures + 1
+            response = {"ok": False, "error": "Invalid request: " + str(e)}
+        else:
+            if isinstance(requests, list):
+                response = [self.execute(r) for r in requests]
+            else:
+                response = self.execute(requests)
+        try:
+            return (BatchDriver.toJSON(response) + "\n").encode("utf-8")
+        except (TypeError, ValueError) as e:
+            error = {"ok": False, "error": "The response could not be encoded: " + str(e)}
+            return (BatchDriver.toJSON(error) + "\n").encode("utf-8")
+
+    #==================================================
+    # Talking to clients
+    #==================================================
+
+    async def _writeResponses(self,pending,writer):
+        """
+        Sends a client the responses to its requests, in the order the
+        requests came in. If the client goes away, the rest of the
+        responses are thrown away.
+        """
+        connected = True
+        while True:
+            future = await pending.get()
+            if (future == None):
+                break
+            data = await future
+            if not (connected):
+                continue
+            try:
+                writer.write(data)
+                # Waits while the client is slow to read what it was sent
+                await writer.drain()
+            except (ConnectionError, OSError):
+                connected = False
+                writer.close()
+
+    async def _handleClient(self,reader,writer):
+        """Reads a client's requests and hands them to the executor as they come in"""
+        self.numConnections = self.numConnections + 1
+        loop = asyncio.get_running_loop()
+        pending = asyncio.Queue(self.maxPending)
+        writerTask = asyncio.ensure_future(self._writeResponses(pending,writer))
+        try:
+            while not (writer.is_closing()):
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # The line is longer than MAX_LINE_LENGTH, so the rest of
+                    # what the client sends cannot be split into lines
+                    error = {"ok": False, "error": "Invalid request: line is too long"}
+                    future = loop.create_future()
+                    future.set_result((BatchDriver.toJSON(error) + "\n").encode("utf-8"))
+                    await pending.put(future)
+                    break
+                except (ConnectionError, OSError):
+                    break
+                if (len(line) <= 0):
+                    break
+                line = line.strip()
+                if (len(line) <= 0):
+                    continue
+                # When too many requests are waiting, this waits too, and the
+                # client's requests back up in the socket instead of in memory
+                await pending.put(loop.run_in_executor(self.executor,self.handleLine,line))
+        finally:
+            await pending.put(None)
+            await writerTask
+            writer.close()
+
+    async def start(self,socketPath=None,host=DEFAULT_HOST,port=None):
+        """
+        Starts listening for clients.
+
+        :param str socketPath: UNIX socket to listen on
+        :param str host: host to listen on if socketPath is None
+        :param int port: TCP port to listen on if socketPath is None (0 picks a free port)
+        :return: the asyncio server
+        """
+        if (socketPath != None):
+            self.server = await asyncio.start_unix_server(self._handleClient,path=socketPath,limit=MAX_LINE_LENGTH)
+        else:
+            self.server = await asyncio.start_server(self._handleClient,host,port,limit=MAX_LINE_LENGTH)
+        return self.server
+
+    def getAddress(self):
+        """Returns the socket path or the (host, port) that the server is listening on"""
+        return self.server.sockets[0].getsockname()
+
+    async def serve(self,socketPath=None,host=DEFAULT_HOST,port=None):
+        """Listens for clients until the server is closed, with the same parameters as start()"""
+        await self.start(socketPath,host,port)
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            if ((socketPath != None) and os.path.exists(socketPath)):
+                os.remove(socketPath)
+
+    def close(self):
+        """Stops listening for clients and shuts down the executor"""
+        if (self.server != None):
+            self.server.close()
+        self.executor.shutdown(wait=False)
+
+
+
+#==================================================
+# Client
+#==================================================
+
+class QueryClient():
+    """Sends requests to a QueryServer and waits for the responses"""
+
+    def __init__(self,socketPath=None,host=DEFAULT_HOST,port=None,timeout=None):
+        """
+        :param str socketPath: UNIX socket the server is listening on
+        :param str host: host the server is listening on if socketPath is None
+        :param int port: TCP port the server is listening on if socketPath is None
+        :param float timeout: seconds to wait for a response, or None to wait forever
+        """
+        if (socketPath != None):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(socketPath)
+        else:
+            self.sock = socket.create_connection((host, port), timeout)
+        self.fin = self.sock.makefile("rb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,excType,excValue,traceback):
+        self.close()
+
+    def _readResponse(self):
+        line = self.fin.readline()
+        if (len(line) <= 0):
+            raise ConnectionError("The server closed the connection")
+        return json.loads(line)
+
+    def request(self,op,**params):
+        """
+        Carries out one request.
+
+        :param str op: name of the operation
+        :param params: the operation's parameters
+        :return: the response, a dictionary with 'ok' and 'result' or 'error'
+        """
+        params["op"] = op
+        self.sock.sendall((json.dumps(params) + "\n").encode("utf-8"))
+        return self._readResponse()
+
+    def requestMany(self,requests,batch=False):
+        """
+        Carries out several requests, sending them all before reading any
+        of the responses.
+
+        :param list requests: the requests, each a dictionary with 'op' and its parameters
+        :param bool batch: if True, the requests are sent on one line as a batch
+        :return: list of the responses, in the same order as the requests
+        """
+        if (batch):
+            self.sock.sendall((json.dumps(requests) + "\n").encode("utf-8"))
+            return self._readResponse()
+        data = "".join(json.dumps(r) + "\n" for r in requests).encode("utf-8")
+        # Reading the responses while sending keeps a long run of requests
+        # from filling both directions of the connection
+        responses = []
+        sent = 0
+        while (sent < len(data)):
+            sent = sent + self.sock.send(data[sent:sent + 65536])
+        while (len(responses) < len(requests)):
+            responses.append(self._readResponse())
+        return responses
+
+    def close(self):
+        """Closes the connection to the server"""
+        self.fin.close()
+        self.sock.close()
+
+
+
+#==================================================
+# Command line
+#==================================================
+
+def _parseCatalogArg(value):
+    """Splits a --catalog argument of the form [name=]file[,file...] into its name and files"""
+    name, sep, files = value.partition("=")
+    if (len(sep) <= 0):
+        files = name
+        name = None
+    filenames = [f.strip() for f in files.split(",") if (len(f.strip()) > 0)]
+    if (name == None):
+        name = os.path.splitext(os.path.basename(filenames[0]))[0] if (len(filenames) > 0) else ""
+    return name.strip(), filenames
+
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Serve catalog and constellation queries from catalogs " +
+                                     "kept in memory, as JSON lines over a UNIX socket or a local TCP port.")
+    where = parser.add_mutually_exclusive_group(required=True)
+    where.add_argument("--socket", help="UNIX socket to listen on")
+    where.add_argument("--port", type=int, help="TCP port to listen on")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="host to listen on with --port (default %(default)s)")
+    parser.add_argument("--catalog", action="append", default=[], metavar="[NAME=]FILE[,FILE...]",
+                        help="catalog to load, merging the files if there are several (may be repeated)")
+    parser.add_argument("--lazy", action="store_true",
+                        help="read the objects' comments from the catalog files only when they are needed")
+    parser.add_argument("--cache-budget", type=int, default=None, dest="cacheBudget",
+                        help="number of object indices to keep in each catalog's cached search results " +
+                        "(0 to not cache them)")
+    parser.add_argument("--max-pending", type=int, default=DEFAULT_MAX_PENDING, dest="maxPending",
+                        help="requests from one client that can wait to be answered (default %(default)s)")
+    args = parser.parse_args(argv)
+
+    if (args.cacheBudget != None):
+        CatalogStore.setQueryCacheBudget(args.cacheBudget)
+    server = QueryServer(args.maxPending)
+    for value in args.catalog:
+        name, filenames = _parseCatalogArg(value)
+        if ((len(filenames) <= 0) or (name in server.catalogs)):
+            parser.error("each --catalog needs at least one file and a name of its own")
+        try:
+            server.loadCatalog(name,filenames,True if args.lazy else None)
+        except (OSError, ValueError) as e:
+            sys.stderr.write("Could not load the catalog data from " + ", ".join(filenames) + ": " + str(e) + "\n")
+            return 1
+
+    try:
+        asyncio.run(server.serve(args.socket,args.host,args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    sys.exit(main())
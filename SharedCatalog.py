@@ -0,0 +1,407 @@
+"""
+Shares a loaded catalog with other processes through shared memory.
+
+When catalog queries are spread over a pool of worker processes, each
+worker would otherwise load the catalog itself and keep its own copy,
+so the time to load it and the memory it takes are multiplied by the
+number of workers. Instead, the process that loaded the catalog can
+publish it. Its columns and string tables are copied once into a
+shared memory segment, and the workers attach to the segment by name.
+An attached catalog's columns are read-only views directly into the
+segment, so nothing is copied and every worker uses the same memory.
+Each worker still builds its own indexes (e.g., for looking up names)
+when it attaches, since those are Python objects.
+
+The segment holds the same kind of layout as a compiled catalog file:
+a small control block, a JSON description of the catalog, and each
+column aligned on 8 bytes. A catalog loaded lazily is shared with the
+offsets of its objects in the catalog data files, and the processes
+that attach to it read the comments from the data files themselves.
+
+Publishing takes a snapshot of the catalog. When the owner clears the
+catalog or loads another one, the segment is marked as withdrawn and
+unlinked. Processes that are attached to it can still use the data
+they have, since it stays mapped until they let go of it, but they can
+check isWithdrawn() to find out that they should detach. The segment is
+also withdrawn if the owner exits without clearing the catalog.
+
+For example,
+
+    name = CatalogStore.publishCatalog()
+    with multiprocessing.Pool(4, CatalogStore.attachSharedCatalog, (name,)) as pool:
+        ...
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+import atexit
+import json
+from multiprocessing import resource_tracker, shared_memory
+import os
+import struct
+import sys
+
+import Chap1.CatalogStore as CatalogStore
+import Chap1.LazyFields as LazyFields
+
+# Identifies a shared catalog segment and its layout version
+_MAGIC = b"ASTSHM01"
+
+# Magic, whether the segment has been withdrawn, and the length of the
+# JSON description that follows
+_CONTROL = struct.Struct("<8sQQ")
+
+# Values of the withdrawn flag
+_LIVE = 0
+_WITHDRAWN = 1
+
+# Prefix of the names given to the segments that are published
+SEGMENT_PREFIX = "astcat_"
+
+#==================================================
+# Laying out a catalog
+#==================================================
+
+def _pad(n):
+    """Returns the number of bytes needed to align n to an 8 byte boundary"""
+    return (8 - (n % 8)) % 8
+
+
+
+def _bytesOf(data):
+    """Returns a byte view of an array, memoryview, or bytes object"""
+    return memoryview(data).cast('B')
+
+
+
+class _Layout():
+    """Collects the columns of a catalog and where each will be in the segment"""
+
+    def __init__(self):
+        self.columns = {}
+        self.parts = []
+        self.size = 0
+
+    def add(self,name,data,typecode):
+        """Adds a column, given its data and array typecode"""
+        data = _bytesOf(data)
+        self.columns[name] = [self.size, len(data), typecode]
+        self.parts.append(data)
+        self.size = self.size + len(data) + _pad(len(data))
+
+    def addTable(self,prefix,table):
+        """Adds the blob, offsets, and (if it has them) ids of a StringTable"""
+        self.add(prefix + ".offsets", table.offsets, 'q')
+        self.add(prefix + ".blob", table.blob, 'B')
+        if (table.ids != None):
+            self.add(prefix + ".ids", table.ids, 'i')
+
+
+
+def _partOf(idx,partStarts):
+    """Returns which of the merged catalogs an object index is in"""
+    k = 0
+    while ((k + 1 < len(partStarts)) and (partStarts[k + 1] <= idx)):
+        k = k + 1
+    return k
+
+
+
+def _layoutCatalog(cat,filenames,parts):
+    """
+    Lays out a catalog's columns for a segment.
+
+    :return: (layout, description) where description is the JSON-able
+             dictionary that describes the layout
+    """
+    layout = _Layout()
+    layout.add("RA", cat.RA, 'd')
+    layout.add("Decl", cat.Decl, 'd')
+    layout.add("mV", cat.mV, 'd')
+    layout.add("constIdx", cat.constIdx, 'h')
+    if (cat.sourceIdx != None):
+        layout.add("sourceIdx", cat.sourceIdx, 'h')
+    layout.addTable("name", cat.names)
+    layout.addTable("altName", cat.altNames)
+
+    partStarts = [0]
+    for part in parts[:-1]:
+        partStarts.append(partStarts[-1] + len(part))
+    lazyComments = None
+    if CatalogStore.isLazyCatalog(cat):
+        # Each source is either a catalog data file to read the comments
+        # from or a table of comments from a catalog that was not lazy
+        lazyComments = []
+        column = cat.comments
+        for k in range(len(column.sources)):
+            source = column.sources[k]
+            entry = {"part": _partOf(column.starts[k],partStarts), "numObjs": len(source)}
+            if isinstance(source, LazyFields.SourceFieldReader):
+                entry["path"] = source.filename
+                entry["fileKey"] = source.fileKey
+                layout.add("comment." + str(k) + ".offsets", source.offsets, 'q')
+            else:
+                layout.addTable("comment." + str(k), source.table)
+            lazyComments.append(entry)
+    else:
+        layout.addTable("comment", cat.comments)
+
+    desc = {"header": cat.header, "numObjs": len(cat), "filenames": filenames,
+            "parts": [{"header": part.header, "numObjs": len(part)} for part in parts],
+            "lazyComments": lazyComments, "columns": layout.columns}
+    return layout, desc
+
+
+
+#==================================================
+# Shared catalogs
+#==================================================
+
+class SharedCatalog():
+    """
+    A catalog in a shared memory segment, either as published by the
+    process that owns it or as attached to by another process.
+    """
+
+    def __init__(self,name,segment,buf,owner):
+        """
+        :param str name: name of the segment
+        :param SharedMemory segment: the segment
+        :param memoryview buf: the contents of the segment
+        :param bool owner: True if this process published the catalog
+        """
+        self.name = name
+        self.segment = segment
+        self.buf = buf
+        self.owner = owner
+        # A forked child gets a copy of this object, but only the process
+        # that published the catalog may withdraw it
+        self.pid = os.getpid()
+        self.catalog = None
+        self.parts = None
+        self.filenames = None
+
+    def getName(self):
+        """Returns the name that other processes attach to the catalog with"""
+        return self.name
+
+    def isWithdrawn(self):
+        """Returns True if the owner has withdrawn the catalog (or this process has let go of it)"""
+        if (self.segment == None):
+            return True
+        magic, state, descLen = _CONTROL.unpack_from(self.buf, 0)
+        return state != _LIVE
+
+    def withdraw(self):
+        """
+        Called by the owner to stop sharing the catalog. The segment is
+        marked as withdrawn and unlinked, so no more processes can attach
+        to it, and it is freed once every attached process has let go of it.
+        """
+        if ((self.segment == None) or not (self.owner) or (os.getpid() != self.pid)):
+            return
+        shm = self.segment
+        self.segment = None
+        magic, state, descLen = _CONTROL.unpack_from(self.buf, 0)
+        _CONTROL.pack_into(self.buf, 0, magic, _WITHDRAWN, descLen)
+        self.buf = None
+        shm.close()
+        if ((os.name == "posix") and (sys.version_info < (3, 13))):
+            # A process attached to the segment may share this process's
+            # resource tracker (e.g., a pool worker) and so may have taken
+            # the segment off it, which unlink() expects it to be on
+            resource_tracker.register("/" + shm.name, "shared_memory")
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+        atexit.unregister(self.withdraw)
+
+    def detach(self):
+        """
+        Called by an attached process to let go of the catalog. The catalog
+        should no longer be in use (e.g., it has been cleared from CatalogStore).
+        """
+        if ((self.segment == None) or self.owner):
+            return
+        segment = self.segment
+        self.segment = None
+        self.catalog = None
+        self.parts = None
+        self.buf.release()
+        self.buf = None
+        segment.close()
+
+
+
+class _AttachedSegment(shared_memory.SharedMemory):
+    """A segment that another process published, attached to read-only"""
+
+    def close(self):
+        try:
+            super().close()
+        except BufferError:
+            # Something still has a view of one of the columns. The segment
+            # is unmapped when the last view is garbage collected.
+            pass
+
+
+
+def publishCatalog(cat,filenames,parts,name=None):
+    """
+    Copies a catalog into a new shared memory segment.
+
+    :param ColumnarCatalog cat: the catalog
+    :param list filenames: full pathnames of the catalog data files it came from
+    :param list parts: catalog loaded from each file, as for PreparedCatalog
+    :param str name: name to give the segment, or None to make one up
+    :return: the SharedCatalog, owned by this process
+    :raises OSError: if the segment could not be created
+    """
+    layout, desc = _layoutCatalog(cat,filenames,parts)
+    descBytes = json.dumps(desc).encode("utf-8")
+    descBytes = descBytes + b" " * _pad(_CONTROL.size + len(descBytes))
+    base = _CONTROL.size + len(descBytes)
+    if (name == None):
+        name = SEGMENT_PREFIX + str(os.getpid()) + "_" + os.urandom(4).hex()
+    shm = shared_memory.SharedMemory(name,True,max(base + layout.size, 1))
+
+    buf = shm.buf
+    buf[_CONTROL.size:base] = descBytes
+    for colName, data in zip(layout.columns, layout.parts):
+        offset = base + layout.columns[colName][0]
+        buf[offset:offset + len(data)] = data
+    # The magic is written last so that a process attaching while the
+    # segment is being filled never sees a partial catalog
+    _CONTROL.pack_into(buf, 0, _MAGIC, _LIVE, len(descBytes))
+
+    shared = SharedCatalog(name,shm,shm.buf,True)
+    shared.filenames = list(filenames)
+    atexit.register(shared.withdraw)
+    return shared
+
+
+
+def _openSegment(name):
+    """
+    Maps an existing segment into memory read-only.
+
+    :return: (segment, buf) where segment is the SharedMemory to close when done
+             with it and buf is a read-only memoryview of its contents
+    """
+    # The segment belongs to the process that published it, so this process's
+    # resource tracker must not remove it when this process exits
+    if (sys.version_info >= (3, 13)):
+        shm = _AttachedSegment(name,track=False)
+    else:
+        shm = _AttachedSegment(name)
+        if (os.name == "posix"):
+            resource_tracker.unregister("/" + shm.name, "shared_memory")
+    return shm, shm.buf.toreadonly()
+
+
+
+def _tableAt(columns,prefix):
+    """Makes a StringTable over the columns of a table in a segment"""
+    return CatalogStore.StringTable(columns[prefix + ".blob"],columns[prefix + ".offsets"],
+                                    columns.get(prefix + ".ids"))
+
+
+
+def _tableSlice(table,start,end):
+    """Makes a StringTable with the strings of a range of objects, sharing the original's blob"""
+    ids = range(start,end) if (table.ids == None) else table.ids[start:end]
+    return CatalogStore.StringTable(table.blob,table.offsets,ids)
+
+
+
+def attachCatalog(name):
+    """
+    Attaches to a catalog that another process published.
+
+    :param str name: name of the segment
+    :return: the SharedCatalog, whose catalog, parts, and filenames are
+             ready to be made into a PreparedCatalog
+    :raises OSError: if there is no such segment
+    :raises ValueError: if the segment does not hold a catalog or has been withdrawn
+    """
+    segment, buf = _openSegment(name)
+    try:
+        magic, state, descLen = _CONTROL.unpack_from(buf, 0)
+        if (magic != _MAGIC):
+            raise ValueError("'" + name + "' is not a shared catalog")
+        if (state != _LIVE):
+            raise ValueError("The shared catalog '" + name + "' has been withdrawn")
+        desc = json.loads(bytes(buf[_CONTROL.size:_CONTROL.size + descLen]).decode("utf-8"))
+    except (ValueError, struct.error):
+        buf.release()
+        segment.close()
+        raise
+    base = _CONTROL.size + descLen
+
+    columns = {}
+    for colName, (offset, length, typecode) in desc["columns"].items():
+        col = buf[base + offset:base + offset + length]
+        columns[colName] = col if (typecode == 'B') else col.cast(typecode)
+
+    cat = CatalogStore.ColumnarCatalog(desc["header"])
+    cat.RA = columns["RA"]
+    cat.Decl = columns["Decl"]
+    cat.mV = columns["mV"]
+    cat.constIdx = columns["constIdx"]
+    cat.sourceIdx = columns.get("sourceIdx")
+    cat.names = _tableAt(columns,"name")
+    cat.altNames = _tableAt(columns,"altName")
+
+    # The separate catalogs that were merged are slices of the merged one
+    parts = []
+    start = 0
+    for partDesc in desc["parts"]:
+        end = start + partDesc["numObjs"]
+        part = CatalogStore.ColumnarCatalog(partDesc["header"])
+        part.RA = cat.RA[start:end]
+        part.Decl = cat.Decl[start:end]
+        part.mV = cat.mV[start:end]
+        part.constIdx = cat.constIdx[start:end]
+        part.names = _tableSlice(cat.names,start,end)
+        part.altNames = _tableSlice(cat.altNames,start,end)
+        parts.append((part, start, end))
+        start = end
+
+    if (desc["lazyComments"] != None):
+        partComments = [LazyFields.LazyStringColumn() for p in parts]
+        for k in range(len(desc["lazyComments"])):
+            entry = desc["lazyComments"][k]
+            prefix = "comment." + str(k)
+            if ("path" in entry):
+                column = LazyFields.lazyCommentsColumn(entry["path"],columns[prefix + ".offsets"],
+                                                       entry["fileKey"])
+            else:
+                column = _tableAt(columns,prefix)
+            partComments[entry["part"]].extend(column)
+        cat.comments = LazyFields.LazyStringColumn()
+        for k in range(len(parts)):
+            parts[k][0].comments = partComments[k]
+            cat.comments.extend(partComments[k])
+    else:
+        cat.comments = _tableAt(columns,"comment")
+        for part, start, end in parts:
+            part.comments = _tableSlice(cat.comments,start,end)
+
+    shared = SharedCatalog(name,segment,buf,False)
+    shared.catalog = cat
+    shared.parts = [cat] if (len(parts) <= 1) else [part for part, start, end in parts]
+    shared.filenames = desc["filenames"]
+    cat.source = shared
+    for part in shared.parts:
+        part.source = shared
+    return shared
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,255 @@
+"""
+Provides a spatial index for finding catalog objects by position.
+
+Finding every object within some distance of a point on the sky, or
+within a range of RA and Decl, normally means checking every object
+in the catalog. Instead, the sky is divided into a grid of cells of
+roughly equal area: declination is split into bands of equal height,
+and each band is split in RA into as many cells as it takes to make
+the cells about as wide as they are tall. Each object is assigned to
+the cell it falls in, and the objects are grouped by cell. A query
+only has to look at the objects in the cells that overlap the area
+being searched, and those are then checked exactly.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+from array import array
+import math
+
+# Average number of objects per cell that the grid is sized for
+OBJS_PER_CELL = 16
+
+# Limits on the height, in degrees, of a declination band
+MIN_BAND_HEIGHT = 0.05
+MAX_BAND_HEIGHT = 10.0
+
+#==================================================
+# Utility routines
+#==================================================
+
+def angularSeparation(RA1,Decl1,RA2,Decl2):
+    """
+    Computes the angle between two points on the sky.
+
+    :param float RA1: right ascension of the first point, in hours
+    :param float Decl1: declination of the first point, in degrees
+    :param float RA2: right ascension of the second point, in hours
+    :param float Decl2: declination of the second point, in degrees
+    :return: angle in degrees
+    """
+    ra1 = math.radians(15.0 * RA1)
+    ra2 = math.radians(15.0 * RA2)
+    d1 = math.radians(Decl1)
+    d2 = math.radians(Decl2)
+    # Haversine formula, which is accurate for small angles
+    h = math.sin((d2 - d1) / 2.0) ** 2 + math.cos(d1) * math.cos(d2) * math.sin((ra2 - ra1) / 2.0) ** 2
+    return math.degrees(2.0 * math.asin(min(math.sqrt(h), 1.0)))
+
+
+
+def _raIntervals(raStart,raEnd):
+    """
+    Splits an RA range, in degrees, that may wrap through 0 into
+    non-wrapping intervals within [0, 360].
+    """
+    if (raEnd - raStart >= 360.0):
+        return [(0.0, 360.0)]
+    raStart = raStart % 360.0
+    raEnd = raEnd % 360.0
+    if (raStart <= raEnd):
+        return [(raStart, raEnd)]
+    return [(raStart, 360.0), (0.0, raEnd)]
+
+
+
+#==================================================
+# Spatial index
+#==================================================
+
+class SpatialIndex():
+    """Grid index over the RA/Decl of a catalog's objects"""
+
+    def __init__(self,RA,Decl,bandHeight=None):
+        """
+        Build the index.
+
+        :param sequence RA: right ascension of each object, in hours
+        :param sequence Decl: declination of each object, in degrees
+        :param float bandHeight: height of a declination band in degrees. If
+                                 None, it is chosen from the number of objects.
+        """
+        n = len(RA)
+        if (bandHeight == None):
+            # The sky is about 41253 square degrees
+            bandHeight = math.sqrt(41253.0 * OBJS_PER_CELL / max(n, 1))
+        bandHeight = min(max(bandHeight, MIN_BAND_HEIGHT), MAX_BAND_HEIGHT)
+        self.numBands = int(math.ceil(180.0 / bandHeight))
+        self.bandHeight = 180.0 / self.numBands
+
+        # Each band has enough RA cells to make them roughly square
+        self.bandCells = array('i')
+        self.bandStart = array('i', [0])
+        for band in range(self.numBands):
+            lo = -90.0 + band * self.bandHeight
+            maxCos = max(math.cos(math.radians(lo)), math.cos(math.radians(lo + self.bandHeight)))
+            if ((lo < 0.0) and (lo + self.bandHeight > 0.0)):
+                maxCos = 1.0
+            cells = max(int(math.ceil(360.0 * maxCos / self.bandHeight)), 1)
+            self.bandCells.append(cells)
+            self.bandStart.append(self.bandStart[-1] + cells)
+        self.numCells = self.bandStart[-1]
+
+        self.RA = RA
+        self.Decl = Decl
+        # Group the objects by cell with a counting sort
+        cells = array('i', [self._cellFor(RA[i], Decl[i]) for i in range(n)])
+        starts = array('q', bytes(8 * (self.numCells + 1)))
+        for c in cells:
+            starts[c + 1] = starts[c + 1] + 1
+        for c in range(self.numCells):
+            starts[c + 1] = starts[c + 1] + starts[c]
+        order = array('i', bytes(4 * n))
+        nextPos = array('q', starts)
+        for i in range(n):
+            c = cells[i]
+            order[nextPos[c]] = i
+            nextPos[c] = nextPos[c] + 1
+        self.order = order
+        self.starts = starts
+
+    def __len__(self):
+        return len(self.RA)
+
+    def _band(self,Decl):
+        """Returns the band that a declination falls in"""
+        return min(max(int((Decl + 90.0) / self.bandHeight), 0), self.numBands - 1)
+
+    def _cellFor(self,RA,Decl):
+        """Returns the cell that a position (RA in hours) falls in"""
+        band = self._band(Decl)
+        cells = self.bandCells[band]
+        return self.bandStart[band] + min(int((RA % 24.0) / 24.0 * cells), cells - 1)
+
+    def _candidates(self,declLo,declHi,raIntervalsForBand):
+        """
+        Generator for the objects in the cells that overlap an area.
+
+        :param float declLo: lowest declination of the area
+        :param float declHi: highest declination of the area
+        :param function raIntervalsForBand: called with a band number, returns
+                        the RA intervals (in degrees) to search in that band
+        """
+        order = self.order
+        starts = self.starts
+        for band in range(self._band(declLo), self._band(declHi) + 1):
+            cells = self.bandCells[band]
+            first = self.bandStart[band]
+            ranges = []
+            for raLo, raHi in raIntervalsForBand(band):
+                # Include the neighboring cells in case rounding put an
+                # object that is right on a cell boundary in the next cell
+                cLo = max(min(int(raLo / 360.0 * cells), cells - 1) - 1, 0)
+                cHi = min(int(raHi / 360.0 * cells) + 1, cells - 1)
+                if ((len(ranges) > 0) and (cLo <= ranges[-1][1] + 1) and (cHi >= ranges[-1][0] - 1)):
+                    ranges[-1] = (min(cLo, ranges[-1][0]), max(cHi, ranges[-1][1]))
+                else:
+                    ranges.append((cLo, cHi))
+            for cLo, cHi in ranges:
+                for i in range(starts[first + cLo], starts[first + cHi + 1]):
+                    yield order[i]
+
+    def findInCone(self,RA,Decl,radius):
+        """
+        Finds the objects within a given angle of a point.
+
+        :param float RA: right ascension of the center, in hours
+        :param float Decl: declination of the center, in degrees
+        :param float radius: radius of the cone, in degrees
+        :return: sorted list of the indices of the objects in the cone
+        """
+        if (radius < 0.0):
+            return []
+        declLo = max(Decl - radius, -90.0)
+        declHi = min(Decl + radius, 90.0)
+        raCenter = 15.0 * RA
+
+        # The cone is never wider in RA than at the points where its edge
+        # runs north-south, where the half-width is asin(sin(radius) / cos(Decl))
+        if ((declLo <= -90.0) or (declHi >= 90.0)):
+            intervals = [(0.0, 360.0)]
+        else:
+            s = math.sin(math.radians(radius)) / math.cos(math.radians(Decl))
+            if (s >= 1.0):
+                intervals = [(0.0, 360.0)]
+            else:
+                halfWidth = math.degrees(math.asin(s))
+                intervals = _raIntervals(raCenter - halfWidth, raCenter + halfWidth)
+
+        # Compare the straight-line distance between unit vectors with the
+        # chord of the radius. Unlike comparing the cosine of the angle with
+        # the cosine of the radius, this stays accurate for tiny radii.
+        chord = 2.0 * math.sin(math.radians(min(radius, 180.0)) / 2.0)
+        maxDist2 = chord * chord
+        ra0 = math.radians(raCenter)
+        d0 = math.radians(Decl)
+        x0 = math.cos(d0) * math.cos(ra0)
+        y0 = math.cos(d0) * math.sin(ra0)
+        z0 = math.sin(d0)
+        RAs = self.RA
+        Decls = self.Decl
+        result = []
+        for i in self._candidates(declLo,declHi,lambda band: intervals):
+            ra = math.radians(15.0 * RAs[i])
+            d = math.radians(Decls[i])
+            cosD = math.cos(d)
+            dx = cosD * math.cos(ra) - x0
+            dy = cosD * math.sin(ra) - y0
+            dz = math.sin(d) - z0
+            if (dx * dx + dy * dy + dz * dz <= maxDist2):
+                result.append(i)
+        result.sort()
+        return result
+
+    def findInBox(self,RAStart,RAEnd,DeclLo,DeclHi):
+        """
+        Finds the objects within a range of RA and Decl. If RAStart is
+        greater than RAEnd, the range wraps through 0h.
+
+        :param float RAStart: start of the RA range, in hours
+        :param float RAEnd: end of the RA range, in hours
+        :param float DeclLo: lowest declination, in degrees
+        :param float DeclHi: highest declination, in degrees
+        :return: sorted list of the indices of the objects in the box
+        """
+        if (DeclLo > DeclHi):
+            return []
+        intervals = _raIntervals(15.0 * RAStart, 15.0 * RAEnd)
+        wraps = (len(intervals) > 1)
+        raLo = RAStart % 24.0
+        raHi = RAEnd % 24.0
+
+        RAs = self.RA
+        Decls = self.Decl
+        result = []
+        for i in self._candidates(max(DeclLo, -90.0),min(DeclHi, 90.0),lambda band: intervals):
+            d = Decls[i]
+            if ((d < DeclLo) or (d > DeclHi)):
+                continue
+            ra = RAs[i] % 24.0
+            if (wraps):
+                if ((ra >= raLo) or (ra <= raHi)):
+                    result.append(i)
+            elif ((intervals[0][1] >= 360.0) or ((ra >= raLo) and (ra <= raHi))):
+                result.append(i)
+        result.sort()
+        return result
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    pass
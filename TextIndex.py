@@ -0,0 +1,311 @@
+"""
+Provides a trigram inverted index for substring searches.
+
+Searching object comments or constellation meanings for a substring
+normally means scanning every string. Instead, every three character
+sequence (trigram) in each string is recorded in an inverted index
+that maps the trigram to the strings containing it. A substring can
+only occur in strings that contain all of the substring's trigrams,
+so intersecting those lists gives a small set of candidates that are
+then checked directly. The results are exactly the same as a scan.
+
+The index can be limited to a memory budget. When the budget would be
+exceeded, the trigrams that occur in the most strings are left out of
+the index since they do the least to narrow down a search. Searches
+still give the same results, they just have more candidates to check.
+
+There is also a sorted prefix index, which finds the strings that start
+with a prefix (e.g., to complete a name as it is typed) and suggests the
+strings that are closest to one that was not found.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+from array import array
+from bisect import bisect_left
+
+import Chap1.LazyImport as LazyImport
+
+# Only needed for suggesting close matches
+difflib = LazyImport.lazyImport("difflib")
+
+# Default memory budget, in bytes, for the posting lists of an index
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+
+# Approximate number of bytes used by each posting list in addition to its entries
+_POSTING_OVERHEAD = 120
+
+# Default number of completions and suggestions to return
+DEFAULT_COMPLETIONS = 10
+DEFAULT_SUGGESTIONS = 5
+
+# How similar (0 - 1) a string must be to be suggested, how many strings
+# that share a prefix with the one that was not found are compared to it,
+# and how many strings are compared on either side of where each of the
+# strings made by leaving out one of its characters would be
+SUGGESTION_CUTOFF = 0.6
+MAX_SUGGESTION_CANDIDATES = 200
+SUGGESTION_NEIGHBORS = 4
+
+#==================================================
+# Trigram index
+#==================================================
+
+def _trigrams(s):
+    """Returns the set of trigrams in a string"""
+    return set([s[i:i + 3] for i in range(len(s) - 2)])
+
+
+
+class TrigramIndex():
+    """
+    Inverted index from trigrams to the ids of the strings containing
+    them. Strings are normalized (e.g., converted to lower case) before
+    they are indexed, and so are the substrings searched for.
+    """
+
+    def __init__(self,strings,normalize,memoryBudget=DEFAULT_MEMORY_BUDGET):
+        """
+        Build the index.
+
+        :param sequence strings: the strings to index. A string's id is its
+                                 position in this sequence. The sequence is
+                                 kept and used to check candidate strings.
+        :param function normalize: converts a string to the form that is searched
+        :param int memoryBudget: maximum number of bytes to use for posting lists
+        """
+        self.normalize = normalize
+        self.strings = strings
+        postings = {}
+        for docId in range(len(strings)):
+            for tri in _trigrams(normalize(strings[docId])):
+                plist = postings.get(tri)
+                if (plist == None):
+                    plist = array('i')
+                    postings[tri] = plist
+                plist.append(docId)
+
+        # Keep the most selective trigrams that fit in the budget
+        self.postings = {}
+        self.dropped = set()
+        used = 0
+        for tri in sorted(postings, key=lambda t: len(postings[t])):
+            plist = postings[tri]
+            size = _POSTING_OVERHEAD + plist.itemsize * len(plist)
+            if (used + size <= memoryBudget):
+                self.postings[tri] = plist
+                used = used + size
+            else:
+                self.dropped.add(tri)
+        self.memoryUsed = used
+
+    def __len__(self):
+        return len(self.strings)
+
+    def _candidates(self,target):
+        """Returns the ids of strings that may contain target (None means all of them)"""
+        lists = []
+        for tri in _trigrams(target):
+            plist = self.postings.get(tri)
+            if (plist != None):
+                lists.append(plist)
+            elif not (tri in self.dropped):
+                # No string at all contains this trigram
+                return []
+        if (len(lists) <= 0):
+            return None
+
+        lists.sort(key=len)
+        result = set(lists[0])
+        for plist in lists[1:]:
+            if (len(result) <= 0):
+                break
+            result.intersection_update(plist)
+        return sorted(result)
+
+    def search(self,target):
+        """
+        Find the strings that contain a substring.
+
+        :param str target: substring to search for
+        :return: sorted list of ids of the strings that contain target
+        """
+        normalize = self.normalize
+        strings = self.strings
+        target = normalize(target)
+        candidates = self._candidates(target)
+        if (candidates == None):
+            candidates = range(len(strings))
+        return [docId for docId in candidates if (target in normalize(strings[docId]))]
+
+
+
+#==================================================
+# Prefix index
+#==================================================
+
+def checkLimit(limit):
+    """Raises ValueError if a limit on the number of strings to return is less than 1"""
+    if (limit < 1):
+        raise ValueError("The most strings to return must be at least 1, not " + str(limit))
+
+
+
+class PrefixIndex():
+    """
+    Sorted index of normalized strings for finding the strings that
+    start with a prefix. The strings with a prefix are next to each
+    other in sorted order, so they are found with two binary searches.
+    """
+
+    def __init__(self,strings,normalize,isNormalized=False):
+        """
+        Build the index.
+
+        :param sequence strings: the strings to index. A string's id is its
+                                 position in this sequence.
+        :param function normalize: converts a string to the form that is searched
+        :param bool isNormalized: True if the strings have already been normalized
+        """
+        self.normalize = normalize
+        if isNormalized:
+            keys = strings
+        else:
+            keys = [normalize(strings[docId]) for docId in range(len(strings))]
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.keys = [keys[docId] for docId in order]
+        self.ids = array('i', order)
+        self.alphabet = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _range(self,prefix):
+        """Returns the range of positions in sorted order of the strings that start with prefix"""
+        prefix = self.normalize(prefix)
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + "\U0010ffff", lo)
+        return lo, hi
+
+    def count(self,prefix):
+        """
+        Counts the strings that start with a prefix.
+
+        :param str prefix: prefix to search for
+        """
+        lo, hi = self._range(prefix)
+        return hi - lo
+
+    def search(self,prefix):
+        """
+        Find the strings that start with a prefix.
+
+        :param str prefix: prefix to search for
+        :return: ids of the strings, in sorted order of the strings
+        """
+        lo, hi = self._range(prefix)
+        return self.ids[lo:hi]
+
+    def getKeys(self,prefix):
+        """
+        Gets the normalized strings that start with a prefix.
+
+        :param str prefix: prefix to search for
+        :return: list of the normalized strings, in sorted order
+        """
+        lo, hi = self._range(prefix)
+        return self.keys[lo:hi]
+
+    def complete(self,prefix,limit=DEFAULT_COMPLETIONS):
+        """
+        Finds the first few strings that start with a prefix. This only
+        takes two binary searches, however many strings there are.
+
+        :param str prefix: prefix to search for
+        :param int limit: most strings to return
+        :return: ids of the strings, in sorted order of the strings
+        :raises ValueError: if limit is less than 1
+        """
+        checkLimit(limit)
+        lo, hi = self._range(prefix)
+        return self.ids[lo:min(hi, lo + limit)]
+
+    def suggest(self,s,limit=DEFAULT_SUGGESTIONS,cutoff=SUGGESTION_CUTOFF):
+        """
+        Finds the strings that are most like a string, for suggesting what
+        might have been meant when a string is not found. Rather than
+        comparing s to every string, it is compared to the strings that
+        share the longest possible prefix with it, to the strings next
+        to where s would be in sorted order with any one character left out
+        (which finds strings where an extra character was typed), and to
+        the strings that s would be with one character changed, put in, or
+        swapped with the next one. So a string that s is one typing mistake
+        away from is always compared, wherever the mistake is.
+
+        :param str s: the string that was not found
+        :param int limit: most strings to return
+        :param float cutoff: how similar (0 - 1) a string must be to be returned
+        :return: ids of the strings, the most similar first
+        :raises ValueError: if limit is less than 1
+        """
+        checkLimit(limit)
+        key = self.normalize(s)
+        if ((len(key) <= 0) or (len(self.keys) <= 0)):
+            return array('i')
+        # Shorten the prefix until it matches enough strings to choose from
+        n = len(key)
+        lo, hi = self._range(key)
+        while ((n > 1) and (hi - lo < MAX_SUGGESTION_CANDIDATES)):
+            n = n - 1
+            lo, hi = self._range(key[:n])
+        if (hi - lo > MAX_SUGGESTION_CANDIDATES):
+            # Use the strings on either side of where s would be
+            pos = bisect_left(self.keys, key, lo, hi)
+            lo = max(min(pos - MAX_SUGGESTION_CANDIDATES // 2, hi - MAX_SUGGESTION_CANDIDATES), lo)
+            hi = lo + MAX_SUGGESTION_CANDIDATES
+        candidates = set(range(lo,hi))
+        for i in range(len(key)):
+            pos = bisect_left(self.keys, key[:i] + key[i + 1:])
+            candidates.update(range(max(pos - SUGGESTION_NEIGHBORS, 0),min(pos + SUGGESTION_NEIGHBORS, len(self.keys))))
+        for variant in self._typoVariants(key):
+            pos = bisect_left(self.keys, variant)
+            if ((pos < len(self.keys)) and (self.keys[pos] == variant)):
+                candidates.add(pos)
+
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(key)
+        scored = []
+        for pos in candidates:
+            matcher.set_seq1(self.keys[pos])
+            # The quick ratios are upper bounds, so they rule out poor matches cheaply
+            if ((matcher.real_quick_ratio() >= cutoff) and (matcher.quick_ratio() >= cutoff)):
+                score = matcher.ratio()
+                if (score >= cutoff):
+                    scored.append((-score, pos))
+        scored.sort()
+        return array('i', [self.ids[pos] for score, pos in scored[:limit]])
+
+    def _typoVariants(self,key):
+        """
+        Generator for the strings that key would be with one character
+        changed, put in, or swapped with the next one, using the characters
+        that appear in the indexed strings.
+        """
+        if (self.alphabet == None):
+            self.alphabet = sorted(set("".join(self.keys)))
+        for i in range(len(key) + 1):
+            for c in self.alphabet:
+                if ((i < len(key)) and (c != key[i])):
+                    yield key[:i] + c + key[i + 1:]
+                yield key[:i] + c + key[i:]
+            if (i + 1 < len(key)):
+                yield key[:i] + key[i + 1] + key[i] + key[i + 2:]
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    pass
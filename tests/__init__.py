@@ -0,0 +1,12 @@
+"""
+Tests for the catalog and constellation modules. Like the rest of Chap1,
+they need the ASTUtils package, and they are run from the directory that
+holds both Chap1 and ASTUtils, e.g.,
+
+    python -m unittest discover -s Chap1/tests -t .
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
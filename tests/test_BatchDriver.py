@@ -0,0 +1,188 @@
+"""
+Tests the batch front end: that its operations give the same results
+as CatalogStore, and that a bad request fails on its own without
+stopping the requests that come after it.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    import ASTUtils.ASTCatalog as ASTCatalog
+    import ASTUtils.ASTConstellation as ASTConstellation
+    from ASTUtils.ASTMisc import ASCENDING_ORDER, DESCENDING_ORDER
+except ImportError:
+    raise unittest.SkipTest("the ASTUtils package is not installed")
+
+import Chap1.BatchDriver as BatchDriver
+import Chap1.CatalogStore as CatalogStore
+from Chap1.tests.test_CatalogStore import CatalogTestCase, NUM_OBJS
+
+#==================================================
+# Tests
+#==================================================
+
+def _run(lines):
+    """Runs JSON-lines requests, returning the responses and the number that failed"""
+    fout = io.StringIO()
+    failures = BatchDriver.runJSONLines(io.StringIO("\n".join(lines) + "\n"),fout)
+    return [json.loads(line) for line in fout.getvalue().splitlines()], failures
+
+
+
+class TestOperations(CatalogTestCase):
+
+    def _result(self,request):
+        response = BatchDriver.execute(request)
+        self.assertTrue(response["ok"],response.get("error"))
+        return response["result"]
+
+    def testInfo(self):
+        info = self._result({"op": "info"})
+        self.assertEqual(info["numObjs"],NUM_OBJS)
+        self.assertEqual(sum(info["constCounts"].values()),
+                         sum(CatalogStore.getCatConstCounts().values()))
+
+    def testObjByName(self):
+        for idx in self.picks[:20]:
+            obj = CatalogStore.getCatObject(idx)
+            found = self._result({"op": "objByName", "name": " " + obj.name.lower() + " "})
+            self.assertEqual(found["index"],idx)
+            self.assertEqual(found["name"],obj.name)
+        self.assertEqual(self._result({"op": "objByName", "name": "no such object"}),None)
+
+    def testObjsInConst(self):
+        CatalogStore.sortStarCatalog(ASTCatalog.CatalogSortField.OBJNAME,DESCENDING_ORDER)
+        abbrev = ASTConstellation.getConstAbbrevName(0)
+        for order, sortOrder in (("ascending", ASCENDING_ORDER), ("descending", DESCENDING_ORDER)):
+            found = self._result({"op": "objsInConst", "const": abbrev, "order": order})
+            self.assertEqual([obj["index"] for obj in found],list(CatalogStore.getConstMembers(0,sortOrder)))
+
+    def testObjsInRange(self):
+        found = self._result({"op": "objsInRange", "start": 11, "count": 5})
+        self.assertEqual([obj["position"] for obj in found],list(range(10,15)))
+
+    def testFilter(self):
+        found = self._result({"op": "filter", "mVMin": 2, "mVMax": 6, "namePrefix": ""})
+        expected = [idx for idx in range(NUM_OBJS) if (CatalogStore.getCatObject(idx).mV != None) and
+                    (2 <= CatalogStore.getCatObject(idx).mV <= 6)]
+        self.assertEqual(sorted(obj["index"] for obj in found),expected)
+
+    def testComplete(self):
+        names = sorted(CatalogStore.getCatObject(idx).name for idx in range(NUM_OBJS))
+        for prefix in ("SYN 1", "syn12", "SYN 999", "nothing"):
+            key = CatalogStore.normalizeName(prefix)
+            expected = [name for name in names if CatalogStore.normalizeName(name).startswith(key)]
+            expected.sort(key=CatalogStore.normalizeName)
+            self.assertEqual(self._result({"op": "complete", "prefix": prefix, "limit": 5}),expected[:5])
+        self.assertEqual(len(self._result({"op": "complete", "prefix": "SYN"})),10)
+
+    def testSuggest(self):
+        name = CatalogStore.getCatObject(self.picks[0]).name
+        for typo in (name + "x", name.replace("SYN", "SYM"), name.replace("SYN", "SYNN")):
+            self.assertIn(name,self._result({"op": "suggest", "name": typo}))
+        self.assertEqual(len(self._result({"op": "suggest", "name": "SYN 1", "limit": 3})),3)
+
+    def testLimitMustBePositive(self):
+        for op in ("complete", "suggest"):
+            for limit in (0, -1, "-1"):
+                response = BatchDriver.execute({"op": op, "prefix": "SYN", "name": "SYN 1", "limit": limit})
+                self.assertEqual(response,{"ok": False, "error": "Parameter 'limit' must be at least 1"})
+
+    def testExportColumns(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            filename = os.path.join(tmpDir,"out.csv")
+            for columns in ("name, RA", ["name", "RA"]):
+                result = self._result({"op": "export", "file": filename, "columns": columns})
+                self.assertEqual(result["numObjs"],NUM_OBJS)
+                with open(filename, "r", encoding="utf-8") as f:
+                    self.assertEqual(f.readline().strip().split(","),["name", "RA"])
+
+
+
+# Requests whose parameters are of the wrong type, which must fail with an error
+_BADLY_TYPED = (
+    {"op": "filter", "namePrefix": 5},
+    {"op": "filter", "const": ["Ori"]},
+    {"op": "export", "file": "out.csv", "columns": 5},
+    {"op": "export", "file": "out.csv", "columns": ["name", 5]},
+    {"op": "export", "file": "out.csv", "of": ["filter"]},
+    {"op": "export", "file": 5},
+    {"op": "objByName", "name": {"first": "M"}},
+    {"op": "objsByComments", "target": 5},
+    {"op": "objsInConst", "const": "Ori", "order": 1},
+    {"op": "complete", "prefix": 5},
+    {"op": "sort", "field": None},
+    {"op": "load", "file": [1, 2]},
+    {"op": "publish", "name": 5},
+    {"op": ["info"]},
+)
+
+class TestBadRequests(CatalogTestCase):
+
+    def testBadlyTypedParameters(self):
+        for request in _BADLY_TYPED:
+            response = BatchDriver.execute(request)
+            self.assertFalse(response["ok"],request)
+            self.assertIsInstance(response["error"],str)
+        self.assertTrue(CatalogStore.isCatalogLoaded())
+
+    def testUnexpectedError(self):
+        def fail(params):
+            raise RuntimeError("something went wrong")
+        with mock.patch.dict(BatchDriver.OPERATIONS, {"fail": fail}):
+            response = BatchDriver.execute({"op": "fail", "id": 7})
+        self.assertEqual(response,{"id": 7, "ok": False, "error": "RuntimeError: something went wrong"})
+
+    def testLinesAfterBadRequestsRun(self):
+        lines = [json.dumps(dict(request, id=k)) for k, request in enumerate(_BADLY_TYPED)]
+        lines = lines + ["not json", "[1, 2]", json.dumps({"op": "info", "id": "last"})]
+        responses, failures = _run(lines)
+        self.assertEqual(len(responses),len(lines))
+        self.assertEqual(failures,len(lines) - 1)
+        self.assertEqual([r.get("id") for r in responses[:len(_BADLY_TYPED)]],list(range(len(_BADLY_TYPED))))
+        self.assertTrue(responses[-1]["ok"])
+        self.assertEqual(responses[-1]["id"],"last")
+        self.assertEqual(responses[-1]["result"]["numObjs"],NUM_OBJS)
+
+    def testNoCatalog(self):
+        CatalogStore.clearCatalogAndSpaceObjects()
+        response = BatchDriver.execute({"op": "objByName", "name": "M31"})
+        self.assertEqual(response,{"ok": False, "error": "No catalog is currently loaded"})
+
+
+
+class TestCommandLine(CatalogTestCase):
+
+    def _main(self,argv):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            status = BatchDriver.main(argv)
+        return status, json.loads(out.getvalue())
+
+    def testOperation(self):
+        name = CatalogStore.getCatObject(self.picks[0]).name
+        status, response = self._main(["--catalog", self.filename, "objByName", "name=" + name])
+        self.assertEqual(status,0)
+        self.assertEqual(response["result"]["index"],self.picks[0])
+
+    def testMissingCatalog(self):
+        status, response = self._main(["--catalog", self.filename + ".missing", "info"])
+        self.assertEqual(status,1)
+        self.assertFalse(response["ok"])
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+"""
+Tests that a catalog read back from its compiled file is the same as
+the catalog parsed from its data file, and that a compiled file is only
+used while it matches the data file.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+import concurrent.futures
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    import ASTUtils.ASTCatalog
+except ImportError:
+    raise unittest.SkipTest("the ASTUtils package is not installed")
+
+import Chap1.Benchmarks as Benchmarks
+import Chap1.CatalogCache as CatalogCache
+import Chap1.CatalogParser as CatalogParser
+import Chap1.CatalogStore as CatalogStore
+
+# Number of objects in the synthetic catalog the tests use
+NUM_OBJS = 1000
+
+#==================================================
+# Tests
+#==================================================
+
+class TestCatalogCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.sourceDir = tempfile.TemporaryDirectory()
+        cls.source = Benchmarks.getSyntheticCatalog(cls.sourceDir.name,NUM_OBJS)
+        cls.expected = list(CatalogParser.iterCatalogObjects(cls.source))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.sourceDir.cleanup()
+
+    def setUp(self):
+        # Each test gets its own copy of the data file, with no compiled file yet
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpDir.name,"catalog.dat")
+        shutil.copyfile(self.source,self.filename)
+        self.opened = []
+
+    def tearDown(self):
+        for cat in self.opened:
+            cat.close()
+        CatalogStore.clearCatalogAndSpaceObjects()
+        self.tmpDir.cleanup()
+
+    def _load(self,lazy=False):
+        cat = CatalogCache.loadCompiledCatalog(self.filename,None,lazy)
+        self.opened.append(cat)
+        return cat
+
+    def _openCurrent(self,lazy=False):
+        cat = CatalogCache.openCurrentCompiledCatalog(self.filename,lazy)
+        if (cat != None):
+            self.opened.append(cat)
+        return cat
+
+    def _checkObjects(self,cat):
+        self.assertEqual(len(cat),len(self.expected))
+        for idx in range(len(cat)):
+            self.assertEqual(cat.getObject(idx),self.expected[idx])
+
+    def testRoundTrip(self):
+        self._checkObjects(self._load())
+        self.assertTrue(os.path.exists(CatalogCache.getCacheFilename(self.filename)))
+        # The second load reads the compiled file
+        cat = self._openCurrent()
+        self.assertNotEqual(cat,None)
+        self._checkObjects(cat)
+
+    def testLazyRoundTrip(self):
+        cat = self._load(True)
+        self.assertTrue(cat.isLazy())
+        self.assertEqual(cat.getStrings("name"),[obj.name for obj in self.expected])
+        self.assertTrue(CatalogStore.loadFormattedStarCatalog(self.filename,True))
+        self.assertTrue(CatalogStore.isLazyCatalog(CatalogStore._getCatalog()))
+        for idx in range(0,NUM_OBJS,7):
+            self.assertEqual(CatalogStore.getCatObject(idx),self.expected[idx])
+
+    def testStoreMatchesParsedCatalog(self):
+        self.assertTrue(CatalogStore.loadFormattedStarCatalog(self.filename))
+        self.assertEqual(CatalogStore.getCatNumObjs(),NUM_OBJS)
+        for idx in range(NUM_OBJS):
+            self.assertEqual(CatalogStore.getCatObject(idx),self.expected[idx])
+
+    def testChangedDataFile(self):
+        self._load()
+        with open(self.filename, "r", encoding="utf-8") as f:
+            text = f.read()
+        with open(self.filename, "w", encoding="utf-8", newline="\n") as f:
+            f.write(text.replace("<Name>SYN 1</Name>", "<Name>Renamed</Name>", 1))
+        self.assertEqual(self._openCurrent(),None)
+        cat = self._load()
+        self.assertEqual(cat.getObject(0).name,"Renamed")
+        self.assertEqual(cat.getObject(1),self.expected[1])
+
+    def testTouchedDataFile(self):
+        self._load()
+        st = os.stat(self.filename)
+        os.utime(self.filename,ns=(st.st_atime_ns, st.st_mtime_ns + 5000000000))
+        cat = self._openCurrent()
+        self.assertNotEqual(cat,None)
+        # The key is brought up to date, so the next load need not hash the file
+        self.assertEqual(cat.key["mtime"],os.stat(self.filename).st_mtime_ns)
+        again = self._openCurrent()
+        self.assertEqual(again.key["mtime"],os.stat(self.filename).st_mtime_ns)
+        self._checkObjects(again)
+
+    def testDamagedCompiledFile(self):
+        self._load()
+        with open(CatalogCache.getCacheFilename(self.filename), "r+b") as f:
+            f.write(b"garbage!")
+        self.assertEqual(self._openCurrent(),None)
+        self._checkObjects(self._load())
+
+
+
+class TestLoadingSeveral(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.filenames = [Benchmarks.getSyntheticCatalog(self.tmpDir.name,NUM_OBJS,seed) for seed in (1, 2, 3)]
+        self.expected = [list(CatalogParser.iterCatalogObjects(f)) for f in self.filenames]
+        # The first catalog is already compiled, and the others have to be compiled in the pool
+        CatalogCache.loadCompiledCatalog(self.filenames[0]).close()
+
+    def tearDown(self):
+        self.tmpDir.cleanup()
+
+    def testWorkersAreSpawned(self):
+        startMethods = []
+        ProcessPoolExecutor = concurrent.futures.ProcessPoolExecutor
+        def makePool(**kwargs):
+            startMethods.append(kwargs["mp_context"].get_start_method())
+            return ProcessPoolExecutor(**kwargs)
+        with mock.patch("concurrent.futures.ProcessPoolExecutor", makePool):
+            cats = CatalogCache.loadCompiledCatalogs(self.filenames,2)
+        try:
+            self.assertEqual(startMethods,["spawn"])
+            for cat, objs in zip(cats, self.expected):
+                self.assertEqual([cat.getObject(i) for i in range(len(cat))],objs)
+        finally:
+            for cat in cats:
+                cat.close()
+
+    def testOpenedCatalogsClosedOnError(self):
+        opened = []
+        openCurrent = CatalogCache.openCurrentCompiledCatalog
+        def openAndRemember(filename,lazy=False):
+            cat = openCurrent(filename,lazy)
+            opened.append(cat)
+            return cat
+        def cancel(numDone,numFiles):
+            raise RuntimeError("cancelled")
+        with mock.patch.object(CatalogCache, "openCurrentCompiledCatalog", openAndRemember):
+            with self.assertRaises(RuntimeError):
+                CatalogCache.loadCompiledCatalogs(self.filenames,2,cancel)
+        self.assertNotEqual(opened[0],None)
+        self.assertEqual(opened[0].mm,None)
+        self.assertEqual(opened[0].RA,None)
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Tests filters with several conditions against checking every object.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+import random
+import unittest
+
+try:
+    import ASTUtils.ASTCatalog as ASTCatalog
+    import ASTUtils.ASTConstellation as ASTConstellation
+    from ASTUtils.ASTMisc import ASCENDING_ORDER, DESCENDING_ORDER
+except ImportError:
+    raise unittest.SkipTest("the ASTUtils package is not installed")
+
+import Chap1.CatalogFilter as CatalogFilter
+import Chap1.CatalogStore as CatalogStore
+from Chap1.tests.test_CatalogStore import CatalogTestCase, NUM_OBJS
+
+#==================================================
+# Tests
+#==================================================
+
+def _matches(f,obj):
+    """Checks whether an object satisfies every condition of a filter, one condition at a time"""
+    if ((f.constIdx != None) and (obj.constIdx != f.constIdx)):
+        return False
+    if ((f.mVMin != None) or (f.mVMax != None)):
+        if (obj.mV == None):
+            return False
+        if (((f.mVMin != None) and (obj.mV < f.mVMin)) or ((f.mVMax != None) and (obj.mV > f.mVMax))):
+            return False
+    if (((f.DeclLo != None) and (obj.Decl < f.DeclLo)) or ((f.DeclHi != None) and (obj.Decl > f.DeclHi))):
+        return False
+    if ((f.RAStart != None) and (f.RAEnd != None) and (f.RAEnd - f.RAStart < 24.0)):
+        raLo = f.RAStart % 24.0
+        raHi = f.RAEnd % 24.0
+        RA = obj.RA % 24.0
+        inRA = ((RA >= raLo) and (RA <= raHi)) if (raLo <= raHi) else ((RA >= raLo) or (RA <= raHi))
+        if not (inRA):
+            return False
+    if (f.namePrefix != None):
+        return CatalogStore.normalizeName(obj.name).startswith(CatalogStore.normalizeName(f.namePrefix))
+    return True
+
+
+
+class TestCatalogFilter(CatalogTestCase):
+
+    def _check(self,f):
+        expected = [i for i in CatalogStore.getActiveOrder() if _matches(f,CatalogStore.getCatObject(i))]
+        self.assertEqual(f.apply(),expected,f.describe())
+        return expected
+
+    def _randomFilter(self,rnd):
+        kwargs = {}
+        if (rnd.random() < 0.5):
+            kwargs["constIdx"] = rnd.randrange(ASTConstellation.getNumConstellations())
+        if (rnd.random() < 0.5):
+            kwargs["mVMin"] = rnd.uniform(-1.0, 10.0)
+        if (rnd.random() < 0.5):
+            kwargs["mVMax"] = rnd.uniform(2.0, 16.0)
+        if (rnd.random() < 0.5):
+            kwargs["RAStart"] = rnd.uniform(0.0, 24.0)
+            kwargs["RAEnd"] = rnd.uniform(0.0, 24.0)
+        if (rnd.random() < 0.5):
+            kwargs["DeclLo"] = rnd.uniform(-90.0, 30.0)
+        if (rnd.random() < 0.5):
+            kwargs["DeclHi"] = rnd.uniform(-30.0, 90.0)
+        if (rnd.random() < 0.4):
+            kwargs["namePrefix"] = rnd.choice(("SYN 1", "syn2", "S", "SYN 19", "xyz", " "))
+        return CatalogFilter.CatalogFilter(**kwargs)
+
+    def testRandomFilters(self):
+        rnd = random.Random(1)
+        for i in range(200):
+            self._check(self._randomFilter(rnd))
+
+    def testRandomFiltersWhenSorted(self):
+        CatalogStore.sortStarCatalog(ASTCatalog.CatalogSortField.DECL,DESCENDING_ORDER)
+        rnd = random.Random(2)
+        for i in range(50):
+            self._check(self._randomFilter(rnd))
+
+    def testEachConditionAlone(self):
+        self.assertGreater(len(self._check(CatalogFilter.CatalogFilter(constIdx=0))),0)
+        self.assertGreater(len(self._check(CatalogFilter.CatalogFilter(mVMin=5.0,mVMax=6.0))),0)
+        self.assertGreater(len(self._check(CatalogFilter.CatalogFilter(mVMax=3.0))),0)
+        self.assertGreater(len(self._check(CatalogFilter.CatalogFilter(RAStart=23.0,RAEnd=1.0))),0)
+        self.assertGreater(len(self._check(CatalogFilter.CatalogFilter(DeclLo=60.0))),0)
+        self.assertGreater(len(self._check(CatalogFilter.CatalogFilter(namePrefix="syn 12"))),0)
+
+    def testIntersection(self):
+        # Objects satisfying all of the conditions are those that each condition alone finds
+        together = set(self._check(CatalogFilter.CatalogFilter(constIdx=1,mVMax=12.0,RAStart=20.0,RAEnd=8.0,
+                                                               DeclHi=45.0)))
+        expected = set(range(NUM_OBJS))
+        for f in (CatalogFilter.CatalogFilter(constIdx=1), CatalogFilter.CatalogFilter(mVMax=12.0),
+                  CatalogFilter.CatalogFilter(RAStart=20.0,RAEnd=8.0), CatalogFilter.CatalogFilter(DeclHi=45.0)):
+            expected.intersection_update(f.apply())
+        self.assertEqual(together,expected)
+        self.assertGreater(len(together),0)
+
+    def testEmptyFilter(self):
+        CatalogStore.sortStarCatalog(ASTCatalog.CatalogSortField.OBJNAME,ASCENDING_ORDER)
+        f = CatalogFilter.CatalogFilter(namePrefix="  ")
+        self.assertTrue(f.isEmpty())
+        self.assertEqual(f.apply(),list(CatalogStore.getActiveOrder()))
+
+    def testNoCatalog(self):
+        CatalogStore.clearCatalogAndSpaceObjects()
+        self.assertEqual(CatalogFilter.CatalogFilter(mVMax=6.0).apply(),[])
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    unittest.main()
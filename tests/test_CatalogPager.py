@@ -0,0 +1,133 @@
+"""
+Tests paging through the catalog and through lists of objects, and
+what happens to a pager when the catalog is sorted, cleared, or
+another catalog is loaded after the pager was made.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+import types
+import unittest
+
+try:
+    import ASTUtils.ASTCatalog as ASTCatalog
+    from ASTUtils.ASTMisc import DESCENDING_ORDER
+    import tkinter as tk
+except ImportError:
+    raise unittest.SkipTest("the ASTUtils package or tkinter is not installed")
+
+import Chap1.Benchmarks as Benchmarks
+import Chap1.CatalogPager as CatalogPager
+import Chap1.CatalogStore as CatalogStore
+from Chap1.tests.test_CatalogStore import CatalogTestCase, NUM_OBJS
+
+# Number of objects in the smaller catalog that replaces the usual one
+NUM_SMALL = 100
+
+def _rowsAt(positions):
+    return [CatalogStore.formatObjRow(CatalogStore.getObjIndexAt(pos)) for pos in positions]
+
+
+
+#==================================================
+# Tests
+#==================================================
+
+class TestPagers(CatalogTestCase):
+
+    def _loadSmaller(self):
+        smaller = Benchmarks.getSyntheticCatalog(self.tmpDir.name,NUM_SMALL,2)
+        self.assertTrue(CatalogStore.loadFormattedStarCatalog(smaller))
+
+    def testPages(self):
+        pager = CatalogPager.CatalogPager(10,1209,500)
+        self.assertEqual(pager.getNumRows(),1200)
+        self.assertEqual(pager.getNumPages(),3)
+        self.assertEqual(list(pager.iterPage(2)),_rowsAt(range(1010,1210)))
+        self.assertEqual(list(pager.iterRows(1195,10)),_rowsAt(range(1205,1210)))
+
+    def testRangeAfterReload(self):
+        pager = CatalogPager.CatalogPager()
+        self.assertEqual(pager.getNumRows(),NUM_OBJS)
+        self._loadSmaller()
+        self.assertFalse(pager.isCurrent())
+        self.assertEqual(list(pager.iterRows(NUM_OBJS - 2,2)),[])
+        self.assertTrue(pager.isCurrent())
+        self.assertEqual(pager.getNumRows(),NUM_SMALL)
+        self.assertEqual(list(pager.iterRows(NUM_SMALL - 2,5)),_rowsAt(range(NUM_SMALL - 2,NUM_SMALL)))
+
+    def testRangeAfterSort(self):
+        pager = CatalogPager.CatalogPager(0,49)
+        CatalogStore.sortStarCatalog(ASTCatalog.CatalogSortField.OBJNAME,DESCENDING_ORDER)
+        self.assertEqual(list(pager.iterRows(0,50)),_rowsAt(range(50)))
+
+    def testRangeAfterClear(self):
+        pager = CatalogPager.CatalogPager()
+        CatalogStore.clearCatalogAndSpaceObjects()
+        self.assertFalse(pager.refresh())
+        self.assertEqual(list(pager.iterRows(0,10)),[])
+
+    def testListAfterReload(self):
+        pager = CatalogPager.ListPager(self.picks)
+        self._loadSmaller()
+        self.assertFalse(pager.refresh())
+        # Neither an IndexError nor rows for whatever objects now have those indices
+        self.assertEqual(list(pager.iterRows(0,len(self.picks))),[])
+
+    def testListAfterSort(self):
+        pager = CatalogPager.ListPager(self.picks)
+        CatalogStore.sortStarCatalog(ASTCatalog.CatalogSortField.RA,DESCENDING_ORDER)
+        self.assertEqual(list(pager.iterRows(0,len(self.picks))),
+                         [CatalogStore.formatObjRow(idx) for idx in self.picks])
+
+
+
+class TestVirtualView(CatalogTestCase):
+
+    def setUp(self):
+        try:
+            self.root = tk.Tk()
+        except tk.TclError:
+            self.skipTest("there is no display")
+        self.root.withdraw()
+        super().setUp()
+
+    def tearDown(self):
+        self.root.destroy()
+        super().tearDown()
+
+    def _text(self,view):
+        return view.text.get("1.0", tk.END).rstrip("\n").split("\n")
+
+    def testWheel(self):
+        view = CatalogPager.VirtualCatalogView(self.root,"Objects",CatalogPager.CatalogPager(),10)
+        for delta in (-1, -120, -3):
+            view._onWheel(types.SimpleNamespace(delta=delta))
+        self.assertEqual(view.top,9)
+        view._onWheel(types.SimpleNamespace(delta=1))
+        self.assertEqual(view.top,6)
+        self.assertEqual(self._text(view),_rowsAt(range(6,16)))
+
+    def testReloadWhileOpen(self):
+        view = CatalogPager.VirtualCatalogView(self.root,"Objects",CatalogPager.ListPager(self.picks),10)
+        listView = view
+        view = CatalogPager.VirtualCatalogView(self.root,"Objects",CatalogPager.CatalogPager(),10)
+        view.scrollTo(NUM_OBJS - 10)
+        smaller = Benchmarks.getSyntheticCatalog(self.tmpDir.name,NUM_SMALL,2)
+        self.assertTrue(CatalogStore.loadFormattedStarCatalog(smaller))
+        view._checkCatalog()
+        listView._checkCatalog()
+        self.assertEqual(view.top,NUM_SMALL - 10)
+        self.assertEqual(self._text(view),_rowsAt(range(NUM_SMALL - 10,NUM_SMALL)))
+        self.assertTrue(listView.stale)
+        self.assertEqual(listView.scrollTo(5),"break")
+        self.assertIn("can no longer be shown",self._text(listView)[0])
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    unittest.main()
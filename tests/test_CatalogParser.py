@@ -0,0 +1,113 @@
+"""
+Tests the streaming catalog parser: that the objects it produces do not
+depend on how the file is split into chunks, and that an object with a
+missing or invalid RA or Decl is reported rather than put at 0h, 0 deg.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+import io
+import os
+import tempfile
+import unittest
+
+try:
+    import ASTUtils.ASTConstellation as ASTConstellation
+except ImportError:
+    raise unittest.SkipTest("the ASTUtils package is not installed")
+
+import Chap1.Benchmarks as Benchmarks
+import Chap1.CatalogParser as CatalogParser
+import Chap1.CatalogStore as CatalogStore
+
+# Number of objects in the synthetic catalog the tests use
+NUM_OBJS = 500
+
+def _catalogText(objects):
+    """Makes the text of a catalog data file with the given <Object> bodies"""
+    return ("<Catalog>\n<Header>\n<CatalogType>Test</CatalogType>\n<Epoch>1950.0</Epoch>\n</Header>\n<Data>\n" +
+            "".join("<Object>" + obj + "</Object>\n" for obj in objects) + "</Data>\n</Catalog>\n").encode("utf-8")
+
+
+
+def _parse(text,chunkSize=CatalogParser.CHUNK_SIZE):
+    parser = CatalogParser.CatalogParser(io.BytesIO(text),chunkSize)
+    return parser, list(parser)
+
+
+
+#==================================================
+# Tests
+#==================================================
+
+class TestCatalogParser(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpDir = tempfile.TemporaryDirectory()
+        cls.filename = Benchmarks.getSyntheticCatalog(cls.tmpDir.name,NUM_OBJS)
+        with open(cls.filename, "rb") as f:
+            cls.text = f.read()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpDir.cleanup()
+
+    def testChunkSizesAgree(self):
+        parser, expected = _parse(self.text)
+        self.assertEqual(len(expected),NUM_OBJS)
+        for chunkSize in (1, 7, 64, 4096):
+            self.assertEqual(_parse(self.text,chunkSize)[1],expected,"chunk size %d" % chunkSize)
+        self.assertEqual(list(CatalogParser.iterCatalogObjects(self.filename,100)),expected)
+
+    def testObjectOffsets(self):
+        parser = CatalogParser.CatalogParser(io.BytesIO(self.text),50)
+        for obj in parser:
+            self.assertEqual(CatalogParser.parseObjectAt(self.text,parser.objOffset,{}),obj)
+        with self.assertRaises(ValueError):
+            CatalogParser.parseObjectAt(self.text,parser.objOffset + 1,{})
+
+    def testFields(self):
+        abbrev = ASTConstellation.getConstAbbrevName(1)
+        parser, objs = _parse(_catalogText(["<Name>A</Name><AltName>B</AltName><RA>5.5</RA><Decl>-22.25</Decl>" +
+                                            "<mV>8.4</mV><Constellation>" + abbrev + "</Constellation>" +
+                                            "<Comment>C &amp; D</Comment>",
+                                            "<Name>E</Name><RA>1</RA><Decl>2</Decl><Constellation>XYZ</Constellation>"]))
+        self.assertEqual(parser.header[CatalogParser.EPOCH_TAG],1950.0)
+        self.assertEqual(parser.header["CatalogType"],"Test")
+        self.assertEqual(objs,[CatalogParser.CatalogObject("A", "B", 5.5, -22.25, 8.4, 1, "C &amp; D"),
+                               CatalogParser.CatalogObject("E", "", 1.0, 2.0, None, -1, "")])
+
+    def testNoData(self):
+        parser, objs = _parse(b"<Catalog><Header><Epoch>2000</Epoch></Header></Catalog>")
+        self.assertEqual(objs,[])
+        self.assertEqual(parser.header[CatalogParser.EPOCH_TAG],2000.0)
+
+    def testBadCoordinates(self):
+        for body, message in (("<Name>M1</Name><Decl>22</Decl>", "'M1' has no RA"),
+                              ("<Name>M1</Name><RA>5.5</RA><Decl></Decl>", "'M1' has no Decl"),
+                              ("<Name>M1</Name><RA>5h</RA><Decl>22</Decl>", "'M1' has an invalid RA '5h'"),
+                              ("<RA>5.5</RA><Decl>north</Decl>", "no name has an invalid Decl 'north'")):
+            with self.assertRaises(ValueError) as cm:
+                _parse(_catalogText(["<Name>OK</Name><RA>1</RA><Decl>2</Decl>", body]))
+            self.assertIn(message,str(cm.exception))
+
+    def testBadCoordinatesInFile(self):
+        filename = os.path.join(self.tmpDir.name,"bad.dat")
+        with open(filename, "wb") as f:
+            f.write(_catalogText(["<Name>OK</Name><RA>1</RA><Decl>2</Decl>", "<Name>Bad</Name><RA>x</RA><Decl>2</Decl>"]))
+        with self.assertRaises(ValueError):
+            list(CatalogParser.iterCatalogObjects(filename))
+        # The catalog is not loaded rather than loaded with the object at 0h, 0 deg
+        CatalogStore.clearCatalogAndSpaceObjects()
+        self.assertFalse(CatalogStore.loadFormattedStarCatalog(filename))
+        self.assertFalse(CatalogStore.isCatalogLoaded())
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    unittest.main()
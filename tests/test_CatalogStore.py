@@ -0,0 +1,260 @@
+"""
+Tests the currently loaded catalog in CatalogStore: finding objects by
+name, by their comments, and by their positions, sorting the catalog,
+and what happens to those searches when the catalog is sorted, cleared,
+or loaded again.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+import math
+import random
+import tempfile
+import unittest
+
+try:
+    import ASTUtils.ASTCatalog as ASTCatalog
+    import ASTUtils.ASTConstellation as ASTConstellation
+    from ASTUtils.ASTMisc import ASCENDING_ORDER, DESCENDING_ORDER
+except ImportError:
+    raise unittest.SkipTest("the ASTUtils package is not installed")
+
+import Chap1.Benchmarks as Benchmarks
+import Chap1.CatalogStore as CatalogStore
+import Chap1.SpatialIndex as SpatialIndex
+
+# Number of objects in the synthetic catalog the tests use
+NUM_OBJS = 2000
+
+#==================================================
+# Tests
+#==================================================
+
+class CatalogTestCase(unittest.TestCase):
+    """Loads a synthetic catalog before each test and clears it afterwards"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpDir = tempfile.TemporaryDirectory()
+        cls.filename = Benchmarks.getSyntheticCatalog(cls.tmpDir.name,NUM_OBJS)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpDir.cleanup()
+
+    def setUp(self):
+        self.assertTrue(CatalogStore.loadFormattedStarCatalog(self.filename))
+        rnd = random.Random(1)
+        self.picks = [rnd.randrange(NUM_OBJS) for i in range(200)]
+
+    def tearDown(self):
+        CatalogStore.clearCatalogAndSpaceObjects()
+
+
+
+class TestNameLookup(CatalogTestCase):
+
+    def testFindsEveryName(self):
+        for idx in range(NUM_OBJS):
+            self.assertEqual(CatalogStore.findObjByName(CatalogStore.getCatObject(idx).name),idx)
+
+    def testIgnoresCaseAndSpaces(self):
+        for idx in self.picks:
+            name = CatalogStore.getCatObject(idx).name
+            self.assertEqual(CatalogStore.findObjByName(name.lower()),idx)
+            self.assertEqual(CatalogStore.findObjByName(" " + name.upper().replace(" ", "") + " "),idx)
+
+    def testFindsAltNames(self):
+        for idx in self.picks:
+            altName = CatalogStore.getCatObject(idx).altName
+            found = CatalogStore.findObjByAltName(altName.lower())
+            # Alternate names need not be unique, so any object with the name will do
+            self.assertGreaterEqual(found,0)
+            self.assertEqual(CatalogStore.normalizeName(CatalogStore.getCatObject(found).altName),
+                             CatalogStore.normalizeName(altName))
+
+    def testUnknownNames(self):
+        self.assertEqual(CatalogStore.findObjByName("no such object"),-1)
+        self.assertEqual(CatalogStore.findObjByAltName("no such object"),-1)
+        self.assertEqual(CatalogStore.findObjByName(""),-1)
+
+    def testClearAndReload(self):
+        name = CatalogStore.getCatObject(self.picks[0]).name
+        self.assertEqual(CatalogStore.findObjByName(name),self.picks[0])
+        CatalogStore.clearCatalogAndSpaceObjects()
+        self.assertFalse(CatalogStore.isCatalogLoaded())
+        self.assertEqual(CatalogStore.findObjByName(name),-1)
+        self.assertEqual(CatalogStore.findObjByAltName(name),-1)
+        self.assertTrue(CatalogStore.loadFormattedStarCatalog(self.filename))
+        self.assertEqual(CatalogStore.findObjByName(name),self.picks[0])
+
+
+
+def _sortKey(sortField,obj):
+    """Gets what an object is sorted by, worked out from the object itself"""
+    csf = ASTCatalog.CatalogSortField
+    if (sortField == csf.RA):
+        return obj.RA
+    if (sortField == csf.DECL):
+        return obj.Decl
+    if (sortField == csf.VISUAL_MAGNITUDE):
+        return math.inf if (obj.mV == None) else obj.mV
+    if (sortField == csf.OBJNAME):
+        return obj.name.lower()
+    if (sortField == csf.OBJ_ALTNAME):
+        return obj.altName.lower()
+    constName = ASTConstellation.getConstName(obj.constIdx).lower() if (obj.constIdx >= 0) else ""
+    if (sortField == csf.CONSTELLATION):
+        return constName
+    return (constName, obj.name.lower())
+
+
+
+class _LinePrt():
+    """Stands in for an ASTPrt instance and keeps the lines output to it"""
+
+    def __init__(self):
+        self.lines = []
+
+    def println(self,text=""):
+        self.lines.append(text)
+
+
+
+class TestSortOrder(CatalogTestCase):
+
+    def _checkOrder(self,sortField,sortOrder):
+        order = list(CatalogStore.getActiveOrder())
+        self.assertEqual(sorted(order),list(range(NUM_OBJS)))
+        keys = [_sortKey(sortField,CatalogStore.getCatObject(idx)) for idx in order]
+        if (sortOrder == DESCENDING_ORDER):
+            keys.reverse()
+        for p in range(1,len(keys)):
+            self.assertLessEqual(keys[p - 1],keys[p],"%s at position %d" % (sortField, p))
+        for p in range(0,NUM_OBJS,97):
+            self.assertEqual(CatalogStore.getObjPosition(CatalogStore.getObjIndexAt(p)),p)
+
+    def testEveryField(self):
+        for sortField in ASTCatalog.CatalogSortField:
+            for sortOrder in (ASCENDING_ORDER, DESCENDING_ORDER):
+                CatalogStore.sortStarCatalog(sortField,sortOrder)
+                self._checkOrder(sortField,sortOrder)
+
+    def testDescendingIsAscendingReversed(self):
+        for sortField in ASTCatalog.CatalogSortField:
+            CatalogStore.sortStarCatalog(sortField,ASCENDING_ORDER)
+            ascending = list(CatalogStore.getActiveOrder())
+            CatalogStore.sortStarCatalog(sortField,DESCENDING_ORDER)
+            self.assertEqual(list(CatalogStore.getActiveOrder()),ascending[::-1])
+
+    def testNameLookupsAfterSorting(self):
+        names = [(idx, CatalogStore.getCatObject(idx).name) for idx in self.picks]
+        for sortField in ASTCatalog.CatalogSortField:
+            CatalogStore.sortStarCatalog(sortField,DESCENDING_ORDER)
+            for idx, name in names:
+                self.assertEqual(CatalogStore.findObjByName(name),idx)
+                self.assertEqual(CatalogStore.getCatObject(idx).name,name)
+
+    def testClearForgetsSort(self):
+        CatalogStore.sortStarCatalog(ASTCatalog.CatalogSortField.RA,DESCENDING_ORDER)
+        CatalogStore.clearCatalogAndSpaceObjects()
+        self.assertEqual(list(CatalogStore.getActiveOrder()),[])
+        self.assertTrue(CatalogStore.loadFormattedStarCatalog(self.filename))
+        self.assertEqual(list(CatalogStore.getActiveOrder()),list(range(NUM_OBJS)))
+
+    def testConstMembersAfterDescendingSort(self):
+        sortField = ASTCatalog.CatalogSortField.VISUAL_MAGNITUDE
+        CatalogStore.sortStarCatalog(sortField,DESCENDING_ORDER)
+        descending = list(CatalogStore.getActiveOrder())
+        for constIdx in range(ASTConstellation.getNumConstellations()):
+            expected = [idx for idx in descending if (CatalogStore.getCatObject(idx).constIdx == constIdx)]
+            # The catalog's order is used when no order is asked for
+            self.assertEqual(list(CatalogStore.getConstMembers(constIdx)),expected)
+            self.assertEqual(list(CatalogStore.getConstMembers(constIdx,DESCENDING_ORDER)),expected)
+            ascending = list(CatalogStore.getConstMembers(constIdx,ASCENDING_ORDER))
+            self.assertEqual(ascending,expected[::-1])
+            keys = [_sortKey(sortField,CatalogStore.getCatObject(idx)) for idx in ascending]
+            self.assertEqual(keys,sorted(keys))
+
+    def testListConstellationInEachOrder(self):
+        CatalogStore.sortStarCatalog(ASTCatalog.CatalogSortField.OBJNAME,DESCENDING_ORDER)
+        constIdx = max(CatalogStore.getCatConstCounts().items(),key=lambda item: item[1])[0]
+        for sortOrder in (ASCENDING_ORDER, DESCENDING_ORDER):
+            prt = _LinePrt()
+            CatalogStore.displayAllObjsByConstellation(prt,constIdx,sortOrder)
+            rows = prt.lines[-CatalogStore.getCatConstCounts()[constIdx]:]
+            self.assertEqual(rows,[CatalogStore.formatObjRow(idx)
+                                   for idx in CatalogStore.getConstMembers(constIdx,sortOrder)])
+            names = [CatalogStore.getCatObject(idx).name.lower()
+                     for idx in CatalogStore.getConstMembers(constIdx,sortOrder)]
+            self.assertEqual(names,sorted(names,reverse=(sortOrder == DESCENDING_ORDER)))
+
+    def testSortPreparedForAnotherCatalog(self):
+        prepared = CatalogStore.prepareSort(ASTCatalog.CatalogSortField.OBJNAME)
+        self.assertTrue(CatalogStore.loadFormattedStarCatalog(self.filename))
+        self.assertFalse(CatalogStore.installSort(prepared,ASCENDING_ORDER))
+        self.assertEqual(list(CatalogStore.getActiveOrder()),list(range(NUM_OBJS)))
+
+
+
+# Comment searches, including ones that are too short to have a trigram
+_COMMENT_QUERIES = ("nebula", "globular cluster", "Var", "spiral galaxy", "xyz", "a", "st", "R ST",
+                    "clusterglobular", "")
+
+class TestCommentSearch(CatalogTestCase):
+
+    def _checkQueries(self):
+        for q in _COMMENT_QUERIES:
+            self.assertEqual(CatalogStore.findObjsByComments(q),CatalogStore.scanObjsByComments(q),repr(q))
+
+    def testMatchesScan(self):
+        self._checkQueries()
+        self.assertGreater(len(CatalogStore.findObjsByComments("nebula")),0)
+
+    def testMatchesScanWhenSorted(self):
+        CatalogStore.sortStarCatalog(ASTCatalog.CatalogSortField.OBJ_ALTNAME,DESCENDING_ORDER)
+        self._checkQueries()
+
+    def testMatchesScanWhenLazy(self):
+        self.assertTrue(CatalogStore.loadFormattedStarCatalog(self.filename,True))
+        self.assertTrue(CatalogStore.isLazyCatalog(CatalogStore._getCatalog()))
+        self._checkQueries()
+
+    def testScanFindsComments(self):
+        for q in ("nebula", "R ST"):
+            target = CatalogStore.normalizeName(q)
+            expected = [i for i in range(NUM_OBJS)
+                        if (target in CatalogStore.normalizeName(CatalogStore.getCatObject(i).comment))]
+            self.assertEqual(CatalogStore.scanObjsByComments(q),expected)
+
+
+
+class TestPositionSearch(CatalogTestCase):
+
+    def _inActiveOrder(self,matches):
+        return [i for i in CatalogStore.getActiveOrder() if matches(CatalogStore.getCatObject(i))]
+
+    def testCones(self):
+        CatalogStore.sortStarCatalog(ASTCatalog.CatalogSortField.VISUAL_MAGNITUDE,ASCENDING_ORDER)
+        for RA, Decl, radius in ((0.1, 5.0, 20.0), (12.0, 90.0, 30.0), (6.0, -40.0, 0.0)):
+            # The objects' coordinates are rounded, so none is right on the edge
+            expected = self._inActiveOrder(lambda obj: SpatialIndex.angularSeparation(RA,Decl,obj.RA,obj.Decl) <= radius)
+            self.assertEqual(CatalogStore.findObjsInCone(RA,Decl,radius),expected)
+
+    def testBoxes(self):
+        CatalogStore.sortStarCatalog(ASTCatalog.CatalogSortField.OBJNAME,DESCENDING_ORDER)
+        for RAStart, RAEnd, DeclLo, DeclHi in ((22.0, 2.0, -30.0, 30.0), (3.0, 9.0, 10.0, 90.0)):
+            expected = self._inActiveOrder(lambda obj: ((obj.Decl >= DeclLo) and (obj.Decl <= DeclHi) and
+                                                        ((obj.RA >= RAStart) or (obj.RA <= RAEnd)
+                                                         if (RAStart > RAEnd) else
+                                                         (obj.RA >= RAStart) and (obj.RA <= RAEnd))))
+            self.assertEqual(CatalogStore.findObjsInBox(RAStart,RAEnd,DeclLo,DeclHi),expected)
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    unittest.main()
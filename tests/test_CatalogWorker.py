@@ -0,0 +1,150 @@
+"""
+Tests running jobs in the background, and that the time a job takes,
+and the time taken to show its results, are recorded in the menu
+operation statistics for the operation that started the job.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+import threading
+import time
+import unittest
+
+try:
+    import ASTUtils.ASTMisc
+    import tkinter
+except ImportError:
+    raise unittest.SkipTest("the ASTUtils package or tkinter is not installed")
+
+import Chap1.CatalogWorker as CatalogWorker
+import Chap1.MenuStats as MenuStats
+
+# Seconds that the jobs in the tests take
+JOB_TIME = 0.05
+
+class _FakeGUI():
+    """Stands in for the GUI object, running the functions given to after() when asked to"""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self,ms,func):
+        self.pending.append(func)
+
+    def runPending(self,timeout=5.0):
+        """Runs the pending functions until there are none left"""
+        deadline = time.perf_counter() + timeout
+        while (len(self.pending) > 0):
+            if (time.perf_counter() > deadline):
+                raise AssertionError("the job did not finish")
+            func = self.pending.pop(0)
+            func()
+            time.sleep(0.001)
+
+
+
+#==================================================
+# Tests
+#==================================================
+
+class TestCatalogWorker(unittest.TestCase):
+
+    def setUp(self):
+        MenuStats.resetStats()
+        self.gui = _FakeGUI()
+        self.worker = CatalogWorker.CatalogWorker(self.gui,1)
+        self.results = []
+
+    def tearDown(self):
+        MenuStats.resetStats()
+
+    def _onDone(self,result):
+        MenuStats.markPhase(MenuStats.PHASE_RENDER)
+        time.sleep(JOB_TIME)
+        self.results.append(result)
+
+    def _menuOperation(self,operation,func,onError=None):
+        """Does what a menu handler that starts a job does"""
+        timer = MenuStats.startOperation(operation)
+        try:
+            MenuStats.markPhase(MenuStats.PHASE_COMPUTE)
+            return self.worker.submit("job",func,self._onDone,onError)
+        finally:
+            MenuStats.finishOperation(timer)
+
+    def testJobTimeIsRecorded(self):
+        def work(job):
+            time.sleep(JOB_TIME)
+            return 42
+        self._menuOperation("op",work)
+        # The handler has returned, but the operation is not over until the job is
+        self.assertEqual(MenuStats.getStats(),{})
+        self.gui.runPending()
+        self.assertEqual(self.results,[42])
+        stats = MenuStats.getStats()
+        self.assertEqual(list(stats),["op"])
+        self.assertEqual(stats["op"].count,1)
+        self.assertGreaterEqual(stats["op"].phaseTimes[MenuStats.PHASE_COMPUTE],JOB_TIME)
+        self.assertGreaterEqual(stats["op"].phaseTimes[MenuStats.PHASE_RENDER],JOB_TIME)
+        self.assertGreaterEqual(stats["op"].totalTime,2 * JOB_TIME)
+
+    def testFailedJobIsRecorded(self):
+        errors = []
+        def work(job):
+            raise RuntimeError("failed")
+        self._menuOperation("op",work,errors.append)
+        self.gui.runPending()
+        self.assertEqual([str(e) for e in errors],["failed"])
+        self.assertEqual(MenuStats.getStats()["op"].count,1)
+
+    def testListenersHearOfJobs(self):
+        heard = []
+        listener = lambda operation, elapsed, phaseTimes: heard.append((operation, sorted(phaseTimes)))
+        MenuStats.addListener(listener)
+        try:
+            self._menuOperation("op",lambda job: 1)
+            self.gui.runPending()
+        finally:
+            MenuStats.removeListener(listener)
+        self.assertEqual(heard,[("op", sorted(MenuStats.PHASES))])
+
+    def testJobWithoutOperation(self):
+        self.worker.submit("job",lambda job: 1,self._onDone)
+        self.gui.runPending()
+        self.assertEqual(MenuStats.getStats()["job"].count,1)
+
+    def testCancelledJobIsNotRecorded(self):
+        started = threading.Event()
+        def work(job):
+            started.set()
+            while True:
+                job.reportProgress(0.5)
+                time.sleep(0.001)
+        self._menuOperation("slow",work)
+        started.wait(5.0)
+        # Preempting the job cancels it, so its operation is never recorded
+        self.assertEqual(self._menuOperation("busy",lambda job: 2),None)
+        timer = MenuStats.startOperation("fast")
+        self.worker.submit("job",lambda job: 3,self._onDone,preempt=True)
+        MenuStats.finishOperation(timer)
+        self.gui.runPending()
+        self.assertEqual(self.results,[3])
+        # The refused operation is over as soon as its handler returns
+        self.assertEqual(sorted(MenuStats.getStats()),["busy", "fast"])
+
+    def testNoCurrentOperationAfterwards(self):
+        self._menuOperation("op",lambda job: 1)
+        self.gui.runPending()
+        # A phase marked outside of any operation is ignored
+        MenuStats.markPhase(MenuStats.PHASE_RENDER)
+        self.assertEqual(MenuStats.getStats()["op"].count,1)
+        self.assertEqual(getattr(MenuStats._current, "timer", None),None)
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Tests the constellation boundary index against a linear scan of the
+boundary table, which is how ASTConstellation.findConstellationFromCoord
+finds a constellation.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+import os
+import random
+import unittest
+
+try:
+    import ASTUtils.ASTConstellation
+except ImportError:
+    raise unittest.SkipTest("the ASTUtils package is not installed")
+
+import Chap1.ConstBoundaryIndex as ConstBoundaryIndex
+
+#==================================================
+# Tests
+#==================================================
+
+def _scanTable(rows,RA,Decl):
+    """Finds the constellation for a coordinate the way the per-point search does"""
+    for raLow, raHigh, declLow, constIdx in rows:
+        if ((Decl >= declLow) and (RA >= raLow) and (RA < raHigh)):
+            return constIdx
+    return -1
+
+
+
+class TestConstBoundaryIndex(unittest.TestCase):
+
+    def setUp(self):
+        filename = ConstBoundaryIndex.getDefaultBoundaryFile()
+        if not os.path.exists(filename):
+            self.skipTest("the constellation boundaries file is not installed")
+        self.rows = ConstBoundaryIndex.loadBoundaryTable(filename)
+        self.index = ConstBoundaryIndex.ConstBoundaryIndex(self.rows)
+
+    def testRandomPointsMatchTableScan(self):
+        rnd = random.Random(1)
+        for i in range(5000):
+            RA = rnd.uniform(0.0, 24.0)
+            Decl = ConstBoundaryIndex._randomDecl(rnd)
+            self.assertEqual(self.index.findConstellation(RA,Decl),_scanTable(self.rows,RA,Decl),
+                             "RA %.6f, Decl %.6f" % (RA, Decl))
+
+    def testBoundaryLinesMatchTableScan(self):
+        # Points exactly on, and just either side of, every line in the table
+        for raLow, raHigh, declLow, constIdx in self.rows:
+            for RA in (raLow, raHigh, 0.5 * (raLow + raHigh)):
+                for Decl in (declLow - 1e-6, declLow, declLow + 1e-6):
+                    if ((RA >= 24.0) or (Decl < -90.0)):
+                        continue
+                    self.assertEqual(self.index.findConstellation(RA,Decl),_scanTable(self.rows,RA,Decl),
+                                     "RA %.6f, Decl %.6f" % (RA, Decl))
+
+    def testBatchMatchesSingleLookups(self):
+        rnd = random.Random(2)
+        raValues = [rnd.uniform(0.0, 24.0) for i in range(2000)]
+        declValues = [ConstBoundaryIndex._randomDecl(rnd) for i in range(2000)]
+        batch = self.index.findConstellations(raValues,declValues)
+        self.assertEqual(list(batch),[self.index.findConstellation(raValues[i],declValues[i])
+                                      for i in range(len(raValues))])
+
+    def testVerifyAgainstPerPoint(self):
+        # Only points within rounding of a boundary line may disagree
+        numPoints = 2000
+        mismatches = ConstBoundaryIndex.verifyAgainstPerPoint(numPoints)
+        self.assertLessEqual(len(mismatches),numPoints // 1000,mismatches)
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    unittest.main()
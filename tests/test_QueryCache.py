@@ -0,0 +1,143 @@
+"""
+Tests that cached search results are reused only for the catalog
+version they were computed for.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+from array import array
+import unittest
+
+try:
+    import ASTUtils.ASTCatalog as ASTCatalog
+    from ASTUtils.ASTMisc import ASCENDING_ORDER, DESCENDING_ORDER
+except ImportError:
+    raise unittest.SkipTest("the ASTUtils package is not installed")
+
+import Chap1.Benchmarks as Benchmarks
+import Chap1.CatalogStore as CatalogStore
+import Chap1.QueryCache as QueryCache
+from Chap1.tests.test_CatalogStore import CatalogTestCase, NUM_OBJS
+
+#==================================================
+# Tests
+#==================================================
+
+class _Counter():
+    """Stands in for a search, counting how many times it is done"""
+
+    def __init__(self,result):
+        self.result = result
+        self.calls = 0
+
+    def __call__(self):
+        self.calls = self.calls + 1
+        return self.result
+
+
+
+class TestQueryCache(unittest.TestCase):
+
+    def testHitsForSameVersion(self):
+        cache = QueryCache.QueryCache()
+        search = _Counter([1, 2, 3])
+        self.assertEqual(cache.lookup("op",("a",),1,search),[1, 2, 3])
+        self.assertEqual(cache.lookup("op",("a",),1,search),[1, 2, 3])
+        self.assertEqual(search.calls,1)
+        self.assertEqual(cache.getStats()["hits"],1)
+        self.assertEqual(cache.lookup("op",("b",),1,search),[1, 2, 3])
+        self.assertEqual(search.calls,2)
+
+    def testNewVersionDropsResults(self):
+        cache = QueryCache.QueryCache()
+        search = _Counter([1])
+        cache.lookup("op",("a",),1,search)
+        cache.lookup("op",("a",),2,search)
+        self.assertEqual(search.calls,2)
+        self.assertEqual(len(cache),1)
+        cache.lookup("op",("a",),2,search)
+        self.assertEqual(search.calls,2)
+
+    def testOldVersionIsNotCached(self):
+        # A search started before the catalog changed must not replace newer results
+        cache = QueryCache.QueryCache()
+        cache.lookup("op",("a",),5,_Counter([5]))
+        old = _Counter([4])
+        self.assertEqual(cache.lookup("op",("a",),4,old),[4])
+        self.assertEqual(cache.lookup("op",("a",),4,old),[4])
+        self.assertEqual(old.calls,2)
+        self.assertEqual(cache.lookup("op",("a",),5,_Counter([0])),[5])
+
+    def testResultsAreCopies(self):
+        cache = QueryCache.QueryCache()
+        first = cache.lookup("op",(),1,lambda: [1, 2])
+        first.append(3)
+        self.assertEqual(cache.lookup("op",(),1,lambda: []),[1, 2])
+        arr = cache.lookup("arr",(),1,lambda: array('i', [7]))
+        arr[0] = 8
+        self.assertEqual(cache.lookup("arr",(),1,lambda: array('i')),array('i', [7]))
+
+    def testBudget(self):
+        cache = QueryCache.QueryCache(10)
+        for k in range(5):
+            cache.lookup("op",(k,),1,lambda: [0, 0, 0, 0])
+        self.assertLessEqual(cache.getStats()["size"],10)
+        # The most recently used results are kept
+        search = _Counter([0, 0, 0, 0])
+        cache.lookup("op",(4,),1,search)
+        self.assertEqual(search.calls,0)
+        cache.lookup("op",(0,),1,search)
+        self.assertEqual(search.calls,1)
+        # Nothing is kept when there is no budget
+        cache.setSizeBudget(0)
+        self.assertEqual(len(cache),0)
+        cache.lookup("op",(9,),1,search)
+        cache.lookup("op",(9,),1,search)
+        self.assertEqual(search.calls,3)
+
+
+
+class TestCatalogVersions(CatalogTestCase):
+
+    def testSortChangesVersion(self):
+        version = CatalogStore.getCatalogVersion()
+        before = CatalogStore.findObjsByComments("nebula")
+        CatalogStore.sortStarCatalog(ASTCatalog.CatalogSortField.RA,DESCENDING_ORDER)
+        self.assertGreater(CatalogStore.getCatalogVersion(),version)
+        after = CatalogStore.findObjsByComments("nebula")
+        self.assertEqual(sorted(after),sorted(before))
+        self.assertEqual(after,CatalogStore.scanObjsByComments("nebula"))
+        members = CatalogStore.getConstMembers(0)
+        CatalogStore.sortStarCatalog(ASTCatalog.CatalogSortField.RA,ASCENDING_ORDER)
+        self.assertEqual(list(CatalogStore.getConstMembers(0)),list(members)[::-1])
+
+    def testReloadChangesVersion(self):
+        name = CatalogStore.getCatObject(NUM_OBJS - 1).name
+        self.assertEqual(CatalogStore.findObjByName(name),NUM_OBJS - 1)
+        version = CatalogStore.getCatalogVersion()
+        # A smaller catalog that does not have the object
+        smaller = Benchmarks.getSyntheticCatalog(self.tmpDir.name,NUM_OBJS // 2,2)
+        self.assertTrue(CatalogStore.loadFormattedStarCatalog(smaller))
+        self.assertGreater(CatalogStore.getCatalogVersion(),version)
+        self.assertEqual(CatalogStore.findObjByName(name),-1)
+        CatalogStore.clearCatalogAndSpaceObjects()
+        self.assertEqual(CatalogStore.findObjByName(name),-1)
+        self.assertEqual(CatalogStore.findObjsByComments("nebula"),[])
+
+    def testRepeatedSearchesHitCache(self):
+        QueryCache.getQueryCache().resetStats()
+        for i in range(3):
+            CatalogStore.findObjsByComments("globular")
+            CatalogStore.findObjByName("SYN 5")
+        stats = CatalogStore.getQueryCacheStats()
+        self.assertEqual(stats["misses"],2)
+        self.assertEqual(stats["hits"],4)
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+"""
+Tests the query server over a loopback connection: that pipelined and
+batched requests are answered in the order they were sent, that each
+request goes to the catalog it names, and that a refused operation, an
+unknown catalog, or a line that is too long gets an error response
+rather than stopping the server.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+import asyncio
+import json
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+try:
+    import ASTUtils.ASTCatalog
+except ImportError:
+    raise unittest.SkipTest("the ASTUtils package is not installed")
+
+import Chap1.Benchmarks as Benchmarks
+import Chap1.CatalogStore as CatalogStore
+import Chap1.QueryServer as QueryServer
+
+# Number of objects in the larger and smaller of the two catalogs served
+NUM_BIG = 2000
+NUM_SMALL = 500
+
+# Longest line and most requests in a batch that the server accepts in these tests
+MAX_LINE = 4096
+MAX_BATCH = 20
+
+# Seconds to wait for a response before a test fails
+TIMEOUT = 30
+
+#==================================================
+# Tests
+#==================================================
+
+class TestQueryServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpDir = tempfile.TemporaryDirectory()
+        cls.server = QueryServer.QueryServer(maxPending=8,maxBatch=MAX_BATCH)
+        cls.server.loadCatalog("big",[Benchmarks.getSyntheticCatalog(cls.tmpDir.name,NUM_BIG,1)])
+        cls.server.loadCatalog("small",[Benchmarks.getSyntheticCatalog(cls.tmpDir.name,NUM_SMALL,2)])
+        cls.loop = asyncio.new_event_loop()
+        with mock.patch.object(QueryServer, "MAX_LINE_LENGTH", MAX_LINE):
+            cls.loop.run_until_complete(cls.server.start(port=0))
+        cls.host, cls.port = cls.server.getAddress()[:2]
+        cls.thread = threading.Thread(target=cls.loop.run_forever,daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.loop.call_soon_threadsafe(cls.server.close)
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+        cls.thread.join(TIMEOUT)
+        cls.loop.close()
+        CatalogStore.clearCatalogAndSpaceObjects()
+        cls.tmpDir.cleanup()
+
+    def _connect(self):
+        return QueryServer.QueryClient(host=self.host,port=self.port,timeout=TIMEOUT)
+
+    def _rawConnect(self):
+        sock = socket.create_connection((self.host, self.port), TIMEOUT)
+        return sock, sock.makefile("rb")
+
+    def testCatalogs(self):
+        with self._connect() as client:
+            response = client.request("catalogs")
+        self.assertTrue(response["ok"],response.get("error"))
+        self.assertEqual([(c["name"], c["numObjs"], c["default"]) for c in response["result"]],
+                         [("big", NUM_BIG, True), ("small", NUM_SMALL, False)])
+
+    def testPipelinedInOrder(self):
+        # Names past the end of the small catalog are only found in the big
+        # one, so each response shows which catalog answered it
+        requests = []
+        for i in range(300):
+            request = {"id": i, "op": "objByName", "name": "SYN %d" % (NUM_SMALL + 1 + i)}
+            if (i % 3 == 1):
+                request["catalog"] = "small"
+            elif (i % 3 == 2):
+                request["catalog"] = "big"
+            requests.append(request)
+        with self._connect() as client:
+            responses = client.requestMany(requests)
+        self.assertEqual([r["id"] for r in responses],list(range(300)))
+        for request, response in zip(requests, responses):
+            self.assertTrue(response["ok"],response.get("error"))
+            if (request.get("catalog") == "small"):
+                self.assertEqual(response["result"],None)
+            else:
+                self.assertEqual(response["result"]["name"],request["name"])
+
+    def testBatch(self):
+        requests = [{"id": "b" + str(i), "op": "objByName", "name": "SYN %d" % (i + 1), "catalog": "small"}
+                    for i in range(MAX_BATCH - 1)]
+        requests.append({"id": "last", "op": "objsInRange", "start": 1, "count": 3})
+        with self._connect() as client:
+            responses = client.requestMany(requests,True)
+            # The connection is still usable after a batch
+            after = client.request("catalogs")
+        self.assertEqual([r["id"] for r in responses],[r["id"] for r in requests])
+        self.assertEqual([r["result"]["name"] for r in responses[:-1]],[r["name"] for r in requests[:-1]])
+        self.assertEqual(len(responses[-1]["result"]),3)
+        self.assertTrue(after["ok"])
+
+    def testErrorsAnsweredInOrder(self):
+        requests = [{"id": 1, "op": "objByName", "name": "SYN 1"},
+                    {"id": 2, "op": "load", "files": "elsewhere.dat"},
+                    {"id": 3, "op": "clear"},
+                    {"id": 4, "op": "objByName", "name": "SYN 1", "catalog": "missing"},
+                    {"id": 5, "op": "noSuchOp"},
+                    {"id": 6, "op": ["objByName"]},
+                    {"id": 7, "op": "objByName", "name": "SYN 1", "catalog": ["big"]},
+                    {"id": 8, "op": "objByName", "name": "SYN 2"}]
+        with self._connect() as client:
+            responses = client.requestMany(requests)
+        self.assertEqual([r["id"] for r in responses],list(range(1, 9)))
+        self.assertEqual([r["ok"] for r in responses],[True] + [False] * 6 + [True])
+        self.assertEqual(responses[1]["error"],"The operation 'load' is not served")
+        self.assertEqual(responses[2]["error"],"The operation 'clear' is not served")
+        self.assertEqual(responses[3]["error"],"No catalog named 'missing' is loaded")
+        self.assertEqual(responses[4]["error"],"Unknown operation 'noSuchOp'")
+        self.assertEqual(responses[7]["result"]["name"],"SYN 2")
+        # Nothing was changed by the refused operations
+        with self._connect() as client:
+            self.assertEqual(client.request("info")["result"]["numObjs"],NUM_BIG)
+
+    def testInvalidLines(self):
+        sock, fin = self._rawConnect()
+        try:
+            sock.sendall(b'not json\n[1, 2]\n' + json.dumps([{"op": "info"}] * (MAX_BATCH + 1)).encode("utf-8") +
+                         b'\n{"id": 9, "op": "info"}\n')
+            responses = [json.loads(fin.readline()) for i in range(4)]
+        finally:
+            fin.close()
+            sock.close()
+        self.assertTrue(all(r["error"].startswith("Invalid request: ") for r in responses[:3]))
+        self.assertEqual(responses[3]["id"],9)
+        self.assertTrue(responses[3]["ok"])
+
+    def testLineTooLong(self):
+        sock, fin = self._rawConnect()
+        try:
+            # Requests before the long line are answered first, then the
+            # error, and then the server closes the connection
+            sock.sendall(b'{"id": 1, "op": "info"}\n{"id": 2, "op": "catalogs"}\n' +
+                         b'{"id": 3, "op": "objByName", "name": "' + b"x" * MAX_LINE + b'"}\n')
+            sock.shutdown(socket.SHUT_WR)
+            responses = [json.loads(line) for line in fin]
+        finally:
+            fin.close()
+            sock.close()
+        self.assertEqual([r.get("id") for r in responses],[1, 2, None])
+        self.assertTrue(responses[0]["ok"] and responses[1]["ok"])
+        self.assertEqual(responses[2],{"ok": False, "error": "Invalid request: line is too long"})
+        # Other clients are still served
+        with self._connect() as client:
+            self.assertTrue(client.request("info")["ok"])
+
+    def testServerStats(self):
+        with self._connect() as client:
+            client.request("objByName",name="SYN 1",catalog="small")
+            stats = client.request("serverStats")["result"]
+        self.assertEqual(stats["catalogs"],["big", "small"])
+        self.assertGreater(stats["connections"],0)
+        self.assertGreater(stats["requests"],0)
+        self.assertGreaterEqual(stats["requests"],stats["failures"])
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+Tests sharing a loaded catalog through shared memory: a process that
+attaches to a published catalog must see the same objects as the
+process that published it, and no process can attach to a catalog once
+it has been withdrawn.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+import multiprocessing
+import tempfile
+import unittest
+
+try:
+    import ASTUtils.ASTCatalog
+except ImportError:
+    raise unittest.SkipTest("the ASTUtils package is not installed")
+
+import Chap1.Benchmarks as Benchmarks
+import Chap1.CatalogStore as CatalogStore
+import Chap1.SharedCatalog as SharedCatalog
+
+# Number of objects in each synthetic catalog the tests use
+NUM_OBJS = 1000
+
+#==================================================
+# Run in the attached process
+#==================================================
+
+def _readSharedCatalog(name):
+    """
+    Attaches to a shared catalog and reads it back.
+
+    :param str name: name of the shared memory segment
+    :return: list of every object in the catalog, or None if it could not be attached
+    """
+    if not (CatalogStore.attachSharedCatalog(name)):
+        return None
+    objs = [tuple(CatalogStore.getCatObject(idx)) for idx in range(CatalogStore.getCatNumObjs())]
+    CatalogStore.clearCatalogAndSpaceObjects()
+    return objs
+
+
+
+#==================================================
+# Tests
+#==================================================
+
+class TestSharedCatalog(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpDir = tempfile.TemporaryDirectory()
+        cls.filenames = [Benchmarks.getSyntheticCatalog(cls.tmpDir.name,NUM_OBJS,seed)
+                         for seed in (1, 2)]
+        # Spawned rather than forked, so the child has nothing but the segment
+        cls.pool = multiprocessing.get_context("spawn").Pool(1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+        cls.pool.join()
+        cls.tmpDir.cleanup()
+
+    def setUp(self):
+        self.attached = []
+
+    def tearDown(self):
+        for shared in self.attached:
+            shared.detach()
+        CatalogStore.clearCatalogAndSpaceObjects()
+
+    def _loadedObjects(self):
+        return [tuple(CatalogStore.getCatObject(idx)) for idx in range(CatalogStore.getCatNumObjs())]
+
+    def _checkRoundTrip(self):
+        expected = self._loadedObjects()
+        name = CatalogStore.publishCatalog()
+        self.assertEqual(self.pool.apply(_readSharedCatalog,(name,)),expected)
+
+    def testRoundTrip(self):
+        self.assertTrue(CatalogStore.loadFormattedStarCatalog(self.filenames[0],False))
+        self._checkRoundTrip()
+
+    def testLazyRoundTrip(self):
+        self.assertTrue(CatalogStore.loadFormattedStarCatalog(self.filenames[0],True))
+        self._checkRoundTrip()
+
+    def testMergedRoundTrip(self):
+        self.assertTrue(CatalogStore.loadFormattedStarCatalogs(self.filenames,False,False))
+        self.assertEqual(CatalogStore.getCatNumObjs(),2 * NUM_OBJS)
+        self._checkRoundTrip()
+
+    def testMergedLazyRoundTrip(self):
+        self.assertTrue(CatalogStore.loadFormattedStarCatalogs(self.filenames,False,True))
+        self._checkRoundTrip()
+
+    def testAttachInSameProcess(self):
+        self.assertTrue(CatalogStore.loadFormattedStarCatalog(self.filenames[0],False))
+        name = CatalogStore.publishCatalog()
+        shared = SharedCatalog.attachCatalog(name)
+        self.attached.append(shared)
+        self.assertFalse(shared.isWithdrawn())
+        self.assertEqual(len(shared.catalog),NUM_OBJS)
+        self.assertEqual(list(shared.catalog.RA),
+                         [CatalogStore.getCatObject(idx).RA for idx in range(NUM_OBJS)])
+
+    def testWithdrawn(self):
+        self.assertTrue(CatalogStore.loadFormattedStarCatalog(self.filenames[0],False))
+        name = CatalogStore.publishCatalog()
+        shared = SharedCatalog.attachCatalog(name)
+        self.attached.append(shared)
+        # Clearing the catalog withdraws it, but what is attached stays usable
+        CatalogStore.clearCatalogAndSpaceObjects()
+        self.assertTrue(shared.isWithdrawn())
+        self.assertEqual(len(shared.catalog.RA),NUM_OBJS)
+        with self.assertRaises((OSError, ValueError)):
+            SharedCatalog.attachCatalog(name)
+        self.assertEqual(self.pool.apply(_readSharedCatalog,(name,)),None)
+
+    def testPublishNothing(self):
+        with self.assertRaises(ValueError):
+            CatalogStore.publishCatalog()
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    unittest.main()
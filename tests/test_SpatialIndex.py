@@ -0,0 +1,126 @@
+"""
+Tests cone and box searches of the spatial index against checking every
+object.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+from array import array
+import math
+import random
+import unittest
+
+try:
+    import ASTUtils.ASTMisc
+except ImportError:
+    raise unittest.SkipTest("the ASTUtils package is not installed")
+
+import Chap1.SpatialIndex as SpatialIndex
+
+# Amount by which an object's distance from the center of a cone may
+# differ from the radius and still be on either side of it (rounding)
+_EDGE_TOLERANCE = 1e-9
+
+#==================================================
+# Tests
+#==================================================
+
+def _makePoints(rnd,count):
+    """Makes points spread over the sky, plus some at the poles and on 0h"""
+    RA = array('d')
+    Decl = array('d')
+    for i in range(count):
+        RA.append(rnd.uniform(0.0, 24.0))
+        Decl.append(math.degrees(math.asin(rnd.uniform(-1.0, 1.0))))
+    for RAValue, DeclValue in ((0.0, 90.0), (12.0, -90.0), (0.0, 0.0), (23.9999, 10.0), (0.0, -45.0)):
+        RA.append(RAValue)
+        Decl.append(DeclValue)
+    return RA, Decl
+
+
+
+def _inBox(RA,Decl,RAStart,RAEnd,DeclLo,DeclHi):
+    """Checks whether a point is in a box the same way findInBox is documented to"""
+    if ((Decl < DeclLo) or (Decl > DeclHi)):
+        return False
+    if (RAEnd - RAStart >= 24.0):
+        return True
+    raLo = RAStart % 24.0
+    raHi = RAEnd % 24.0
+    RA = RA % 24.0
+    if (raLo <= raHi):
+        return (RA >= raLo) and (RA <= raHi)
+    return (RA >= raLo) or (RA <= raHi)
+
+
+
+class TestSpatialIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.rnd = random.Random(1)
+        self.RA, self.Decl = _makePoints(self.rnd,5000)
+
+    def _checkCone(self,index,RA,Decl,radius):
+        found = index.findInCone(RA,Decl,radius)
+        self.assertEqual(found,sorted(found))
+        foundSet = set(found)
+        for i in range(len(self.RA)):
+            sep = SpatialIndex.angularSeparation(RA,Decl,self.RA[i],self.Decl[i])
+            if (i in foundSet):
+                self.assertLessEqual(sep,radius + _EDGE_TOLERANCE,(RA, Decl, radius, i))
+            else:
+                self.assertGreater(sep,radius - _EDGE_TOLERANCE,(RA, Decl, radius, i))
+
+    def _checkBox(self,index,RAStart,RAEnd,DeclLo,DeclHi):
+        expected = [i for i in range(len(self.RA))
+                    if _inBox(self.RA[i],self.Decl[i],RAStart,RAEnd,DeclLo,DeclHi)]
+        self.assertEqual(index.findInBox(RAStart,RAEnd,DeclLo,DeclHi),expected,
+                         (RAStart, RAEnd, DeclLo, DeclHi))
+
+    def testCones(self):
+        index = SpatialIndex.SpatialIndex(self.RA,self.Decl)
+        cones = [(0.0, 90.0, 5.0), (6.0, -90.0, 20.0), (0.0, 0.0, 3.0), (23.95, 10.0, 2.0),
+                 (12.0, 89.0, 2.0), (3.0, 45.0, 0.0), (3.0, 45.0, 180.0), (18.0, -30.0, 95.0)]
+        for i in range(50):
+            cones.append((self.rnd.uniform(0.0, 24.0), self.rnd.uniform(-90.0, 90.0),
+                          self.rnd.choice((0.5, 2.0, 10.0, 45.0))))
+        for RA, Decl, radius in cones:
+            self._checkCone(index,RA,Decl,radius)
+
+    def testConeAroundEachPointFindsIt(self):
+        index = SpatialIndex.SpatialIndex(self.RA,self.Decl)
+        for i in range(0,len(self.RA),50):
+            self.assertIn(i,index.findInCone(self.RA[i],self.Decl[i],1e-6))
+
+    def testBoxes(self):
+        index = SpatialIndex.SpatialIndex(self.RA,self.Decl)
+        boxes = [(0.0, 24.0, -90.0, 90.0), (22.0, 2.0, -10.0, 10.0), (20.0, 24.0, 0.0, 90.0),
+                 (0.0, 0.0, -90.0, 90.0), (5.0, 6.0, 30.0, 20.0), (10.0, 11.0, 80.0, 95.0),
+                 (-2.0, 1.0, -95.0, -60.0)]
+        for i in range(50):
+            DeclLo = self.rnd.uniform(-90.0, 90.0)
+            boxes.append((self.rnd.uniform(0.0, 24.0), self.rnd.uniform(0.0, 24.0), DeclLo,
+                          DeclLo + self.rnd.uniform(0.0, 40.0)))
+        for RAStart, RAEnd, DeclLo, DeclHi in boxes:
+            self._checkBox(index,RAStart,RAEnd,DeclLo,DeclHi)
+
+    def testBandHeights(self):
+        # The cells must not change the results, however coarse or fine they are
+        for bandHeight in (0.5, 10.0, 90.0):
+            index = SpatialIndex.SpatialIndex(self.RA,self.Decl,bandHeight)
+            self._checkCone(index,1.0,60.0,15.0)
+            self._checkBox(index,23.0,1.5,-20.0,20.0)
+
+    def testNoPoints(self):
+        index = SpatialIndex.SpatialIndex(array('d'),array('d'))
+        self.assertEqual(index.findInCone(0.0,0.0,180.0),[])
+        self.assertEqual(index.findInBox(0.0,24.0,-90.0,90.0),[])
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+"""
+Tests the trigram and prefix indexes against a plain scan of the strings
+they index, and the prefix index's suggestions for mistyped strings.
+
+Copyright (c) 2018
+
+:author: J. L. Lawrence
+:version 3.0, 2018
+"""
+
+import difflib
+import random
+import string
+import unittest
+
+try:
+    import ASTUtils.ASTConstellation
+except ImportError:
+    raise unittest.SkipTest("the ASTUtils package is not installed")
+
+import Chap1.CatalogStore as CatalogStore
+import Chap1.ConstSearch as ConstSearch
+import Chap1.ConstTables as ConstTables
+import Chap1.TextIndex as TextIndex
+
+# Words the test strings are made from
+_WORDS = ("Open", "globular", "cluster", "Spiral", "galaxy", "nebula", "double star",
+          "variable", "bright", "faint", "M 31", "NGC 224", "aaa", "aaaa", "x")
+
+#==================================================
+# Tests
+#==================================================
+
+def _scan(strings,target):
+    """Finds the strings containing target by looking at every one of them"""
+    target = CatalogStore.normalizeName(target)
+    return [k for k in range(len(strings)) if (target in CatalogStore.normalizeName(strings[k]))]
+
+
+
+def _makeStrings(rnd,count):
+    return [" ".join(rnd.choice(_WORDS) for w in range(rnd.randint(0, 4))) for i in range(count)]
+
+
+
+def _makeQueries(rnd,strings,count):
+    """Picks substrings of the strings of every length, plus a few that are not in any of them"""
+    queries = ["", " ", "zzz", "qq", "nebulaa", "Globular Cluster", "doublestar"]
+    for i in range(count):
+        s = rnd.choice(strings)
+        if (len(s) <= 0):
+            continue
+        start = rnd.randrange(len(s))
+        queries.append(s[start:start + rnd.randint(1, 8)])
+    return queries
+
+
+
+class TestTrigramIndex(unittest.TestCase):
+
+    def setUp(self):
+        rnd = random.Random(1)
+        self.strings = _makeStrings(rnd,1000)
+        self.queries = _makeQueries(rnd,self.strings,300)
+
+    def testMatchesScan(self):
+        index = TextIndex.TrigramIndex(self.strings,CatalogStore.normalizeName)
+        for q in self.queries:
+            self.assertEqual(index.search(q),_scan(self.strings,q),repr(q))
+
+    def testMatchesScanOverBudget(self):
+        # Most of the posting lists are dropped, so most searches check more candidates
+        index = TextIndex.TrigramIndex(self.strings,CatalogStore.normalizeName,2000)
+        self.assertGreater(len(index.dropped),0)
+        self.assertLessEqual(index.memoryUsed,2000)
+        for q in self.queries:
+            self.assertEqual(index.search(q),_scan(self.strings,q),repr(q))
+
+    def testNoStrings(self):
+        index = TextIndex.TrigramIndex([],CatalogStore.normalizeName)
+        self.assertEqual(index.search("abc"),[])
+        self.assertEqual(index.search(""),[])
+
+
+
+def _makeNames(rnd,count):
+    """Makes names of random letters, with a few that are prefixes of others or differ only in case"""
+    names = ["".join(rnd.choice(string.ascii_lowercase) for c in range(rnd.randint(5, 10))) for i in range(count)]
+    return names + [names[0][:3], names[1].upper(), names[2] + " b", ""]
+
+
+
+def _completions(keys,prefix,limit):
+    """Finds the completions of a prefix by sorting the keys that start with it"""
+    prefix = CatalogStore.normalizeName(prefix)
+    return sorted((k for k in range(len(keys)) if keys[k].startswith(prefix)), key=lambda k: (keys[k], k))[:limit]
+
+
+
+def _typos(rnd,s):
+    """Makes each kind of single character typo in a string"""
+    i = rnd.randrange(len(s) - 1)
+    c = rnd.choice([ch for ch in string.ascii_lowercase if (ch != s[i])])
+    return (s[:i] + c + s[i + 1:],                  # wrong character
+            s[:i] + s[i + 1:],                      # missing character
+            s[:i] + c + s[i:],                      # extra character
+            s[:i] + s[i + 1] + s[i] + s[i + 2:])    # swapped characters
+
+
+
+class TestPrefixIndex(unittest.TestCase):
+
+    def setUp(self):
+        rnd = random.Random(3)
+        self.names = _makeNames(rnd,3000)
+        self.keys = [CatalogStore.normalizeName(s) for s in self.names]
+        self.index = TextIndex.PrefixIndex(self.names,CatalogStore.normalizeName)
+
+    def testCompleteMatchesScan(self):
+        rnd = random.Random(4)
+        prefixes = ["", "a", "zz", "Q", self.names[0][:3], self.names[1], self.names[2] + " B", "abcdefghijk"]
+        prefixes = prefixes + [rnd.choice(self.names)[:rnd.randint(1, 4)] for i in range(200)]
+        for prefix in prefixes:
+            for limit in (1, 3, TextIndex.DEFAULT_COMPLETIONS, 100000):
+                self.assertEqual(list(self.index.complete(prefix,limit)),_completions(self.keys,prefix,limit),
+                                 repr(prefix))
+            self.assertEqual(self.index.count(prefix),len(_completions(self.keys,prefix,len(self.keys))))
+
+    def testSuggestsMistypedNames(self):
+        rnd = random.Random(5)
+        for k in range(0,3000,23):
+            for typo in _typos(rnd,self.names[k]):
+                found = list(self.index.suggest(typo))
+                self.assertLessEqual(len(found),TextIndex.DEFAULT_SUGGESTIONS)
+                self.assertIn(k,found,"%r for %r" % (typo, self.names[k]))
+                # None of the names is more like the typo than the first suggestion
+                score = difflib.SequenceMatcher(None,self.keys[found[0]],typo).ratio()
+                if (score < 1.0):
+                    self.assertEqual(difflib.get_close_matches(typo,self.keys,1,score + 1e-9),[])
+
+    def testSuggestionsAreMostSimilarFirst(self):
+        found = list(self.index.suggest(self.names[10][:-1] + "q",20,0.0))
+        scores = [difflib.SequenceMatcher(None,self.keys[k],self.keys[10][:-1] + "q").ratio() for k in found]
+        self.assertEqual(scores,sorted(scores,reverse=True))
+
+    def testNothingToSuggest(self):
+        self.assertEqual(list(self.index.suggest("")),[])
+        self.assertEqual(list(TextIndex.PrefixIndex([],CatalogStore.normalizeName).suggest("abc")),[])
+
+    def testLimitMustBePositive(self):
+        for limit in (0, -1):
+            with self.assertRaises(ValueError):
+                self.index.complete("a",limit)
+            with self.assertRaises(ValueError):
+                self.index.suggest("abc",limit)
+
+
+
+class TestConstellationNames(unittest.TestCase):
+
+    def testCompleteMatchesScan(self):
+        tables = ConstTables.getConstTables()
+        for byAbbrev, names in ((False, tables.names), (True, tables.abbrevs)):
+            keys = [CatalogStore.normalizeName(s) for s in names]
+            for prefix in [""] + [name[:n] for name in names for n in (1, 2, 3)]:
+                self.assertEqual(ConstSearch.completeConstNames(prefix,5,byAbbrev),_completions(keys,prefix,5))
+
+    def testSuggest(self):
+        tables = ConstTables.getConstTables()
+        for idx in range(len(tables.names)):
+            name = tables.names[idx]
+            self.assertEqual(ConstSearch.suggestConstNames(name,1),[idx])
+            self.assertIn(idx,ConstSearch.suggestConstNames(name[:-1] + "x" + name[-1]))
+        with self.assertRaises(ValueError):
+            ConstSearch.suggestConstNames(tables.names[0],-1)
+
+
+
+class TestConstellationMeanings(unittest.TestCase):
+
+    def testMatchesScan(self):
+        meanings = ConstTables.getConstTables().meanings
+        rnd = random.Random(2)
+        for q in _makeQueries(rnd,meanings,100):
+            self.assertEqual(ConstSearch.findConstellationsByMeaning(q),_scan(meanings,q),repr(q))
+
+
+
+#=========== Main entry point ===============
+if __name__ == '__main__':
+    unittest.main()